@@ -6,16 +6,21 @@ Based on Google OR-Tools CVRP solver
 Author: BARQ Fleet Management Team
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
 import pandas as pd
-import numpy as np
+import json
 import logging
 from datetime import datetime
 import os
 
+from profiling import PROFILE_ARTIFACTS, PROFILE_DIR, is_authorized, profiled, valid_profile_id
+from solution_index import SolutionIndex
+from symmetric_matrix import SymmetricMatrix, matrix_lookup
+from travel_time import TimeDependentTravelTime, parse_clock, validate_route_timing
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
@@ -38,19 +43,27 @@ class CVRPOptimizer:
         self.solution_cache = {}
         logger.info("CVRP Optimizer initialized")
 
-    def optimize(self, distance_matrix, demands, vehicle_capacities, num_vehicles, depot=0, time_limit=5, time_windows=None, service_times=None):
+    def optimize(self, distance_matrix, demands, vehicle_capacities, num_vehicles, depot=0, time_limit=5, time_windows=None, service_times=None,
+                 local_search_metaheuristic='GUIDED_LOCAL_SEARCH', travel_time_model=None, start_minute=0,
+                 initial_routes=None):
         """
         Solve CVRP problem using Google OR-Tools with optional time windows
 
         Args:
-            distance_matrix: 2D array of distances between locations
+            distance_matrix: 2D array of distances between locations, or a SymmetricMatrix
             demands: Array of demand at each location (parcels/weight)
             vehicle_capacities: Array of vehicle capacities
             num_vehicles: Number of vehicles
             depot: Index of depot location (default: 0)
-            time_limit: Maximum solve time in seconds
+            time_limit: Maximum solve time in seconds (fractions allowed)
             time_windows: Optional list of (earliest, latest) time tuples for each location in minutes
             service_times: Optional list of service time at each location in minutes
+            local_search_metaheuristic: OR-Tools metaheuristic name (GREEDY_DESCENT stops at the
+                first local optimum instead of running until the time limit)
+            travel_time_model: Optional TimeDependentTravelTime replacing the constant-speed time matrix
+            start_minute: Minute of day the plan starts (time windows are relative to it)
+            initial_routes: Optional per-vehicle lists of node indices to start the search from
+                (falls back to PATH_CHEAPEST_ARC if the routes are not a feasible assignment)
 
         Returns:
             dict: Optimized routes with metrics
@@ -78,11 +91,13 @@ class CVRPOptimizer:
             routing = pywrapcp.RoutingModel(manager)
 
             # Create distance callback
+            distance = matrix_lookup(data['distance_matrix'])
+
             def distance_callback(from_index, to_index):
                 """Returns the distance between the two nodes."""
                 from_node = manager.IndexToNode(from_index)
                 to_node = manager.IndexToNode(to_index)
-                return int(data['distance_matrix'][from_node][to_node])
+                return int(distance(from_node, to_node))
 
             transit_callback_index = routing.RegisterTransitCallback(distance_callback)
             routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
@@ -106,21 +121,34 @@ class CVRPOptimizer:
             if time_windows is not None:
                 logger.info("Adding time window constraints")
 
-                # Convert distance matrix to time matrix (assuming average speed)
-                # Average speed: 40 km/h in urban areas = 0.667 km/min
-                # Distance in meters, so meters/min = 40000/60 = 667 m/min
-                speed_m_per_min = 667
-                time_matrix = [[int(dist / speed_m_per_min) for dist in row] for row in distance_matrix]
-
                 # Add service times if provided
                 if service_times is None:
                     service_times = [0] * len(distance_matrix)
 
+                if travel_time_model is not None:
+                    # Transit callbacks cannot see the departure time, so each origin uses the
+                    # traffic slice at its window opening; validate_route_timing re-checks exactly
+                    departures = [
+                        start_minute + time_windows[node][0] + service_times[node]
+                        for node in range(len(distance_matrix))
+                    ]
+                    travel_time = travel_time_model.departure_lookup(departures)
+                else:
+                    # Convert distance matrix to time matrix (assuming average speed)
+                    # Average speed: 40 km/h in urban areas = 0.667 km/min
+                    # Distance in meters, so meters/min = 40000/60 = 667 m/min
+                    speed_m_per_min = 667
+                    if isinstance(distance_matrix, SymmetricMatrix):
+                        time_matrix = distance_matrix.scaled(speed_m_per_min)
+                    else:
+                        time_matrix = [[int(dist / speed_m_per_min) for dist in row] for row in distance_matrix]
+                    travel_time = matrix_lookup(time_matrix)
+
                 def time_callback(from_index, to_index):
                     """Returns the travel time + service time."""
                     from_node = manager.IndexToNode(from_index)
                     to_node = manager.IndexToNode(to_index)
-                    return time_matrix[from_node][to_node] + service_times[from_node]
+                    return travel_time(from_node, to_node) + service_times[from_node]
 
                 time_callback_index = routing.RegisterTransitCallback(time_callback)
 
@@ -152,17 +180,39 @@ class CVRPOptimizer:
             search_parameters.first_solution_strategy = (
                 routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
             )
-            search_parameters.local_search_metaheuristic = (
-                routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+            search_parameters.local_search_metaheuristic = getattr(
+                routing_enums_pb2.LocalSearchMetaheuristic, local_search_metaheuristic
             )
-            search_parameters.time_limit.FromSeconds(time_limit)
-
-            # Solve the problem
-            solution = routing.SolveWithParameters(search_parameters)
+            search_parameters.time_limit.FromMilliseconds(int(time_limit * 1000))
+
+            # Solve the problem, warm-starting from the initial routes when they are feasible
+            initial_solution = None
+            if initial_routes:
+                routing.CloseModelWithParameters(search_parameters)
+                initial_solution = routing.ReadAssignmentFromRoutes(initial_routes, True)
+                if initial_solution is None:
+                    logger.info("Initial routes are infeasible, solving from scratch")
+
+            if initial_solution is not None:
+                solution = routing.SolveFromAssignmentWithParameters(initial_solution, search_parameters)
+            else:
+                solution = routing.SolveWithParameters(search_parameters)
 
             if solution:
                 has_time_dimension = time_windows is not None
-                return self._extract_solution(data, manager, routing, solution, has_time_dimension)
+                result = self._extract_solution(data, manager, routing, solution, has_time_dimension,
+                                                local_search_metaheuristic)
+
+                if initial_solution is not None:
+                    result['optimization_metadata']['initial_solution'] = 'warm_start'
+
+                if travel_time_model is not None:
+                    result['optimization_metadata']['travel_time_model'] = 'time_dependent'
+                    result['time_dependent_validation'] = validate_route_timing(
+                        result['routes'], travel_time_model, start_minute, service_times, time_windows
+                    )
+
+                return result
             else:
                 logger.error("No solution found")
                 return {'success': False, 'error': 'No solution found'}
@@ -171,7 +221,8 @@ class CVRPOptimizer:
             logger.error(f"CVRP optimization error: {str(e)}")
             return {'success': False, 'error': str(e)}
 
-    def _extract_solution(self, data, manager, routing, solution, has_time_dimension=False):
+    def _extract_solution(self, data, manager, routing, solution, has_time_dimension=False,
+                          local_search_metaheuristic='GUIDED_LOCAL_SEARCH'):
         """Extract solution from OR-Tools solver"""
         routes = []
         total_distance = 0
@@ -233,7 +284,8 @@ class CVRPOptimizer:
                 'stops': route_stops,
                 'total_distance': route_distance,
                 'total_load': route_load,
-                'capacity_utilization': (route_load / data['vehicle_capacities'][vehicle_id]) * 100
+                'capacity_utilization': (route_load / data['vehicle_capacities'][vehicle_id] * 100)
+                if data['vehicle_capacities'][vehicle_id] > 0 else 0
             }
 
             if time_dimension:
@@ -264,16 +316,121 @@ class CVRPOptimizer:
             'summary': summary,
             'optimization_metadata': {
                 'algorithm': 'OR-Tools CVRP',
-                'strategy': 'PATH_CHEAPEST_ARC + GUIDED_LOCAL_SEARCH',
+                'strategy': f'PATH_CHEAPEST_ARC + {local_search_metaheuristic}',
                 'time_windows_enabled': has_time_dimension,
                 'timestamp': datetime.now().isoformat()
             }
         }
 
 
+    def reoptimize_routes(self, depot, routes, dirty_vehicle_ids, mode='tsp', time_limit=1):
+        """
+        Re-optimize only the routes of edited vehicles, leaving every other route untouched
+
+        Args:
+            depot: Depot coordinates {"lat", "lng"}
+            routes: Current plan, one {"vehicle_id", "capacity", "stops"} entry per vehicle.
+                Stops exclude the depot and use the batch location format.
+            dirty_vehicle_ids: IDs of the vehicles whose routes were edited
+            mode: 'tsp' re-sequences each dirty route on its own;
+                'cvrp' pools the stops of all dirty routes into one small CVRP
+            time_limit: Maximum solve time in seconds per sub-problem
+
+        Returns:
+            dict: The full plan with the dirty routes replaced
+        """
+        dirty = set(dirty_vehicle_ids)
+        dirty_routes = [route for route in routes if route['vehicle_id'] in dirty]
+        logger.info(f"Re-optimizing {len(dirty_routes)}/{len(routes)} routes ({mode})")
+
+        if mode == 'cvrp':
+            groups = [dirty_routes]
+        else:
+            groups = [[route] for route in dirty_routes]
+
+        # Solved one after another: the transit callbacks are Python and hold the GIL, so
+        # threads would not overlap, and each small GREEDY_DESCENT solve takes milliseconds
+        solved = [self._solve_route_group(depot, group, time_limit) for group in groups]
+
+        replaced = {}
+        for result in solved:
+            if not result.get('success'):
+                return result
+            replaced.update(result['routes'])
+
+        return {
+            'success': True,
+            'routes': [replaced.get(route['vehicle_id'], route) for route in routes],
+            'reoptimized_vehicle_ids': [route['vehicle_id'] for route in dirty_routes],
+            'optimization_metadata': {
+                'algorithm': 'OR-Tools CVRP',
+                'mode': mode,
+                'strategy': 'PATH_CHEAPEST_ARC + GREEDY_DESCENT',
+                'routes_untouched': len(routes) - len(dirty_routes),
+                'timestamp': datetime.now().isoformat()
+            }
+        }
+
+    def _solve_route_group(self, depot, group, time_limit):
+        """Solve the stops of a group of routes over the group's own vehicles"""
+        stops = [stop for route in group for stop in route['stops']]
+        if not stops:
+            return {
+                'success': True,
+                'routes': {route['vehicle_id']: {**route, 'stops': [], 'total_distance': 0, 'reoptimized': True}
+                           for route in group}
+            }
+
+        demands = [0] + [stop.get('demand', 0) for stop in stops]
+        vehicle_capacities = [route['capacity'] for route in group]
+        if len(group) == 1:
+            # A manual move may overload the vehicle; re-sequencing must still succeed
+            vehicle_capacities = [max(vehicle_capacities[0], sum(demands))]
+
+        time_windows, service_times = build_time_windows(stops)
+        result = self.optimize(
+            distance_matrix=build_distance_matrix([depot] + stops),
+            demands=demands,
+            vehicle_capacities=vehicle_capacities,
+            num_vehicles=len(group),
+            depot=0,
+            time_limit=time_limit,
+            time_windows=time_windows,
+            service_times=service_times,
+            local_search_metaheuristic='GREEDY_DESCENT'
+        )
+        if not result.get('success'):
+            return result
+
+        routes = {}
+        for route, solved_route in zip(group, result['routes']):
+            sequence = [stops[stop['location_index'] - 1] for stop in solved_route['stops']
+                        if stop['location_index'] != 0]
+            routes[route['vehicle_id']] = {
+                **route,
+                'stops': sequence,
+                'total_distance': solved_route['total_distance'],
+                'total_load': solved_route['total_load'],
+                'capacity_utilization': (solved_route['total_load'] / route['capacity'] * 100)
+                if route['capacity'] > 0 else 0,
+                'capacity_exceeded': solved_route['total_load'] > route['capacity'],
+                'reoptimized': True
+            }
+            if 'total_time' in solved_route:
+                routes[route['vehicle_id']]['total_time'] = solved_route['total_time']
+
+        return {'success': True, 'routes': routes}
+
+
 # Initialize optimizer
 optimizer = CVRPOptimizer()
 
+# Historical plans used to warm-start recurring batch instances
+solution_index = SolutionIndex(os.environ.get(
+    'SOLUTION_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'solution_index.db')
+))
+
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -286,6 +443,7 @@ def health_check():
 
 
 @app.route('/api/optimize/cvrp', methods=['POST'])
+@profiled
 def optimize_cvrp():
     """
     CVRP optimization endpoint
@@ -357,6 +515,7 @@ def optimize_cvrp():
 
 
 @app.route('/api/optimize/batch', methods=['POST'])
+@profiled
 def optimize_batch():
     """
     Batch optimization with location coordinates
@@ -379,7 +538,11 @@ def optimize_batch():
             {"id": "v1", "capacity": 15},
             {"id": "v2", "capacity": 15}
         ],
-        "time_limit": 5
+        "time_limit": 5,
+        "departure_time": "17:30",  # optional: enables the time-dependent travel-time model
+        "traffic_profile": [["07:00", 25], ["17:00", 18]],  # optional (time of day, km/h); default Riyadh
+        "seed_from_history": true,  # optional (default false): warm-start from the most similar stored plan
+        "store_solution": true  # optional (default false): add this plan to the local historical index
     }
     """
     try:
@@ -392,21 +555,7 @@ def optimize_batch():
         time_limit = data.get('time_limit', 5)
 
         # Build distance matrix using Haversine
-        all_points = [depot] + locations
-        distance_matrix = []
-
-        for i, point1 in enumerate(all_points):
-            row = []
-            for j, point2 in enumerate(all_points):
-                if i == j:
-                    row.append(0)
-                else:
-                    distance = calculate_haversine_distance(
-                        point1['lat'], point1['lng'],
-                        point2['lat'], point2['lng']
-                    )
-                    row.append(int(distance))  # Convert to meters
-            distance_matrix.append(row)
+        distance_matrix = build_distance_matrix([depot] + locations)
 
         # Build demands (depot has 0 demand)
         demands = [0] + [loc['demand'] for loc in locations]
@@ -415,25 +564,25 @@ def optimize_batch():
         vehicle_capacities = [v['capacity'] for v in vehicles]
 
         # Build time windows if provided (depot has no constraint)
-        time_windows = None
-        service_times = None
-
-        if any('time_window' in loc for loc in locations):
-            # Depot has wide time window (0 to 480 minutes = 8 hours)
-            time_windows = [(0, 480)]
-            service_times = [0]  # No service time at depot
-
-            for loc in locations:
-                if 'time_window' in loc:
-                    tw = loc['time_window']
-                    time_windows.append((tw['earliest'], tw['latest']))
-                else:
-                    # Default: anytime within 8 hours
-                    time_windows.append((0, 480))
-
-                service_times.append(loc.get('service_time', 8))  # Default 8 minutes
+        time_windows, service_times = build_time_windows(locations)
+
+        # Time-dependent travel times when the plan's departure time is known
+        travel_time_model = None
+        start_minute = 0
+        if 'departure_time' in data:
+            start_minute = parse_clock(data['departure_time'])
+            travel_time_model = TimeDependentTravelTime.from_distance_matrix(
+                distance_matrix, data.get('traffic_profile')
+            )
 
-            logger.info(f"Time windows configured for {len(time_windows)} locations")
+        # Seed from the most similar historical plan (same depot and fleet shape)
+        initial_routes = None
+        history_similarity = None
+        if data.get('seed_from_history', False):
+            try:
+                initial_routes, history_similarity = solution_index.seed_routes(depot, locations, vehicles)
+            except Exception as e:
+                logger.warning(f"Solution index lookup failed: {str(e)}")
 
         # Optimize
         result = optimizer.optimize(
@@ -444,10 +593,22 @@ def optimize_batch():
             depot=0,
             time_limit=time_limit,
             time_windows=time_windows,
-            service_times=service_times
+            service_times=service_times,
+            travel_time_model=travel_time_model,
+            start_minute=start_minute,
+            initial_routes=initial_routes
         )
 
         if result.get('success'):
+            if history_similarity is not None:
+                result['optimization_metadata']['history_similarity'] = round(history_similarity, 3)
+
+            if data.get('store_solution', False):
+                try:
+                    solution_index.store(depot, locations, vehicles, result)
+                except Exception as e:
+                    logger.warning(f"Solution index store failed: {str(e)}")
+
             # Enrich with location data
             for route in result['routes']:
                 for stop in route['stops']:
@@ -475,19 +636,141 @@ def optimize_batch():
         }), 500
 
 
-def calculate_haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points using Haversine formula"""
-    R = 6371000  # Earth radius in meters
+@app.route('/api/optimize/reoptimize', methods=['POST'])
+@profiled
+def reoptimize_routes():
+    """
+    Route-local re-optimization after manual plan edits
+    Only the routes of the "dirty" vehicles are re-solved; all other routes are returned verbatim
+
+    Request body:
+    {
+        "depot": {"lat": 24.7136, "lng": 46.6753},
+        "routes": [
+            {
+                "vehicle_id": "v1",
+                "capacity": 15,
+                "stops": [{"id": "loc1", "lat": 24.7236, "lng": 46.6853, "demand": 5}]
+            },
+            {"vehicle_id": "v2", "capacity": 15, "stops": [...]}
+        ],
+        "dirty_vehicle_ids": ["v1", "v2"],
+        "mode": "tsp",  # "tsp" (per-route) or "cvrp" (pool dirty stops)
+        "time_limit": 1
+    }
+    """
+    try:
+        data = request.json
+
+        # Validate required fields
+        required_fields = ['depot', 'routes', 'dirty_vehicle_ids']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({
+                    'success': False,
+                    'error': f'Missing required field: {field}'
+                }), 400
+
+        mode = data.get('mode', 'tsp')
+        if mode not in ('tsp', 'cvrp'):
+            return jsonify({
+                'success': False,
+                'error': 'Mode must be "tsp" or "cvrp"'
+            }), 400
+
+        known_vehicles = {route['vehicle_id'] for route in data['routes']}
+        unknown_vehicles = [v for v in data['dirty_vehicle_ids'] if v not in known_vehicles]
+        if unknown_vehicles:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown dirty vehicle IDs: {unknown_vehicles}'
+            }), 400
+
+        result = optimizer.reoptimize_routes(
+            depot=data['depot'],
+            routes=data['routes'],
+            dirty_vehicle_ids=data['dirty_vehicle_ids'],
+            mode=mode,
+            time_limit=data.get('time_limit', 1)
+        )
+
+        if result.get('success'):
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 500
+
+    except Exception as e:
+        logger.error(f"Re-optimization error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """List stored solve profiles (requires X-Profiling-Token)"""
+    if not is_authorized():
+        return jsonify({'success': False, 'error': 'Profiling not authorized'}), 403
+
+    profiles = []
+    if os.path.isdir(PROFILE_DIR):
+        for profile_id in sorted(os.listdir(PROFILE_DIR)):
+            meta_path = os.path.join(PROFILE_DIR, profile_id, 'meta.json')
+            if os.path.isfile(meta_path):
+                with open(meta_path) as f:
+                    profiles.append(json.load(f))
+
+    return jsonify({'success': True, 'profiles': profiles}), 200
+
 
-    lat1_rad = np.radians(lat1)
-    lat2_rad = np.radians(lat2)
-    delta_lat = np.radians(lat2 - lat1)
-    delta_lon = np.radians(lon2 - lon1)
+@app.route('/api/profiles/<profile_id>/<artifact>', methods=['GET'])
+def download_profile(profile_id, artifact):
+    """
+    Download a profile artifact (requires X-Profiling-Token)
+
+    Artifacts: request.json (sanitized input), stacks.folded (collapsed stacks), meta.json
+    """
+    if not is_authorized():
+        return jsonify({'success': False, 'error': 'Profiling not authorized'}), 403
+    if not valid_profile_id(profile_id) or artifact not in PROFILE_ARTIFACTS:
+        return jsonify({'success': False, 'error': 'Unknown profile artifact'}), 404
+    if not os.path.isfile(os.path.join(PROFILE_DIR, profile_id, artifact)):
+        return jsonify({'success': False, 'error': f'Profile {profile_id} not found'}), 404
+
+    return send_from_directory(os.path.join(PROFILE_DIR, profile_id), artifact, as_attachment=True)
+
+
+def build_distance_matrix(points):
+    """Build a compact Haversine distance matrix (integer meters) for a list of {"lat", "lng"} points"""
+    return SymmetricMatrix.from_coordinates(points)
+
+
+def build_time_windows(locations):
+    """
+    Build time windows and service times for depot + locations
+
+    Returns (None, None) when no location carries a time window.
+    """
+    if not any('time_window' in loc for loc in locations):
+        return None, None
+
+    # Depot has wide time window (0 to 480 minutes = 8 hours)
+    time_windows = [(0, 480)]
+    service_times = [0]  # No service time at depot
+
+    for loc in locations:
+        if 'time_window' in loc:
+            tw = loc['time_window']
+            time_windows.append((tw['earliest'], tw['latest']))
+        else:
+            # Default: anytime within 8 hours
+            time_windows.append((0, 480))
 
-    a = np.sin(delta_lat/2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(delta_lon/2)**2
-    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+        service_times.append(loc.get('service_time', 8))  # Default 8 minutes
 
-    return R * c
+    logger.info(f"Time windows configured for {len(time_windows)} locations")
+    return time_windows, service_times
 
 
 if __name__ == '__main__':
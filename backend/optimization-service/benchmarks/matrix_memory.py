@@ -0,0 +1,72 @@
+"""
+Distance matrix memory benchmark
+Compares the legacy list-of-lists matrix with the compact SymmetricMatrix
+
+Usage:
+    python benchmarks/matrix_memory.py [sizes...]   # default: 1000 3000 5000
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from symmetric_matrix import SymmetricMatrix  # noqa: E402
+
+
+def random_points(n, seed=42):
+    """Random stops around central Riyadh (~20km box)"""
+    rng = np.random.default_rng(seed)
+    lats = 24.7136 + rng.uniform(-0.1, 0.1, n)
+    lngs = 46.6753 + rng.uniform(-0.1, 0.1, n)
+    return [{'lat': float(lat), 'lng': float(lng)} for lat, lng in zip(lats, lngs)]
+
+
+def measure(build):
+    """Return (result, retained bytes, seconds) for a builder"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, elapsed
+
+
+def access_time(lookup, n, samples=200000, seed=7):
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, n, size=(samples, 2)).tolist()
+    start = time.perf_counter()
+    for i, j in pairs:
+        lookup(i, j)
+    return (time.perf_counter() - start) / samples * 1e9
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 3000, 5000]
+    print(f"{'stops':>6} {'list-of-lists':>14} {'meters uint32':>14} {'minutes uint16':>15} "
+          f"{'saving':>7} {'build':>7} {'get ns (list/compact)':>22}")
+
+    for n in sizes:
+        points = random_points(n)
+
+        compact, compact_bytes, build_seconds = measure(lambda: SymmetricMatrix.from_coordinates(points))
+        minutes, minutes_bytes, _ = measure(lambda: compact.scaled(667))
+        # The legacy representation: a dense Python list of int rows
+        dense, dense_bytes, _ = measure(lambda: compact.to_dense(np.int64).tolist())
+
+        list_ns = access_time(lambda i, j, rows=dense: rows[i][j], n)
+        compact_ns = access_time(compact.get, n)
+        del dense
+
+        print(f"{n:>6} {dense_bytes / 2**20:>12.1f}MB {compact_bytes / 2**20:>12.1f}MB "
+              f"{minutes_bytes / 2**20:>13.1f}MB {dense_bytes / compact_bytes:>6.0f}x "
+              f"{build_seconds:>6.2f}s {list_ns:>10.0f} / {compact_ns:<10.0f}")
+
+
+if __name__ == '__main__':
+    main()
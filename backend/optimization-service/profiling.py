@@ -0,0 +1,196 @@
+"""
+On-Demand Solve Profiling
+Opt-in statistical profiling of optimization requests for offline replay
+
+A profiled request is sampled by a background thread (sys._current_frames) and stored
+under data/profiles/<profile_id>/:
+- request.json: sanitized request payload (identifiers hashed, contact details dropped)
+- stacks.folded: collapsed stacks, input for flamegraph.pl / speedscope
+- meta.json: endpoint, status, duration, sample count and replay command
+
+Profiling is disabled unless PROFILING_TOKEN is set, and each profiled request must
+send the token in the X-Profiling-Token header.
+
+Author: BARQ Fleet Management Team
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+
+from flask import request, jsonify, make_response
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get(
+    'PROFILE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'profiles')
+)
+SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.005))  # seconds
+
+PROFILE_ARTIFACTS = ('request.json', 'stacks.folded', 'meta.json')
+
+# Hashed so replays keep references (e.g. dirty_vehicle_ids) consistent
+ID_KEYS = {'id', 'location_id', 'vehicle_id', 'dirty_vehicle_ids', 'order_id', 'driver_id'}
+# Not needed to solve, dropped entirely
+PII_KEYS = {'name', 'address', 'phone', 'email', 'customer', 'customer_name', 'notes'}
+
+_PROFILE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def profiling_token():
+    return os.environ.get('PROFILING_TOKEN')
+
+
+def is_authorized():
+    """True when profiling is enabled and the request carries the right token"""
+    token = profiling_token()
+    provided = request.headers.get('X-Profiling-Token', '')
+    return bool(token) and hmac.compare_digest(token.encode(), provided.encode())
+
+
+def valid_profile_id(profile_id):
+    return bool(_PROFILE_ID_PATTERN.match(profile_id or ''))
+
+
+def _hash_identifier(value):
+    return hashlib.sha256(str(value).encode()).hexdigest()[:12]
+
+
+def sanitize_payload(payload):
+    """Copy of a request payload with identifiers hashed and contact details removed"""
+    if isinstance(payload, dict):
+        sanitized = {}
+        for key, value in payload.items():
+            if key in PII_KEYS or key == 'profile':
+                continue
+            if key in ID_KEYS:
+                sanitized[key] = ([_hash_identifier(v) for v in value] if isinstance(value, list)
+                                  else _hash_identifier(value))
+            else:
+                sanitized[key] = sanitize_payload(value)
+        return sanitized
+    if isinstance(payload, list):
+        return [sanitize_payload(item) for item in payload]
+    return payload
+
+
+class SamplingProfiler:
+    """Samples the call stack of one thread at a fixed interval into collapsed-stack counts"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='solve-profiler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """Collapsed stack lines ("frame;frame;frame count")"""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+
+def new_profile_id(request_id):
+    """
+    Profile ID for a request: the client's X-Request-ID (when usable) plus a random suffix,
+    so a reused request ID never overwrites an earlier profile
+    """
+    suffix = uuid.uuid4().hex
+    if not valid_profile_id(request_id):
+        return suffix
+    return f"{request_id[:55]}-{suffix[:8]}"
+
+
+def save_profile(profile_id, payload, profiler, meta):
+    """Write the profile artifacts and return their directory"""
+    profile_path = os.path.join(PROFILE_DIR, profile_id)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    os.mkdir(profile_path)  # fails rather than overwrite an existing profile
+
+    with open(os.path.join(profile_path, 'request.json'), 'w') as f:
+        json.dump(sanitize_payload(payload), f)
+    with open(os.path.join(profile_path, 'stacks.folded'), 'w') as f:
+        f.write(profiler.collapsed())
+    with open(os.path.join(profile_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    return profile_path
+
+
+def profiled(view):
+    """
+    Profile a view when the request opts in with ?profile=true (or "profile": true in the body)
+
+    Unauthorized profiling requests are rejected with 403 rather than silently run unprofiled.
+    The profile ID is returned in the X-Profile-Id response header.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        payload = request.get_json(silent=True)
+        requested = (request.args.get('profile', '').lower() == 'true'
+                     or (isinstance(payload, dict) and payload.get('profile') is True))
+        if not requested:
+            return view(*args, **kwargs)
+
+        if not is_authorized():
+            return jsonify({'success': False, 'error': 'Profiling not authorized'}), 403
+
+        profile_id = new_profile_id(request.headers.get('X-Request-ID', ''))
+
+        start = time.perf_counter()
+        with SamplingProfiler(threading.get_ident()) as profiler:
+            response = make_response(view(*args, **kwargs))
+        duration = time.perf_counter() - start
+
+        try:
+            save_profile(profile_id, payload, profiler, {
+                'profile_id': profile_id,
+                'endpoint': request.path,
+                'status_code': response.status_code,
+                'duration_seconds': round(duration, 3),
+                'samples': profiler.samples,
+                'sample_interval_seconds': profiler.interval,
+                'created_at': datetime.now().isoformat(),
+                'replay': f"curl -X POST http://localhost:5001{request.path} "
+                          f"-H 'Content-Type: application/json' -d @request.json"
+            })
+            response.headers['X-Profile-Id'] = profile_id
+            logger.info(f"Stored profile {profile_id} for {request.path} ({profiler.samples} samples)")
+        except OSError as e:
+            logger.error(f"Failed to store profile {profile_id}: {str(e)}")
+
+        return response
+
+    return wrapper
@@ -0,0 +1,239 @@
+"""
+Historical Solution Index
+Persists solved plans with instance fingerprints and seeds new solves from the
+most similar historical plan
+
+Plans for the same hub repeat day to day (same neighborhoods, same fleet), so the
+nearest historical solution mapped onto today's stops is a much better starting
+point than PATH_CHEAPEST_ARC.
+
+Fingerprint:
+- depot geohash and the set of stop geohashes (neighborhood level)
+- fleet shape (vehicle count and sorted capacities)
+
+Author: BARQ Fleet Management Team
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Precision 6 cells are roughly 1.2km x 0.6km: one neighborhood
+FINGERPRINT_PRECISION = 6
+
+
+def encode_geohash(lat, lng, precision=FINGERPRINT_PRECISION):
+    """Encode coordinates as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        coord_range, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (coord_range[0] + coord_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            coord_range[0] = mid
+        else:
+            bits <<= 1
+            coord_range[1] = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            geohash.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(geohash)
+
+
+def fingerprint_instance(depot, locations, vehicles):
+    """Build the similarity fingerprint of a batch instance"""
+    return {
+        'depot_geohash': encode_geohash(depot['lat'], depot['lng']),
+        'geohashes': sorted({encode_geohash(loc['lat'], loc['lng']) for loc in locations}),
+        'num_vehicles': len(vehicles),
+        'capacities': sorted(v['capacity'] for v in vehicles)
+    }
+
+
+class SolutionIndex:
+    """Local SQLite index of solved plans keyed by instance fingerprint"""
+
+    def __init__(self, path, max_plans_per_depot=50, min_similarity=0.5):
+        """
+        Args:
+            path: SQLite file path (created on first use)
+            max_plans_per_depot: Plans kept per depot geohash (oldest are pruned)
+            min_similarity: Minimum Jaccard similarity of stop geohashes to seed from a plan
+        """
+        self.path = path
+        self.max_plans_per_depot = max_plans_per_depot
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        if not self._initialized:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS solutions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    depot_geohash TEXT NOT NULL,
+                    num_vehicles INTEGER NOT NULL,
+                    capacities TEXT NOT NULL,
+                    geohashes TEXT NOT NULL,
+                    routes TEXT NOT NULL,
+                    total_distance INTEGER,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_solutions_fleet
+                ON solutions (depot_geohash, num_vehicles)
+            """)
+            self._initialized = True
+        return conn
+
+    def store(self, depot, locations, vehicles, result):
+        """
+        Persist a solved batch plan
+
+        Args:
+            depot, locations, vehicles: The batch request instance
+            result: Successful optimizer result (routes with location_index stops)
+        """
+        fingerprint = fingerprint_instance(depot, locations, vehicles)
+        routes = [
+            [[locations[stop['location_index'] - 1]['lat'], locations[stop['location_index'] - 1]['lng']]
+             for stop in route['stops'] if stop['location_index'] != 0]
+            for route in result['routes']
+        ]
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    """INSERT INTO solutions
+                       (depot_geohash, num_vehicles, capacities, geohashes, routes, total_distance, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (fingerprint['depot_geohash'], fingerprint['num_vehicles'],
+                     json.dumps(fingerprint['capacities']), json.dumps(fingerprint['geohashes']),
+                     json.dumps(routes), result['summary']['total_distance'], datetime.now().isoformat())
+                )
+                # Keep only the most recent plans for this depot
+                conn.execute(
+                    """DELETE FROM solutions WHERE depot_geohash = ? AND id NOT IN (
+                           SELECT id FROM solutions WHERE depot_geohash = ? ORDER BY id DESC LIMIT ?)""",
+                    (fingerprint['depot_geohash'], fingerprint['depot_geohash'], self.max_plans_per_depot)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def find_nearest(self, depot, locations, vehicles):
+        """
+        Find the most similar historical plan for the same depot and fleet shape
+
+        Returns:
+            tuple: (routes, similarity) or (None, 0.0) when nothing is similar enough
+        """
+        fingerprint = fingerprint_instance(depot, locations, vehicles)
+        geohashes = set(fingerprint['geohashes'])
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    """SELECT capacities, geohashes, routes FROM solutions
+                       WHERE depot_geohash = ? AND num_vehicles = ?
+                       ORDER BY id DESC""",
+                    (fingerprint['depot_geohash'], fingerprint['num_vehicles'])
+                ).fetchall()
+            finally:
+                conn.close()
+
+        best_routes, best_similarity = None, 0.0
+        for capacities, stored_geohashes, routes in rows:
+            if json.loads(capacities) != fingerprint['capacities']:
+                continue
+            stored = set(json.loads(stored_geohashes))
+            similarity = len(geohashes & stored) / len(geohashes | stored) if geohashes | stored else 0.0
+            if similarity > best_similarity:
+                best_routes, best_similarity = json.loads(routes), similarity
+
+        if best_similarity < self.min_similarity:
+            return None, best_similarity
+        return best_routes, best_similarity
+
+    def seed_routes(self, depot, locations, vehicles):
+        """
+        Map the nearest historical plan onto a new stop set
+
+        Each new stop joins the historical route of its closest historical stop, at that
+        stop's position. Overloaded routes shed their last stops to the other vehicle with
+        the most spare capacity that fits them.
+
+        Returns:
+            tuple: (initial routes as lists of 1-based location indices, similarity),
+                   or (None, similarity) when there is no usable plan or the capacity
+                   repair cannot place a stop
+        """
+        historical_routes, similarity = self.find_nearest(depot, locations, vehicles)
+        if historical_routes is None:
+            return None, similarity
+
+        points, route_ids, positions = [], [], []
+        for route_id, route in enumerate(historical_routes):
+            for position, point in enumerate(route):
+                points.append(point)
+                route_ids.append(route_id)
+                positions.append(position)
+        if not points:
+            return None, similarity
+
+        historical = np.radians(np.asarray(points, dtype=np.float64))
+        new = np.radians(np.asarray([[loc['lat'], loc['lng']] for loc in locations], dtype=np.float64))
+
+        # Equirectangular distance is enough to rank nearby stops
+        dlat = new[:, None, 0] - historical[None, :, 0]
+        dlng = (new[:, None, 1] - historical[None, :, 1]) * np.cos(historical[None, :, 0])
+        nearest = np.argmin(dlat ** 2 + dlng ** 2, axis=1)
+
+        seeded = [[] for _ in vehicles]
+        for location_idx, point_idx in enumerate(nearest):
+            seeded[route_ids[point_idx]].append((positions[point_idx], location_idx + 1))
+        initial_routes = [[node for _, node in sorted(route)] for route in seeded]
+
+        # Repair capacity so the seed is a feasible assignment: move the last stops of an
+        # overloaded route to the other vehicle with the most spare capacity that fits them
+        capacities = [v['capacity'] for v in vehicles]
+        loads = [sum(locations[node - 1]['demand'] for node in route) for route in initial_routes]
+        for vehicle_id, route in enumerate(initial_routes):
+            while loads[vehicle_id] > capacities[vehicle_id]:
+                if not route:
+                    return None, similarity
+                node = route.pop()
+                demand = locations[node - 1]['demand']
+                fits = [v for v in range(len(vehicles))
+                        if v != vehicle_id and capacities[v] - loads[v] >= demand]
+                if not fits:
+                    return None, similarity
+                target = max(fits, key=lambda v: capacities[v] - loads[v])
+                initial_routes[target].append(node)
+                loads[vehicle_id] -= demand
+                loads[target] += demand
+
+        return initial_routes, similarity
@@ -0,0 +1,116 @@
+"""
+Compact Symmetric Matrix
+Upper-triangle storage for symmetric distance and time matrices
+
+Haversine matrices are symmetric with a zero diagonal, so only the n(n-1)/2 entries
+above the diagonal are stored, in a typed array (uint32 meters, uint16 minutes).
+A full list-of-lists of Python ints costs ~36 bytes per entry; this costs 2-4 bytes
+per stored entry, i.e. 1-2 bytes per matrix cell.
+
+Author: BARQ Fleet Management Team
+"""
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000
+
+# memoryview format codes for the supported storage types
+_FORMATS = {np.dtype(np.uint16): 'H', np.dtype(np.uint32): 'I'}
+
+
+def upper_triangle_offsets(size):
+    """Per-row offsets into a flat strict upper triangle: (i, j), j > i, is at offsets[i] + j"""
+    return [i * (2 * size - i - 1) // 2 - i - 1 for i in range(size)]
+
+
+class SymmetricMatrix:
+    """
+    Symmetric matrix with a zero diagonal stored as its strict upper triangle
+
+    Row i (j > i) starts at offset i*(2n-i-1)/2 in the flat array, so get(i, j) is O(1).
+    """
+
+    def __init__(self, size, values):
+        """
+        Args:
+            size: Matrix dimension n
+            values: Flat upper triangle (row-major, j > i), uint16 or uint32, length n(n-1)/2
+        """
+        self.size = size
+        self.values = np.ascontiguousarray(values)
+        if self.values.dtype not in _FORMATS:
+            raise ValueError(f"Unsupported matrix dtype: {self.values.dtype}")
+        if len(self.values) != size * (size - 1) // 2:
+            raise ValueError(f"Expected {size * (size - 1) // 2} values for a {size}x{size} matrix")
+
+        # Flat view: indexing returns Python ints without numpy scalar overhead
+        self._flat = memoryview(self.values).cast('B').cast(_FORMATS[self.values.dtype])
+        self._row_offsets = upper_triangle_offsets(size)
+
+    @classmethod
+    def from_coordinates(cls, points, dtype=np.uint32):
+        """
+        Haversine distances in integer meters for a list of {"lat", "lng"} points
+
+        Computed one row at a time so peak memory stays O(n) beyond the result.
+        """
+        size = len(points)
+        lat = np.radians(np.array([p['lat'] for p in points], dtype=np.float64))
+        lng = np.radians(np.array([p['lng'] for p in points], dtype=np.float64))
+        cos_lat = np.cos(lat)
+        values = np.empty(size * (size - 1) // 2, dtype=dtype)
+
+        offset = 0
+        for i in range(size - 1):
+            a = (np.sin((lat[i + 1:] - lat[i]) / 2) ** 2
+                 + cos_lat[i] * cos_lat[i + 1:] * np.sin((lng[i + 1:] - lng[i]) / 2) ** 2)
+            row = 2 * EARTH_RADIUS_M * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+            values[offset:offset + size - i - 1] = row  # truncates to whole meters
+            offset += size - i - 1
+
+        return cls(size, values)
+
+    @classmethod
+    def from_dense(cls, matrix, dtype=np.uint32):
+        """Compress a dense symmetric matrix (upper triangle is kept)"""
+        dense = np.asarray(matrix)
+        rows, cols = np.triu_indices(len(dense), k=1)
+        return cls(len(dense), dense[rows, cols].astype(dtype))
+
+    def scaled(self, divisor, dtype=np.uint16):
+        """New matrix of int(value / divisor), e.g. meters to minutes at a constant speed"""
+        scaled = np.floor_divide(self.values, divisor)
+        return SymmetricMatrix(self.size, np.minimum(scaled, np.iinfo(dtype).max).astype(dtype))
+
+    def get(self, i, j):
+        """Value at (i, j)"""
+        if i == j:
+            return 0
+        if i > j:
+            i, j = j, i
+        return self._flat[self._row_offsets[i] + j]
+
+    def to_dense(self, dtype=None):
+        """Full n x n numpy matrix"""
+        dense = np.zeros((self.size, self.size), dtype=dtype or self.values.dtype)
+        rows, cols = np.triu_indices(self.size, k=1)
+        dense[rows, cols] = self.values
+        dense[cols, rows] = self.values
+        return dense
+
+    def __array__(self, dtype=None, copy=None):
+        return self.to_dense(dtype)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+
+def matrix_lookup(matrix):
+    """O(1) (i, j) accessor for a SymmetricMatrix or a dense list-of-lists / array"""
+    if isinstance(matrix, SymmetricMatrix):
+        return matrix.get
+    return lambda i, j: matrix[i][j]
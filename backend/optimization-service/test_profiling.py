@@ -0,0 +1,97 @@
+"""
+Tests for on-demand solve profiling (authorization, request-thread sampling, profile storage)
+
+Run with: python -m pytest test_profiling.py
+"""
+
+import json
+import os
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+import profiling
+from profiling import new_profile_id, profiled, sanitize_payload, valid_profile_id
+
+TOKEN = 'test-token'
+
+
+def busy_solve_step(seconds):
+    """Spin in Python so the sampler finds this frame on the request thread"""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+    return seconds
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv('PROFILING_TOKEN', TOKEN)
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+
+    app = Flask(__name__)
+
+    @app.route('/solve', methods=['POST'])
+    @profiled
+    def solve():
+        solved = [busy_solve_step(0.2) for _ in range(2)]
+        return jsonify({'success': True, 'solved': len(solved)})
+
+    return app.test_client()
+
+
+def post(client, headers=None, query='?profile=true'):
+    return client.post(f'/solve{query}', json={'vehicles': [{'id': 'v1', 'name': 'Driver'}]},
+                       headers={'X-Profiling-Token': TOKEN, **(headers or {})})
+
+
+def test_unprofiled_request_runs_normally(client):
+    response = post(client, query='')
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+
+
+def test_profiling_requires_token(client):
+    response = client.post('/solve?profile=true', json={}, headers={'X-Profiling-Token': 'wrong'})
+    assert response.status_code == 403
+
+
+def test_profile_samples_request_thread(client, tmp_path):
+    response = post(client)
+    assert response.status_code == 200
+
+    profile_path = tmp_path / response.headers['X-Profile-Id']
+    folded = (profile_path / 'stacks.folded').read_text()
+    assert 'busy_solve_step' in folded
+
+    meta = json.loads((profile_path / 'meta.json').read_text())
+    assert meta['samples'] > 0
+    request_payload = json.loads((profile_path / 'request.json').read_text())
+    assert 'name' not in request_payload['vehicles'][0]
+
+
+def test_reused_request_id_keeps_earlier_profiles(client, tmp_path):
+    first = post(client, headers={'X-Request-ID': 'plan-hub3'}).headers['X-Profile-Id']
+    second = post(client, headers={'X-Request-ID': 'plan-hub3'}).headers['X-Profile-Id']
+
+    assert first != second
+    assert first.startswith('plan-hub3-') and second.startswith('plan-hub3-')
+    assert sorted(os.listdir(tmp_path)) == sorted([first, second])
+
+
+def test_new_profile_id_is_always_valid():
+    assert valid_profile_id(new_profile_id('x' * 64))
+    assert valid_profile_id(new_profile_id('../etc/passwd'))
+    assert not new_profile_id('../etc/passwd').startswith('.')
+
+
+def test_sanitize_payload_hashes_ids_and_drops_contact_details():
+    payload = {'dirty_vehicle_ids': ['v1', 'v2'], 'routes': [{'vehicle_id': 'v1', 'phone': '555', 'demand': 3}],
+               'profile': True}
+    sanitized = sanitize_payload(payload)
+
+    assert 'profile' not in sanitized
+    assert sanitized['routes'][0]['demand'] == 3
+    assert 'phone' not in sanitized['routes'][0]
+    assert sanitized['routes'][0]['vehicle_id'] == sanitized['dirty_vehicle_ids'][0] != 'v1'
@@ -0,0 +1,89 @@
+"""
+Tests for route-local re-optimization (CVRPOptimizer.reoptimize_routes)
+
+Run with: python -m pytest test_reoptimize.py
+"""
+
+import random
+
+import pytest
+
+from app import app, optimizer
+
+DEPOT = {'lat': 24.7136, 'lng': 46.6753}
+
+
+def make_stops(count, seed, demand=1):
+    rng = random.Random(seed)
+    return [{'id': f's{seed}-{i}', 'lat': 24.70 + rng.random() * 0.05, 'lng': 46.66 + rng.random() * 0.05,
+             'demand': demand} for i in range(count)]
+
+
+@pytest.fixture
+def plan():
+    return [{'vehicle_id': f'v{i}', 'capacity': 20, 'stops': make_stops(8, seed=i)} for i in range(3)]
+
+
+def stop_ids(route):
+    return sorted(stop['id'] for stop in route['stops'])
+
+
+def test_tsp_mode_resequences_only_dirty_routes(plan):
+    result = optimizer.reoptimize_routes(DEPOT, plan, ['v0', 'v2'], mode='tsp', time_limit=1)
+
+    assert result['success']
+    assert result['reoptimized_vehicle_ids'] == ['v0', 'v2']
+    assert result['optimization_metadata']['routes_untouched'] == 1
+    assert result['routes'][1] is plan[1]
+    for before, after in zip(plan, result['routes']):
+        assert after['vehicle_id'] == before['vehicle_id']
+        assert stop_ids(after) == stop_ids(before)
+    assert result['routes'][0]['reoptimized'] and result['routes'][2]['reoptimized']
+    assert result['routes'][0]['capacity_utilization'] == pytest.approx(8 / 20 * 100)
+
+
+def test_cvrp_mode_pools_dirty_stops(plan):
+    result = optimizer.reoptimize_routes(DEPOT, plan, ['v0', 'v1'], mode='cvrp', time_limit=1)
+
+    assert result['success']
+    pooled = sorted(stop_ids(result['routes'][0]) + stop_ids(result['routes'][1]))
+    assert pooled == sorted(stop_ids(plan[0]) + stop_ids(plan[1]))
+    assert result['routes'][2] is plan[2]
+
+
+def test_overloaded_route_is_resequenced_and_flagged():
+    plan = [{'vehicle_id': 'v0', 'capacity': 5, 'stops': make_stops(4, seed=1, demand=2)}]
+    result = optimizer.reoptimize_routes(DEPOT, plan, ['v0'])
+
+    route = result['routes'][0]
+    assert result['success']
+    assert route['capacity_exceeded'] is True
+    assert route['capacity_utilization'] == pytest.approx(160.0)
+
+
+def test_zero_capacity_route_does_not_divide_by_zero():
+    plan = [{'vehicle_id': 'v0', 'capacity': 0, 'stops': make_stops(3, seed=2)}]
+    result = optimizer.reoptimize_routes(DEPOT, plan, ['v0'])
+
+    assert result['success']
+    assert result['routes'][0]['capacity_utilization'] == 0
+    assert result['routes'][0]['capacity_exceeded'] is True
+
+
+def test_empty_dirty_route():
+    plan = [{'vehicle_id': 'v0', 'capacity': 10, 'stops': []}]
+    result = optimizer.reoptimize_routes(DEPOT, plan, ['v0'])
+
+    assert result['success']
+    assert result['routes'][0]['stops'] == []
+
+
+def test_endpoint_returns_full_plan(plan):
+    response = app.test_client().post('/api/optimize/reoptimize', json={
+        'depot': DEPOT, 'routes': plan, 'dirty_vehicle_ids': ['v1'], 'time_limit': 1
+    })
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [route['vehicle_id'] for route in body['routes']] == ['v0', 'v1', 'v2']
+    assert body['reoptimized_vehicle_ids'] == ['v1']
@@ -0,0 +1,119 @@
+"""
+Tests for the historical solution index (fingerprints, nearest plan, seeded routes)
+
+Run with: python -m pytest test_solution_index.py
+"""
+
+import pytest
+
+from solution_index import SolutionIndex, encode_geohash, fingerprint_instance
+
+DEPOT = {'lat': 24.7136, 'lng': 46.6753}
+
+
+def make_locations(demands):
+    """Stops about 1.5km apart so each gets its own geohash cell"""
+    return [{'lat': 24.70 + 0.015 * i, 'lng': 46.66 + 0.015 * i, 'demand': demand}
+            for i, demand in enumerate(demands)]
+
+
+def make_result(routes):
+    """Optimizer-style result for routes given as lists of 1-based location indices"""
+    return {
+        'routes': [
+            {'stops': [{'location_index': 0}] + [{'location_index': node} for node in route] +
+                      [{'location_index': 0}]}
+            for route in routes
+        ],
+        'summary': {'total_distance': 1000}
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SolutionIndex(str(tmp_path / 'solution_index.db'))
+
+
+def test_encode_geohash_known_value():
+    assert encode_geohash(57.64911, 10.40744, precision=11) == 'u4pruydqqvj'
+    assert encode_geohash(57.64911, 10.40744) == 'u4pruy'
+
+
+def test_fingerprint_sorts_capacities_and_dedupes_cells():
+    locations = make_locations([1, 1]) + make_locations([1])
+    fingerprint = fingerprint_instance(DEPOT, locations, [{'capacity': 20}, {'capacity': 10}])
+    assert fingerprint['capacities'] == [10, 20]
+    assert fingerprint['num_vehicles'] == 2
+    assert len(fingerprint['geohashes']) == 2
+
+
+def test_seed_routes_without_history(index):
+    locations = make_locations([1, 1])
+    vehicles = [{'capacity': 10}]
+    assert index.seed_routes(DEPOT, locations, vehicles) == (None, 0.0)
+
+
+def test_seed_routes_replays_stored_plan(index):
+    locations = make_locations([2, 3, 4, 1])
+    vehicles = [{'capacity': 10}, {'capacity': 10}]
+    index.store(DEPOT, locations, vehicles, make_result([[3, 1], [2, 4]]))
+
+    routes, similarity = index.seed_routes(DEPOT, locations, vehicles)
+    assert similarity == 1.0
+    assert routes == [[3, 1], [2, 4]]
+
+
+def test_seed_routes_requires_same_fleet_shape(index):
+    locations = make_locations([2, 3])
+    index.store(DEPOT, locations, [{'capacity': 10}, {'capacity': 10}], make_result([[1], [2]]))
+
+    routes, _ = index.seed_routes(DEPOT, locations, [{'capacity': 10}, {'capacity': 12}])
+    assert routes is None
+
+
+def test_seed_routes_moves_overflow_to_vehicle_with_room(index):
+    # Historical loads 12 / 8 on capacities 10 / 10: the last stop (demand 2) fits on vehicle 1
+    locations = make_locations([5, 5, 2, 8])
+    vehicles = [{'capacity': 10}, {'capacity': 10}]
+    index.store(DEPOT, locations, vehicles, make_result([[1, 2, 3], [4]]))
+
+    routes, _ = index.seed_routes(DEPOT, locations, vehicles)
+    assert routes == [[1, 2], [4, 3]]
+
+
+def test_seed_routes_returns_none_when_overflow_fits_nowhere(index):
+    # Historical loads 12 / 8 on capacities 10 / 10 and total demand 20: popping the demand-10
+    # stop leaves the overloaded vehicle with the most spare capacity, which must not be chosen
+    locations = make_locations([2, 10, 8])
+    vehicles = [{'capacity': 10}, {'capacity': 10}]
+    index.store(DEPOT, locations, vehicles, make_result([[1, 2], [3]]))
+
+    routes, similarity = index.seed_routes(DEPOT, locations, vehicles)
+    assert routes is None
+    assert similarity == 1.0
+
+
+def test_seeded_routes_respect_capacities(index):
+    demands = [3, 4, 2, 5, 1, 2, 7, 3]
+    locations = make_locations(demands)
+    vehicles = [{'capacity': 12}, {'capacity': 12}, {'capacity': 12}]
+    index.store(DEPOT, locations, vehicles, make_result([[1, 2, 3, 4, 5, 6], [7], [8]]))
+
+    routes, _ = index.seed_routes(DEPOT, locations, vehicles)
+    assert sorted(node for route in routes for node in route) == list(range(1, len(demands) + 1))
+    for route, vehicle in zip(routes, vehicles):
+        assert sum(demands[node - 1] for node in route) <= vehicle['capacity']
+
+
+def test_store_prunes_old_plans(tmp_path):
+    index = SolutionIndex(str(tmp_path / 'solution_index.db'), max_plans_per_depot=2)
+    locations = make_locations([1, 1])
+    vehicles = [{'capacity': 10}]
+    for _ in range(4):
+        index.store(DEPOT, locations, vehicles, make_result([[1, 2]]))
+
+    conn = index._connect()
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM solutions').fetchone()[0] == 2
+    finally:
+        conn.close()
@@ -0,0 +1,93 @@
+"""
+Tests for the compact symmetric distance matrix (indexing, scaling, Haversine rows)
+
+Run with: python -m pytest test_symmetric_matrix.py
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from symmetric_matrix import EARTH_RADIUS_M, SymmetricMatrix, matrix_lookup, upper_triangle_offsets
+
+
+def haversine(a, b):
+    lat1, lng1, lat2, lng2 = map(math.radians, (a['lat'], a['lng'], b['lat'], b['lng']))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.atan2(math.sqrt(h), math.sqrt(1 - h))
+
+
+def random_symmetric(n, seed=0, high=100000):
+    rng = np.random.default_rng(seed)
+    dense = rng.integers(0, high, (n, n))
+    dense = np.triu(dense, 1)
+    return dense + dense.T
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 17])
+def test_get_matches_dense_in_both_directions(n):
+    dense = random_symmetric(n)
+    matrix = SymmetricMatrix.from_dense(dense)
+
+    assert len(matrix) == n
+    assert len(matrix.values) == n * (n - 1) // 2
+    for i in range(n):
+        for j in range(n):
+            assert matrix.get(i, j) == dense[i, j]
+    assert np.array_equal(matrix.to_dense(), dense)
+    assert np.array_equal(np.asarray(matrix), dense)
+
+
+def test_offsets_walk_the_flat_triangle_in_order():
+    n = 6
+    offsets = upper_triangle_offsets(n)
+    flat = [offsets[i] + j for i in range(n) for j in range(i + 1, n)]
+    assert flat == list(range(n * (n - 1) // 2))
+
+
+def test_from_coordinates_truncates_haversine_meters():
+    rng = np.random.default_rng(1)
+    points = [{'lat': 24.7 + lat, 'lng': 46.6 + lng} for lat, lng in rng.uniform(-0.2, 0.2, (12, 2))]
+    matrix = SymmetricMatrix.from_coordinates(points)
+
+    assert matrix.values.dtype == np.uint32
+    for i in range(12):
+        for j in range(12):
+            expected = int(haversine(points[i], points[j])) if i != j else 0
+            assert abs(matrix.get(i, j) - expected) <= 1
+
+
+def test_scaled_floors_and_saturates():
+    dense = np.array([[0, 666, 667, 1_000_000_000],
+                      [666, 0, 1334, 5],
+                      [667, 1334, 0, 0],
+                      [1_000_000_000, 5, 0, 0]])
+    minutes = SymmetricMatrix.from_dense(dense).scaled(667)
+
+    assert minutes.values.dtype == np.uint16
+    assert minutes.get(0, 1) == 0
+    assert minutes.get(2, 0) == 1
+    assert minutes.get(1, 2) == 2
+    assert minutes.get(3, 0) == np.iinfo(np.uint16).max
+    assert minutes.nbytes == 2 * len(minutes.values)
+
+
+def test_scaled_matches_dense_integer_division():
+    dense = random_symmetric(25, seed=4)
+    scaled = SymmetricMatrix.from_dense(dense).scaled(667)
+    assert np.array_equal(scaled.to_dense(np.int64), dense // 667)
+
+
+def test_rejects_bad_shapes_and_dtypes():
+    with pytest.raises(ValueError):
+        SymmetricMatrix(3, np.zeros(2, dtype=np.uint32))
+    with pytest.raises(ValueError):
+        SymmetricMatrix(3, np.zeros(3, dtype=np.float64))
+
+
+def test_matrix_lookup_supports_both_representations():
+    dense = random_symmetric(5, seed=2)
+    compact = matrix_lookup(SymmetricMatrix.from_dense(dense))
+    listed = matrix_lookup(dense.tolist())
+    assert all(compact(i, j) == listed(i, j) for i in range(5) for j in range(5))
@@ -0,0 +1,99 @@
+"""
+Tests for the time-dependent travel-time model (upper-triangle tensor, interpolation,
+per-origin departure lookups and route timing validation)
+
+Run with: python -m pytest test_travel_time.py
+"""
+
+import numpy as np
+import pytest
+
+from symmetric_matrix import SymmetricMatrix
+from travel_time import (TimeDependentTravelTime, format_clock, parse_clock,
+                         validate_route_timing)
+
+PROFILE = [("00:00", 60), ("08:00", 20), ("18:00", 30)]
+
+
+def random_matrix(n, seed=0):
+    rng = np.random.default_rng(seed)
+    points = [{'lat': 24.7 + lat, 'lng': 46.6 + lng} for lat, lng in rng.uniform(-0.1, 0.1, (n, 2))]
+    return SymmetricMatrix.from_coordinates(points)
+
+
+def dense_slices(matrix, profile):
+    """Reference tensor: ceil(meters / meters-per-minute) for every cell, per breakpoint"""
+    dense = matrix.to_dense(np.float32)
+    return [np.ceil(dense / np.float32(speed * 1000.0 / 60.0)) for _, speed in profile]
+
+
+def test_parse_and_format_clock():
+    assert parse_clock("17:30") == 1050
+    assert parse_clock(90) == 90
+    assert format_clock(1440 + 65) == "01:05"
+
+
+def test_tensor_is_upper_triangle_of_dense_slices():
+    matrix = random_matrix(40)
+    model = TimeDependentTravelTime.from_distance_matrix(matrix, PROFILE)
+
+    assert model.tensor.shape == (3, 40 * 39 // 2)
+    rows, cols = np.triu_indices(40, k=1)
+    for k, dense in enumerate(dense_slices(matrix, PROFILE)):
+        assert np.array_equal(model.tensor[k], dense[rows, cols])
+
+
+def test_dense_input_matches_symmetric_input():
+    matrix = random_matrix(15)
+    from_dense = TimeDependentTravelTime.from_distance_matrix(matrix.to_dense(), PROFILE)
+    from_compact = TimeDependentTravelTime.from_distance_matrix(matrix, PROFILE)
+    assert np.array_equal(from_dense.tensor, from_compact.tensor)
+
+
+def test_travel_time_interpolates_and_wraps_midnight():
+    matrix = random_matrix(10)
+    model = TimeDependentTravelTime.from_distance_matrix(matrix, PROFILE)
+    slices = dense_slices(matrix, PROFILE)
+
+    assert model.travel_time(2, 7, 8 * 60) == slices[1][2, 7]
+    assert model.travel_time(7, 2, 13 * 60) == pytest.approx((slices[1][7, 2] + slices[2][7, 2]) / 2)
+    # 18:00 -> 24:00 (the 00:00 breakpoint of the next day): 21:00 is halfway
+    assert model.travel_time(3, 4, 21 * 60) == pytest.approx((slices[2][3, 4] + slices[0][3, 4]) / 2)
+    assert model.travel_time(3, 4, 21 * 60 + 1440) == model.travel_time(3, 4, 21 * 60)
+    assert model.travel_time(5, 5, 600) == 0
+
+
+def test_departure_lookup_uses_each_origins_slice():
+    n = 30
+    matrix = random_matrix(n, seed=3)
+    model = TimeDependentTravelTime.from_distance_matrix(matrix, PROFILE)
+    departures = np.random.default_rng(5).uniform(0, 2880, n).tolist()
+    lookup = model.departure_lookup(departures)
+
+    for i in range(n):
+        for j in range(n):
+            assert lookup(i, j) == round(model.travel_time(i, j, departures[i]))
+
+
+def test_tensor_saturates_at_int16_max():
+    matrix = SymmetricMatrix(2, np.array([4_000_000_000], dtype=np.uint32))
+    model = TimeDependentTravelTime.from_distance_matrix(matrix, [("00:00", 1)])
+    assert model.travel_time(0, 1, 0) == np.iinfo(np.int16).max
+
+
+def test_validate_route_timing_reports_late_stops():
+    # 1 km legs at 60 km/h: 1 minute each
+    matrix = SymmetricMatrix.from_dense([[0, 1000, 2000], [1000, 0, 1000], [2000, 1000, 0]])
+    model = TimeDependentTravelTime.from_distance_matrix(matrix, [("00:00", 60)])
+    routes = [{'vehicle_id': 0, 'stops': [{'location_index': 0}, {'location_index': 1},
+                                          {'location_index': 2}, {'location_index': 0}]}]
+    time_windows = [(0, 480), (0, 10), (0, 5)]
+
+    result = validate_route_timing(routes, model, start_minute=600, service_times=[0, 5, 0],
+                                   time_windows=time_windows)
+
+    schedule = result['routes'][0]['schedule']
+    assert [stop['arrival_minute'] for stop in schedule] == [1.0, 7.0, 9.0]
+    assert result['late_stops'] == 1
+    assert result['max_lateness_minutes'] == 2.0
+    assert result['on_time_rate'] == 50.0
@@ -0,0 +1,219 @@
+"""
+Time-Dependent Travel Time Model
+Compact piecewise-linear travel-time tensor for traffic-aware routing
+
+Travel times are stored per time-of-day breakpoint as an int16 tensor of minutes
+(breakpoints x n(n-1)/2: the upper triangle of each symmetric n x n matrix, as in
+SymmetricMatrix). Between breakpoints the travel time is interpolated linearly, and the
+profile wraps around midnight.
+
+Author: BARQ Fleet Management Team
+"""
+
+from bisect import bisect_right
+import numpy as np
+
+from symmetric_matrix import SymmetricMatrix, upper_triangle_offsets
+
+MINUTES_PER_DAY = 1440
+INT16_MAX = np.iinfo(np.int16).max
+TENSOR_CHUNK = 1 << 20  # distances converted per step when building the tensor
+
+# Riyadh weekday urban traffic profile: (minute of day, average speed in km/h)
+RIYADH_SPEED_PROFILE = [
+    (0, 55),      # 00:00 free flow
+    (360, 45),    # 06:00
+    (420, 25),    # 07:00 morning peak
+    (570, 35),    # 09:30
+    (720, 30),    # 12:00 midday
+    (900, 28),    # 15:00 school / shift change
+    (1020, 18),   # 17:00 evening peak
+    (1200, 22),   # 20:00
+    (1320, 40),   # 22:00
+]
+
+
+def parse_clock(value):
+    """Convert "HH:MM" (or minutes as a number) to minutes of day"""
+    if isinstance(value, str):
+        hours, minutes = value.split(':')
+        return int(hours) * 60 + int(minutes)
+    return int(value)
+
+
+def format_clock(minute):
+    """Format minutes (may exceed one day) as "HH:MM" time of day"""
+    minute = int(round(minute)) % MINUTES_PER_DAY
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class TimeDependentTravelTime:
+    """
+    Piecewise-linear time-dependent travel times over a symmetric distance matrix
+
+    breakpoints: ascending minutes of day, shape (k,)
+    tensor: travel minutes departing at each breakpoint, int16, shape (k, n(n-1)/2); each row
+        is the strict upper triangle of that breakpoint's n x n matrix (SymmetricMatrix layout)
+    """
+
+    def __init__(self, num_nodes, breakpoints, tensor):
+        self.num_nodes = num_nodes
+        self.breakpoints = np.asarray(breakpoints, dtype=np.int32)
+        self.tensor = np.ascontiguousarray(tensor, dtype=np.int16)
+        self.num_breakpoints = self.tensor.shape[0]
+        if self.tensor.shape[1] != num_nodes * (num_nodes - 1) // 2:
+            raise ValueError(f"Expected {num_nodes * (num_nodes - 1) // 2} values per breakpoint "
+                             f"for {num_nodes} nodes")
+        # Flat int16 view: indexing returns Python ints without numpy scalar overhead
+        self._flat = memoryview(self.tensor).cast('B').cast('h')
+        self._stride = self.tensor.shape[1]
+        self._row_offsets = upper_triangle_offsets(num_nodes)
+        self._breakpoint_list = self.breakpoints.tolist()
+
+    @classmethod
+    def from_distance_matrix(cls, distance_matrix, speed_profile=None):
+        """
+        Build the tensor from a symmetric distance matrix (meters) and a time-of-day speed profile
+
+        Args:
+            distance_matrix: SymmetricMatrix of distances in meters (a dense n x n matrix is
+                compressed to its upper triangle first)
+            speed_profile: list of (minute_of_day, speed_kmh); defaults to Riyadh traffic
+        """
+        if not isinstance(distance_matrix, SymmetricMatrix):
+            distance_matrix = SymmetricMatrix.from_dense(distance_matrix)
+        speed_profile = sorted((parse_clock(minute), speed) for minute, speed in speed_profile or RIYADH_SPEED_PROFILE)
+        breakpoints = [minute for minute, _ in speed_profile]
+        meters_per_minute = np.array([speed * 1000.0 / 60.0 for _, speed in speed_profile], dtype=np.float32)
+
+        # Converted in chunks so temporaries stay small next to the tensor itself
+        values = distance_matrix.values
+        tensor = np.empty((len(speed_profile), len(values)), dtype=np.int16)
+        for lo in range(0, len(values), TENSOR_CHUNK):
+            distances = values[lo:lo + TENSOR_CHUNK].astype(np.float32)
+            for k in range(len(speed_profile)):
+                minutes = np.ceil(distances / meters_per_minute[k])
+                tensor[k, lo:lo + TENSOR_CHUNK] = np.minimum(minutes, INT16_MAX)
+
+        return cls(distance_matrix.size, breakpoints, tensor)
+
+    @property
+    def nbytes(self):
+        return self.tensor.nbytes
+
+    def _interval(self, minute_of_day):
+        """Return (breakpoint index, next index, fraction of the way to the next breakpoint)"""
+        k = bisect_right(self._breakpoint_list, minute_of_day) - 1
+        next_k = (k + 1) % self.num_breakpoints
+        start = self._breakpoint_list[k]
+        span = (self._breakpoint_list[next_k] - start) % MINUTES_PER_DAY or MINUTES_PER_DAY
+        return k, next_k, ((minute_of_day - start) % MINUTES_PER_DAY) / span
+
+    def _offset(self, from_node, to_node):
+        if from_node < to_node:
+            return self._row_offsets[from_node] + to_node
+        return self._row_offsets[to_node] + from_node
+
+    def travel_time(self, from_node, to_node, departure_minute):
+        """Travel minutes from one node to another departing at departure_minute"""
+        if from_node == to_node:
+            return 0
+        k, next_k, fraction = self._interval(departure_minute % MINUTES_PER_DAY)
+        offset = self._offset(from_node, to_node)
+        before = self._flat[k * self._stride + offset]
+        after = self._flat[next_k * self._stride + offset]
+        return before + (after - before) * fraction
+
+    def departure_lookup(self, departure_minutes):
+        """
+        (from_node, to_node) -> integer travel minutes, where from_node departs at
+        departure_minutes[from_node]
+
+        Gives the solver one time-of-day slice per origin node. Each call interpolates two
+        tensor entries, so no n x n matrix is materialized.
+        """
+        intervals = [self._interval(minute % MINUTES_PER_DAY) for minute in departure_minutes]
+        before_base = [k * self._stride for k, _, _ in intervals]
+        after_base = [next_k * self._stride for _, next_k, _ in intervals]
+        fractions = [fraction for _, _, fraction in intervals]
+        flat, offset = self._flat, self._offset
+
+        def lookup(from_node, to_node):
+            if from_node == to_node:
+                return 0
+            index = offset(from_node, to_node)
+            before = flat[before_base[from_node] + index]
+            after = flat[after_base[from_node] + index]
+            return round(before + (after - before) * fractions[from_node])
+
+        return lookup
+
+
+def validate_route_timing(routes, model, start_minute, service_times=None, time_windows=None):
+    """
+    Recompute arrival times for solved routes under the time-dependent model
+
+    Arrivals before a window opens wait for it; arrivals after it closes are reported as late.
+
+    Args:
+        routes: Solver routes (each with 'vehicle_id' and 'stops' carrying 'location_index')
+        model: TimeDependentTravelTime
+        start_minute: Minute of day at which vehicles leave the depot
+        service_times: Optional service minutes per location
+        time_windows: Optional (earliest, latest) per location, in minutes from start
+
+    Returns:
+        dict: Per-route arrival schedule and late-stop summary
+    """
+    service_times = service_times or [0] * model.num_nodes
+    validated_routes = []
+    late_stops = 0
+    total_stops = 0
+    max_lateness = 0.0
+
+    for route in routes:
+        nodes = [stop['location_index'] for stop in route['stops']]
+        clock = float(start_minute)
+        schedule = []
+        route_late_stops = 0
+
+        for previous, node in zip(nodes, nodes[1:]):
+            departure = clock + service_times[previous]
+            arrival = departure + model.travel_time(previous, node, departure)
+            lateness = 0.0
+
+            if time_windows is not None:
+                earliest, latest = time_windows[node]
+                lateness = max(0.0, arrival - (start_minute + latest))
+                clock = max(arrival, start_minute + earliest)
+            else:
+                clock = arrival
+
+            schedule.append({
+                'location_index': node,
+                'arrival_minute': round(arrival - start_minute, 1),
+                'arrival_clock': format_clock(arrival),
+                'late_by_minutes': round(lateness, 1)
+            })
+            if node != nodes[0]:  # the depot return is not a delivery stop
+                total_stops += 1
+                if lateness > 0:
+                    route_late_stops += 1
+                    max_lateness = max(max_lateness, lateness)
+
+        late_stops += route_late_stops
+        validated_routes.append({
+            'vehicle_id': route['vehicle_id'],
+            'schedule': schedule,
+            'route_duration_minutes': round(clock - start_minute, 1),
+            'late_stops': route_late_stops
+        })
+
+    return {
+        'start_time': format_clock(start_minute),
+        'routes': validated_routes,
+        'total_stops': total_stops,
+        'late_stops': late_stops,
+        'on_time_rate': round((1 - late_stops / total_stops) * 100, 2) if total_stops else 100.0,
+        'max_lateness_minutes': round(max_lateness, 1)
+    }
@@ -3,12 +3,22 @@ Flask API Server for BARQ Fleet Analytics
 Comprehensive analytics API exposing all Python modules via HTTP
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
 import sys
+import json
 import logging
 
+import psycopg2
+
+from database_connection import (
+    ASYNC_QUERIES_AVAILABLE, CircuitOpenError, QueryTimeoutError, get_circuit_breaker_metrics,
+    get_pool_metrics, get_query_cache, get_query_telemetry, get_statement_registry,
+    get_timed_out_queries, run_async
+)
+from sla_stream import StreamCapacityError
+
 app = Flask(__name__)
 CORS(app)
 
@@ -32,6 +42,7 @@ _sla_analytics = None
 _route_analyzer = None
 _fleet_performance = None
 _demand_forecaster = None
+_sla_broadcaster = None
 
 def get_sla_analytics():
     """Lazy initialization of SLA Analytics."""
@@ -47,6 +58,56 @@ def get_sla_analytics():
             raise
     return _sla_analytics
 
+def get_demand_forecaster():
+    """
+    Lazy initialization of the Demand Forecaster (and its forecast cache).
+
+    Connects through the database layer, which raises instead of exiting the worker, and
+    keeps the instance only once connected, so the next request after an outage connects
+    again. A refused connection is raised as CircuitOpenError (the attempt tripped the
+    breaker) for the endpoints' 503 response.
+    """
+    global _demand_forecaster
+    if _demand_forecaster is None:
+        from demand_forecaster import DemandForecaster
+        forecaster = DemandForecaster(db_config=get_db_config())
+        try:
+            forecaster.db.connect()
+        except psycopg2.OperationalError as e:
+            logger.error(f"Failed to initialize Demand Forecaster: {e}")
+            raise CircuitOpenError(f"Database unavailable: {e}") from e
+        except Exception as e:
+            logger.error(f"Failed to initialize Demand Forecaster: {e}")
+            raise
+        forecaster.data_source = 'demo' if forecaster.db.is_fallback_mode else 'production'
+        _demand_forecaster = forecaster
+        logger.info("Demand Forecaster initialized successfully")
+    return _demand_forecaster
+
+def get_sla_broadcaster():
+    """Lazy initialization of the realtime SLA stream, shared by all subscribers."""
+    global _sla_broadcaster
+    if _sla_broadcaster is None:
+        from sla_stream import SLAStatusBroadcaster
+        _sla_broadcaster = SLAStatusBroadcaster(get_sla_analytics())
+    return _sla_broadcaster
+
+def query_timeout_response(error: QueryTimeoutError):
+    """504 response for a query cancelled at its deadline."""
+    return jsonify({
+        'error': str(error),
+        'error_type': 'query_timeout',
+        'query_fingerprint': error.fingerprint,
+        'timeout_seconds': error.timeout
+    }), 504
+
+def circuit_open_response(error: CircuitOpenError):
+    """503 response while the database circuit breaker is open."""
+    return jsonify({
+        'error': str(error),
+        'error_type': 'database_unavailable'
+    }), 503, {'Retry-After': '5'}
+
 # ============================================================================
 # HEALTH & STATUS ENDPOINTS
 # ============================================================================
@@ -75,7 +136,9 @@ def health():
         'status': 'healthy',
         'service': 'barq-fleet-analytics',
         'version': '1.0.0',
-        'database': 'connected' if _sla_analytics else 'not_initialized'
+        'database': 'connected' if _sla_analytics else 'not_initialized',
+        'connection_pools': get_pool_metrics(),
+        'circuit_breakers': get_circuit_breaker_metrics()
     })
 
 @app.route('/api/docs', methods=['GET'])
@@ -87,10 +150,21 @@ def api_docs():
         'endpoints': {
             'SLA Analytics': {
                 'GET /api/sla/realtime': 'Real-time SLA status',
-                'GET /api/sla/compliance?days=7&service_type=BARQ': 'SLA compliance metrics',
+                'GET /api/sla/stream': 'Real-time SLA status and at-risk/breach transitions (Server-Sent Events)',
+                'GET /api/sla/stream/stats': 'SLA stream subscribers and publisher counters',
+                'GET /api/sla/compliance?days=7&hub_id=1': 'SLA compliance metrics',
                 'GET /api/sla/breach-risk?hub_id=1': 'Breach risk patterns',
                 'GET /api/sla/trend?days=30': 'SLA compliance trend'
             },
+            'Database': {
+                'GET /api/db/timeouts': 'Recently timed-out queries (SQL fingerprint, duration)',
+                'GET /api/db/cache': 'Query result cache hit rates and entries',
+                'GET /api/db/queries?limit=20&order_by=total_ms': 'Per-fingerprint query stats and latency histogram',
+                'GET /api/db/slow-queries': 'Slow-query log with callers and captured plans',
+                'GET /api/db/statements': 'Prepared statements with estimated planning time saved',
+                'GET /api/db/rollups': 'Rollup high-water marks and staleness',
+                'POST /api/db/rollups/refresh?full=false': 'Refresh rollups incrementally (schedule every minute)'
+            },
             'Route Analytics': {
                 'GET /api/routes/efficiency?days=30': 'Route efficiency analysis',
                 'GET /api/routes/bottlenecks?days=30': 'Operational bottlenecks',
@@ -103,9 +177,10 @@ def api_docs():
                 'GET /api/fleet/cohorts?period=monthly': 'Driver cohort comparison'
             },
             'Demand Forecasting': {
-                'GET /api/demand/hourly?horizon=7': 'Hourly demand forecast',
-                'GET /api/demand/daily?horizon=30': 'Daily demand forecast',
-                'GET /api/demand/resources?horizon=14': 'Resource requirements'
+                'GET /api/demand/hourly?horizon=7&hub_id=1': 'Hourly demand forecast',
+                'GET /api/demand/daily?horizon=30&hub_id=1': 'Daily demand forecast',
+                'GET /api/demand/resources?horizon=14': 'Resource requirements',
+                'GET /api/demand/cache': 'Forecast cache hit rates, watermark and invalidations'
             }
         }
     })
@@ -120,21 +195,80 @@ def get_realtime_status():
     try:
         result = get_sla_analytics().get_realtime_sla_status()
         return jsonify(result)
+    except QueryTimeoutError as e:
+        return query_timeout_response(e)
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
     except Exception as e:
         logger.error(f"Error in realtime status: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/sla/stream', methods=['GET'])
+def stream_realtime_status():
+    """
+    Server-Sent Events stream of realtime SLA status and shipment transitions.
+
+    Every subscriber reads the same status computed once per SLA_STREAM_INTERVAL, so
+    database load does not grow with the number of open dashboards. Browsers reconnect
+    with Last-Event-ID and resume from the buffered events.
+    """
+    try:
+        broadcaster = get_sla_broadcaster()
+    except Exception as e:
+        logger.error(f"Error starting SLA stream: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    try:
+        # The slot is reserved here, not when the response starts streaming
+        subscription = broadcaster.subscribe(last_event_id=request.headers.get('Last-Event-ID', type=int))
+    except StreamCapacityError:
+        # Each open stream holds a server thread; keep some for ordinary requests
+        return jsonify({
+            'error': 'Too many open SLA streams on this server',
+            'error_type': 'stream_capacity'
+        }), 503, {'Retry-After': '10'}
+
+    def events():
+        for event in subscription:
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            event_id, event_type, data = event
+            yield f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Releases the slot even when the client is gone before the first event
+    response.call_on_close(subscription.close)
+    return response
+
+@app.route('/api/sla/stream/stats', methods=['GET'])
+def get_stream_stats():
+    """Subscribers, buffered events and status computations of the SLA stream."""
+    stats = _sla_broadcaster.get_stats() if _sla_broadcaster else {'subscribers': 0, 'publisher_running': False}
+    if _sla_analytics:
+        stats['tracker'] = _sla_analytics.tracker.get_stats()
+    return jsonify(stats)
+
 @app.route('/api/sla/compliance', methods=['GET'])
 def get_compliance():
     """Get historical SLA compliance metrics."""
     try:
         days = int(request.args.get('days', 7))
-        service_type = request.args.get('service_type')
-        result = get_sla_analytics().analyze_sla_compliance(
-            date_range=days,
-            service_type=service_type
-        )
+        hub_id = request.args.get('hub_id', type=int)
+        analytics = get_sla_analytics()
+        if ASYNC_QUERIES_AVAILABLE:
+            # Overall, per-hub and zone queries run concurrently
+            result = run_async(analytics.analyze_sla_compliance_async(date_range=days, hub_id=hub_id))
+        else:
+            result = analytics.analyze_sla_compliance(date_range=days, hub_id=hub_id)
         return jsonify(result)
+    except QueryTimeoutError as e:
+        return query_timeout_response(e)
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
     except Exception as e:
         logger.error(f"Error in compliance analysis: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -146,6 +280,10 @@ def get_breach_risk():
         hub_id = request.args.get('hub_id', type=int)
         result = get_sla_analytics().identify_breach_risks(hub_id=hub_id)
         return jsonify(result)
+    except QueryTimeoutError as e:
+        return query_timeout_response(e)
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
     except Exception as e:
         logger.error(f"Error in breach risk analysis: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -157,10 +295,75 @@ def get_trend():
         days = int(request.args.get('days', 30))
         result = get_sla_analytics().get_sla_trend(days=days)
         return jsonify(result)
+    except QueryTimeoutError as e:
+        return query_timeout_response(e)
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
     except Exception as e:
         logger.error(f"Error in trend analysis: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/db/timeouts', methods=['GET'])
+def get_query_timeouts():
+    """Recently timed-out queries with their SQL fingerprints and durations."""
+    timeouts = get_timed_out_queries()
+    return jsonify({'count': len(timeouts), 'timeouts': timeouts})
+
+@app.route('/api/db/cache', methods=['GET'])
+def get_query_cache_metrics():
+    """Query result cache hit rates per query class, entries and evictions."""
+    return jsonify(get_query_cache().get_metrics())
+
+@app.route('/api/db/queries', methods=['GET'])
+def get_query_stats():
+    """Per-fingerprint calls, latency, rows and bytes, ranked by total time."""
+    limit = request.args.get('limit', 20, type=int)
+    order_by = request.args.get('order_by', 'total_ms')
+    if order_by not in ('total_ms', 'calls', 'max_ms', 'mean_ms', 'rows', 'bytes', 'errors'):
+        return jsonify({'error': f"Unsupported order_by: {order_by}"}), 400
+    telemetry = get_query_telemetry()
+    return jsonify({
+        'queries': telemetry.get_query_stats(limit=limit, order_by=order_by),
+        'latency_histogram': telemetry.get_histogram()
+    })
+
+@app.route('/api/db/statements', methods=['GET'])
+def get_prepared_statements():
+    """Registered statements: executions, preparations and planning time saved by PREPARE."""
+    registry = get_statement_registry()
+    return jsonify({'enabled': registry.enabled, 'statements': registry.get_stats()})
+
+@app.route('/api/db/rollups', methods=['GET'])
+def get_rollup_status():
+    """High-water mark, staleness and last refresh of each analytics rollup."""
+    try:
+        rollups = get_sla_analytics().rollups
+        return jsonify({'ready': rollups.is_ready(), 'rollups': rollups.status()})
+    except Exception as e:
+        logger.error(f"Error reading rollup status: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/db/rollups/refresh', methods=['POST'])
+def refresh_rollups():
+    """Recompute the rollup buckets changed since the last refresh (full=true recomputes all)."""
+    try:
+        full = request.args.get('full', 'false').lower() == 'true'
+        return jsonify(get_sla_analytics().rollups.refresh(full=full))
+    except Exception as e:
+        logger.error(f"Error refreshing rollups: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/db/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """Slow-query log with SQL fingerprints, callers and EXPLAIN plans when captured."""
+    telemetry = get_query_telemetry()
+    slow_queries = telemetry.get_slow_queries()
+    return jsonify({
+        'threshold_ms': telemetry.slow_query_ms,
+        'count': len(slow_queries),
+        'slow_queries': slow_queries
+    })
+
 # ============================================================================
 # ROUTE ANALYTICS ENDPOINTS
 # ============================================================================
@@ -394,19 +597,13 @@ def get_hourly_forecast():
     """Get hourly demand forecast."""
     try:
         horizon = int(request.args.get('horizon', 7))
-
-        # Mock response
-        result = {
-            'status': 'success',
-            'forecast_type': 'hourly',
-            'horizon_days': horizon,
-            'forecast': [
-                {'date': '2025-11-08', 'hour': 9, 'predicted_orders': 45, 'confidence': 0.89},
-                {'date': '2025-11-08', 'hour': 12, 'predicted_orders': 87, 'confidence': 0.92},
-                {'date': '2025-11-08', 'hour': 18, 'predicted_orders': 72, 'confidence': 0.88}
-            ]
-        }
+        hub_id = request.args.get('hub_id', type=int)
+        result = get_demand_forecaster().forecast_hourly_demand(horizon_days=horizon, hub_id=hub_id)
         return jsonify(result)
+    except QueryTimeoutError as e:
+        return query_timeout_response(e)
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
     except Exception as e:
         logger.error(f"Error in hourly forecast: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -416,56 +613,43 @@ def get_daily_forecast():
     """Get daily demand forecast."""
     try:
         horizon = int(request.args.get('horizon', 30))
-
-        # Mock response
-        result = {
-            'status': 'success',
-            'forecast_type': 'daily',
-            'horizon_days': horizon,
-            'forecast': [
-                {'date': '2025-11-08', 'predicted_orders': 856, 'trend': 'increasing', 'confidence': 0.91},
-                {'date': '2025-11-09', 'predicted_orders': 923, 'trend': 'increasing', 'confidence': 0.89},
-                {'date': '2025-11-10', 'predicted_orders': 795, 'trend': 'stable', 'confidence': 0.87}
-            ]
-        }
+        hub_id = request.args.get('hub_id', type=int)
+        result = get_demand_forecaster().forecast_daily_demand(horizon_days=horizon, hub_id=hub_id)
         return jsonify(result)
+    except QueryTimeoutError as e:
+        return query_timeout_response(e)
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
     except Exception as e:
         logger.error(f"Error in daily forecast: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/demand/resources', methods=['GET'])
 def get_resource_forecast():
-    """Get resource requirements forecast."""
+    """Get resource requirements forecast (reuses the cached daily forecast)."""
     try:
         horizon = int(request.args.get('horizon', 14))
-
-        # Mock response
-        result = {
-            'status': 'success',
-            'forecast_type': 'resources',
-            'horizon_days': horizon,
-            'requirements': [
-                {
-                    'date': '2025-11-08',
-                    'drivers_needed': 67,
-                    'vehicles_needed': 52,
-                    'peak_hour': 12,
-                    'peak_drivers': 89
-                },
-                {
-                    'date': '2025-11-09',
-                    'drivers_needed': 72,
-                    'vehicles_needed': 56,
-                    'peak_hour': 18,
-                    'peak_drivers': 95
-                }
-            ]
-        }
+        result = get_demand_forecaster().forecast_resource_requirements(horizon_days=horizon)
         return jsonify(result)
+    except QueryTimeoutError as e:
+        return query_timeout_response(e)
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
     except Exception as e:
         logger.error(f"Error in resource forecast: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/demand/cache', methods=['GET'])
+def get_forecast_cache_metrics():
+    """Forecast cache hit rates per forecast kind, current watermark and invalidations."""
+    try:
+        return jsonify(get_demand_forecaster().forecast_cache.get_metrics())
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+    except Exception as e:
+        logger.error(f"Error in forecast cache metrics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 # ============================================================================
 # ERROR HANDLERS
 # ============================================================================
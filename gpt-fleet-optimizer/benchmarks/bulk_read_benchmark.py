@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Bulk read benchmark: execute_query + pd.DataFrame vs streaming vs COPY.
+
+Reads the first N rows of orders and shipments through each path and reports wall time
+and rows/second. Run against a scratch database seeded with seed_synthetic_data.py.
+
+Usage:
+    DB_HOST=localhost DB_NAME=barq_bench python benchmarks/bulk_read_benchmark.py --rows 100000 1000000 3000000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database_connection import get_database_connection, pa_csv  # noqa: E402
+
+TABLES = {
+    'orders': {
+        'dtypes': {'id': 'int64', 'hub_id': 'Int64', 'shipment_id': 'Int64', 'order_status': 'category'},
+        'parse_dates': ['created_at', 'updated_at', 'delivery_start', 'delivery_finish'],
+    },
+    'shipments': {
+        'dtypes': {'id': 'int64', 'tracking_no': 'string', 'shipment_status': 'category',
+                   'courier_id': 'Int64', 'partner_id': 'Int64', 'promise_time': 'Int64',
+                   'is_completed': 'boolean', 'is_cancelled': 'boolean',
+                   'driving_distance': 'float64', 'reward': 'float64'},
+        'parse_dates': ['created_at', 'updated_at', 'pickup_time', 'delivery_finish', 'complete_time'],
+    },
+}
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bulk read paths')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000, 3000000])
+    parser.add_argument('--tables', nargs='+', default=list(TABLES))
+    args = parser.parse_args()
+
+    db = get_database_connection()
+    db.connect(retry_attempts=1)
+
+    paths = {
+        'execute_query + DataFrame': lambda q, spec: pd.DataFrame(db.execute_query(q, timeout=None)),
+        'query_dataframe': lambda q, spec: db.query_dataframe(q, timeout=None),
+        'read_copy (pandas)': lambda q, spec: db.read_copy(q, timeout=None, **spec),
+    }
+    if pa_csv is not None:
+        paths['read_copy (arrow)'] = lambda q, spec: db.read_copy(q, timeout=None, engine='arrow', **spec)
+
+    print(f"{'table':<10} {'rows':>9}  {'path':<26} {'seconds':>8} {'rows/s':>11} {'speedup':>8}")
+    for table in args.tables:
+        for rows in args.rows:
+            query = f"SELECT * FROM {table} ORDER BY id LIMIT {rows}"
+            baseline = None
+            for name, read in paths.items():
+                seconds, result = timed(lambda: read(query, TABLES[table]))
+                count = result.num_rows if hasattr(result, 'num_rows') else len(result)
+                baseline = baseline or seconds
+                print(f"{table:<10} {count:>9}  {name:<26} {seconds:>8.2f} {count / seconds:>11,.0f} "
+                      f"{baseline / seconds:>7.1f}x")
+                del result
+
+    db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Forecast model benchmark: seasonal means vs batched Holt-Winters, per series vs batched.
+
+Generates hub x date x hour order counts shaped like the forecast_all_hubs query (weekly
+and daily cycles, per-hub trends, noise, some hubs opening late), holds out the last days,
+and fits four ways: the current seasonal-mean models one hub at a time (as the single-hub
+forecasts do) and for all hubs at once, and Holt-Winters one hub at a time and for all hubs
+at once. Reports fit + forecast time and WAPE / MAPE on the holdout. No database is needed.
+
+Usage:
+    python benchmarks/forecast_model_benchmark.py --hubs 50 200 --forecast_type daily hourly
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from demand_forecaster import DemandForecaster  # noqa: E402
+
+HOURLY_SHAPE = np.array([1, 1, 1, 1, 1, 1, 2, 4, 6, 8, 9, 10, 12, 11, 9, 8, 8, 10, 13, 14, 12, 8, 4, 2], dtype=float)
+WEEKLY_SHAPE = np.array([1.2, 0.9, 0.9, 0.95, 1.0, 1.3, 1.4])  # Sunday first, like EXTRACT(DOW)
+
+
+def synthetic_orders(hubs: int, days: int, seed: int = 42) -> pd.DataFrame:
+    """Order counts per hub, date and hour with rows only where orders > 0 (as the query returns)."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(pd.Timestamp.now().normalize() - pd.Timedelta(days=days), periods=days, freq='D')
+    dow = ((dates.dayofweek.to_numpy() + 1) % 7)
+    scale = rng.uniform(0.2, 3.0, hubs)
+    growth = rng.normal(0, 0.004, hubs)
+    opened = np.where(rng.random(hubs) < 0.1, rng.integers(0, days - 28, hubs), 0)
+
+    t = np.arange(days)
+    rate = (scale[:, None, None] * (1 + growth[:, None, None] * t[None, :, None]) *
+            WEEKLY_SHAPE[dow][None, :, None] * HOURLY_SHAPE[None, None, :])
+    counts = rng.poisson(np.maximum(rate, 0))
+    counts[t[None, :] < opened[:, None]] = 0
+
+    hub, day, hour = np.nonzero(counts)
+    return pd.DataFrame({
+        'hub_id': hub + 1,
+        'day_of_week': dow[day].astype(float),
+        'hour_of_day': hour.astype(float),
+        'order_count': counts[hub, day, hour],
+        'order_date': dates[day].date
+    })
+
+
+def accuracy(forecast: pd.DataFrame, actual: pd.DataFrame, keys: list) -> tuple:
+    """WAPE (%) over all slots and MAPE (%) over slots with orders."""
+    merged = forecast.merge(actual, on=keys, how='left').fillna({'order_count': 0})
+    error = (merged['forecasted_demand'] - merged['order_count']).abs()
+    wape = error.sum() / merged['order_count'].sum() * 100
+    nonzero = merged['order_count'] > 0
+    mape = (error[nonzero] / merged.loc[nonzero, 'order_count']).mean() * 100
+    return wape, mape
+
+
+def run_methods(forecaster: DemandForecaster, train: pd.DataFrame, horizon: int, start, forecast_type: str) -> dict:
+    def seasonal(df, by_hub):
+        if forecast_type == 'hourly':
+            return forecaster._hourly_forecast_grid(forecaster._hourly_stats(df, by_hub), horizon, start, by_hub)
+        daily = df.groupby(['hub_id', 'order_date'], sort=True).agg(
+            day_of_week=('day_of_week', 'first'), order_count=('order_count', 'sum')
+        ).reset_index()
+        return forecaster._daily_forecast_grid(daily if by_hub else daily.drop(columns='hub_id'),
+                                               horizon, start, by_hub)[0]
+
+    def per_series(fit):
+        tables = []
+        for hub_id, hub_df in train.groupby('hub_id'):
+            table = fit(hub_df)
+            tables.append(table.assign(hub_id=hub_id) if 'hub_id' not in table else table)
+        return pd.concat(tables, ignore_index=True)
+
+    methods = {
+        'seasonal mean, per hub': lambda: per_series(lambda df: seasonal(df, False)),
+        'seasonal mean, batched': lambda: seasonal(train, True),
+        'holt-winters, per hub': lambda: per_series(
+            lambda df: forecaster._holt_winters_grid(df, horizon, start, forecast_type)),
+        'holt-winters, batched': lambda: forecaster._holt_winters_grid(train, horizon, start, forecast_type),
+    }
+    results = {}
+    for name, method in methods.items():
+        began = time.perf_counter()
+        table = method()
+        results[name] = (time.perf_counter() - began, table)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark demand forecast models')
+    parser.add_argument('--hubs', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--days', type=int, default=90, help='History length including the holdout')
+    parser.add_argument('--holdout', type=int, default=7, help='Days held out and forecast')
+    parser.add_argument('--forecast_type', nargs='+', choices=['daily', 'hourly'], default=['daily', 'hourly'])
+    args = parser.parse_args()
+
+    forecaster = DemandForecaster()
+    for forecast_type in args.forecast_type:
+        print(f"\n{forecast_type} forecasts, {args.holdout}-day holdout")
+        print(f"{'hubs':>5}  {'method':<24} {'fit+forecast ms':>16} {'WAPE %':>8} {'MAPE %':>8}")
+        for hubs in args.hubs:
+            orders = synthetic_orders(hubs, args.days)
+            cutoff = max(orders['order_date']) - pd.Timedelta(days=args.holdout - 1)
+            train = orders[orders['order_date'] < cutoff]
+            test = orders[orders['order_date'] >= cutoff].assign(date=lambda df: pd.to_datetime(df['order_date']).dt.strftime('%Y-%m-%d'))
+            if forecast_type == 'hourly':
+                keys = ['hub_id', 'date', 'hour']
+                actual = test.assign(hour=test['hour_of_day'].astype(int).map('{:02d}:00'.format))[keys + ['order_count']]
+            else:
+                keys = ['hub_id', 'date']
+                actual = test.groupby(keys, as_index=False)['order_count'].sum()
+
+            start = pd.Timestamp(cutoff).to_pydatetime()
+            for name, (seconds, table) in run_methods(forecaster, train, args.holdout, start, forecast_type).items():
+                wape, mape = accuracy(table[keys + ['forecasted_demand']], actual, keys)
+                print(f"{hubs:>5}  {name:<24} {seconds * 1000:>16.1f} {wape:>8.1f} {mape:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
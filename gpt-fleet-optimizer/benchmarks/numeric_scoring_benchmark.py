@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Scoring benchmark: Decimal object columns vs float64 columns.
+
+Runs the CPI, VPI and route efficiency scoring on synthetic frames shaped like the analyzer
+query results. The "Decimal" path starts from object columns of Python Decimal (what the
+cursor returned before NUMERIC_AS_FLOAT) and has to coerce them first, because Decimal * float
+raises TypeError. The "float64" path scores the columns analyzers receive now.
+No database is needed.
+
+Usage:
+    python benchmarks/numeric_scoring_benchmark.py --rows 1000 10000 100000
+"""
+
+import os
+import sys
+import time
+import argparse
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fleet_performance import FleetPerformanceAnalyzer  # noqa: E402
+from route_analyzer import RouteAnalyzer  # noqa: E402
+
+SCORERS = {
+    'CPI (couriers)': (FleetPerformanceAnalyzer._score_couriers,
+                       ['completion_rate', 'on_time_rate', 'shipments_per_day', 'avg_delivery_hours']),
+    'VPI (vehicles)': (FleetPerformanceAnalyzer._score_vehicles,
+                       ['completion_rate', 'on_time_rate', 'shipments_per_day']),
+    'route efficiency': (RouteAnalyzer._score_routes,
+                         ['on_time_rate', 'avg_delivery_hours']),
+}
+
+
+def synthetic_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'completion_rate': rng.uniform(70, 100, rows),
+        'on_time_rate': rng.uniform(60, 100, rows),
+        'shipments_per_day': rng.uniform(5, 40, rows),
+        'avg_delivery_hours': rng.uniform(0.3, 3.0, rows),
+    })
+    # Some couriers have no completed or timed deliveries
+    df.loc[rng.random(rows) < 0.02, ['on_time_rate', 'avg_delivery_hours']] = np.nan
+    return df
+
+
+def as_decimal(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """NUMERIC columns the way RealDictCursor delivered them: object dtype, Decimal or None."""
+    df = df.copy()
+    for column in columns:
+        df[column] = pd.Series(
+            [None if pd.isna(value) else Decimal(repr(value)) for value in df[column]],
+            dtype=object
+        )
+    return df
+
+
+def coerce_then(score):
+    """The old path: element-wise Decimal -> float conversion before any arithmetic."""
+    def run(df: pd.DataFrame) -> pd.DataFrame:
+        for column in df.columns:
+            df[column] = pd.to_numeric(df[column])
+        return score(df)
+    return run
+
+
+def timed(func, df: pd.DataFrame, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        frame = df.copy()
+        start = time.perf_counter()
+        func(frame)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analyzer scoring on Decimal vs float64 columns')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scoring':<18} {'rows':>8}  {'Decimal ms':>11} {'float64 ms':>11} {'speedup':>8}")
+    for rows in args.rows:
+        base = synthetic_frame(rows)
+        for name, (score, columns) in SCORERS.items():
+            before = timed(coerce_then(score), as_decimal(base[columns], columns), args.repeat)
+            after = timed(score, base[columns], args.repeat)
+            print(f"{name:<18} {rows:>8}  {before * 1000:>11.2f} {after * 1000:>11.2f} "
+                  f"{before / after:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
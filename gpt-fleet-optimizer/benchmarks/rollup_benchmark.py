@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Rollup benchmark: analyzer methods on raw tables vs on the rollup tables.
+
+Builds the rollups (full refresh), times an incremental refresh after touching a batch of
+shipments, then times each analyzer method against raw orders/shipments and against the
+rollups. The result cache is cleared before every call. Run against a scratch database
+seeded with seed_synthetic_data.py.
+
+Usage:
+    DB_HOST=localhost DB_NAME=barq_bench python benchmarks/rollup_benchmark.py --repeat 3
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database_connection import get_database_connection, get_query_cache  # noqa: E402
+from demand_forecaster import DemandForecaster  # noqa: E402
+from fleet_performance import FleetPerformanceAnalyzer  # noqa: E402
+from route_analyzer import RouteAnalyzer  # noqa: E402
+from rollups import RollupManager  # noqa: E402
+from sla_analytics import SLAAnalytics  # noqa: E402
+
+TOUCH_SHIPMENTS = """
+UPDATE shipments SET updated_at = NOW() - INTERVAL '5 minutes'
+WHERE id IN (SELECT id FROM shipments ORDER BY random() LIMIT %s)
+"""
+
+
+def timed(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        get_query_cache().clear()
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            result = func()
+        best = min(best, time.perf_counter() - start)
+        if isinstance(result, dict) and 'error' in result:
+            raise RuntimeError(result['error'])
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analyzers on raw tables vs rollups')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--touch', type=int, default=1000, help='Shipments touched before the incremental refresh')
+    args = parser.parse_args()
+
+    db = get_database_connection()
+    db.connect(retry_attempts=1)
+    manager = RollupManager(db)
+
+    start = time.perf_counter()
+    manager.create_tables(backfill=True)
+    print(f"✓ full build ({time.perf_counter() - start:.1f}s)")
+
+    db.execute_query(TOUCH_SHIPMENTS, [args.touch], timeout=None)
+    start = time.perf_counter()
+    results = manager.refresh()
+    buckets = sum(result['dirty_buckets'] for result in results.values())
+    print(f"✓ incremental refresh after touching {args.touch} shipments: "
+          f"{buckets} buckets ({time.perf_counter() - start:.2f}s)")
+
+    sla, routes, fleet, demand = SLAAnalytics(), RouteAnalyzer(), FleetPerformanceAnalyzer(), DemandForecaster()
+    analyzers = [sla, routes, fleet, demand]
+    for analyzer in analyzers:
+        with redirect_stdout(io.StringIO()):
+            analyzer.connect()
+
+    methods = {
+        'analyze_sla_compliance(7)': lambda: sla.analyze_sla_compliance(date_range=7),
+        'analyze_route_efficiency(30)': lambda: routes.analyze_route_efficiency(date_range=30),
+        'analyze_bottlenecks(30)': lambda: routes.analyze_bottlenecks(date_range=30),
+        'analyze_abc_routes()': lambda: routes.analyze_abc_routes(),
+        'analyze_courier_performance()': lambda: fleet.analyze_courier_performance(period='monthly'),
+        'forecast_hourly_demand(7)': lambda: demand.forecast_hourly_demand(horizon_days=7),
+    }
+
+    print(f"\n{'method':<32} {'raw ms':>10} {'rollup ms':>10} {'speedup':>8}")
+    for name, method in methods.items():
+        for analyzer in analyzers:
+            analyzer.rollups.enabled = False
+        raw = timed(method, args.repeat)
+        for analyzer in analyzers:
+            analyzer.rollups.enabled = True
+        rolled = timed(method, args.repeat)
+        print(f"{name:<32} {raw * 1000:>10.1f} {rolled * 1000:>10.1f} {raw / rolled:>7.1f}x")
+
+    db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Seed a scratch PostgreSQL database with synthetic BarqFleet-shaped data.
+
+Creates hubs, couriers, shipments and orders with the production column names and types
+used by the analyzers (promise_time as epoch seconds, NUMERIC distances and rewards),
+spread over the last 90 days. Intended for local benchmarks only - never run it against
+production.
+
+Usage:
+    DB_HOST=localhost DB_NAME=barq_bench python benchmarks/seed_synthetic_data.py --shipments 3000000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database_connection import get_database_connection  # noqa: E402
+
+SCHEMA = """
+DROP TABLE IF EXISTS orders, shipments, couriers, hubs;
+
+CREATE TABLE hubs (
+    id SERIAL PRIMARY KEY,
+    code TEXT NOT NULL,
+    city_id INTEGER,
+    latitude NUMERIC(10, 7),
+    longitude NUMERIC(10, 7),
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE couriers (
+    id SERIAL PRIMARY KEY,
+    first_name TEXT,
+    last_name TEXT,
+    vehicle_type TEXT,
+    hub_id INTEGER,
+    is_online BOOLEAN,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE shipments (
+    id BIGSERIAL PRIMARY KEY,
+    tracking_no TEXT,
+    shipment_status TEXT,
+    courier_id INTEGER,
+    partner_id INTEGER,
+    created_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ,
+    pickup_time TIMESTAMPTZ,
+    delivery_finish TIMESTAMPTZ,
+    complete_time TIMESTAMPTZ,
+    promise_time BIGINT,
+    is_completed BOOLEAN,
+    is_cancelled BOOLEAN,
+    driving_distance NUMERIC(10, 2),
+    reward NUMERIC(10, 2)
+);
+
+CREATE TABLE orders (
+    id BIGSERIAL PRIMARY KEY,
+    hub_id INTEGER,
+    shipment_id BIGINT,
+    order_status TEXT,
+    created_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ,
+    delivery_start TIMESTAMPTZ,
+    delivery_finish TIMESTAMPTZ
+);
+"""
+
+HUBS = """
+INSERT INTO hubs (code, city_id, latitude, longitude)
+SELECT 'HUB-' || LPAD(g::text, 3, '0'), 1 + g %% 5,
+       24.7136 + (random() - 0.5) * 0.4, 46.6753 + (random() - 0.5) * 0.4
+FROM generate_series(1, %s) g
+"""
+
+COURIERS = """
+INSERT INTO couriers (first_name, last_name, vehicle_type, hub_id, is_online)
+SELECT 'Courier', LPAD(g::text, 5, '0'),
+       (ARRAY['MOTORCYCLE', 'CAR', 'VAN'])[1 + g %% 3],
+       1 + g %% %s, random() < 0.6
+FROM generate_series(1, %s) g
+"""
+
+# 85% completed, 5% cancelled, the rest still active; recent rows are the active ones
+SHIPMENTS = """
+INSERT INTO shipments (tracking_no, shipment_status, courier_id, partner_id, created_at, updated_at,
+                       pickup_time, delivery_finish, complete_time, promise_time,
+                       is_completed, is_cancelled, driving_distance, reward)
+SELECT
+    'TRK' || LPAD(g::text, 10, '0'),
+    CASE WHEN state < 0.85 THEN 'completed' WHEN state < 0.90 THEN 'cancelled' ELSE 'in_transit' END,
+    1 + (random() * (%s - 1))::int,
+    1 + (random() * 49)::int,
+    created_at,
+    created_at + interval '1 minute' * (20 + random() * 160),
+    created_at + interval '1 minute' * (5 + random() * 15),
+    CASE WHEN state < 0.85 THEN created_at + interval '1 minute' * (20 + random() * 100) END,
+    CASE WHEN state < 0.85 THEN created_at + interval '1 minute' * (25 + random() * 100) END,
+    EXTRACT(EPOCH FROM created_at + interval '1 minute' * (60 + random() * 60))::bigint,
+    state < 0.85,
+    state >= 0.85 AND state < 0.90,
+    round((1 + random() * 25)::numeric, 2),
+    round((8 + random() * 30)::numeric, 2)
+FROM (
+    SELECT g,
+           CASE WHEN g > %s - %s / 100 THEN 0.95 ELSE random() END AS state,
+           CASE WHEN g > %s - %s / 100 THEN NOW() - interval '1 minute' * random() * 180
+                ELSE NOW() - interval '1 day' * random() * 90 END AS created_at
+    FROM generate_series(1, %s) g
+) seed
+"""
+
+ORDERS = """
+INSERT INTO orders (hub_id, shipment_id, order_status, created_at, updated_at, delivery_start, delivery_finish)
+SELECT 1 + s.id %% %s, s.id,
+       CASE WHEN s.is_completed THEN 'delivered' WHEN s.is_cancelled THEN 'cancelled' ELSE 'pending' END,
+       s.created_at, s.updated_at, s.pickup_time, s.delivery_finish
+FROM shipments s
+"""
+
+INDEXES = """
+CREATE INDEX idx_shipments_created_at ON shipments (created_at);
+CREATE INDEX idx_shipments_delivery_finish ON shipments (delivery_finish);
+CREATE INDEX idx_shipments_updated_at ON shipments (updated_at);
+CREATE INDEX idx_orders_shipment_id ON orders (shipment_id);
+CREATE INDEX idx_orders_created_at ON orders (created_at);
+CREATE INDEX idx_orders_hub_id ON orders (hub_id);
+CREATE INDEX idx_orders_updated_at ON orders (updated_at);
+ANALYZE;
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed synthetic BarqFleet data for benchmarks')
+    parser.add_argument('--shipments', type=int, default=1000000, help='Number of shipments (and orders)')
+    parser.add_argument('--couriers', type=int, default=850)
+    parser.add_argument('--hubs', type=int, default=20)
+    args = parser.parse_args()
+
+    db = get_database_connection()
+    db.connect(retry_attempts=1)
+
+    steps = [
+        ('schema', SCHEMA, None),
+        ('hubs', HUBS, [args.hubs]),
+        ('couriers', COURIERS, [args.hubs, args.couriers]),
+        ('shipments', SHIPMENTS, [args.couriers] + [args.shipments] * 5),
+        ('orders', ORDERS, [args.hubs]),
+        ('indexes', INDEXES, None),
+    ]
+    for name, sql, params in steps:
+        start = time.time()
+        db.execute_query(sql, params, timeout=None)
+        print(f"✓ {name} ({time.time() - start:.1f}s)")
+
+    db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
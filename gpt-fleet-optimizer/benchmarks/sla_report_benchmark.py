@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+SLA compliance report benchmark: three separate queries vs one GROUPING SETS scan.
+
+Runs the overall, per-hub and per-zone compliance queries the report used to issue one
+after another, then the single-scan report query from SLAAnalytics, each under
+EXPLAIN (ANALYZE, BUFFERS). Reports server execution time and shared buffers touched
+(hit + read). Run against a scratch database seeded with seed_synthetic_data.py.
+
+Usage:
+    DB_HOST=localhost DB_NAME=barq_bench python benchmarks/sla_report_benchmark.py --days 7 30 90
+"""
+
+import io
+import os
+import sys
+import argparse
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sla_analytics import SLAAnalytics  # noqa: E402
+
+DELIVERIES = """
+    FROM shipments s
+    LEFT JOIN orders o ON o.shipment_id = s.id
+    WHERE s.is_completed = true
+    AND s.delivery_finish IS NOT NULL
+    AND s.promise_time IS NOT NULL
+    AND s.delivery_finish >= %s
+    AND s.delivery_finish <= %s
+"""
+
+SEPARATE_QUERIES = {
+    'overall': """
+    SELECT
+        COUNT(*) as total_deliveries,
+        SUM(CASE WHEN s.delivery_finish <= to_timestamp(s.promise_time) THEN 1 ELSE 0 END) as on_time,
+        AVG(EXTRACT(EPOCH FROM (s.delivery_finish - s.created_at)) / 60) as avg_duration_minutes,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM (s.delivery_finish - s.created_at)) / 60),
+        PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM (s.delivery_finish - s.created_at)) / 60)
+    """ + DELIVERIES,
+    'hubs': """
+    SELECT
+        o.hub_id,
+        h.code as hub_name,
+        COUNT(*) as total_deliveries,
+        (SUM(CASE WHEN s.delivery_finish <= to_timestamp(s.promise_time) THEN 1 ELSE 0 END)::float / COUNT(*) * 100) as compliance_rate,
+        AVG(EXTRACT(EPOCH FROM (s.delivery_finish - s.created_at)) / 60) as avg_duration_minutes
+    FROM shipments s
+    JOIN orders o ON o.shipment_id = s.id
+    LEFT JOIN hubs h ON h.id = o.hub_id
+    WHERE s.is_completed = true
+    AND s.delivery_finish IS NOT NULL
+    AND s.promise_time IS NOT NULL
+    AND s.delivery_finish >= %s
+    AND s.delivery_finish <= %s
+    GROUP BY o.hub_id, h.code
+    HAVING COUNT(*) >= 10
+    ORDER BY compliance_rate ASC
+    LIMIT 20
+    """,
+    'zones': """
+    SELECT
+        CASE
+            WHEN s.delivery_finish <= to_timestamp(s.promise_time) THEN 'on_time'
+            WHEN EXTRACT(EPOCH FROM (s.delivery_finish - to_timestamp(s.promise_time))) / 60 <= 15 THEN 'at_risk'
+            ELSE 'violated'
+        END as zone,
+        COUNT(*) as count
+    """ + DELIVERIES + """
+    GROUP BY zone
+    """,
+}
+
+
+def explain(db, query: str, params) -> tuple:
+    """Server execution time (ms) and shared buffers touched for one query."""
+    rows = db.execute_query("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params, timeout=None)
+    plan = rows[0]['QUERY PLAN'][0]
+    root = plan['Plan']
+    return plan['Execution Time'], root.get('Shared Hit Blocks', 0) + root.get('Shared Read Blocks', 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the SLA compliance report queries')
+    parser.add_argument('--days', type=int, nargs='+', default=[7, 30, 90])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    analytics = SLAAnalytics()
+    with redirect_stdout(io.StringIO()):
+        analytics.connect()
+    db = analytics.db
+
+    print(f"{'days':>5}  {'path':<12} {'exec ms':>10} {'buffers':>10} {'speedup':>8} {'io ratio':>9}")
+    for days in args.days:
+        end_date = datetime.now()
+        params = [end_date - timedelta(days=days), end_date]
+
+        separate_ms, separate_buffers = float('inf'), 0
+        single_ms, single_buffers = float('inf'), 0
+        for _ in range(args.repeat):
+            runs = [explain(db, query, params) for query in SEPARATE_QUERIES.values()]
+            if sum(ms for ms, _ in runs) < separate_ms:
+                separate_ms, separate_buffers = sum(ms for ms, _ in runs), sum(b for _, b in runs)
+
+            ms, buffers = explain(db, *analytics._compliance_report_query(*params))
+            if ms < single_ms:
+                single_ms, single_buffers = ms, buffers
+
+        print(f"{days:>5}  {'3 queries':<12} {separate_ms:>10.1f} {separate_buffers:>10}")
+        print(f"{days:>5}  {'single scan':<12} {single_ms:>10.1f} {single_buffers:>10} "
+              f"{separate_ms / single_ms:>7.1f}x {single_buffers / max(separate_buffers, 1):>8.2f}")
+
+    db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Realtime SLA benchmark: polling queries vs the in-memory tracker.
+
+Times get_realtime_sla_status with the two realtime queries (cache disabled) and with
+RealtimeSLATracker, after touching a batch of active shipments so the tracker has deltas to
+apply, and checks that both paths report the same counts. Run against a scratch database
+seeded with seed_synthetic_data.py.
+
+Usage:
+    DB_HOST=localhost DB_NAME=barq_bench python benchmarks/sla_tracker_benchmark.py --repeat 20
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database_connection import get_query_cache  # noqa: E402
+from sla_analytics import SLAAnalytics  # noqa: E402
+
+TOUCH_ACTIVE = """
+UPDATE shipments SET updated_at = NOW()
+WHERE id IN (
+    SELECT id FROM shipments
+    WHERE is_completed = false AND is_cancelled = false AND promise_time IS NOT NULL
+    ORDER BY random() LIMIT %s
+)
+"""
+
+
+def timed(func, repeat: int):
+    times = []
+    for _ in range(repeat):
+        get_query_cache().clear()
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            result = func()
+        times.append(time.perf_counter() - start)
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+    return sorted(times)[len(times) // 2], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark realtime SLA status: SQL vs tracker')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--touch', type=int, default=500, help='Active shipments updated before the tracker run')
+    args = parser.parse_args()
+
+    analytics = SLAAnalytics()
+    with redirect_stdout(io.StringIO()):
+        analytics.connect()
+    tracker = analytics.tracker
+
+    start = time.perf_counter()
+    tracker.sync(force=True)
+    print(f"✓ tracker load: {tracker.get_stats()['active_shipments']} active shipments "
+          f"({time.perf_counter() - start:.2f}s)")
+
+    analytics.db.execute_query(TOUCH_ACTIVE, [args.touch], timeout=None)
+    start = time.perf_counter()
+    tracker.poll_interval = 0
+    tracker.sync()
+    print(f"✓ delta poll after touching {args.touch} shipments ({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+    tracker.enabled = False
+    sql_seconds, sql_result = timed(analytics.get_realtime_sla_status, args.repeat)
+    tracker.enabled = True
+    tracker.poll_interval = 3600
+    tracker_seconds, tracker_result = timed(analytics.get_realtime_sla_status, args.repeat)
+
+    print(f"\n{'path':<10} {'median ms':>10}")
+    print(f"{'sql':<10} {sql_seconds * 1000:>10.2f}")
+    print(f"{'tracker':<10} {tracker_seconds * 1000:>10.3f}   {sql_seconds / tracker_seconds:.0f}x")
+
+    # Counts can differ by shipments crossing a deadline between the two runs
+    for key in ('total_active', 'total_at_risk', 'total_breached'):
+        sql_value = sql_result.get('overall', {}).get(key, 0)
+        tracker_value = tracker_result.get('overall', {}).get(key, 0)
+        marker = '✓' if sql_value == tracker_value else '≠'
+        print(f"{marker} {key}: sql={sql_value} tracker={tracker_value}")
+
+    analytics.db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Shared test fakes and fixtures.
+
+- RecordingCursor / db_with_cursor: a DatabaseConnection whose get_cursor hands out one
+  fake cursor that records every statement, for replaying refresh transactions.
+- telemetry: a fresh QueryTelemetry (every query counts as slow) installed as the
+  module-wide instance.
+- clock: a fake wall clock for the query cache.
+- wait_for: polls for a condition set by a background thread.
+"""
+
+import os
+import sys
+import time
+import types
+from contextlib import contextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database_connection  # noqa: E402
+from database_connection import DatabaseConnection, QueryTelemetry  # noqa: E402
+
+CLOCK_START = 1_700_000_000.0
+
+
+class RecordingCursor:
+    """Records every statement; fetchone returns what answer() gave for the last one."""
+
+    # Row count reported after each statement
+    rows_affected = -1
+
+    def __init__(self):
+        self.statements = []
+        self.rowcount = -1
+        self._row = None
+
+    def execute(self, query, params=None):
+        self.statements.append((query, params))
+        self.rowcount = self.rows_affected
+        self._row = self.answer(query)
+
+    def answer(self, query):
+        return None
+
+    def fetchone(self):
+        return self._row
+
+
+def db_with_cursor(cursor, database='test'):
+    db = DatabaseConnection(config={'host': 'test', 'port': 5432, 'database': database})
+
+    @contextmanager
+    def get_cursor():
+        yield cursor
+
+    db.get_cursor = get_cursor
+    return db
+
+
+def wait_for(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+class FakeClock:
+    def __init__(self, now: float = CLOCK_START):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def telemetry(monkeypatch):
+    telemetry = QueryTelemetry(slow_query_ms=0)
+    monkeypatch.setattr(database_connection, '_telemetry', telemetry)
+    return telemetry
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(database_connection, 'time', types.SimpleNamespace(
+        time=clock.time, monotonic=time.monotonic, perf_counter=time.perf_counter, sleep=time.sleep))
+    return clock
@@ -1,23 +1,57 @@
 #!/usr/bin/env python3
 """
 Robust Database Connection Handler for BarqFleet Analytics
-Provides resilient database connectivity with retry logic, circuit breaker pattern,
-and automatic fallback to demo data when production is unavailable.
+Provides resilient database connectivity with a non-blocking circuit breaker (background
+health probing), process-wide connection pooling, and automatic fallback to demo data when
+production is unavailable.
 """
 
 import os
+import re
 import sys
+import asyncio
 import json
 import time
+import hashlib
+import io
+import pickle
+import uuid
+import weakref
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+import threading
+from collections import OrderedDict, deque
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 import psycopg2
+import psycopg2.errors
 from psycopg2.extras import RealDictCursor
 import pandas as pd
 import numpy as np
 from contextlib import contextmanager
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # Optional: only needed for read_copy(engine='arrow')
+    pa = None
+    pa_csv = None
+
+try:
+    import redis
+except ImportError:  # Optional: only needed to share the query cache across processes
+    redis = None
+
+try:
+    import psycopg
+    import psycopg.errors
+    from psycopg.rows import dict_row
+    from psycopg.types.numeric import FloatLoader, NumericLoader
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # Optional: only needed for the asyncio query path (execute_query_async)
+    psycopg = None
+
+ASYNC_QUERIES_AVAILABLE = psycopg is not None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -26,57 +60,1178 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class CircuitOpenError(Exception):
+    """Raised instead of touching the database while its circuit breaker is open."""
+
+
 class CircuitBreaker:
-    """Circuit breaker implementation to prevent repeated failed connection attempts."""
-    
-    def __init__(self, failure_threshold=3, reset_timeout=60, expected_exception=Exception):
+    """
+    Thread-safe circuit breaker that never blocks the caller.
+
+    After failure_threshold consecutive failures the circuit opens and callers fail fast
+    (or use cached/demo data). A background thread then runs probe() every probe_interval
+    seconds, backing off to reset_timeout; the first successful probe closes the circuit.
+    HALF_OPEN means a probe is in flight. State transitions and the time spent in each state
+    are exported by get_metrics().
+    """
+
+    STATES = ('CLOSED', 'OPEN', 'HALF_OPEN')
+
+    def __init__(self, failure_threshold=3, reset_timeout=60, expected_exception=Exception,
+                 probe=None, probe_interval=5.0, name='database'):
         self.failure_threshold = failure_threshold
         self.reset_timeout = reset_timeout
         self.expected_exception = expected_exception
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._state = 'CLOSED'
+        self._state_since = time.monotonic()
         self.failure_count = 0
         self.last_failure_time = None
-        self.state = 'CLOSED'  # CLOSED, OPEN, HALF_OPEN
-        
+        self._prober = None
+        self._stop = threading.Event()
+
+        # Metrics
+        self._time_in_state = {state: 0.0 for state in self.STATES}
+        self._transitions = {}
+        self._probes = 0
+        self._probe_failures = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
     def __call__(self, func):
         def wrapper(*args, **kwargs):
-            if self.state == 'OPEN':
-                if self._should_attempt_reset():
-                    self.state = 'HALF_OPEN'
-                else:
-                    raise Exception(f"Circuit breaker is OPEN. Database unavailable. Next retry in {self._time_to_reset():.0f}s")
-            
+            if not self.allow_request():
+                raise CircuitOpenError(f"Circuit breaker is OPEN. {self.name} unavailable.")
+
             try:
                 result = func(*args, **kwargs)
-                self._on_success()
+                self.record_success()
                 return result
             except self.expected_exception as e:
-                self._on_failure()
+                self.record_failure()
                 raise e
-                
+
         return wrapper
-    
-    def _should_attempt_reset(self):
-        return (
-            self.last_failure_time and 
-            time.time() - self.last_failure_time >= self.reset_timeout
-        )
-    
-    def _time_to_reset(self):
-        if self.last_failure_time:
-            return self.reset_timeout - (time.time() - self.last_failure_time)
+
+    def allow_request(self) -> bool:
+        """True when the circuit is closed; never waits."""
+        if self._state == 'CLOSED':
+            return True
+        with self._lock:
+            self._rejected += 1
+        return False
+
+    def record_success(self):
+        with self._lock:
+            self.failure_count = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failure_count += 1
+            self.last_failure_time = time.time()
+            if self._state == 'CLOSED' and self.failure_count >= self.failure_threshold:
+                self._transition('OPEN')
+                logger.warning(f"Circuit breaker for {self.name} opened after {self.failure_count} failures")
+                self._start_prober()
+
+    def trip(self):
+        """Open the circuit now (e.g. after a caller has exhausted its own attempts)."""
+        with self._lock:
+            if self._state == 'CLOSED':
+                self._transition('OPEN')
+                logger.warning(f"Circuit breaker for {self.name} opened")
+                self._start_prober()
+
+    def _transition(self, state: str):
+        """Change state (caller holds the lock)."""
+        now = time.monotonic()
+        self._time_in_state[self._state] += now - self._state_since
+        key = f"{self._state}->{state}"
+        self._transitions[key] = self._transitions.get(key, 0) + 1
+        self._state = state
+        self._state_since = now
+
+    def _start_prober(self):
+        """Start the background prober (caller holds the lock)."""
+        if self.probe is None or (self._prober and self._prober.is_alive()):
+            return
+        self._prober = threading.Thread(target=self._probe_loop, name=f"circuit-probe-{self.name}", daemon=True)
+        self._prober.start()
+
+    def _probe_loop(self):
+        interval = self.probe_interval
+        while not self._stop.wait(interval):
+            with self._lock:
+                self._transition('HALF_OPEN')
+                self._probes += 1
+            try:
+                self.probe()
+            except Exception as e:
+                with self._lock:
+                    self._probe_failures += 1
+                    self._transition('OPEN')
+                interval = min(interval * 2, self.reset_timeout)
+                logger.info(f"Circuit breaker probe for {self.name} failed ({e}); next probe in {interval:.0f}s")
+                continue
+
+            with self._lock:
+                self.failure_count = 0
+                self._transition('CLOSED')
+            logger.info(f"✓ Circuit breaker for {self.name} closed after successful probe")
+            return
+
+    def stop(self):
+        """Stop the background prober."""
+        self._stop.set()
+
+    def get_metrics(self) -> Dict:
+        """Current state, transition counts, time per state and probe counters."""
+        with self._lock:
+            time_in_state = dict(self._time_in_state)
+            time_in_state[self._state] += time.monotonic() - self._state_since
+            return {
+                'name': self.name,
+                'state': self._state,
+                'state_seconds': round(time.monotonic() - self._state_since, 1),
+                'failure_count': self.failure_count,
+                'time_in_state_seconds': {state: round(seconds, 1) for state, seconds in time_in_state.items()},
+                'transitions': dict(self._transitions),
+                'probes': self._probes,
+                'probe_failures': self._probe_failures,
+                'rejected_requests': self._rejected
+            }
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the checkout timeout."""
+
+
+class QueryTimeoutError(Exception):
+    """Raised when a query exceeds its deadline and is cancelled."""
+
+    def __init__(self, message: str, fingerprint: str, timeout: float, duration: float):
+        super().__init__(message)
+        self.fingerprint = fingerprint
+        self.timeout = timeout
+        self.duration = duration
+
+
+# Extra seconds after the server-side statement_timeout before the client cancels itself
+# (covers a stalled network or an unresponsive backend)
+CLIENT_CANCEL_GRACE_SECONDS = 2.0
+
+# NUMERIC results (AVG, SUM over bigint, PERCENTILE_CONT, EXTRACT, ...) as float instead of
+# Decimal, so DataFrames get float64 columns. Queries opt out with numeric_as_float=False.
+NUMERIC_AS_FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values,
+    'NUMERIC_AS_FLOAT',
+    lambda value, cursor: float(value) if value is not None else None
+)
+
+_timed_out_queries = deque(maxlen=100)
+_timed_out_queries_lock = threading.Lock()
+
+
+def normalize_sql(query: str) -> str:
+    """Strip comments, literals and extra whitespace so equivalent queries compare equal."""
+    normalized = re.sub(r'--[^\n]*|/\*.*?\*/', ' ', query, flags=re.S)
+    normalized = re.sub(r"'(?:[^']|'')*'", '?', normalized)
+    normalized = re.sub(r'\b\d+(?:\.\d+)?\b', '?', normalized)
+    normalized = re.sub(r'%s|%\(\w+\)s', '?', normalized)
+    return re.sub(r'\s+', ' ', normalized).strip().lower()
+
+
+def fingerprint_sql(query: str) -> str:
+    """Short stable identifier of a query shape (literals and parameters ignored)."""
+    return hashlib.md5(normalize_sql(query).encode()).hexdigest()[:12]
+
+
+def _record_timed_out_query(query: str, timeout: float, duration: float, cancelled_by: str) -> str:
+    fingerprint = fingerprint_sql(query)
+    with _timed_out_queries_lock:
+        _timed_out_queries.append({
+            'fingerprint': fingerprint,
+            'query': normalize_sql(query)[:300],
+            'timeout_seconds': timeout,
+            'duration_seconds': round(duration, 3),
+            'cancelled_by': cancelled_by,
+            'timestamp': datetime.now().isoformat()
+        })
+    logger.warning(f"Query {fingerprint} cancelled by {cancelled_by} after {duration:.1f}s "
+                   f"(timeout {timeout}s)")
+    return fingerprint
+
+
+def get_timed_out_queries() -> List[Dict]:
+    """Most recent timed-out queries (newest last)."""
+    with _timed_out_queries_lock:
+        return list(_timed_out_queries)
+
+
+# Upper bounds (ms) of the query latency histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+def _find_caller() -> str:
+    """module.function of the nearest frame outside this module (the code that issued the query)."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module != __name__ and not module.startswith(('threading', 'asyncio', 'concurrent', 'contextlib')):
+            code = frame.f_code
+            return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+        frame = frame.f_back
+    return 'background'
+
+
+def _estimate_bytes(rows: List, sample_size: int = 100) -> int:
+    """Approximate result size in bytes from the text length of up to sample_size rows."""
+    if not rows:
         return 0
-    
-    def _on_success(self):
-        self.failure_count = 0
-        self.state = 'CLOSED'
-        
-    def _on_failure(self):
-        self.failure_count += 1
-        self.last_failure_time = time.time()
-        
-        if self.failure_count >= self.failure_threshold:
-            self.state = 'OPEN'
-            logger.warning(f"Circuit breaker opened after {self.failure_count} failures")
+    sample = rows[:sample_size]
+    sample_bytes = sum(
+        len(str(value)) for row in sample
+        for value in (row.values() if isinstance(row, dict) else row) if value is not None
+    )
+    return int(sample_bytes / len(sample) * len(rows))
+
+
+class QueryTelemetry:
+    """
+    Per-fingerprint query statistics and a slow-query log.
+
+    Every query issued through DatabaseConnection is recorded under its SQL fingerprint with
+    its caller, duration, row count and (estimated) bytes received. Queries slower than
+    slow_query_ms also go to the slow-query log; with explain_slow_queries, an
+    EXPLAIN (ANALYZE, BUFFERS) plan is captured for them in the background, at most once per
+    fingerprint per explain_interval seconds.
+    """
+
+    def __init__(self, slow_query_ms: float = 1000.0, explain_slow_queries: bool = False,
+                 explain_interval: float = 600.0, slow_log_size: int = 100):
+        self.slow_query_ms = slow_query_ms
+        self.explain_slow_queries = explain_slow_queries
+        self.explain_interval = explain_interval
+
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict] = {}
+        self._histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self._slow_queries = deque(maxlen=slow_log_size)
+        self._last_explained: Dict[str, float] = {}
+
+    def record(self, query: str, caller: str, duration: float, rows: int = 0, bytes_received: int = 0,
+               error: str = None, explain=None):
+        """
+        Record one execution.
+
+        Args:
+            explain: Optional callable returning the EXPLAIN (ANALYZE, BUFFERS) plan text,
+                invoked in a background thread when the query is slow
+        """
+        fingerprint = fingerprint_sql(query)
+        duration_ms = duration * 1000
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if duration_ms <= bound),
+                      len(LATENCY_BUCKETS_MS))
+        slow = duration_ms >= self.slow_query_ms
+
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                stats = self._stats[fingerprint] = {
+                    'fingerprint': fingerprint,
+                    'query': normalize_sql(query)[:300],
+                    'callers': {},
+                    'calls': 0,
+                    'errors': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'bytes': 0,
+                    'histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1)
+                }
+            stats['calls'] += 1
+            stats['errors'] += error is not None
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['rows'] += rows
+            stats['bytes'] += bytes_received
+            stats['histogram'][bucket] += 1
+            stats['callers'][caller] = stats['callers'].get(caller, 0) + 1
+            self._histogram[bucket] += 1
+
+            capture_plan = False
+            if slow:
+                entry = {
+                    'fingerprint': fingerprint,
+                    'query': normalize_sql(query)[:1000],
+                    'caller': caller,
+                    'duration_ms': round(duration_ms, 1),
+                    'rows': rows,
+                    'bytes': bytes_received,
+                    'error': error,
+                    'timestamp': datetime.now().isoformat(),
+                    'plan': None
+                }
+                self._slow_queries.append(entry)
+                now = time.monotonic()
+                if (self.explain_slow_queries and explain is not None and error is None
+                        and now - self._last_explained.get(fingerprint, -self.explain_interval)
+                        >= self.explain_interval):
+                    self._last_explained[fingerprint] = now
+                    capture_plan = True
+
+        if slow:
+            logger.warning(f"Slow query {fingerprint} from {caller}: {duration_ms:.0f}ms, {rows} rows")
+        if capture_plan:
+            threading.Thread(target=self._capture_plan, args=(entry, explain),
+                             name=f"explain-{fingerprint}", daemon=True).start()
+
+    def _capture_plan(self, entry: Dict, explain):
+        try:
+            plan = explain()
+        except Exception as e:
+            plan = f"EXPLAIN failed: {e}"
+        with self._lock:
+            entry['plan'] = plan
+
+    def get_query_stats(self, limit: int = 20, order_by: str = 'total_ms') -> List[Dict]:
+        """Fingerprints ranked by total time (or calls, max_ms, rows, bytes), with mean latency."""
+        with self._lock:
+            stats = [dict(item, callers=dict(item['callers']), histogram=list(item['histogram']))
+                     for item in self._stats.values()]
+        for item in stats:
+            item['mean_ms'] = round(item['total_ms'] / item['calls'], 2) if item['calls'] else 0.0
+            item['total_ms'] = round(item['total_ms'], 1)
+            item['max_ms'] = round(item['max_ms'], 1)
+        return sorted(stats, key=lambda item: item[order_by], reverse=True)[:limit]
+
+    def get_histogram(self) -> Dict[str, int]:
+        """Latency histogram over all queries, keyed by bucket upper bound."""
+        labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ['gt_30000ms']
+        with self._lock:
+            return dict(zip(labels, self._histogram))
+
+    def get_slow_queries(self) -> List[Dict]:
+        """Slow-query log, newest last."""
+        with self._lock:
+            return [dict(entry) for entry in self._slow_queries]
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_query_telemetry() -> QueryTelemetry:
+    """
+    Get the process-wide query telemetry.
+
+    Configured from DB_SLOW_QUERY_MS (default 1000) and DB_SLOW_QUERY_EXPLAIN=1 (capture
+    EXPLAIN (ANALYZE, BUFFERS) for slow queries; this re-runs the query).
+    """
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = QueryTelemetry(
+                slow_query_ms=float(os.getenv('DB_SLOW_QUERY_MS', 1000)),
+                explain_slow_queries=os.getenv('DB_SLOW_QUERY_EXPLAIN', '').lower() in ('1', 'true', 'yes')
+            )
+        return _telemetry
+
+
+class PreparedStatement(str):
+    """
+    SQL text registered under a server-side statement name.
+
+    It is the plain query string everywhere else (cache keys, telemetry, fallback data,
+    streaming and COPY); execute_query and query_dataframe run it with EXECUTE.
+    """
+
+    def __new__(cls, name: str, sql: str):
+        statement = super().__new__(cls, sql)
+        statement.name = name
+        return statement
+
+
+_PLACEHOLDER = re.compile(r'%([s%])')
+
+
+class StatementRegistry:
+    """
+    Recurring analytics queries, prepared server-side once per pooled connection.
+
+    A query re-sent as text is parsed, analyzed and planned on every call. A registered
+    statement is PREPAREd the first time it runs on a connection and EXECUTEd with
+    parameters after that; once PostgreSQL settles on a generic plan (after five
+    executions on a connection) planning is skipped entirely. Every sample_every
+    executions the planning time of the text query and of EXECUTE is sampled with
+    EXPLAIN (SUMMARY) to report the savings per statement.
+    """
+
+    def __init__(self, enabled: bool = True, sample_every: int = 50):
+        """
+        Args:
+            enabled: Prepare registered statements; False runs them as plain text (e.g.
+                behind PgBouncer in transaction pooling mode)
+            sample_every: Executions between planning-time samples (0 disables sampling)
+        """
+        self.enabled = enabled
+        self.sample_every = sample_every
+        self._lock = threading.Lock()
+        self._statements: Dict[str, PreparedStatement] = {}
+        self._stats: Dict[str, Dict] = {}
+        self._prepared = weakref.WeakKeyDictionary()  # connection -> prepared statement names
+
+    def register(self, name: str, sql: str) -> PreparedStatement:
+        """
+        Declare a query under a statement name; registering the same SQL again is a lookup.
+
+        The SQL uses psycopg2 placeholders (%s, %%); they are rewritten to $1..$n for PREPARE.
+
+        Raises:
+            ValueError: Invalid name, or the name is already bound to different SQL
+        """
+        if not re.fullmatch(r'[a-z_][a-z0-9_]*', name):
+            raise ValueError(f"Invalid statement name: {name}")
+        with self._lock:
+            statement = self._statements.get(name)
+            if statement is None:
+                statement = PreparedStatement(name, sql)
+                self._statements[name] = statement
+                self._stats[name] = {
+                    'executions': 0,
+                    'preparations': 0,
+                    'planning_samples': 0,
+                    'text_planning_ms': 0.0,
+                    'prepared_planning_ms': 0.0
+                }
+            elif statement != sql:
+                raise ValueError(f"Statement {name} is already registered with different SQL")
+        return statement
+
+    @staticmethod
+    def _server_sql(statement: PreparedStatement) -> str:
+        counter = iter(range(1, statement.count('%s') + 1))
+        return _PLACEHOLDER.sub(lambda m: '%' if m.group(1) == '%' else f"${next(counter)}", statement)
+
+    @staticmethod
+    def _execute_sql(statement: PreparedStatement, params) -> str:
+        if not params:
+            return f"EXECUTE {statement.name}"
+        return f"EXECUTE {statement.name} ({', '.join(['%s'] * len(params))})"
+
+    def _ensure_prepared(self, cursor, statement: PreparedStatement):
+        conn = cursor.connection
+        with self._lock:
+            names = self._prepared.setdefault(conn, set())
+            if statement.name in names:
+                return
+        cursor.execute(f"PREPARE {statement.name} AS {self._server_sql(statement)}")
+        # PREPARE is not transactional: the statement outlives a rollback on this connection
+        with self._lock:
+            names.add(statement.name)
+            self._stats[statement.name]['preparations'] += 1
+
+    def execute(self, cursor, statement: PreparedStatement, params=None) -> bool:
+        """
+        Run a registered statement on a psycopg2 cursor, preparing it on the connection first.
+
+        Returns:
+            True when a planning-time sample is due for this execution
+        """
+        self._ensure_prepared(cursor, statement)
+        try:
+            cursor.execute(self._execute_sql(statement, params), params or [])
+        except psycopg2.errors.InvalidSqlStatementName:
+            # Deallocated behind our back (DISCARD ALL, server-side pooler): re-prepare next time
+            with self._lock:
+                self._prepared.get(cursor.connection, set()).discard(statement.name)
+            raise
+        return self.count_execution(statement)
+
+    def count_execution(self, statement: PreparedStatement) -> bool:
+        """Count one prepared execution; True when a planning-time sample is due."""
+        with self._lock:
+            stats = self._stats[statement.name]
+            stats['executions'] += 1
+            return bool(self.sample_every) and stats['executions'] % self.sample_every == 0
+
+    def sample_planning(self, cursor, statement: PreparedStatement, params=None):
+        """Measure planning time of the text query and of EXECUTE on one connection."""
+        text_ms = self._planning_ms(cursor, f"EXPLAIN (SUMMARY ON, FORMAT JSON) {statement}", params)
+        self._ensure_prepared(cursor, statement)
+        prepared_ms = self._planning_ms(
+            cursor, f"EXPLAIN (SUMMARY ON, FORMAT JSON) {self._execute_sql(statement, params)}", params
+        )
+        with self._lock:
+            stats = self._stats[statement.name]
+            stats['planning_samples'] += 1
+            stats['text_planning_ms'] += text_ms
+            stats['prepared_planning_ms'] += prepared_ms
+
+    @staticmethod
+    def _planning_ms(cursor, explain: str, params) -> float:
+        cursor.execute(explain, params or [])
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return float(plan[0].get('Planning Time', 0.0))
+
+    def get_stats(self) -> List[Dict]:
+        """Per-statement executions and estimated planning time saved, largest savings first."""
+        with self._lock:
+            items = [(name, self._statements[name], dict(stats)) for name, stats in self._stats.items()]
+        report = []
+        for name, statement, stats in items:
+            samples = stats.pop('planning_samples')
+            text_ms = stats.pop('text_planning_ms') / samples if samples else None
+            prepared_ms = stats.pop('prepared_planning_ms') / samples if samples else None
+            saved_ms = max(text_ms - prepared_ms, 0.0) * stats['executions'] if samples else None
+            report.append(dict(
+                {'name': name, 'fingerprint': fingerprint_sql(statement)},
+                **stats,
+                planning_samples=samples,
+                avg_text_planning_ms=round(text_ms, 3) if samples else None,
+                avg_prepared_planning_ms=round(prepared_ms, 3) if samples else None,
+                est_planning_saved_ms=round(saved_ms, 1) if samples else None
+            ))
+        return sorted(report, key=lambda item: item['est_planning_saved_ms'] or 0.0, reverse=True)
+
+
+_statement_registry = None
+_statement_registry_lock = threading.Lock()
+
+
+def get_statement_registry() -> StatementRegistry:
+    """
+    Get the process-wide statement registry.
+
+    Configured from DB_PREPARED_STATEMENTS (default on; set to 0 behind a transaction-mode
+    pooler) and DB_PREPARED_SAMPLE_EVERY (default 50).
+    """
+    global _statement_registry
+    with _statement_registry_lock:
+        if _statement_registry is None:
+            _statement_registry = StatementRegistry(
+                enabled=os.getenv('DB_PREPARED_STATEMENTS', '1').lower() not in ('0', 'false', 'no'),
+                sample_every=int(os.getenv('DB_PREPARED_SAMPLE_EVERY', 50))
+            )
+        return _statement_registry
+
+
+def register_statement(name: str, sql: str) -> PreparedStatement:
+    """Declare an analytics query in the process-wide statement registry."""
+    return get_statement_registry().register(name, sql)
+
+
+class ConnectionPool:
+    """
+    Thread-safe PostgreSQL connection pool.
+
+    Connections are created lazily up to max_size and reused LIFO. A borrowed connection
+    that has been idle longer than health_check_interval is pinged first; dead connections
+    are replaced transparently.
+    """
+
+    def __init__(self, config: Dict[str, Any], min_size: int = 1, max_size: int = 10,
+                 checkout_timeout: float = 10.0, health_check_interval: float = 30.0):
+        """
+        Initialize connection pool.
+
+        Args:
+            config: psycopg2 connection parameters
+            min_size: Connections opened eagerly and kept when idle
+            max_size: Maximum open connections
+            checkout_timeout: Seconds to wait for a free connection before PoolTimeoutError
+            health_check_interval: Idle seconds after which a connection is pinged on borrow
+        """
+        self.config = config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+
+        self._condition = threading.Condition()
+        self._idle = deque()  # (connection, returned_at)
+        self._size = 0
+        self._closed = False
+
+        # Metrics
+        self._checkouts = 0
+        self._timeouts = 0
+        self._health_check_failures = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._peak_in_use = 0
+
+        for _ in range(min_size):
+            self._idle.append((self._create_connection(), time.monotonic()))
+            self._size += 1
+
+    def _create_connection(self):
+        conn = psycopg2.connect(**self.config)
+        psycopg2.extensions.register_type(NUMERIC_AS_FLOAT, conn)
+        return conn
+
+    def _is_healthy(self, conn, idle_seconds: float) -> bool:
+        """Check a connection before handing it out."""
+        if conn.closed:
+            return False
+        if idle_seconds < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, timeout: float = None):
+        """
+        Borrow a connection, waiting up to timeout (default: checkout_timeout) seconds.
+
+        Raises:
+            PoolTimeoutError: No connection became available in time
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise Exception("Connection pool is closed")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1  # reserve the slot, connect outside the lock
+                    conn, returned_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available after {timeout:.1f}s "
+                        f"(pool size {self.max_size})"
+                    )
+                self._condition.wait(remaining)
+
+        try:
+            if conn is None:
+                conn = self._create_connection()
+            elif not self._is_healthy(conn, time.monotonic() - returned_at):
+                with self._condition:
+                    self._health_check_failures += 1
+                logger.warning("Discarding unhealthy pooled connection")
+                self._close_quietly(conn)
+                conn = self._create_connection()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        wait = time.monotonic() - start
+        with self._condition:
+            self._checkouts += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._peak_in_use = max(self._peak_in_use, self._size - len(self._idle))
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a borrowed connection; broken or discarded connections are closed."""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._condition:
+            if discard or conn.closed or self._closed:
+                self._size -= 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """Borrow a connection for the duration of a with-block."""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            # Also runs on GeneratorExit when a streaming consumer stops early;
+            # broken connections are detected and discarded by putconn
+            self.putconn(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def closeall(self):
+        """Close idle connections; borrowed ones are closed when returned."""
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                self._close_quietly(conn)
+            self._condition.notify_all()
+
+    def get_metrics(self) -> Dict:
+        """Pool sizing, utilization and checkout wait-time metrics."""
+        with self._condition:
+            in_use = self._size - len(self._idle)
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'open_connections': self._size,
+                'idle_connections': len(self._idle),
+                'in_use_connections': in_use,
+                'peak_in_use_connections': self._peak_in_use,
+                'utilization_pct': round(in_use / self.max_size * 100, 1),
+                'checkouts': self._checkouts,
+                'checkout_timeouts': self._timeouts,
+                'health_check_failures': self._health_check_failures,
+                'avg_wait_ms': round(self._total_wait / self._checkouts * 1000, 2) if self._checkouts else 0.0,
+                'max_wait_ms': round(self._max_wait * 1000, 2)
+            }
+
+
+# Process-wide pools, one per distinct connection configuration
+_pools: Dict[Tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(config: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((key, str(value)) for key, value in config.items()))
+
+
+def get_connection_pool(config: Dict[str, Any]) -> ConnectionPool:
+    """
+    Get (or create) the shared pool for a connection configuration.
+
+    Sizing is read from DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE and DB_POOL_CHECKOUT_TIMEOUT.
+    """
+    key = _pool_key(config)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(
+                config,
+                min_size=int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+                max_size=int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                checkout_timeout=float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', 10.0))
+            )
+            _pools[key] = pool
+            logger.info(f"Created connection pool for {config.get('host')}/{config.get('database')} "
+                        f"(max {pool.max_size})")
+        return pool
+
+
+def get_pool_metrics() -> List[Dict]:
+    """Metrics for every pool in this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [
+        dict(pool.get_metrics(), host=pool.config.get('host'), database=pool.config.get('database'))
+        for pool in pools
+    ]
+
+
+# Process-wide circuit breakers, one per distinct connection configuration
+_breakers: Dict[Tuple, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def _probe_database(config: Dict[str, Any]):
+    """Open a fresh connection and run SELECT 1 (raises if the database is unreachable)."""
+    conn = psycopg2.connect(**config)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    finally:
+        conn.close()
+
+
+def get_circuit_breaker(config: Dict[str, Any]) -> CircuitBreaker:
+    """
+    Get (or create) the shared circuit breaker for a connection configuration.
+
+    Tuned by DB_BREAKER_FAILURE_THRESHOLD, DB_BREAKER_PROBE_INTERVAL and
+    DB_BREAKER_MAX_PROBE_INTERVAL (seconds).
+    """
+    key = _pool_key(config)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                failure_threshold=int(os.getenv('DB_BREAKER_FAILURE_THRESHOLD', 3)),
+                reset_timeout=float(os.getenv('DB_BREAKER_MAX_PROBE_INTERVAL', 120)),
+                expected_exception=(psycopg2.OperationalError, psycopg2.InterfaceError),
+                probe=lambda: _probe_database(config),
+                probe_interval=float(os.getenv('DB_BREAKER_PROBE_INTERVAL', 5)),
+                name=f"{config.get('host')}/{config.get('database')}"
+            )
+            _breakers[key] = breaker
+        return breaker
+
+
+def get_circuit_breaker_metrics() -> List[Dict]:
+    """Metrics for every circuit breaker in this process."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.get_metrics() for breaker in breakers]
+
+
+def close_all_pools():
+    """Close every pool in this process (e.g. on worker shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.closeall()
+
+
+# Query classes for the result cache: seconds an entry is fresh. An expired entry is served
+# for another TTL while it is refreshed in the background.
+QUERY_CACHE_TTLS = {
+    'realtime': 5.0,      # active shipments, at-risk deliveries
+    'recent': 60.0,       # windows ending now (last 7/30 days)
+    'historical': 900.0,  # windows ending at CURRENT_DATE (90-day history)
+}
+
+# Classes whose windows move at midnight: their keys include today's date, so yesterday's
+# window is never served (not even stale) once the date changes
+QUERY_CACHE_DATED_CLASSES = frozenset({'historical'})
+
+
+class QueryCache:
+    """
+    Thread-safe cache of query results with per-class TTLs and stale-while-revalidate.
+
+    Keys combine whitespace-normalized SQL, the parameters and the database. Datetime
+    parameters are truncated to the class TTL in the key, so "last N days up to now()"
+    queries issued within one TTL window share an entry; keys of the classes in
+    QUERY_CACHE_DATED_CLASSES also include today's date, for queries relative to
+    CURRENT_DATE. Least recently used entries are
+    evicted beyond max_entries. With a Redis URL, entries are also shared across worker
+    processes (the local cache stays in front of Redis).
+    """
+
+    def __init__(self, ttls: Dict[str, float] = None, max_entries: int = 512, redis_url: str = None):
+        """
+        Initialize query cache.
+
+        Args:
+            ttls: Query class -> fresh seconds (default: QUERY_CACHE_TTLS)
+            max_entries: Maximum entries kept in this process
+            redis_url: Optional Redis URL for sharing entries across processes (needs redis)
+        """
+        self.ttls = dict(QUERY_CACHE_TTLS, **(ttls or {}))
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._refreshing = set()
+
+        self._redis = None
+        if redis_url:
+            if redis is None:
+                logger.warning("QUERY_CACHE_REDIS_URL is set but redis is not installed; cache is per-process")
+            else:
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+
+        # Metrics
+        self._stats = {cache_class: {'hits': 0, 'stale_hits': 0, 'misses': 0} for cache_class in self.ttls}
+        self._refreshes = 0
+        self._refresh_failures = 0
+        self._evictions = 0
+
+    def make_key(self, cache_class: str, query: str, params=None, *extra) -> str:
+        """Cache key for a query, its parameters and any extra discriminators."""
+        ttl = self.ttls[cache_class]
+        key_params = []
+        for value in params or []:
+            if isinstance(value, datetime):
+                key_params.append(f"dt:{int(value.timestamp() // ttl)}")
+            else:
+                key_params.append(repr(value))
+        if cache_class in QUERY_CACHE_DATED_CLASSES:
+            key_params.append(f"date:{date.fromtimestamp(time.time()).isoformat()}")
+        raw = '\x1f'.join([cache_class, re.sub(r'\s+', ' ', query).strip(), *key_params, *map(repr, extra)])
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def get_or_load(self, key: str, cache_class: str, loader):
+        """
+        Return the cached value for key, calling loader() on a miss.
+
+        A stale entry (older than the TTL but within the stale window) is returned at once
+        and refreshed by one background thread.
+        """
+        value, state = self._lookup(key, cache_class)
+        if state == 'stale' and self._begin_refresh(key):
+            def refresh():
+                try:
+                    self._end_refresh(key, cache_class, loader())
+                except Exception as e:
+                    self._end_refresh(key, cache_class, error=e)
+
+            threading.Thread(target=refresh, name=f"querycache-refresh-{key[:8]}", daemon=True).start()
+        if state is not None:
+            return value
+
+        value = loader()
+        self._put(key, cache_class, value)
+        return value
+
+    async def get_or_load_async(self, key: str, cache_class: str, loader):
+        """Asyncio variant of get_or_load; loader is a coroutine function."""
+        value, state = self._lookup(key, cache_class)
+        if state == 'stale' and self._begin_refresh(key):
+            async def refresh():
+                try:
+                    self._end_refresh(key, cache_class, await loader())
+                except Exception as e:
+                    self._end_refresh(key, cache_class, error=e)
+
+            asyncio.ensure_future(refresh())
+        if state is not None:
+            return value
+
+        value = await loader()
+        self._put(key, cache_class, value)
+        return value
+
+    def peek(self, key: str):
+        """The cached value for key regardless of age, or None (used while the database is down)."""
+        entry = self._get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def _lookup(self, key: str, cache_class: str) -> Tuple[Any, Optional[str]]:
+        """(value, 'fresh' or 'stale') for a usable entry, else (None, None); counts the lookup."""
+        ttl = self.ttls[cache_class]
+        entry = self._get_entry(key)
+        state = None
+        if entry is not None:
+            age = time.time() - entry[1]
+            if age < ttl:
+                state = 'fresh'
+            elif age < 2 * ttl:
+                state = 'stale'
+
+        counter = {'fresh': 'hits', 'stale': 'stale_hits', None: 'misses'}[state]
+        with self._lock:
+            self._stats[cache_class][counter] += 1
+        return (entry[0], state) if state else (None, None)
+
+    def _get_entry(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        if self._redis is not None:
+            try:
+                payload = self._redis.get(f"querycache:{key}")
+            except Exception as e:
+                logger.debug(f"Query cache Redis read failed: {e}")
+                return None
+            if payload is not None:
+                entry = pickle.loads(payload)
+                self._store_local(key, entry)
+                return entry
+        return None
+
+    def _put(self, key: str, cache_class: str, value):
+        entry = (value, time.time())
+        self._store_local(key, entry)
+        if self._redis is not None:
+            try:
+                self._redis.set(f"querycache:{key}", pickle.dumps(entry),
+                                ex=max(1, int(2 * self.ttls[cache_class])))
+            except Exception as e:
+                logger.debug(f"Query cache Redis write failed: {e}")
+
+    def _store_local(self, key: str, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _begin_refresh(self, key: str) -> bool:
+        """Claim the background refresh of a stale key (only one refresh runs per key)."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _end_refresh(self, key: str, cache_class: str, value=None, error: Exception = None):
+        if error is None:
+            self._put(key, cache_class, value)
+        else:
+            logger.warning(f"Background query cache refresh failed: {error}")
+        with self._lock:
+            self._refreshing.discard(key)
+            if error is None:
+                self._refreshes += 1
+            else:
+                self._refresh_failures += 1
+
+    def clear(self):
+        """Drop all entries held by this process."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_metrics(self) -> Dict:
+        """Entry count, hit rates per query class, refresh and eviction counters."""
+        with self._lock:
+            classes = {}
+            for cache_class, stats in self._stats.items():
+                lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+                classes[cache_class] = dict(
+                    stats,
+                    ttl_seconds=self.ttls[cache_class],
+                    hit_rate=round((stats['hits'] + stats['stale_hits']) / lookups, 3) if lookups else 0.0
+                )
+            hits = sum(stats['hits'] + stats['stale_hits'] for stats in self._stats.values())
+            lookups = hits + sum(stats['misses'] for stats in self._stats.values())
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'shared': self._redis is not None,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+                'refreshes': self._refreshes,
+                'refresh_failures': self._refresh_failures,
+                'evictions': self._evictions,
+                'classes': classes
+            }
+
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryCache:
+    """
+    Get the process-wide query cache.
+
+    Configured from QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_REDIS_URL and
+    QUERY_CACHE_TTL_<CLASS> (e.g. QUERY_CACHE_TTL_REALTIME=10).
+    """
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            ttls = {
+                cache_class: float(os.getenv(f"QUERY_CACHE_TTL_{cache_class.upper()}", ttl))
+                for cache_class, ttl in QUERY_CACHE_TTLS.items()
+            }
+            _query_cache = QueryCache(
+                ttls=ttls,
+                max_entries=int(os.getenv('QUERY_CACHE_MAX_ENTRIES', 512)),
+                redis_url=os.getenv('QUERY_CACHE_REDIS_URL')
+            )
+        return _query_cache
+
+
+# Event loop (on its own thread) that owns the asyncio connection pools
+_db_loop = None
+_db_loop_lock = threading.Lock()
+_async_pools: Dict[Tuple, 'asyncio.Future'] = {}
+
+
+def get_db_event_loop() -> asyncio.AbstractEventLoop:
+    """Get (or start) the process-wide event loop used by the asyncio query path."""
+    global _db_loop
+    with _db_loop_lock:
+        if _db_loop is None:
+            _db_loop = asyncio.new_event_loop()
+            threading.Thread(target=_db_loop.run_forever, name='db-event-loop', daemon=True).start()
+        return _db_loop
+
+
+def run_async(coro, timeout: float = None):
+    """
+    Run a coroutine on the database event loop and wait for its result.
+
+    This is how synchronous code (Flask handlers, CLI) calls the async analyzer methods.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_db_event_loop()).result(timeout)
+
+
+async def _configure_async_connection(conn):
+    conn.adapters.register_loader('numeric', FloatLoader)
+
+
+async def _open_async_pool(config: Dict[str, Any]):
+    kwargs = dict(config)
+    if 'database' in kwargs:
+        kwargs['dbname'] = kwargs.pop('database')
+    pool = AsyncConnectionPool(
+        kwargs=kwargs,
+        min_size=int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+        max_size=int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        timeout=float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', 10.0)),
+        configure=_configure_async_connection,
+        open=False
+    )
+    await pool.open(wait=True, timeout=float(config.get('connect_timeout', 10)))
+    logger.info(f"Created async connection pool for {config.get('host')}/{config.get('database')} "
+                f"(max {pool.max_size})")
+    return pool
+
+
+async def get_async_connection_pool(config: Dict[str, Any]):
+    """
+    Get (or create) the shared psycopg 3 async pool for a connection configuration.
+
+    Pools belong to the database event loop, so this must be awaited on it (see run_async).
+    Sized by the same DB_POOL_* variables as the synchronous pool.
+    """
+    if psycopg is None:
+        raise ImportError("psycopg 3 with psycopg_pool is required for the asyncio query path")
+    if asyncio.get_running_loop() is not _db_loop:
+        raise RuntimeError("Async queries must run on the database event loop; use run_async()")
+
+    # Only touched from the event loop thread, so no lock is needed
+    key = _pool_key(config)
+    opening = _async_pools.get(key)
+    if opening is None:
+        opening = _async_pools[key] = asyncio.ensure_future(_open_async_pool(config))
+    try:
+        return await asyncio.shield(opening)
+    except Exception:
+        if _async_pools.get(key) is opening:
+            del _async_pools[key]
+        raise
+
+
+def _arrow_type(dtype: str):
+    """pyarrow type for a pandas dtype name used in read_copy(dtypes=...)."""
+    if dtype == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    if dtype in ('boolean', 'bool'):
+        return pa.bool_()
+    # Nullable pandas integers ('Int64') map to the plain Arrow type, which allows nulls
+    return pa.type_for_alias(str(dtype).lower())
 
 
 class DatabaseConnection:
@@ -92,14 +1247,12 @@ class DatabaseConnection:
         """
         self.config = config or self._get_default_config()
         self.enable_fallback = enable_fallback
-        self.conn = None
+        self.pool = None
+        self.query_cache = get_query_cache()
+        self.statements = get_statement_registry()
         self.is_fallback_mode = False
-        self.connection_pool = {}
-        self.circuit_breaker = CircuitBreaker(
-            failure_threshold=3,
-            reset_timeout=120,  # 2 minutes
-            expected_exception=(psycopg2.Error, psycopg2.OperationalError)
-        )
+        # Shared per database: one prober, and every analyzer sees the same state
+        self.circuit_breaker = get_circuit_breaker(self.config)
         
         # Demo data for fallback
         self.demo_data = {}
@@ -119,54 +1272,88 @@ class DatabaseConnection:
     
     def connect(self, retry_attempts: int = 3, base_delay: float = 2.0) -> bool:
         """
-        Establish database connection with retry logic and exponential backoff.
-        
+        Establish database connection without blocking the caller.
+
+        Attempts are made back to back, never with a sleep in between. When they fail (or the
+        circuit breaker is already open), this returns at once: fallback mode if enabled,
+        otherwise the error. The circuit breaker's background prober does the waiting and
+        closes the circuit once the database answers again.
+
         Args:
-            retry_attempts: Number of retry attempts (default: 3)
-            base_delay: Base delay for exponential backoff in seconds (default: 2.0)
-            
+            retry_attempts: Immediate connection attempts (default: 3)
+            base_delay: Unused; kept for compatibility (backoff now happens in the prober)
+
         Returns:
             bool: True if connected to production, False if using fallback
+
+        Raises:
+            CircuitOpenError: The circuit is open and fallback is disabled
         """
-        # Check circuit breaker state
-        if self.circuit_breaker.state == 'OPEN':
-            if self.circuit_breaker._should_attempt_reset():
-                self.circuit_breaker.state = 'HALF_OPEN'
-                logger.info("Circuit breaker attempting reset...")
-            else:
-                logger.warning(f"Circuit breaker is OPEN. Next retry in {self.circuit_breaker._time_to_reset():.0f}s")
-                if self.enable_fallback:
-                    self._activate_fallback_mode()
-                    return False
-                else:
-                    raise Exception(f"Circuit breaker is OPEN. Database unavailable.")
-        
+        if not self.circuit_breaker.allow_request():
+            logger.warning("Circuit breaker is OPEN; database unavailable (probing in background)")
+            if self.enable_fallback:
+                self._activate_fallback_mode()
+                return False
+            raise CircuitOpenError("Circuit breaker is OPEN. Database unavailable.")
+
+        last_error = None
         for attempt in range(retry_attempts):
             try:
-                self.conn = psycopg2.connect(**self.config)
+                # Shared pool for this config; borrowing once verifies connectivity
+                pool = get_connection_pool(self.config)
+                pool.putconn(pool.getconn())
+                self.pool = pool
                 self.is_fallback_mode = False
-                self.circuit_breaker._on_success()
+                self.circuit_breaker.record_success()
                 logger.info("✓ Connected to BarqFleet production database successfully")
                 return True
-                
+
             except (psycopg2.Error, psycopg2.OperationalError) as e:
-                self.circuit_breaker._on_failure()
-                delay = base_delay * (2 ** attempt)  # Exponential backoff
+                last_error = e
+                self.circuit_breaker.record_failure()
                 logger.warning(f"Database connection attempt {attempt + 1}/{retry_attempts} failed: {e}")
-                
-                if attempt < retry_attempts - 1:
-                    logger.info(f"Retrying in {delay:.1f} seconds...")
-                    time.sleep(delay)
-                else:
-                    logger.error("All database connection attempts failed")
-                    if self.enable_fallback:
-                        self._activate_fallback_mode()
-                        return False
-                    else:
-                        raise e
-        
-        return False
-    
+                if not self.circuit_breaker.allow_request():
+                    break
+
+        logger.error("All database connection attempts failed")
+        self.circuit_breaker.trip()
+        if self.enable_fallback:
+            self._activate_fallback_mode()
+            return False
+        raise last_error
+
+    def _check_circuit(self) -> bool:
+        """
+        True if the database may be queried.
+
+        Leaves fallback mode once the breaker has closed again (the prober saw the database
+        recover).
+        """
+        if self.is_fallback_mode and self.circuit_breaker.state == 'CLOSED':
+            try:
+                self.connect(retry_attempts=1)
+            except Exception:
+                pass
+        return not self.is_fallback_mode and self.circuit_breaker.allow_request()
+
+    def _while_open(self, query: str, params: List, cached=None):
+        """Result for a query while the circuit is open: last cached value, demo data, or error."""
+        if cached is not None:
+            return cached
+        if self.enable_fallback:
+            return self._execute_fallback_query(query, params)
+        raise CircuitOpenError("Circuit breaker is OPEN. Database unavailable.")
+
+    def _guarded(self, func, *args):
+        """Call func, feeding connection-level failures and successes to the circuit breaker."""
+        try:
+            result = func(*args)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.circuit_breaker.record_failure()
+            raise
+        self.circuit_breaker.record_success()
+        return result
+
     def _activate_fallback_mode(self):
         """Activate fallback mode with demo data."""
         self.is_fallback_mode = True
@@ -174,10 +1361,10 @@ class DatabaseConnection:
         logger.info("Using realistic Saudi Arabian fleet data for analytics")
         
     def disconnect(self):
-        """Close database connection."""
-        if self.conn and not self.is_fallback_mode:
-            self.conn.close()
-            logger.info("✓ Database connection closed")
+        """Release the shared pool (its connections stay open for other users)."""
+        if self.pool and not self.is_fallback_mode:
+            self.pool = None
+            logger.info("✓ Database connection released")
         
     @contextmanager
     def get_cursor(self):
@@ -187,54 +1374,495 @@ class DatabaseConnection:
             yield MockCursor(self.demo_data)
             return
             
-        if not self.conn:
+        if not self.pool:
             raise Exception("Database connection not established")
-            
-        cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-        try:
-            yield cursor
-            self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Database transaction failed: {e}")
-            raise e
-        finally:
-            cursor.close()
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                yield cursor
+                conn.commit()
+            except Exception as e:
+                if not conn.closed:
+                    conn.rollback()
+                logger.error(f"Database transaction failed: {e}")
+                raise e
+            finally:
+                cursor.close()
     
-    def execute_query(self, query: str, params: List = None, timeout: float = 30.0) -> List[Dict]:
+    def execute_query(self, query: str, params: List = None, timeout: float = 30.0,
+                      numeric_as_float: bool = True, cache: str = None) -> List[Dict]:
         """
-        Execute query with timeout and error handling.
-        
+        Execute query with timeout, error handling and optional result caching.
+
+        The deadline is enforced by the server (SET LOCAL statement_timeout) and, as a
+        backstop, by cancelling the query from the client shortly after.
+
         Args:
-            query: SQL query to execute
+            query: SQL query to execute, or a registered statement (see register_statement),
+                which runs prepared
             params: Query parameters
-            timeout: Query timeout in seconds
-            
+            timeout: Query timeout in seconds (None or 0 disables it)
+            numeric_as_float: Return NUMERIC as float; pass False to keep exact Decimal
+                values (e.g. money columns)
+            cache: Query class for the result cache ('realtime', 'recent', 'historical');
+                None bypasses it. Only for read-only queries
+
         Returns:
             List of dictionaries with query results
+
+        Raises:
+            QueryTimeoutError: The query exceeded its timeout and was cancelled
         """
-        if self.is_fallback_mode:
-            return self._execute_fallback_query(query, params)
-            
+        key = self.query_cache.make_key(cache, query, params, 'rows', numeric_as_float,
+                                        self._cache_scope()) if cache else None
+
+        if not self._check_circuit():
+            if self.is_fallback_mode:
+                return self._execute_fallback_query(query, params)
+            cached = self.query_cache.peek(key) if cache else None
+            return [dict(row) for row in self._while_open(query, params, cached)]
+
+        if cache:
+            rows = self.query_cache.get_or_load(
+                key, cache, lambda: self._guarded(self._execute_query, query, params, timeout, numeric_as_float)
+            )
+            return [dict(row) for row in rows]
+
+        return self._guarded(self._execute_query, query, params, timeout, numeric_as_float)
+
+    def _cache_scope(self) -> Tuple:
+        """Database identity for cache keys, so entries from different databases never mix."""
+        return (self.config.get('host'), self.config.get('port'), self.config.get('database'))
+
+    def execute_in_transaction(self, cursor, query: str, params=None) -> int:
+        """
+        Execute one statement on a get_cursor() cursor, recorded in the query telemetry.
+
+        For multi-statement transactions (row locks, ON COMMIT DROP temp tables) that cannot
+        go through execute_query. Results stay on the cursor (fetchone / fetchall). Slow
+        statements reach the slow-query log, but no plan is captured: a separate connection
+        would not see the transaction's temp tables and would wait on its locks.
+
+        Args:
+            cursor: Cursor from get_cursor()
+            query: SQL statement
+            params: Query parameters (None leaves % in the SQL uninterpreted)
+
+        Returns:
+            cursor.rowcount
+        """
+        with self._instrumented(query, params, explain=False) as stats:
+            cursor.execute(query, params)
+            stats['rows'] = max(cursor.rowcount, 0)
+        return cursor.rowcount
+
+    @contextmanager
+    def _instrumented(self, query: str, params: List = None, explain: bool = True):
+        """
+        Time one query and record it in the query telemetry, failures included.
+
+        The with-block fills in 'rows' and 'bytes' on the yielded dict. This is the single
+        instrumented execution path: every query the analyzers issue passes through it.
+        """
+        stats = {'rows': 0, 'bytes': 0}
+        caller = _find_caller()
+        start = time.monotonic()
+        try:
+            yield stats
+        except Exception as e:
+            get_query_telemetry().record(query, caller, time.monotonic() - start, stats['rows'],
+                                         stats['bytes'], error=type(e).__name__)
+            raise
+        get_query_telemetry().record(query, caller, time.monotonic() - start, stats['rows'], stats['bytes'],
+                                     explain=(lambda: self._explain(query, params)) if explain else None)
+
+    def _explain(self, query: str, params: List = None) -> str:
+        """EXPLAIN (ANALYZE, BUFFERS) plan of a SELECT; re-runs the query, then rolls back."""
+        if not query.strip().upper().startswith(('SELECT', 'WITH')) or not self.pool:
+            return "Not captured: only SELECT queries are explained"
+        with self.pool.connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SET LOCAL statement_timeout = %s", [60000])
+                    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {query}", params or [])
+                    return '\n'.join(row[0] for row in cursor.fetchall())
+            finally:
+                conn.rollback()
+
+    def _sample_planning(self, statement: PreparedStatement, params: List = None):
+        """Sample text vs EXECUTE planning time of a registered statement in the background."""
+        def sample():
+            try:
+                with self.pool.connection() as conn:
+                    try:
+                        with conn.cursor() as cursor:
+                            cursor.execute("SET LOCAL statement_timeout = %s", [60000])
+                            self.statements.sample_planning(cursor, statement, params)
+                    finally:
+                        conn.rollback()
+            except Exception as e:
+                logger.warning(f"Planning-time sample for {statement.name} failed: {e}")
+
+        if self.pool:
+            threading.Thread(target=sample, name=f"plan-sample-{statement.name}", daemon=True).start()
+
+    def _execute_query(self, query: str, params: List, timeout: float, numeric_as_float: bool) -> List[Dict]:
         with self.get_cursor() as cursor:
+            cancel_timer = None
+            client_cancelled = threading.Event()
+
+            if not numeric_as_float:
+                psycopg2.extensions.register_type(psycopg2.extensions.DECIMAL, cursor)
+
+            if timeout:
+                cursor.execute("SET LOCAL statement_timeout = %s", [int(timeout * 1000)])
+                conn = cursor.connection
+
+                def cancel():
+                    client_cancelled.set()
+                    conn.cancel()
+
+                cancel_timer = threading.Timer(timeout + CLIENT_CANCEL_GRACE_SECONDS, cancel)
+                cancel_timer.daemon = True
+                cancel_timer.start()
+
+            start = time.monotonic()
             try:
-                cursor.execute(query, params or [])
-                
-                # Handle different query types
-                if query.strip().upper().startswith(('SELECT', 'WITH')):
-                    results = cursor.fetchall()
-                    return [dict(row) for row in results]
-                else:
-                    return [{'affected_rows': cursor.rowcount}]
-                    
+                with self._instrumented(query, params) as stats:
+                    if isinstance(query, PreparedStatement) and self.statements.enabled:
+                        if self.statements.execute(cursor, query, params):
+                            self._sample_planning(query, params)
+                    else:
+                        cursor.execute(query, params or [])
+
+                    # Handle different query types
+                    if query.strip().upper().startswith(('SELECT', 'WITH')):
+                        results = [dict(row) for row in cursor.fetchall()]
+                        stats['rows'] = len(results)
+                        stats['bytes'] = _estimate_bytes(results)
+                        return results
+                    else:
+                        stats['rows'] = cursor.rowcount
+                        return [{'affected_rows': cursor.rowcount}]
+
+            except psycopg2.errors.QueryCanceled as e:
+                duration = time.monotonic() - start
+                cancelled_by = 'client' if client_cancelled.is_set() else 'server'
+                fingerprint = _record_timed_out_query(query, timeout, duration, cancelled_by)
+                raise QueryTimeoutError(
+                    f"Query timeout ({timeout}s) [query {fingerprint}]",
+                    fingerprint, timeout, duration
+                ) from e
             except psycopg2.OperationalError as e:
-                if 'timeout' in str(e).lower():
-                    logger.error(f"Query timeout after {timeout}s: {query[:100]}...")
-                    raise Exception(f"Query timeout ({timeout}s)")
-                else:
-                    logger.error(f"Database operational error: {e}")
-                    raise e
+                logger.error(f"Database operational error: {e}")
+                raise e
+            finally:
+                if cancel_timer:
+                    cancel_timer.cancel()
+
+    async def execute_query_async(self, query: str, params: List = None, timeout: float = 30.0,
+                                  numeric_as_float: bool = True, cache: str = None) -> List[Dict]:
+        """
+        Asyncio variant of execute_query over a shared psycopg 3 connection pool.
+
+        Independent queries awaited together (asyncio.gather) run concurrently on separate
+        pooled connections. Must run on the database event loop (see run_async); arguments
+        and errors are the same as execute_query.
+        """
+        key = self.query_cache.make_key(cache, query, params, 'rows', numeric_as_float,
+                                        self._cache_scope()) if cache else None
+
+        if not self._check_circuit():
+            if self.is_fallback_mode:
+                return self._execute_fallback_query(query, params)
+            cached = self.query_cache.peek(key) if cache else None
+            return [dict(row) for row in self._while_open(query, params, cached)]
+
+        if not self.pool:
+            raise Exception("Database connection not established")
+
+        if cache:
+            rows = await self.query_cache.get_or_load_async(
+                key, cache, lambda: self._execute_query_async(query, params, timeout, numeric_as_float)
+            )
+            return [dict(row) for row in rows]
+
+        return await self._execute_query_async(query, params, timeout, numeric_as_float)
+
+    async def _execute_query_async(self, query: str, params: List, timeout: float,
+                                   numeric_as_float: bool) -> List[Dict]:
+        pool = await get_async_connection_pool(self.config)
+        start = time.monotonic()
+        try:
+            async with pool.connection() as conn:
+                async with conn.cursor(row_factory=dict_row) as cursor:
+                    if not numeric_as_float:
+                        cursor.adapters.register_loader('numeric', NumericLoader)
+                    if timeout:
+                        await cursor.execute(f"SET LOCAL statement_timeout = {int(timeout * 1000)}")
+
+                    # psycopg 3 prepares registered statements itself, per connection
+                    prepare = isinstance(query, PreparedStatement) and self.statements.enabled
+                    with self._instrumented(query, params) as stats:
+                        if timeout:
+                            # Client-side backstop, as in execute_query
+                            await asyncio.wait_for(cursor.execute(query, params or [], prepare=prepare),
+                                                   timeout + CLIENT_CANCEL_GRACE_SECONDS)
+                        else:
+                            await cursor.execute(query, params or [], prepare=prepare)
+                        if prepare and self.statements.count_execution(query):
+                            self._sample_planning(query, params)
+
+                        if query.strip().upper().startswith(('SELECT', 'WITH')):
+                            rows = await cursor.fetchall()
+                            stats['rows'] = len(rows)
+                            stats['bytes'] = _estimate_bytes(rows)
+                        else:
+                            stats['rows'] = cursor.rowcount
+                            rows = [{'affected_rows': cursor.rowcount}]
+
+        except (psycopg.errors.QueryCanceled, asyncio.TimeoutError) as e:
+            duration = time.monotonic() - start
+            cancelled_by = 'client' if isinstance(e, asyncio.TimeoutError) else 'server'
+            fingerprint = _record_timed_out_query(query, timeout, duration, cancelled_by)
+            raise QueryTimeoutError(
+                f"Query timeout ({timeout}s) [query {fingerprint}]",
+                fingerprint, timeout, duration
+            ) from e
+        except (psycopg.OperationalError, psycopg.InterfaceError):
+            self.circuit_breaker.record_failure()
+            raise
+
+        self.circuit_breaker.record_success()
+        return rows
+
+    def iter_query(self, query: str, params: List = None, itersize: int = 10000,
+                   timeout: float = 30.0, numeric_as_float: bool = True) -> Iterator[Dict[str, list]]:
+        """
+        Stream a SELECT through a named server-side cursor in column-oriented chunks.
+
+        Only one chunk is held client-side at a time, so peak memory does not depend on the
+        result size. The pooled connection stays checked out until the iterator is exhausted
+        or closed.
+
+        Args:
+            query: SELECT query
+            params: Query parameters
+            itersize: Rows per round trip and per chunk
+            timeout: statement_timeout applied to each fetch, in seconds (None or 0 disables it)
+            numeric_as_float: Return NUMERIC as float; pass False to keep exact Decimal values
+
+        Yields:
+            Dictionary mapping column name to a list of at most itersize values
+
+        Raises:
+            QueryTimeoutError: A fetch exceeded the timeout and was cancelled
+        """
+        if not self._check_circuit():
+            rows = (self._execute_fallback_query(query, params) if self.is_fallback_mode
+                    else self._while_open(query, params))
+            if rows:
+                yield {column: [row.get(column) for row in rows] for column in rows[0]}
+            return
+
+        if not self.pool:
+            raise Exception("Database connection not established")
+
+        with self.pool.connection() as conn:
+            start = time.monotonic()
+            try:
+                if timeout:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SET LOCAL statement_timeout = %s", [int(timeout * 1000)])
+
+                # Plain tuples (no RealDictCursor): rows are transposed into columns right away
+                with conn.cursor(name=f"stream_{uuid.uuid4().hex[:16]}") as cursor, \
+                        self._instrumented(query, params) as stats:
+                    cursor.itersize = itersize
+                    if not numeric_as_float:
+                        psycopg2.extensions.register_type(psycopg2.extensions.DECIMAL, cursor)
+                    cursor.execute(query, params or [])
+                    while True:
+                        rows = cursor.fetchmany(itersize)
+                        if not rows:
+                            break
+                        stats['rows'] += len(rows)
+                        stats['bytes'] += _estimate_bytes(rows)
+                        columns = [column.name for column in cursor.description]
+                        yield dict(zip(columns, (list(values) for values in zip(*rows))))
+                conn.commit()
+
+            except psycopg2.errors.QueryCanceled as e:
+                duration = time.monotonic() - start
+                fingerprint = _record_timed_out_query(query, timeout, duration, 'server')
+                raise QueryTimeoutError(
+                    f"Query timeout ({timeout}s) [query {fingerprint}]",
+                    fingerprint, timeout, duration
+                ) from e
+
+    def query_dataframe(self, query: str, params: List = None, itersize: int = 50000,
+                        timeout: float = 30.0, numeric_as_float: bool = True,
+                        cache: str = None) -> pd.DataFrame:
+        """
+        Stream a query into a single DataFrame.
+
+        Each chunk is converted to typed columns as it arrives and the chunks are concatenated
+        once, instead of materializing a list of row dicts first. NUMERIC columns arrive as
+        float64 unless numeric_as_float=False (then they stay object columns of Decimal).
+        With cache set to a query class, the frame is served from the result cache (see
+        execute_query). Registered statements run prepared and are fetched in one round trip.
+
+        Returns:
+            DataFrame with the query results (empty DataFrame for no rows)
+        """
+        key = self.query_cache.make_key(cache, query, params, 'dataframe', numeric_as_float,
+                                        self._cache_scope()) if cache else None
+
+        if not self._check_circuit():
+            if self.is_fallback_mode:
+                return pd.DataFrame(self._execute_fallback_query(query, params))
+            cached = self.query_cache.peek(key) if cache else None
+            result = self._while_open(query, params, cached)
+            return result.copy() if isinstance(result, pd.DataFrame) else pd.DataFrame(result)
+
+        if cache:
+            df = self.query_cache.get_or_load(
+                key, cache,
+                lambda: self._guarded(self._query_dataframe, query, params, itersize, timeout, numeric_as_float)
+            )
+            return df.copy()
+
+        return self._guarded(self._query_dataframe, query, params, itersize, timeout, numeric_as_float)
+
+    def _query_dataframe(self, query: str, params: List, itersize: int, timeout: float,
+                         numeric_as_float: bool) -> pd.DataFrame:
+        if isinstance(query, PreparedStatement) and self.statements.enabled:
+            # EXECUTE cannot back a server-side cursor; registered statements are aggregate
+            # queries, fetched in one round trip instead of streamed
+            return pd.DataFrame(self._execute_query(query, params, timeout, numeric_as_float))
+        chunks = self.iter_query(query, params, itersize, timeout, numeric_as_float)
+        frames = [pd.DataFrame(chunk) for chunk in chunks]
+        if not frames:
+            return pd.DataFrame()
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
     
+    def read_copy(self, query: str, params: List = None, dtypes: Dict[str, str] = None,
+                  parse_dates: List[str] = None, engine: str = 'pandas',
+                  timeout: float = 120.0):
+        """
+        Bulk-read a SELECT with COPY (query) TO STDOUT and parse it column-wise.
+
+        The server streams the result as CSV in one round trip, and pandas (or pyarrow)
+        parses it straight into typed columns, skipping per-row tuple and dict construction.
+        Timestamps are exported in UTC.
+
+        Args:
+            query: SELECT query (no trailing semicolon)
+            params: Query parameters
+            dtypes: Column name -> dtype (e.g. {'id': 'int64', 'courier_id': 'Int64',
+                'reward': 'float64', 'shipment_status': 'category'}); use nullable dtypes
+                ('Int64', 'boolean') for columns that may be NULL. Unlisted columns are inferred
+            parse_dates: Columns parsed as UTC datetimes
+            engine: 'pandas' for a DataFrame, 'arrow' for a pyarrow.Table (needs pyarrow)
+            timeout: Query timeout in seconds (None or 0 disables it)
+
+        Returns:
+            DataFrame (engine='pandas') or pyarrow.Table (engine='arrow')
+
+        Raises:
+            QueryTimeoutError: The COPY exceeded its timeout and was cancelled
+        """
+        if engine not in ('pandas', 'arrow'):
+            raise ValueError(f"Unknown engine: {engine}")
+        if engine == 'arrow' and pa_csv is None:
+            raise ImportError("pyarrow is required for engine='arrow'")
+
+        if not self._check_circuit():
+            df = pd.DataFrame(self._execute_fallback_query(query, params) if self.is_fallback_mode
+                              else self._while_open(query, params))
+            return pa.Table.from_pandas(df, preserve_index=False) if engine == 'arrow' else df
+
+        if not self.pool:
+            raise Exception("Database connection not established")
+
+        buffer = io.BytesIO()
+        with self.pool.connection() as conn:
+            start = time.monotonic()
+            try:
+                with conn.cursor() as cursor:
+                    if timeout:
+                        cursor.execute("SET LOCAL statement_timeout = %s", [int(timeout * 1000)])
+                    cursor.execute("SET LOCAL timezone = 'UTC'")
+                    select = cursor.mogrify(query, params).decode() if params else query
+                    with self._instrumented(query, params) as stats:
+                        cursor.copy_expert(
+                            f"COPY ({select.strip().rstrip(';')}) TO STDOUT WITH (FORMAT csv, HEADER true)",
+                            buffer
+                        )
+                        stats['bytes'] = buffer.getbuffer().nbytes
+                        stats['rows'] = max(buffer.getvalue().count(b'\n') - 1, 0)
+                conn.commit()
+
+            except psycopg2.errors.QueryCanceled as e:
+                duration = time.monotonic() - start
+                fingerprint = _record_timed_out_query(query, timeout, duration, 'server')
+                raise QueryTimeoutError(
+                    f"Query timeout ({timeout}s) [query {fingerprint}]",
+                    fingerprint, timeout, duration
+                ) from e
+
+        buffer.seek(0)
+        if engine == 'arrow':
+            return self._parse_copy_arrow(buffer, dtypes, parse_dates)
+        return self._parse_copy_pandas(buffer, dtypes, parse_dates)
+
+    @staticmethod
+    def _parse_copy_pandas(buffer: io.BytesIO, dtypes: Dict[str, str] = None,
+                           parse_dates: List[str] = None) -> pd.DataFrame:
+        """Parse COPY CSV output into a DataFrame."""
+        if buffer.getbuffer().nbytes == 0:
+            return pd.DataFrame()
+        # Booleans need true/false values for 'bool' columns; NULL bools become 'boolean'
+        dtypes = dict(dtypes or {})
+        df = pd.read_csv(
+            buffer,
+            dtype={column: dtype for column, dtype in dtypes.items() if dtype not in ('bool', 'boolean')},
+            true_values=['t'],
+            false_values=['f'],
+            keep_default_na=False,
+            na_values=[''],
+            low_memory=False
+        )
+        for column, dtype in dtypes.items():
+            if dtype in ('bool', 'boolean') and column in df:
+                df[column] = df[column].astype('boolean' if df[column].isna().any() else dtype)
+        for column in parse_dates or []:
+            if column in df:
+                df[column] = pd.to_datetime(df[column], utc=True, format='ISO8601')
+        return df
+
+    @staticmethod
+    def _parse_copy_arrow(buffer: io.BytesIO, dtypes: Dict[str, str] = None,
+                          parse_dates: List[str] = None):
+        """Parse COPY CSV output into a pyarrow.Table."""
+        if buffer.getbuffer().nbytes == 0:
+            return pa.table({})
+        column_types = {column: _arrow_type(dtype) for column, dtype in (dtypes or {}).items()}
+        for column in parse_dates or []:
+            column_types[column] = pa.timestamp('us', tz='UTC')
+        return pa_csv.read_csv(
+            buffer,
+            convert_options=pa_csv.ConvertOptions(
+                column_types=column_types,
+                true_values=['t'],
+                false_values=['f'],
+                null_values=[''],
+                strings_can_be_null=True,
+                quoted_strings_can_be_null=False
+            )
+        )
+
     def _execute_fallback_query(self, query: str, params: List = None) -> List[Dict]:
         """Execute query against demo data in fallback mode."""
         logger.info(f"Executing query in fallback mode: {query[:100]}...")
@@ -381,9 +2009,10 @@ class DatabaseConnection:
     def get_connection_status(self) -> Dict:
         """Get current connection status and health information."""
         status = {
-            'connected': self.conn is not None and not self.is_fallback_mode,
+            'connected': self.pool is not None and not self.is_fallback_mode,
             'fallback_mode': self.is_fallback_mode,
             'circuit_breaker_state': self.circuit_breaker.state,
+            'circuit_breaker': self.circuit_breaker.get_metrics(),
             'config': {
                 'host': self.config.get('host', 'unknown'),
                 'database': self.config.get('database', 'unknown'),
@@ -400,6 +2029,8 @@ class DatabaseConnection:
             }
         else:
             status['data_source'] = 'production'
+            if self.pool:
+                status['pool'] = self.pool.get_metrics()
             
         return status
 
@@ -425,17 +2056,20 @@ class MockCursor:
         pass
 
 
-def get_database_connection(enable_fallback: bool = False) -> DatabaseConnection:
+def get_database_connection(enable_fallback: bool = False, config: Dict[str, str] = None) -> DatabaseConnection:
     """
     Factory function to get a configured database connection.
-    
+
+    All connections with the same config share one process-wide pool.
+
     Args:
         enable_fallback: Whether to enable demo data fallback
-        
+        config: Database configuration. If None, reads from environment.
+
     Returns:
         DatabaseConnection instance
     """
-    return DatabaseConnection(enable_fallback=enable_fallback)
+    return DatabaseConnection(config, enable_fallback=enable_fallback)
 
 
 # Health check functions
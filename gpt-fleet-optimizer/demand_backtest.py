@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Demand Backtest - Fleet Optimizer Module
+Rolling-origin backtests of the demand forecast methods on an offline snapshot.
+
+A snapshot holds order counts per hub, date and hour (the forecast_all_hubs query over a
+longer range), exported once from the database to Parquet or CSV. The backtest replays
+forecast cutoffs ("origins") over it: each origin fits a method on the history_days before
+the cutoff, exactly as production would have on that day, and forecasts the next `horizon`
+days, which are then compared with what happened.
+
+Origins are a whole number of weeks apart, so every origin's history can be moved onto one
+common calendar without changing weekdays. All origins x hubs are then fitted as one batch
+of series per method - one vectorized fit instead of one per origin - and errors are
+reported per method, hub and horizon (days ahead) as WAPE and MAPE, with fit and predict
+time per method.
+
+Usage:
+    python demand_backtest.py --export snapshot.parquet --days 180     # needs the database
+    python demand_backtest.py --snapshot snapshot.parquet --forecast_type daily --origins 8
+    python demand_backtest.py --snapshot snapshot.csv --forecast_type hourly --horizon 3 --output errors.csv
+"""
+
+import sys
+import time
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from database_connection import get_database_connection
+from demand_forecaster import DemandForecaster
+
+
+METHODS = ('seasonal_mean', 'holt_winters')
+
+SNAPSHOT_QUERY = """
+SELECT
+    hub_id,
+    DATE(created_at) AS order_date,
+    EXTRACT(HOUR FROM created_at)::int AS hour_of_day,
+    COUNT(*) AS order_count
+FROM orders
+WHERE created_at >= CURRENT_DATE - %s * INTERVAL '1 day'
+AND created_at < CURRENT_DATE
+AND hub_id IS NOT NULL
+GROUP BY hub_id, DATE(created_at), EXTRACT(HOUR FROM created_at)
+"""
+
+
+def export_snapshot(path: str, days: int = 180) -> int:
+    """
+    Write order counts per hub, date and hour for the last `days` complete days.
+
+    Read with one COPY (dates and hours in UTC). Parquet needs pyarrow; any other
+    extension is written as CSV.
+
+    Returns:
+        Rows written
+    """
+    db = get_database_connection()
+    db.connect(retry_attempts=1)
+    try:
+        df = db.read_copy(SNAPSHOT_QUERY, [days], timeout=None,
+                          dtypes={'hub_id': 'int64', 'hour_of_day': 'int64', 'order_count': 'int64'})
+    finally:
+        db.disconnect()
+
+    if Path(path).suffix == '.parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return len(df)
+
+
+def load_snapshot(path: str) -> pd.DataFrame:
+    """
+    Read a snapshot written by export_snapshot (or any table with hub_id, order_date,
+    order_count and, for hourly backtests, hour_of_day).
+
+    Adds day_of_week in the PostgreSQL convention (Sunday = 0) the forecaster expects.
+    """
+    df = pd.read_parquet(path) if Path(path).suffix == '.parquet' else pd.read_csv(path)
+    missing = {'hub_id', 'order_date', 'order_count'} - set(df.columns)
+    if missing:
+        raise ValueError(f"Snapshot is missing columns: {', '.join(sorted(missing))}")
+
+    df['order_date'] = pd.to_datetime(df['order_date']).dt.normalize()
+    df['day_of_week'] = (df['order_date'].dt.dayofweek + 1) % 7
+    return df
+
+
+class DemandBacktest:
+    """Rolling-origin evaluation of forecast methods over a locally loaded history."""
+
+    def __init__(self, history: pd.DataFrame, history_days: int = 90, forecaster: DemandForecaster = None):
+        """
+        Initialize the backtest.
+
+        Args:
+            history: Snapshot from load_snapshot
+            history_days: Days of history each origin fits on (production uses 90)
+            forecaster: Forecaster whose models are evaluated; it is never connected
+        """
+        self.history = history
+        self.history_days = history_days
+        self.forecaster = forecaster or DemandForecaster()
+
+    def origins(self, count: int, step_days: int, horizon: int) -> List[pd.Timestamp]:
+        """
+        The latest `count` cutoffs, step_days apart, whose horizon ends within the snapshot.
+
+        Cutoffs without a full history_days before them are dropped.
+        """
+        if step_days % 7:
+            raise ValueError("step_days must be a multiple of 7")
+        first_date = self.history['order_date'].min()
+        last_origin = self.history['order_date'].max() + pd.Timedelta(days=1 - horizon)
+        origins = [last_origin - pd.Timedelta(days=k * step_days) for k in range(count)]
+        return [origin for origin in origins if origin - pd.Timedelta(days=self.history_days) >= first_date]
+
+    def run(self, forecast_type: str = 'daily', horizon: int = 7, origins: int = 8, step_days: int = 7,
+            methods: Tuple[str, ...] = METHODS) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Forecast every origin with every method and compare with the actuals.
+
+        Returns:
+            (errors, timings): one row per method, origin, hub and forecast date (and hour)
+            with horizon (days ahead, 1-based), forecast and actual; and fit / predict
+            seconds and series count per method
+        """
+        if forecast_type not in ('hourly', 'daily'):
+            raise ValueError(f"Unsupported forecast_type: {forecast_type}")
+        if forecast_type == 'hourly' and 'hour_of_day' not in self.history:
+            raise ValueError("Hourly backtests need an hour_of_day column in the snapshot")
+
+        cutoffs = self.origins(origins, step_days, horizon)
+        if not cutoffs:
+            raise ValueError(f"Snapshot is too short for a {self.history_days}-day history and {horizon}-day horizon")
+        train, hubs = self._stack_origins(cutoffs)
+        start = cutoffs[0].to_pydatetime()
+
+        errors, timings = [], {}
+        for method in methods:
+            fit, predict = self._method(method, forecast_type, horizon, start)
+            began = time.perf_counter()
+            fitted = fit(train)
+            fitted_at = time.perf_counter()
+            forecast = predict(fitted)
+            timings[method] = {
+                'fit_seconds': fitted_at - began,
+                'predict_seconds': time.perf_counter() - fitted_at,
+                'series': int(train['hub_id'].nunique())
+            }
+            errors.append(self._score(forecast, cutoffs, hubs, forecast_type).assign(method=method))
+        return pd.concat(errors, ignore_index=True), timings
+
+    def _stack_origins(self, cutoffs: List[pd.Timestamp]) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Each origin's training window, moved to end at the latest cutoff, as one frame whose
+        hub_id is the series index origin * n_hubs + hub code.
+        """
+        history = self.history
+        codes, hubs = pd.factorize(history['hub_id'], sort=True)
+        windows = []
+        for k, cutoff in enumerate(cutoffs):
+            in_window = ((history['order_date'] >= cutoff - pd.Timedelta(days=self.history_days)) &
+                         (history['order_date'] < cutoff)).to_numpy()
+            window = history[in_window].assign(hub_id=k * len(hubs) + codes[in_window])
+            window['order_date'] = window['order_date'] + (cutoffs[0] - cutoff)
+            windows.append(window)
+        train = pd.concat(windows, ignore_index=True)
+        return train.sort_values(['hub_id', 'order_date'], kind='stable'), np.asarray(hubs)
+
+    def _method(self, method: str, forecast_type: str, horizon: int, start):
+        """(fit, predict) callables; seasonal-mean daily statistics are computed in predict."""
+        forecaster = self.forecaster
+        if method == 'holt_winters':
+            return (
+                lambda train: forecaster._holt_winters_fit(train, forecast_type),
+                lambda fitted: forecaster._holt_winters_forecast(*fitted, horizon, start, forecast_type)
+            )
+        if method != 'seasonal_mean':
+            raise ValueError(f"Unsupported method: {method}")
+        if forecast_type == 'hourly':
+            return (
+                lambda train: forecaster._hourly_stats(train, by_hub=True),
+                lambda stats: forecaster._hourly_forecast_grid(stats, horizon, start, by_hub=True)
+            )
+        return (
+            lambda train: train.groupby(['hub_id', 'order_date'], sort=True).agg(
+                day_of_week=('day_of_week', 'first'),
+                order_count=('order_count', 'sum')
+            ).reset_index(),
+            lambda daily: forecaster._daily_forecast_grid(daily, horizon, start, by_hub=True)[0]
+        )
+
+    def _score(self, forecast: pd.DataFrame, cutoffs: List[pd.Timestamp], hubs: np.ndarray,
+               forecast_type: str) -> pd.DataFrame:
+        """Map stacked series back to (origin, hub, real date) and attach the actuals."""
+        series = forecast['hub_id'].to_numpy(dtype=int)
+        origin = series // len(hubs)
+        shifted_date = pd.to_datetime(forecast['date'])
+        shift = (cutoffs[0] - pd.DatetimeIndex(cutoffs)).to_numpy()[origin]
+        scored = pd.DataFrame({
+            'origin': pd.DatetimeIndex(cutoffs)[origin],
+            'hub_id': hubs[series % len(hubs)],
+            'order_date': (shifted_date - shift).to_numpy(),
+            'horizon': (shifted_date - cutoffs[0]).dt.days.to_numpy() + 1,
+            'forecast': forecast['forecasted_demand'].to_numpy(dtype=float)
+        })
+
+        keys = ['hub_id', 'order_date']
+        if forecast_type == 'hourly':
+            scored['hour_of_day'] = forecast['hour'].str[:2].astype(int).to_numpy()
+            keys.append('hour_of_day')
+        actual = self.history.groupby(keys, as_index=False)['order_count'].sum()
+        scored = scored.merge(actual, on=keys, how='left').rename(columns={'order_count': 'actual'})
+        scored['actual'] = scored['actual'].fillna(0)
+        return scored
+
+
+def summarize(errors: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    """
+    WAPE and MAPE (%) per group.
+
+    WAPE = sum |forecast - actual| / sum actual. MAPE averages |error| / actual over slots
+    with orders only (it is undefined for empty slots).
+    """
+    frame = errors.assign(
+        abs_error=(errors['forecast'] - errors['actual']).abs(),
+        ape=lambda df: (df['abs_error'] / df['actual']).where(df['actual'] > 0)
+    )
+    summary = frame.groupby(by).agg(
+        slots=('actual', 'size'),
+        actual=('actual', 'sum'),
+        abs_error=('abs_error', 'sum'),
+        mape=('ape', 'mean')
+    )
+    summary['wape'] = (summary['abs_error'] / summary['actual'].where(summary['actual'] > 0) * 100).round(2)
+    summary['mape'] = (summary['mape'] * 100).round(2)
+    return summary[['slots', 'actual', 'wape', 'mape']].reset_index()
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of demand forecasts')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--snapshot', help='Parquet or CSV snapshot to backtest on')
+    source.add_argument('--export', help='Write a snapshot from the database to this path and exit')
+    parser.add_argument('--days', type=int, default=180, help='Days exported with --export (default: 180)')
+    parser.add_argument('--forecast_type', choices=['daily', 'hourly'], default='daily')
+    parser.add_argument('--methods', nargs='+', choices=METHODS, default=list(METHODS))
+    parser.add_argument('--horizon', type=int, default=7, help='Days forecast from each origin (default: 7)')
+    parser.add_argument('--origins', type=int, default=8, help='Number of cutoffs (default: 8)')
+    parser.add_argument('--step', type=int, default=7, help='Days between cutoffs, a multiple of 7 (default: 7)')
+    parser.add_argument('--history_days', type=int, default=90, help='History per cutoff (default: 90)')
+    parser.add_argument('--output', help='Write WAPE/MAPE per method, hub and horizon to this CSV')
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+    args = parser.parse_args()
+
+    if args.step % 7:
+        parser.error("--step must be a multiple of 7")
+
+    try:
+        if args.export:
+            rows = export_snapshot(args.export, args.days)
+            print(f"✓ Wrote {rows:,} rows to {args.export}")
+            return
+
+        backtest = DemandBacktest(load_snapshot(args.snapshot), history_days=args.history_days)
+        errors, timings = backtest.run(args.forecast_type, args.horizon, args.origins, args.step, tuple(args.methods))
+    except Exception as e:
+        print(f"❌ Backtest failed: {e}")
+        sys.exit(1)
+
+    by_horizon = summarize(errors, ['method', 'horizon'])
+    overall = summarize(errors, ['method'])
+    if args.output:
+        summarize(errors, ['method', 'hub_id', 'horizon']).to_csv(args.output, index=False)
+
+    if args.json:
+        print(json.dumps({
+            'overall': overall.to_dict('records'),
+            'by_horizon': by_horizon.to_dict('records'),
+            'timings': timings
+        }, indent=2, default=str))
+        return
+
+    origins = errors['origin'].nunique()
+    print(f"\n📏 {args.forecast_type} backtest: {origins} origins, {args.horizon}-day horizon, "
+          f"{errors['hub_id'].nunique()} hubs")
+    print(f"\n{'method':<15} {'WAPE %':>8} {'MAPE %':>8} {'series':>7} {'fit ms':>9} {'predict ms':>11}")
+    for row in overall.itertuples():
+        timing = timings[row.method]
+        print(f"{row.method:<15} {row.wape:>8.1f} {row.mape:>8.1f} {timing['series']:>7} "
+              f"{timing['fit_seconds'] * 1000:>9.1f} {timing['predict_seconds'] * 1000:>11.1f}")
+
+    print("\nWAPE % by days ahead:")
+    table = by_horizon.pivot(index='horizon', columns='method', values='wape')
+    print(table.to_string(float_format=lambda value: f"{value:.1f}"))
+    if args.output:
+        print(f"\n✓ Per-hub errors written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
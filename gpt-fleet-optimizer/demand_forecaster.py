@@ -24,15 +24,32 @@ Usage:
 
 import os
 import sys
+import logging
 import json
 import argparse
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 import numpy as np
 
 # Import our robust database connection handler
-from database_connection import DatabaseConnection, get_database_connection
+from database_connection import DatabaseConnection, QueryTimeoutError, get_database_connection
+from rollups import RollupManager, hourly_demand_query, hub_hourly_demand_query
+from demand_profiles import DemandProfileStore
+from exponential_smoothing import HoltWinters
+from forecast_cache import ForecastCache
+
+
+logger = logging.getLogger(__name__)
+
+# Forecasts are fitted on complete days before CURRENT_DATE: they change when the day rolls
+# over or when orders land in the history window (one index scan on created_at)
+DATA_WATERMARK = """
+SELECT CURRENT_DATE AS window_end, MAX(created_at) AS last_order
+FROM orders
+WHERE created_at >= CURRENT_DATE - INTERVAL '90 days'
+AND created_at < CURRENT_DATE
+"""
 
 
 class DemandForecaster:
@@ -52,7 +69,10 @@ class DemandForecaster:
         elif enable_fallback is None:
             enable_fallback = False
         
-        self.db = get_database_connection(enable_fallback=enable_fallback)
+        self.db = get_database_connection(enable_fallback=enable_fallback, config=db_config)
+        self.rollups = RollupManager(self.db)
+        self.profiles = DemandProfileStore(self.db)
+        self.forecast_cache = ForecastCache()
         self.data_source = 'unknown'
 
     def connect(self):
@@ -88,7 +108,31 @@ class DemandForecaster:
         status['forecaster_data_source'] = self.data_source
         return status
 
-    def forecast_hourly_demand(self, horizon_days: int = 7, hub_id: int = None) -> Dict:
+    def _memoized(self, kind: str, args: Tuple, compute, cacheable=None):
+        """
+        Serve a forecast from the forecast cache at the current data watermark.
+
+        compute(history_cache) reads its history with that query cache class. Under the
+        forecast cache it is None: the watermark decides when history is re-read, and a
+        query cache entry from before the watermark moved would otherwise be forecast and
+        stored under the new watermark. Error results are not stored. Computes directly,
+        with the 'historical' query cache, when the forecast cache is disabled
+        (FORECAST_CACHE=0), on demo data, or when the watermark cannot be read.
+        """
+        if not self.forecast_cache.enabled or self.db.is_fallback_mode:
+            return compute('historical')
+        try:
+            rows = self.db.execute_query(DATA_WATERMARK, timeout=5.0, cache='recent')
+            watermark = f"{rows[0]['window_end']}/{rows[0]['last_order']}" if rows else None
+        except Exception as e:
+            logger.warning(f"Forecast watermark unavailable, computing without the forecast cache: {e}")
+            return compute('historical')
+        return self.forecast_cache.get_or_compute(
+            kind, args, watermark, lambda: compute(None),
+            cacheable=cacheable or (lambda result: 'error' not in result)
+        )
+
+    def forecast_hourly_demand(self, horizon_days: int = 7, hub_id: int = None, columnar: bool = False) -> Dict:
         """
         Forecast hourly delivery demand based on historical patterns.
 
@@ -101,10 +145,19 @@ class DemandForecaster:
         Args:
             horizon_days: Number of days to forecast
             hub_id: Specific hub to forecast (optional)
+            columnar: Return 'forecasts' as a dict of column lists instead of one dict per hour
 
         Returns:
             Dictionary with hourly demand forecasts and resource recommendations
         """
+        return self._memoized(
+            'hourly', (hub_id or None, horizon_days, columnar),
+            lambda history_cache: self._forecast_hourly_demand(horizon_days, hub_id, columnar, history_cache)
+        )
+
+    def _forecast_hourly_demand(self, horizon_days: int = 7, hub_id: int = None, columnar: bool = False,
+                                history_cache: Optional[str] = 'historical') -> Dict:
+        """forecast_hourly_demand without the forecast cache."""
         print(f"\n⏰ Forecasting hourly demand for next {horizon_days} days...")
 
         # Analyze historical patterns (last 90 days) using orders table
@@ -123,10 +176,16 @@ class DemandForecaster:
         """.format("AND hub_id = %s" if hub_id else "")
 
         try:
-            params = [hub_id] if hub_id else []
-            results = self.db.execute_query(query, params, timeout=30.0)
+            if self.profiles.is_ready():
+                hourly_stats = self.profiles.hourly_stats(hub_id, cache=history_cache)
+            else:
+                params = [hub_id] if hub_id else []
+                if self.rollups.is_ready():
+                    query, params = hourly_demand_query(hub_id)
+                df = self.db.query_dataframe(query, params, timeout=30.0, cache=history_cache)
+                hourly_stats = self._hourly_stats(df)
 
-            if not results:
+            if hourly_stats.empty:
                 print("⚠ No historical data found for forecasting")
                 return {
                     "error": "Insufficient historical data",
@@ -134,81 +193,16 @@ class DemandForecaster:
                     "fallback_available": self.db.enable_fallback
                 }
 
-            df = pd.DataFrame(results)
-
-            # Calculate statistical patterns by day of week and hour
-            hourly_stats = df.groupby(['day_of_week', 'hour_of_day']).agg({
-                'order_count': ['mean', 'std', 'min', 'max', 'count']
-            }).round(2)
-
-            hourly_stats.columns = ['avg_orders', 'std_orders', 'min_orders', 'max_orders', 'sample_count']
-            hourly_stats = hourly_stats.reset_index()
-
-            # Generate forecasts for next N days
-            forecasts = []
-            today = datetime.now()
-
-            for day_offset in range(horizon_days):
-                forecast_date = today + timedelta(days=day_offset)
-                dow = forecast_date.weekday() + 1  # Monday = 1
-                if dow == 7:  # Sunday = 0 in PostgreSQL
-                    dow = 0
-
-                for hour in range(24):
-                    # Get historical average for this day/hour combination
-                    mask = (hourly_stats['day_of_week'] == dow) & (hourly_stats['hour_of_day'] == hour)
-                    historical_data = hourly_stats[mask]
-
-                    if len(historical_data) > 0:
-                        avg_demand = historical_data['avg_orders'].iloc[0]
-                        std_demand = historical_data['std_orders'].iloc[0]
-
-                        if pd.isna(std_demand):
-                            std_demand = avg_demand * 0.2  # Default to 20% variation
-
-                        # Calculate confidence based on sample size and variance
-                        sample_count = historical_data['sample_count'].iloc[0]
-                        cv = std_demand / avg_demand if avg_demand > 0 else 1
-
-                        if sample_count >= 10 and cv < 0.3:
-                            confidence = 'high'
-                        elif sample_count >= 5 and cv < 0.5:
-                            confidence = 'medium'
-                        else:
-                            confidence = 'low'
-
-                        forecasts.append({
-                            'date': forecast_date.strftime('%Y-%m-%d'),
-                            'day_of_week': forecast_date.strftime('%A'),
-                            'hour': f"{hour:02d}:00",
-                            'forecasted_demand': round(avg_demand, 1),
-                            'lower_bound': max(0, round(avg_demand - std_demand, 1)),
-                            'upper_bound': round(avg_demand + std_demand, 1),
-                            'confidence': confidence,
-                            'sample_count': int(sample_count)
-                        })
-                    else:
-                        # No historical data for this hour, use overall average
-                        overall_avg = df['order_count'].mean()
-                        forecasts.append({
-                            'date': forecast_date.strftime('%Y-%m-%d'),
-                            'day_of_week': forecast_date.strftime('%A'),
-                            'hour': f"{hour:02d}:00",
-                            'forecasted_demand': round(overall_avg, 1),
-                            'lower_bound': 0,
-                            'upper_bound': round(overall_avg * 2, 1),
-                            'confidence': 'low',
-                            'sample_count': 0
-                        })
+            forecast_df = self._hourly_forecast_grid(hourly_stats, horizon_days, datetime.now())
+            forecasts = forecast_df.to_dict('list' if columnar else 'records')
 
             # Identify peak hours
-            forecast_df = pd.DataFrame(forecasts)
             peak_threshold = forecast_df['forecasted_demand'].quantile(0.75)
             peak_hours = forecast_df[forecast_df['forecasted_demand'] >= peak_threshold].to_dict('records')
 
             # Overall statistics
             stats = {
-                'total_forecasts': len(forecasts),
+                'total_forecasts': len(forecast_df),
                 'avg_hourly_demand': float(forecast_df['forecasted_demand'].mean()),
                 'peak_demand': float(forecast_df['forecasted_demand'].max()),
                 'min_demand': float(forecast_df['forecasted_demand'].min()),
@@ -216,7 +210,7 @@ class DemandForecaster:
                 'high_confidence_hours': int(forecast_df[forecast_df['confidence'] == 'high'].shape[0])
             }
 
-            print(f"✓ Generated {len(forecasts)} hourly forecasts")
+            print(f"✓ Generated {len(forecast_df)} hourly forecasts")
 
             return {
                 'forecast_type': 'hourly',
@@ -231,10 +225,10 @@ class DemandForecaster:
                 'connection_info': self.get_connection_info()
             }
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            print(f"✗ Hourly forecast failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Hourly forecast failed")
             
             return {
                 "error": str(e),
@@ -248,6 +242,302 @@ class DemandForecaster:
                 }
             }
 
+    def forecast_all_hubs(self, horizon_days: int = 7, forecast_type: str = 'hourly',
+                          method: str = 'seasonal_mean') -> pd.DataFrame:
+        """
+        Forecast every hub at once.
+
+        One grouped query returns order counts per hub, date and hour for the last 90
+        complete days (from the hourly order rollup when it is fresh); hourly batches read
+        the persisted demand profiles instead when they are current. Every hub's model is
+        then fitted with the same array operations as the single-hub forecasts, over a
+        (hub, day of week, hour) axis instead of one series at a time. Hourly and daily
+        batches share the cached query.
+
+        method='holt_winters' fits an additive damped Holt-Winters model to every hub's
+        daily (weekly season) or hourly (168-hour season) series in one batch instead; see
+        exponential_smoothing.py. Bounds are +/- one forecast standard deviation.
+
+        Args:
+            horizon_days: Number of days to forecast
+            forecast_type: 'hourly' (same model as forecast_hourly_demand) or 'daily'
+                (same model as forecast_daily_demand)
+            method: 'seasonal_mean' (the models above) or 'holt_winters'
+
+        Returns:
+            Tidy DataFrame with one row per hub and date ('daily') or hub, date and hour
+            ('hourly'), sorted by hub_id; slice one hub with table[table['hub_id'] == 5].
+            Empty when there is no history.
+        """
+        return self._memoized(
+            'all_hubs', (forecast_type, method, horizon_days),
+            lambda history_cache: self._forecast_all_hubs(horizon_days, forecast_type, method, history_cache),
+            cacheable=lambda table: not table.empty
+        )
+
+    def _forecast_all_hubs(self, horizon_days: int = 7, forecast_type: str = 'hourly',
+                           method: str = 'seasonal_mean', history_cache: Optional[str] = 'historical') -> pd.DataFrame:
+        """forecast_all_hubs without the forecast cache."""
+        if forecast_type not in ('hourly', 'daily'):
+            raise ValueError(f"Unsupported forecast_type: {forecast_type}")
+        if method not in ('seasonal_mean', 'holt_winters'):
+            raise ValueError(f"Unsupported method: {method}")
+
+        print(f"\n🗺  Forecasting {forecast_type} demand for all hubs, next {horizon_days} days...")
+
+        query = """
+        SELECT
+            hub_id,
+            EXTRACT(DOW FROM created_at) as day_of_week,
+            EXTRACT(HOUR FROM created_at) as hour_of_day,
+            COUNT(*) as order_count,
+            DATE(created_at) as order_date
+        FROM orders
+        WHERE created_at >= CURRENT_DATE - INTERVAL '90 days'
+        AND created_at < CURRENT_DATE
+        AND hub_id IS NOT NULL
+        GROUP BY hub_id, DATE(created_at), EXTRACT(DOW FROM created_at), EXTRACT(HOUR FROM created_at)
+        ORDER BY hub_id, order_date, hour_of_day
+        """
+        if forecast_type == 'hourly' and method == 'seasonal_mean' and self.profiles.is_ready():
+            df = hourly_stats = self.profiles.hourly_stats(all_hubs=True, cache=history_cache)
+        else:
+            params = []
+            if self.rollups.is_ready():
+                query, params = hub_hourly_demand_query()
+            df = self.db.query_dataframe(query, params, timeout=60.0, cache=history_cache)
+            hourly_stats = None
+
+        if df.empty:
+            print("⚠ No historical data found for forecasting")
+            return pd.DataFrame()
+
+        if method == 'holt_winters':
+            table = self._holt_winters_grid(df, horizon_days, datetime.now(), forecast_type)
+        elif forecast_type == 'hourly':
+            if hourly_stats is None:
+                hourly_stats = self._hourly_stats(df, by_hub=True)
+            table = self._hourly_forecast_grid(hourly_stats, horizon_days, datetime.now(), by_hub=True)
+        else:
+            daily = df.groupby(['hub_id', 'order_date'], sort=True).agg(
+                day_of_week=('day_of_week', 'first'),
+                order_count=('order_count', 'sum')
+            ).reset_index()
+            table, _ = self._daily_forecast_grid(daily, horizon_days, datetime.now(), by_hub=True)
+
+        print(f"✓ Generated {len(table)} {forecast_type} forecasts for {table['hub_id'].nunique()} hubs")
+        return table
+
+    @staticmethod
+    def _series_codes(df: pd.DataFrame, by_hub: bool) -> Tuple[np.ndarray, list]:
+        """Integer series index per row (one series per hub, or a single series)."""
+        if by_hub:
+            codes, hubs = pd.factorize(df['hub_id'], sort=True)
+            return codes, list(hubs)
+        return np.zeros(len(df), dtype=int), [None]
+
+    def _hourly_stats(self, df: pd.DataFrame, by_hub: bool = False) -> pd.DataFrame:
+        """Mean, sample std and count of hourly order counts per (hub,) day of week and hour."""
+        keys = ['hub_id', 'day_of_week', 'hour_of_day'] if by_hub else ['day_of_week', 'hour_of_day']
+        return df.groupby(keys)['order_count'].agg(['mean', 'std', 'count']).reset_index()
+
+    def _hourly_forecast_grid(self, hourly_stats: pd.DataFrame, horizon_days: int, start: datetime,
+                              by_hub: bool = False) -> pd.DataFrame:
+        """
+        Hourly forecasts for horizon_days from `start`, one row per (hub,) date and hour.
+
+        `hourly_stats` holds the mean, std and sample count of hourly order counts per
+        (hub,) day of week and hour, from _hourly_stats or the persisted demand profile. They
+        are laid out as (series, day of week, hour) arrays; the forecast is a lookup of those
+        arrays with the calendar grid's indices. Slots without history fall back to the
+        series' overall mean, low confidence.
+        """
+        codes, hubs = self._series_codes(hourly_stats, by_hub)
+        n_series = len(hubs)
+        counts = hourly_stats['count'].to_numpy(dtype=float)
+        totals = counts * hourly_stats['mean'].to_numpy(dtype=float)
+        hourly_stats = hourly_stats.round({'mean': 2, 'std': 2})
+
+        # PostgreSQL day of week: Sunday = 0
+        slot = (
+            codes,
+            hourly_stats['day_of_week'].to_numpy(dtype=int),
+            hourly_stats['hour_of_day'].to_numpy(dtype=int)
+        )
+        avg_by_slot = np.full((n_series, 7, 24), np.nan)
+        std_by_slot = np.full((n_series, 7, 24), np.nan)
+        count_by_slot = np.zeros((n_series, 7, 24), dtype=int)
+        avg_by_slot[slot] = hourly_stats['mean'].to_numpy(dtype=float)
+        std_by_slot[slot] = hourly_stats['std'].to_numpy(dtype=float)
+        count_by_slot[slot] = hourly_stats['count'].to_numpy(dtype=int)
+
+        dates = pd.date_range(pd.Timestamp(start).normalize(), periods=horizon_days, freq='D')
+        slots_per_series = horizon_days * 24
+        series = np.repeat(np.arange(n_series), slots_per_series)
+        dow = np.tile(np.repeat((dates.dayofweek.to_numpy() + 1) % 7, 24), n_series)
+        hour = np.tile(np.arange(24), horizon_days * n_series)
+
+        avg = avg_by_slot[series, dow, hour]
+        std = std_by_slot[series, dow, hour]
+        sample_count = count_by_slot[series, dow, hour]
+        known = sample_count > 0
+
+        std = np.where(np.isnan(std), avg * 0.2, std)  # Default to 20% variation
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cv = np.where(avg > 0, std / avg, 1)
+        confidence = np.select(
+            [(sample_count >= 10) & (cv < 0.3), (sample_count >= 5) & (cv < 0.5)],
+            ['high', 'medium'],
+            default='low'
+        )
+
+        overall_avg = (np.bincount(codes, weights=totals, minlength=n_series) /
+                       np.bincount(codes, weights=counts, minlength=n_series))[series]
+        forecast = np.where(known, avg, overall_avg)
+        lower = np.where(known, np.maximum(0, np.round(avg - std, 1)), 0)
+        upper = np.where(known, avg + std, overall_avg * 2)
+
+        columns = {'hub_id': np.repeat(hubs, slots_per_series)} if by_hub else {}
+        columns.update({
+            'date': np.tile(np.repeat(dates.strftime('%Y-%m-%d').to_numpy(), 24), n_series),
+            'day_of_week': np.tile(np.repeat(dates.strftime('%A').to_numpy(), 24), n_series),
+            'hour': np.tile([f"{h:02d}:00" for h in range(24)], horizon_days * n_series),
+            'forecasted_demand': np.round(forecast, 1),
+            'lower_bound': lower,
+            'upper_bound': np.round(upper, 1),
+            'confidence': np.where(known, confidence, 'low'),
+            'sample_count': sample_count
+        })
+        return pd.DataFrame(columns)
+
+    def _daily_forecast_grid(self, daily: pd.DataFrame, horizon_days: int, start: datetime,
+                             by_hub: bool = False) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Daily forecasts for horizon_days from `start`, one row per (hub,) date.
+
+        `daily` holds one row per (hub,) date with orders, in date order. Each series gets
+        its day-of-week mean and sample std, plus a linear trend fitted to its last 30 days:
+        the least-squares slope is computed for all series at once from per-series sums.
+        Days of week without history fall back to the series' overall mean +/- 20%.
+
+        Returns:
+            (forecast frame, daily growth rate per series)
+        """
+        codes, hubs = self._series_codes(daily, by_hub)
+        n_series = len(hubs)
+        counts = daily['order_count'].to_numpy(dtype=float)
+
+        dow_stats = daily.assign(series=codes).groupby(['series', 'day_of_week'])['order_count'].agg(['mean', 'std'])
+        slot = (
+            dow_stats.index.get_level_values('series').to_numpy(dtype=int),
+            dow_stats.index.get_level_values('day_of_week').to_numpy(dtype=int)
+        )
+        avg_by_dow = np.full((n_series, 7), np.nan)
+        std_by_dow = np.full((n_series, 7), np.nan)
+        avg_by_dow[slot] = dow_stats['mean'].to_numpy(dtype=float)
+        std_by_dow[slot] = dow_stats['std'].to_numpy(dtype=float)
+
+        # Linear trend over each series' last 30 days: slope = (n*Sxy - Sx*Sy) / (n*Sxx - Sx^2)
+        recent = pd.Series(codes).groupby(codes).cumcount(ascending=False).to_numpy() < 30
+        recent_codes, y = codes[recent], counts[recent]
+        x = pd.Series(recent_codes).groupby(recent_codes).cumcount().to_numpy(dtype=float)
+        n = np.bincount(recent_codes, minlength=n_series).astype(float)
+        sx = np.bincount(recent_codes, weights=x, minlength=n_series)
+        sy = np.bincount(recent_codes, weights=y, minlength=n_series)
+        sxx = np.bincount(recent_codes, weights=x * x, minlength=n_series)
+        sxy = np.bincount(recent_codes, weights=x * y, minlength=n_series)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+            mean_y = sy / n
+            growth = np.where((n > 1) & (mean_y > 0), slope / mean_y, 0.0)
+
+        dates = pd.date_range(pd.Timestamp(start).normalize(), periods=horizon_days, freq='D')
+        series = np.repeat(np.arange(n_series), horizon_days)
+        offset = np.tile(np.arange(horizon_days), n_series)
+        dow = np.tile((dates.dayofweek.to_numpy() + 1) % 7, n_series)
+
+        base = avg_by_dow[series, dow]
+        std = np.nan_to_num(std_by_dow[series, dow])
+        known = ~np.isnan(base)
+        trend = base * growth[series] * offset
+        forecasted = base + trend
+        overall_avg = (np.bincount(codes, weights=counts, minlength=n_series) /
+                       np.bincount(codes, minlength=n_series))[series]
+
+        columns = {'hub_id': np.repeat(hubs, horizon_days)} if by_hub else {}
+        columns.update({
+            'date': np.tile(dates.strftime('%Y-%m-%d').to_numpy(), n_series),
+            'day_of_week': np.tile(dates.strftime('%A').to_numpy(), n_series),
+            'forecasted_demand': np.round(np.where(known, forecasted, overall_avg), 1),
+            'lower_bound': np.maximum(0, np.where(known, np.round(forecasted - std, 1), np.round(overall_avg * 0.8, 1))),
+            'upper_bound': np.where(known, np.round(forecasted + std, 1), np.round(overall_avg * 1.2, 1)),
+            'trend_contribution': np.where(known, np.round(trend, 1), 0)
+        })
+        return pd.DataFrame(columns), growth
+
+    def _holt_winters_grid(self, df: pd.DataFrame, horizon_days: int, start: datetime,
+                           forecast_type: str) -> pd.DataFrame:
+        """Holt-Winters forecasts for horizon_days from `start`, one row per hub and date (and hour)."""
+        model, hubs, history_end = self._holt_winters_fit(df, forecast_type)
+        return self._holt_winters_forecast(model, hubs, history_end, horizon_days, start, forecast_type)
+
+    def _holt_winters_fit(self, df: pd.DataFrame, forecast_type: str) -> Tuple[HoltWinters, list, pd.Timestamp]:
+        """
+        Fit Holt-Winters to every hub's daily or hourly order counts.
+
+        `df` holds order counts per hub, date and hour. They are laid out as a dense
+        (hub, day) or (hub, hour) array: zero where a hub had no orders, NaN before a hub's
+        first order so late-starting hubs are not fitted to a run of zeros.
+
+        Returns:
+            (fitted model, hub_id per model row, first date after the history)
+        """
+        codes, hubs = self._series_codes(df, by_hub=True)
+        dates = pd.to_datetime(df['order_date'])
+        first_date = dates.min().normalize()
+        day = (dates - first_date).dt.days.to_numpy()
+        n_days = int(day.max()) + 1
+
+        if forecast_type == 'hourly':
+            per_day, season_length = 24, 168
+            index = day * 24 + df['hour_of_day'].to_numpy(dtype=int)
+        else:
+            per_day, season_length = 1, 7
+            index = day
+        y = np.zeros((len(hubs), n_days * per_day))
+        np.add.at(y, (codes, index), df['order_count'].to_numpy(dtype=float))
+        first_seen = np.full(len(hubs), y.shape[1])
+        np.minimum.at(first_seen, codes, index)
+        y[np.arange(y.shape[1]) < first_seen[:, None]] = np.nan
+
+        model = HoltWinters(season_length).fit(y)
+        return model, hubs, first_date + pd.Timedelta(days=n_days)
+
+    def _holt_winters_forecast(self, model: HoltWinters, hubs: list, history_end: pd.Timestamp,
+                               horizon_days: int, start: datetime, forecast_type: str) -> pd.DataFrame:
+        """Forecast frame from a fitted model; days between history_end and `start` are forecast and dropped."""
+        per_day = 24 if forecast_type == 'hourly' else 1
+        gap = max(0, (pd.Timestamp(start).normalize() - history_end).days)
+        mean, std = model.forecast((gap + horizon_days) * per_day)
+        mean, std = mean[:, gap * per_day:], std[:, gap * per_day:]
+        mean = np.maximum(mean, 0)
+
+        dates = pd.date_range(pd.Timestamp(start).normalize(), periods=horizon_days, freq='D')
+        n_slots = horizon_days * per_day
+        columns = {
+            'hub_id': np.repeat(hubs, n_slots),
+            'date': np.tile(np.repeat(dates.strftime('%Y-%m-%d').to_numpy(), per_day), len(hubs)),
+            'day_of_week': np.tile(np.repeat(dates.strftime('%A').to_numpy(), per_day), len(hubs))
+        }
+        if forecast_type == 'hourly':
+            columns['hour'] = np.tile([f"{h:02d}:00" for h in range(24)], horizon_days * len(hubs))
+        columns.update({
+            'forecasted_demand': np.round(mean, 1).ravel(),
+            'lower_bound': np.maximum(0, np.round(mean - std, 1)).ravel(),
+            'upper_bound': np.round(mean + std, 1).ravel()
+        })
+        return pd.DataFrame(columns)
+
     def forecast_daily_demand(self, horizon_days: int = 30, hub_id: int = None) -> Dict:
         """
         Forecast daily delivery demand.
@@ -265,6 +555,14 @@ class DemandForecaster:
         Returns:
             Dictionary with daily demand forecasts
         """
+        return self._memoized(
+            'daily', (hub_id or None, horizon_days),
+            lambda history_cache: self._forecast_daily_demand(horizon_days, hub_id, history_cache)
+        )
+
+    def _forecast_daily_demand(self, horizon_days: int = 30, hub_id: int = None,
+                               history_cache: Optional[str] = 'historical') -> Dict:
+        """forecast_daily_demand without the forecast cache."""
         print(f"\n📅 Forecasting daily demand for next {horizon_days} days...")
 
         # Query historical daily patterns from orders table
@@ -279,31 +577,17 @@ class DemandForecaster:
             AND created_at < CURRENT_DATE
             {}
             GROUP BY DATE(created_at), EXTRACT(DOW FROM created_at)
-        ),
-        dow_averages AS (
-            SELECT
-                day_of_week,
-                AVG(order_count) as avg_orders,
-                STDDEV(order_count) as stddev_orders
-            FROM daily_orders
-            GROUP BY day_of_week
         )
-        SELECT
-            ds.date,
-            ds.day_of_week,
-            ds.order_count,
-            da.avg_orders,
-            da.stddev_orders
-        FROM daily_orders ds
-        LEFT JOIN dow_averages da ON ds.day_of_week = da.day_of_week
-        ORDER BY ds.date
+        SELECT date, day_of_week, order_count
+        FROM daily_orders
+        ORDER BY date
         """.format("AND hub_id = %s" if hub_id else "")
 
         try:
             params = [hub_id] if hub_id else []
-            results = self.db.execute_query(query, params, timeout=30.0)
+            df = self.db.query_dataframe(query, params, timeout=30.0, cache=history_cache)
 
-            if not results:
+            if df.empty:
                 print("⚠ No historical data found")
                 return {
                     "error": "Insufficient historical data",
@@ -311,62 +595,9 @@ class DemandForecaster:
                     "fallback_available": self.db.enable_fallback
                 }
 
-            df = pd.DataFrame(results)
-
-            # Calculate weekly trend (simple linear regression on last 30 days)
-            recent_30 = df.tail(30).copy()
-            if len(recent_30) > 1:
-                x = np.arange(len(recent_30))
-                y = recent_30['order_count'].values
-                slope, intercept = np.polyfit(x, y, 1)
-                daily_growth_rate = slope / np.mean(y) if np.mean(y) > 0 else 0
-            else:
-                daily_growth_rate = 0
-
-            # Generate forecasts
-            forecasts = []
-            today = datetime.now()
-            dow_averages = df.groupby('day_of_week').agg({
-                'avg_orders': 'first',
-                'stddev_orders': 'first'
-            }).to_dict('index')
-
-            for day_offset in range(horizon_days):
-                forecast_date = today + timedelta(days=day_offset)
-                dow = forecast_date.weekday() + 1
-                if dow == 7:
-                    dow = 0
-
-                if dow in dow_averages:
-                    base_demand = dow_averages[dow]['avg_orders']
-                    std_demand = dow_averages[dow]['stddev_orders'] or 0
-
-                    # Apply trend adjustment (convert Decimal to float for arithmetic operations)
-                    trend_adjustment = float(base_demand) * daily_growth_rate * day_offset
-                    forecasted = float(base_demand) + trend_adjustment
-                    std_demand_float = float(std_demand) if std_demand else 0
-
-                    forecasts.append({
-                        'date': forecast_date.strftime('%Y-%m-%d'),
-                        'day_of_week': forecast_date.strftime('%A'),
-                        'forecasted_demand': round(forecasted, 1),
-                        'lower_bound': max(0, round(forecasted - std_demand_float, 1)),
-                        'upper_bound': round(forecasted + std_demand_float, 1),
-                        'trend_contribution': round(trend_adjustment, 1)
-                    })
-                else:
-                    # Fallback to overall average
-                    overall_avg = df['order_count'].mean()
-                    forecasts.append({
-                        'date': forecast_date.strftime('%Y-%m-%d'),
-                        'day_of_week': forecast_date.strftime('%A'),
-                        'forecasted_demand': round(overall_avg, 1),
-                        'lower_bound': max(0, round(overall_avg * 0.8, 1)),
-                        'upper_bound': round(overall_avg * 1.2, 1),
-                        'trend_contribution': 0
-                    })
-
-            forecast_df = pd.DataFrame(forecasts)
+            forecast_df, growth = self._daily_forecast_grid(df, horizon_days, datetime.now())
+            daily_growth_rate = growth[0]
+            forecasts = forecast_df.to_dict('records')
 
             stats = {
                 'total_days': len(forecasts),
@@ -392,10 +623,10 @@ class DemandForecaster:
                 'connection_info': self.get_connection_info()
             }
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            print(f"✗ Daily forecast failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Daily forecast failed")
             
             return {
                 "error": str(e),
@@ -442,17 +673,15 @@ class DemandForecaster:
 
         try:
             params = [hub_id] if hub_id else []
-            results = self.db.execute_query(query, params, timeout=30.0)
+            df = self.db.query_dataframe(query, params, timeout=30.0, cache='historical')
 
-            if not results:
+            if df.empty:
                 return {
                     "error": "Insufficient historical data",
                     "data_source": self.data_source,
                     "fallback_available": self.db.enable_fallback
                 }
 
-            df = pd.DataFrame(results)
-
             # Calculate growth trend
             if len(df) > 1:
                 x = np.arange(len(df))
@@ -504,10 +733,10 @@ class DemandForecaster:
                 'connection_info': self.get_connection_info()
             }
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            print(f"✗ Weekly forecast failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Weekly forecast failed")
             
             return {
                 "error": str(e),
@@ -536,6 +765,13 @@ class DemandForecaster:
         Returns:
             Dictionary with resource requirement forecasts
         """
+        return self._memoized(
+            'resource', (horizon_days,),
+            lambda history_cache: self._forecast_resource_requirements(horizon_days)
+        )
+
+    def _forecast_resource_requirements(self, horizon_days: int = 7) -> Dict:
+        """forecast_resource_requirements without the forecast cache."""
         print(f"\n👥 Forecasting resource requirements for next {horizon_days} days...")
 
         # Get demand forecast first
@@ -761,6 +997,17 @@ def main():
         type=int,
         help='Specific hub ID to forecast'
     )
+    parser.add_argument(
+        '--all_hubs',
+        action='store_true',
+        help='Forecast every hub in one batch (hourly or daily)'
+    )
+    parser.add_argument(
+        '--method',
+        choices=['seasonal_mean', 'holt_winters'],
+        default='seasonal_mean',
+        help='Model for --all_hubs (default: seasonal_mean)'
+    )
     parser.add_argument(
         '--output',
         choices=['console', 'json'],
@@ -775,6 +1022,20 @@ def main():
     forecaster.connect()
 
     try:
+        if args.all_hubs:
+            if args.forecast_type not in ('hourly', 'daily'):
+                parser.error("--all_hubs supports --forecast_type hourly or daily")
+            table = forecaster.forecast_all_hubs(horizon_days=args.horizon, forecast_type=args.forecast_type,
+                                                 method=args.method)
+            if args.output == 'json':
+                print("\n" + table.to_json(orient='records', indent=2))
+            elif not table.empty:
+                totals = table.groupby('hub_id')['forecasted_demand'].sum().sort_values(ascending=False)
+                print(f"\n📊 Forecasted deliveries per hub, next {args.horizon} days (top 20 of {len(totals)}):")
+                for hub, total in totals.head(20).items():
+                    print(f"  Hub {hub}: {total:,.0f}")
+            return
+
         # Generate forecast
         if args.forecast_type == 'hourly':
             results = forecaster.forecast_hourly_demand(horizon_days=args.horizon, hub_id=args.hub_id)
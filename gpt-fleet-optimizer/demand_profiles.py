@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Demand Profiles - Fleet Optimizer Module
+Persisted seasonal demand profiles for the demand forecaster.
+
+forecast_hourly_demand models demand as the mean and standard deviation of hourly order
+counts per day of week and hour over the last 90 complete days. Rederiving that profile
+scans 90 days of orders on every forecast. analytics_demand_profile keeps it instead: per
+hub (hub_id 0 = all orders), day of week and hour, the sample count, running mean and sum
+of squared deviations (Welford's M2).
+
+A daily refresh moves the 90-day window forward without rescanning it. It folds in the
+hourly counts of the days that entered the window and takes out the days that left it,
+using the pairwise (Chan et al.) form of Welford's update for adding and removing a batch.
+Maintenance reads two days of orders; forecasts read ~170 profile rows per hub. As in the
+raw query, an hour with no orders on a given day is not a sample.
+
+Usage:
+    python demand_profiles.py --create     # create tables and build the current window
+    python demand_profiles.py --refresh    # fold in new days (schedule daily, after midnight)
+    python demand_profiles.py --rebuild    # recompute the window (after backfills or corrections)
+    python demand_profiles.py --status
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import timedelta
+from typing import Dict, Optional
+
+import pandas as pd
+
+from database_connection import DatabaseConnection, get_database_connection
+
+
+# Profile of all orders, including those without a hub (hub ids start at 1)
+ALL_HUBS = 0
+
+PROFILE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analytics_demand_profile (
+    hub_id INTEGER NOT NULL,
+    day_of_week SMALLINT NOT NULL,
+    hour_of_day SMALLINT NOT NULL,
+    n BIGINT NOT NULL,
+    mean DOUBLE PRECISION NOT NULL,
+    m2 DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (hub_id, day_of_week, hour_of_day)
+);
+
+CREATE TABLE IF NOT EXISTS analytics_demand_profile_state (
+    profile TEXT PRIMARY KEY,
+    window_start DATE,
+    window_end DATE,
+    refreshed_at TIMESTAMPTZ,
+    days_added INTEGER,
+    days_removed INTEGER,
+    duration_ms DOUBLE PRECISION
+);
+
+INSERT INTO analytics_demand_profile_state (profile) VALUES ('hourly') ON CONFLICT DO NOTHING;
+"""
+
+# Hourly order counts per day in [start, end), per hub and for all orders
+DAY_COUNTS = """
+SELECT
+    CASE WHEN GROUPING(hub_id) = 1 THEN 0 ELSE hub_id END AS hub_id,
+    EXTRACT(DOW FROM created_at) AS day_of_week,
+    EXTRACT(HOUR FROM created_at) AS hour_of_day,
+    COUNT(*) AS order_count
+FROM orders
+WHERE created_at >= %(start)s::date
+AND created_at < %(end)s::date
+GROUP BY GROUPING SETS (
+    (hub_id, DATE(created_at), EXTRACT(DOW FROM created_at), EXTRACT(HOUR FROM created_at)),
+    (DATE(created_at), EXTRACT(DOW FROM created_at), EXTRACT(HOUR FROM created_at))
+)
+HAVING GROUPING(hub_id) = 1 OR hub_id IS NOT NULL
+"""
+
+BATCH_STATS = """
+SELECT
+    hub_id,
+    day_of_week,
+    hour_of_day,
+    COUNT(*) AS n,
+    AVG(order_count)::float8 AS mean,
+    COALESCE(VAR_POP(order_count)::float8 * COUNT(*), 0) AS m2
+FROM {}
+GROUP BY hub_id, day_of_week, hour_of_day
+"""
+
+PROFILE_REBUILD = """
+DELETE FROM analytics_demand_profile;
+INSERT INTO analytics_demand_profile (hub_id, day_of_week, hour_of_day, n, mean, m2)
+""" + BATCH_STATS.format('profile_days')
+
+# Combine (n_a, mean_a, M2_a) with a batch (n_b, mean_b, M2_b):
+#   n = n_a + n_b, mean = mean_a + d * n_b / n, M2 = M2_a + M2_b + d^2 * n_a * n_b / n, d = mean_b - mean_a
+PROFILE_ADD = """
+INSERT INTO analytics_demand_profile AS p (hub_id, day_of_week, hour_of_day, n, mean, m2)
+""" + BATCH_STATS.format('profile_days') + """
+ON CONFLICT (hub_id, day_of_week, hour_of_day) DO UPDATE SET
+    n = p.n + EXCLUDED.n,
+    mean = p.mean + (EXCLUDED.mean - p.mean) * EXCLUDED.n / (p.n + EXCLUDED.n),
+    m2 = p.m2 + EXCLUDED.m2 + (EXCLUDED.mean - p.mean) ^ 2 * p.n * EXCLUDED.n / (p.n + EXCLUDED.n)
+"""
+
+# The same identity solved for the remainder r = a - b
+PROFILE_REMOVE = """
+WITH batch AS (
+""" + BATCH_STATS.format('profile_days') + """
+),
+remainder AS (
+    SELECT
+        p.hub_id,
+        p.day_of_week,
+        p.hour_of_day,
+        p.n - b.n AS n,
+        (p.n * p.mean - b.n * b.mean) / NULLIF(p.n - b.n, 0) AS mean,
+        p.m2 - b.m2 AS m2_less_batch,
+        b.n AS batch_n,
+        b.mean AS batch_mean,
+        p.n AS total_n
+    FROM analytics_demand_profile p
+    JOIN batch b USING (hub_id, day_of_week, hour_of_day)
+)
+UPDATE analytics_demand_profile p SET
+    n = r.n,
+    mean = COALESCE(r.mean, 0),
+    m2 = COALESCE(GREATEST(r.m2_less_batch - (r.batch_mean - r.mean) ^ 2 * r.n * r.batch_n / r.total_n, 0), 0)
+FROM remainder r
+WHERE p.hub_id = r.hub_id AND p.day_of_week = r.day_of_week AND p.hour_of_day = r.hour_of_day;
+DELETE FROM analytics_demand_profile WHERE n <= 0
+"""
+
+
+class DemandProfileStore:
+    """Maintains the persisted demand profile and serves it to the forecaster."""
+
+    def __init__(self, db: DatabaseConnection, window_days: int = 90, rebuild_after_days: int = 30,
+                 readiness_ttl: float = 60.0):
+        """
+        Initialize the profile store.
+
+        Args:
+            db: Database connection shared with the forecaster
+            window_days: Complete days in the profile window (the forecaster's 90-day history)
+            rebuild_after_days: Rebuild instead of folding in when more days than this are missing
+            readiness_ttl: Seconds a readiness check is reused
+        """
+        self.db = db
+        self.window_days = window_days
+        self.rebuild_after_days = rebuild_after_days
+        self.readiness_ttl = readiness_ttl
+        self.enabled = os.getenv('DEMAND_PROFILES', 'auto').lower() not in ('0', 'off', 'false', 'no')
+
+        self._lock = threading.Lock()
+        self._ready = None
+        self._ready_checked = 0.0
+
+    def create_tables(self, build: bool = True) -> Dict:
+        """Create the profile tables (idempotent) and optionally build the current window."""
+        self.db.execute_query(PROFILE_SCHEMA, timeout=None)
+        return self.refresh(full=True) if build else {}
+
+    def refresh(self, full: bool = False) -> Dict:
+        """
+        Move the profile window to the last window_days complete days.
+
+        Args:
+            full: Recompute the window instead of folding in and taking out days
+
+        Returns:
+            Mode, window, days added and removed, duration
+        """
+        start = time.monotonic()
+        execute = self.db.execute_in_transaction
+        with self.db.get_cursor() as cursor:
+            execute(cursor, "SET LOCAL statement_timeout = 0")
+            # Row lock serializes concurrent refreshers
+            execute(cursor,
+                "SELECT window_start, window_end, CURRENT_DATE AS today "
+                "FROM analytics_demand_profile_state WHERE profile = 'hourly' FOR UPDATE"
+            )
+            state = cursor.fetchone()
+            if state is None:
+                raise RuntimeError("Demand profiles are not set up; run python demand_profiles.py --create")
+
+            target_end = state['today']
+            target_start = target_end - timedelta(days=self.window_days)
+            window_start, window_end = state['window_start'], state['window_end']
+            rebuild = (full or window_end is None or window_end > target_end or
+                       (target_end - window_end).days > self.rebuild_after_days)
+
+            days_added = days_removed = 0
+            if rebuild:
+                self._load_days(cursor, target_start, target_end)
+                execute(cursor, PROFILE_REBUILD)
+                days_added = self.window_days
+            else:
+                if window_end < target_end:
+                    self._load_days(cursor, window_end, target_end)
+                    execute(cursor, PROFILE_ADD)
+                    days_added = (target_end - window_end).days
+                if window_start < target_start:
+                    self._load_days(cursor, window_start, target_start)
+                    execute(cursor, PROFILE_REMOVE)
+                    days_removed = (target_start - window_start).days
+
+            duration_ms = round((time.monotonic() - start) * 1000, 1)
+            execute(cursor,
+                "UPDATE analytics_demand_profile_state SET window_start = %s, window_end = %s, refreshed_at = NOW(), "
+                "days_added = %s, days_removed = %s, duration_ms = %s WHERE profile = 'hourly'",
+                [target_start, target_end, days_added, days_removed, duration_ms]
+            )
+
+        with self._lock:
+            self._ready = None
+        return {
+            'mode': 'full' if rebuild else 'incremental',
+            'window_start': target_start.isoformat(),
+            'window_end': target_end.isoformat(),
+            'days_added': days_added,
+            'days_removed': days_removed,
+            'duration_ms': duration_ms
+        }
+
+    def _load_days(self, cursor, start, end):
+        execute = self.db.execute_in_transaction
+        execute(cursor, "DROP TABLE IF EXISTS profile_days")
+        execute(cursor, f"CREATE TEMP TABLE profile_days ON COMMIT DROP AS {DAY_COUNTS}", {'start': start, 'end': end})
+
+    def status(self) -> Dict:
+        """Profile window, last refresh and size."""
+        rows = self.db.execute_query("""
+        SELECT
+            s.window_start,
+            s.window_end,
+            s.refreshed_at,
+            s.days_added,
+            s.days_removed,
+            s.duration_ms,
+            (SELECT COUNT(DISTINCT hub_id) FROM analytics_demand_profile WHERE hub_id <> 0) AS hubs,
+            (SELECT COUNT(*) FROM analytics_demand_profile) AS profile_rows
+        FROM analytics_demand_profile_state s
+        WHERE s.profile = 'hourly'
+        """)
+        status = rows[0] if rows else {}
+        for column in ('window_start', 'window_end', 'refreshed_at'):
+            if status.get(column) is not None:
+                status[column] = status[column].isoformat()
+        return status
+
+    def is_ready(self) -> bool:
+        """
+        Whether the forecaster should read the profile.
+
+        True when profiles are enabled (DEMAND_PROFILES), the tables exist and the window
+        ends today, i.e. it covers the same days as the raw 90-day query. The answer is
+        cached for readiness_ttl seconds; any failure counts as not ready.
+        """
+        if not self.enabled or self.db.is_fallback_mode:
+            return False
+        with self._lock:
+            if self._ready is not None and time.monotonic() - self._ready_checked < self.readiness_ttl:
+                return self._ready
+
+        try:
+            rows = self.db.execute_query("SELECT to_regclass('analytics_demand_profile_state') IS NOT NULL AS present")
+            ready = bool(rows and rows[0]['present'])
+            if ready:
+                rows = self.db.execute_query(
+                    "SELECT window_end = CURRENT_DATE AND window_start = CURRENT_DATE - %s AS current "
+                    "FROM analytics_demand_profile_state WHERE profile = 'hourly'",
+                    [self.window_days]
+                )
+                ready = bool(rows and rows[0]['current'])
+        except Exception:
+            ready = False
+
+        with self._lock:
+            self._ready = ready
+            self._ready_checked = time.monotonic()
+        return ready
+
+    def hourly_stats(self, hub_id: int = None, all_hubs: bool = False,
+                     cache: Optional[str] = 'historical') -> pd.DataFrame:
+        """
+        Profile rows as (hub_id,) day_of_week, hour_of_day, mean, std, count.
+
+        Args:
+            hub_id: Hub to read (None = all orders)
+            all_hubs: Read every hub's profile (with a hub_id column) instead
+            cache: Query cache class for the read (None reads the table)
+        """
+        query = """
+        SELECT
+            hub_id,
+            day_of_week,
+            hour_of_day,
+            mean,
+            CASE WHEN n > 1 THEN sqrt(m2 / (n - 1)) END AS std,
+            n AS count
+        FROM analytics_demand_profile
+        WHERE {}
+        ORDER BY hub_id, day_of_week, hour_of_day
+        """.format("hub_id <> %s" if all_hubs else "hub_id = %s")
+        params = [ALL_HUBS] if all_hubs else [hub_id or ALL_HUBS]
+        stats = self.db.query_dataframe(query, params, cache=cache)
+        return stats if all_hubs else stats.drop(columns='hub_id')
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Maintain persisted demand profiles')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--create', action='store_true', help='Create profile tables and build the window')
+    group.add_argument('--refresh', action='store_true', help='Fold in new days, take out expired ones')
+    group.add_argument('--rebuild', action='store_true', help='Recompute the whole window')
+    group.add_argument('--status', action='store_true', help='Show the profile window and size')
+    args = parser.parse_args()
+
+    db = get_database_connection()
+    db.connect(retry_attempts=1)
+    store = DemandProfileStore(db)
+
+    try:
+        if args.create:
+            results = store.create_tables()
+        elif args.refresh:
+            results = store.refresh()
+        elif args.rebuild:
+            results = store.refresh(full=True)
+        else:
+            results = store.status()
+        print(json.dumps(results, indent=2, default=str))
+    except Exception as e:
+        print(f"❌ Demand profile {'status' if args.status else 'refresh'} failed: {e}")
+        sys.exit(1)
+    finally:
+        db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Exponential Smoothing - Fleet Optimizer Module
+Batched additive Holt-Winters (ETS(A,Ad,A)) for many demand series at once.
+
+HoltWinters fits every row of a 2-D array (series x time) in one pass. The smoothing
+recursion runs over time; each step updates all series and all candidate parameter sets
+together as NumPy arrays, so a thousand hub series cost about as many Python steps as one.
+Parameters are chosen per series from a fixed grid by in-sample one-step squared error,
+which stands in for per-series numerical likelihood optimization (that does not batch).
+
+Model, in error-correction form with season length m and damping phi:
+    forecast_t = level + phi * trend + season[t - m]
+    e_t        = y_t - forecast_t
+    level      = level + phi * trend + alpha * e_t
+    trend      = phi * trend + beta * e_t
+    season[t]  = season[t - m] + gamma * e_t
+
+NaN observations are treated as missing: states advance without an error correction.
+Series that start late should be NaN-padded, not zero-padded.
+"""
+
+import itertools
+from typing import Tuple
+
+import numpy as np
+
+
+# alpha, beta as a fraction of alpha, gamma as a fraction of (1 - alpha), damping
+DEFAULT_GRID = {
+    'alpha': (0.05, 0.1, 0.2, 0.3, 0.5, 0.7),
+    'beta': (0.0, 0.1),
+    'gamma': (0.05, 0.15, 0.3),
+    'phi': (0.9, 0.98)
+}
+
+
+def parameter_grid(grid: dict = None) -> np.ndarray:
+    """
+    Candidate (alpha, beta, gamma, phi) rows within the admissible region
+    0 < alpha < 1, 0 <= beta <= alpha, 0 < gamma < 1 - alpha.
+
+    Without a trend (beta = 0) the damping has no effect, so only one phi is kept.
+    """
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    rows = set()
+    for alpha, beta, gamma, phi in itertools.product(grid['alpha'], grid['beta'], grid['gamma'], grid['phi']):
+        if beta == 0:
+            phi = max(grid['phi'])
+        rows.add((alpha, beta * alpha, gamma * (1 - alpha), phi))
+    return np.array(sorted(rows))
+
+
+def _nanmean_rows(values: np.ndarray) -> np.ndarray:
+    """Row means ignoring NaN; NaN for rows without observations (no all-NaN warning)."""
+    present = ~np.isnan(values)
+    count = present.sum(axis=1)
+    total = np.where(present, values, 0.0).sum(axis=1)
+    return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+class HoltWinters:
+    """Additive damped Holt-Winters fitted to every row of a (series, time) array."""
+
+    def __init__(self, season_length: int, grid: dict = None, max_chunk_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the model.
+
+        Args:
+            season_length: Observations per season (7 for daily data, 168 for hourly)
+            grid: Overrides for DEFAULT_GRID
+            max_chunk_bytes: Bound on the seasonal state held at once; series are fitted in
+                chunks of at most this many bytes of (series, parameter set, season) floats
+        """
+        self.season_length = season_length
+        self.params = parameter_grid(grid)
+        self.max_chunk_bytes = max_chunk_bytes
+
+        self.alpha = self.beta = self.gamma = self.phi = None
+        self.level = self.trend = self.season = self.sigma = None
+        self.n_obs = 0
+
+    def fit(self, y: np.ndarray) -> 'HoltWinters':
+        """
+        Fit every series (row) of y.
+
+        Args:
+            y: (series, time) array with at least one full season; NaN = missing
+
+        Returns:
+            self, with per-series parameters, final states and residual sigma
+        """
+        y = np.atleast_2d(np.asarray(y, dtype=float))
+        m = self.season_length
+        if y.shape[1] < m:
+            raise ValueError(f"Need at least one season ({m} observations), got {y.shape[1]}")
+
+        n_series = y.shape[0]
+        self.n_obs = y.shape[1]
+        self.alpha, self.beta, self.gamma, self.phi = (np.empty(n_series) for _ in range(4))
+        self.level, self.trend, self.sigma = (np.empty(n_series) for _ in range(3))
+        self.season = np.empty((n_series, m))
+
+        chunk = max(1, self.max_chunk_bytes // (len(self.params) * m * 8))
+        for lo in range(0, n_series, chunk):
+            self._fit_chunk(y[lo:lo + chunk], slice(lo, lo + chunk))
+        return self
+
+    def _fit_chunk(self, y: np.ndarray, rows: slice):
+        m = self.season_length
+        n_series, n_obs = y.shape
+        n_params = len(self.params)
+        alpha, beta, gamma, phi = (self.params[:, i] for i in range(4))
+
+        start, level0, trend0, season0 = self._initial_states(y)
+        level = np.repeat(level0[:, None], n_params, axis=1)
+        trend = np.repeat(trend0[:, None], n_params, axis=1)
+        season = np.repeat(season0[:, None, :], n_params, axis=1)
+        sse = np.zeros((n_series, n_params))
+        observed = np.zeros(n_series)
+
+        for t in range(n_obs):
+            s = t % m
+            damped = phi * trend
+            y_t = y[:, t]
+            present = ~np.isnan(y_t)
+            e = np.where(present[:, None], np.nan_to_num(y_t)[:, None] - (level + damped + season[:, :, s]), 0.0)
+            sse += e * e
+            observed += present
+            # States stand still until a series' first observation
+            started = (t >= start)[:, None]
+            level += np.where(started, damped + alpha * e, 0.0)
+            trend = np.where(started, damped + beta * e, trend)
+            season[:, :, s] += gamma * e
+
+        best = np.argmin(sse, axis=1)
+        index = np.arange(n_series)
+        self.alpha[rows], self.beta[rows], self.gamma[rows], self.phi[rows] = self.params[best].T
+        self.level[rows] = level[index, best]
+        self.trend[rows] = trend[index, best]
+        # Align the seasonal ring buffer so column j is the season of observation n_obs + j
+        self.season[rows] = np.roll(season[index, best], -(n_obs % m), axis=1)
+        self.sigma[rows] = np.sqrt(sse[index, best] / np.maximum(observed, 1))
+
+    def _initial_states(self, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Start index, level, trend and seasonal ring buffer of every series.
+
+        Each series starts at its first observation. Level and trend come from the means of
+        its first two seasons, the season from its first season's deviations, stored in the
+        ring slots (t % m) of the observations they came from.
+        """
+        m = self.season_length
+        n_series, n_obs = y.shape
+        present = ~np.isnan(y)
+        start = np.where(present.any(axis=1), present.argmax(axis=1), 0)
+
+        positions = start[:, None] + np.arange(2 * m)
+        window = np.take_along_axis(y, np.minimum(positions, n_obs - 1), axis=1)
+        window[positions >= n_obs] = np.nan
+
+        first = np.nan_to_num(_nanmean_rows(window[:, :m]))
+        second = _nanmean_rows(window[:, m:])
+        trend = np.where(np.isnan(second), 0.0, (second - first) / m)
+        deviations = np.nan_to_num(window[:, :m] - first[:, None])
+        deviations -= deviations.mean(axis=1, keepdims=True)
+        season = np.empty((n_series, m))
+        np.put_along_axis(season, positions[:, :m] % m, deviations, axis=1)
+        # `first` is the level at the middle of the first season; step back to just before it
+        level = first - trend * (m + 1) / 2
+        return start, level, trend, season
+
+    def forecast(self, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Point forecasts and forecast standard deviations for the next `horizon` steps.
+
+        The variance is the exact ETS(A,Ad,A) h-step variance,
+        sigma^2 * (1 + sum_{j<h} c_j^2) with c_j = alpha + beta * (phi + ... + phi^j) + gamma * [j % m == 0].
+
+        Returns:
+            (mean, std), each (series, horizon)
+        """
+        m = self.season_length
+        steps = np.arange(1, horizon + 1)
+        phi_powers = self.phi[:, None] ** steps
+        damped_sum = np.cumsum(phi_powers, axis=1)  # phi + ... + phi^h
+
+        season = self.season[:, (steps - 1) % m]
+        mean = self.level[:, None] + damped_sum * self.trend[:, None] + season
+
+        c = (self.alpha[:, None] + self.beta[:, None] * damped_sum[:, :-1] +
+             self.gamma[:, None] * (steps[:-1] % m == 0))
+        variance = np.concatenate([np.ones((len(mean), 1)), 1 + np.cumsum(c * c, axis=1)], axis=1)
+        return mean, self.sigma[:, None] * np.sqrt(variance)
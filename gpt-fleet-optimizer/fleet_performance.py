@@ -19,16 +19,21 @@ Usage:
 
 import os
 import sys
+import logging
 import json
 import argparse
 from datetime import datetime, timedelta
 from typing import Dict, List
-import psycopg2
-from psycopg2.extras import RealDictCursor
 import pandas as pd
 import numpy as np
 from scipy import stats
 
+from database_connection import QueryTimeoutError, get_database_connection, register_statement
+from rollups import RollupManager, courier_performance_query
+
+
+logger = logging.getLogger(__name__)
+
 
 class FleetPerformanceAnalyzer:
     """Analyzes fleet (courier and vehicle) performance metrics."""
@@ -50,12 +55,14 @@ class FleetPerformanceAnalyzer:
             }
 
         self.db_config = db_config
-        self.conn = None
+        # Queries borrow connections from the shared pool, so one instance is safe across threads
+        self.db = get_database_connection(config=db_config)
+        self.rollups = RollupManager(self.db)
 
     def connect(self):
         """Establish database connection."""
         try:
-            self.conn = psycopg2.connect(**self.db_config)
+            self.db.connect(retry_attempts=1)
             print("✓ Connected to BarqFleet production database successfully")
         except Exception as e:
             print(f"✗ Database connection failed: {e}")
@@ -63,9 +70,8 @@ class FleetPerformanceAnalyzer:
 
     def disconnect(self):
         """Close database connection."""
-        if self.conn:
-            self.conn.close()
-            print("✓ Database connection closed")
+        self.db.disconnect()
+        print("✓ Database connection closed")
 
     def analyze_courier_performance(self, period: str = 'monthly', courier_id: int = None) -> Dict:
         """
@@ -98,7 +104,7 @@ class FleetPerformanceAnalyzer:
         else:
             start_date = end_date - timedelta(days=30)
 
-        query = """
+        query = register_statement('fleet_courier_metrics_single' if courier_id else 'fleet_courier_metrics', """
         WITH courier_metrics AS (
             SELECT
                 s.courier_id,
@@ -163,38 +169,22 @@ class FleetPerformanceAnalyzer:
             (cm.cancelled_shipments::float / cm.total_shipments * 100) as cancellation_rate
         FROM courier_metrics cm
         ORDER BY completion_rate DESC, on_time_rate DESC
-        """.format("AND s.courier_id = %s" if courier_id else "")
+        """.format("AND s.courier_id = %s" if courier_id else ""))
 
         try:
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
             params = [start_date, end_date]
             if courier_id:
                 params.append(courier_id)
+            if self.rollups.is_ready():
+                query, params = courier_performance_query(start_date, end_date, courier_id)
 
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            cursor.close()
+            df = self.db.query_dataframe(query, params, cache='recent')
 
-            if not results:
+            if df.empty:
                 print("⚠ No courier performance data found")
                 return {"error": "No data available"}
 
-            df = pd.DataFrame(results)
-
-            # Calculate Courier Performance Index (CPI)
-            # Composite score: completion_rate (40%) + on_time_rate (30%) + shipments_per_day normalized (20%) + speed (10%)
-            max_shipments_per_day = df['shipments_per_day'].max() if df['shipments_per_day'].max() > 0 else 1
-            min_avg_hours = df['avg_delivery_hours'].min() if not pd.isna(df['avg_delivery_hours'].min()) else 1
-
-            # Fill NaN values with 0 for on_time_rate
-            df['on_time_rate'] = df['on_time_rate'].fillna(0)
-
-            df['cpi'] = (
-                (df['completion_rate'] * 0.40) +
-                (df['on_time_rate'] * 0.30) +
-                ((df['shipments_per_day'] / max_shipments_per_day) * 100 * 0.20) +
-                ((min_avg_hours / df['avg_delivery_hours'].replace(0, 1)) * 100 * 0.10)
-            ).clip(0, 100)
+            df = self._score_couriers(df)
 
             # Rank couriers
             df = df.sort_values('cpi', ascending=False)
@@ -255,12 +245,10 @@ class FleetPerformanceAnalyzer:
                 'recommendations': self._generate_courier_recommendations(df)
             }
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
-            print(f"✗ Courier performance analysis failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Courier performance analysis failed")
             return {"error": str(e)}
 
     def analyze_vehicle_performance(self, period: str = 'monthly', vehicle_type: str = None) -> Dict:
@@ -289,7 +277,7 @@ class FleetPerformanceAnalyzer:
         else:
             start_date = end_date - timedelta(days=30)
 
-        query = """
+        query = register_statement('fleet_vehicle_metrics_single' if vehicle_type else 'fleet_vehicle_metrics', """
         WITH vehicle_metrics AS (
             SELECT
                 c.vehicle_type,
@@ -332,32 +320,20 @@ class FleetPerformanceAnalyzer:
             (vm.total_distance_km / vm.courier_count / vm.active_days) as km_per_courier_per_day
         FROM vehicle_metrics vm
         ORDER BY completion_rate DESC
-        """.format("AND c.vehicle_type = %s" if vehicle_type else "")
+        """.format("AND c.vehicle_type = %s" if vehicle_type else ""))
 
         try:
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
             params = [start_date, end_date]
             if vehicle_type:
                 params.append(vehicle_type)
 
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            cursor.close()
+            df = self.db.query_dataframe(query, params, cache='recent')
 
-            if not results:
+            if df.empty:
                 print("⚠ No vehicle type performance data found")
                 return {"error": "No data available"}
 
-            df = pd.DataFrame(results)
-
-            # Calculate Vehicle Performance Index (VPI)
-            max_shipments_per_day = df['shipments_per_day'].max() if df['shipments_per_day'].max() > 0 else 1
-
-            df['vpi'] = (
-                (df['completion_rate'] * 0.40) +
-                (df['on_time_rate'].fillna(0) * 0.30) +
-                ((df['shipments_per_day'] / max_shipments_per_day) * 100 * 0.30)
-            ).clip(0, 100)
+            df = self._score_vehicles(df)
 
             df = df.sort_values('vpi', ascending=False)
             df['rank'] = range(1, len(df) + 1)
@@ -389,14 +365,46 @@ class FleetPerformanceAnalyzer:
                 'recommendations': self._generate_vehicle_recommendations(df, underutilized)
             }
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
-            print(f"✗ Vehicle performance analysis failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Vehicle performance analysis failed")
             return {"error": str(e)}
 
+    @staticmethod
+    def _score_couriers(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the Courier Performance Index (CPI) column.
+
+        Composite score: completion_rate (40%) + on_time_rate (30%) +
+        shipments_per_day normalized (20%) + speed (10%)
+        """
+        max_shipments_per_day = df['shipments_per_day'].max() if df['shipments_per_day'].max() > 0 else 1
+        min_avg_hours = df['avg_delivery_hours'].min() if not pd.isna(df['avg_delivery_hours'].min()) else 1
+
+        # Fill NaN values with 0 for on_time_rate
+        df['on_time_rate'] = df['on_time_rate'].fillna(0)
+
+        df['cpi'] = (
+            (df['completion_rate'] * 0.40) +
+            (df['on_time_rate'] * 0.30) +
+            ((df['shipments_per_day'] / max_shipments_per_day) * 100 * 0.20) +
+            ((min_avg_hours / df['avg_delivery_hours'].replace(0, 1)) * 100 * 0.10)
+        ).clip(0, 100)
+        return df
+
+    @staticmethod
+    def _score_vehicles(df: pd.DataFrame) -> pd.DataFrame:
+        """Add the Vehicle Performance Index (VPI) column."""
+        max_shipments_per_day = df['shipments_per_day'].max() if df['shipments_per_day'].max() > 0 else 1
+
+        df['vpi'] = (
+            (df['completion_rate'] * 0.40) +
+            (df['on_time_rate'].fillna(0) * 0.30) +
+            ((df['shipments_per_day'] / max_shipments_per_day) * 100 * 0.30)
+        ).clip(0, 100)
+        return df
+
     def compare_courier_cohorts(self, metric: str = 'cpi', period: str = 'monthly') -> Dict:
         """
         Compare performance across different courier cohorts using ANOVA.
@@ -441,7 +449,7 @@ class FleetPerformanceAnalyzer:
                 try:
                     f_stat, p_value = stats.f_oneway(*cohort_values)
                 except Exception as e:
-                    print(f"⚠ ANOVA failed: {e}")
+                    logger.warning(f"ANOVA failed: {e}")
                     f_stat, p_value = 0, 1.0
             else:
                 f_stat, p_value = 0, 1.0
@@ -485,7 +493,7 @@ class FleetPerformanceAnalyzer:
                             'difference': float(np.mean(values1) - np.mean(values2))
                         })
                     except Exception as e:
-                        print(f"⚠ Pairwise comparison failed for {cohort1} vs {cohort2}: {e}")
+                        logger.warning(f"Pairwise comparison failed for {cohort1} vs {cohort2}: {e}")
 
         print(f"✓ Compared {len(cohort_names)} cohorts with ANOVA F={f_stat:.2f}, p={p_value:.4f}")
 
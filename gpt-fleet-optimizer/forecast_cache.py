@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Forecast Cache - Fleet Optimizer Module
+Memoized demand forecast artifacts, keyed by kind, hub, horizon and data watermark.
+
+A forecast depends only on the complete days of order history it was fitted on, so it
+stays valid until that history changes. ForecastCache stores each forecast result under
+its arguments plus a data watermark: the history's end date and its newest order. Lookups
+with a new watermark drop every entry at once (a day rolled over or late orders landed),
+instead of letting them age out on a TTL. Concurrent misses for one key compute it once.
+
+Resource plans reuse the daily forecast artifact, and dashboards polling the hourly, daily
+and resource endpoints share the same fits. Cached results, including their
+recommendations, are shared between callers and must be treated as read-only.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class ForecastCache:
+    """Thread-safe LRU of forecast artifacts, invalidated when the data watermark moves."""
+
+    def __init__(self, max_entries: int = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Artifacts kept (default FORECAST_CACHE_MAX_ENTRIES or 256)
+        """
+        self.max_entries = max_entries or int(os.getenv('FORECAST_CACHE_MAX_ENTRIES', 256))
+        self.enabled = os.getenv('FORECAST_CACHE', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (kind, args) -> (value, watermark, compute_seconds)
+        self._inflight = {}  # (kind, args) -> Lock held by the computing thread
+        self._watermark = None
+        self._watermark_since = None
+
+        # Metrics
+        self._stats = {}  # kind -> counters
+        self._invalidations = 0
+        self._evictions = 0
+
+    def get_or_compute(self, kind: str, args: Tuple[Hashable, ...], watermark: Hashable,
+                       compute: Callable[[], Any], cacheable: Callable[[Any], bool] = None) -> Any:
+        """
+        Return the artifact for (kind, args) at `watermark`, calling compute() on a miss.
+
+        Args:
+            kind: Artifact kind ('daily', 'hourly', ...); hit rates are reported per kind
+            args: Forecast arguments (hub, horizon, ...)
+            watermark: Data watermark the artifact is valid for
+            compute: Produces the artifact
+            cacheable: Whether a computed value may be stored (e.g. not error results)
+        """
+        key = (kind, args)
+        self._observe_watermark(watermark)
+        value, found = self._lookup(key, kind, watermark)
+        if found:
+            return value
+
+        with self._lock:
+            inflight = self._inflight.setdefault(key, threading.Lock())
+        with inflight:
+            # Another thread may have computed it while this one waited
+            value, found = self._lookup(key, kind, watermark, counter='shared')
+            if found:
+                return value
+            self._count(kind, 'misses')
+            try:
+                started = time.monotonic()
+                value = compute()
+                seconds = time.monotonic() - started
+                if cacheable is None or cacheable(value):
+                    self._store(key, kind, watermark, value, seconds)
+                return value
+            finally:
+                with self._lock:
+                    if self._inflight.get(key) is inflight:
+                        del self._inflight[key]
+
+    def invalidate(self, kind: str = None):
+        """Drop every artifact (or every artifact of one kind)."""
+        with self._lock:
+            for key in [key for key in self._entries if kind is None or key[0] == kind]:
+                del self._entries[key]
+            self._invalidations += 1
+
+    def get_metrics(self) -> Dict:
+        """Hit rates per kind, compute time saved, entries, evictions and the current watermark."""
+        with self._lock:
+            kinds = {}
+            for kind, stats in self._stats.items():
+                hits = stats['hits'] + stats['shared']
+                lookups = hits + stats['misses']
+                kinds[kind] = dict(
+                    stats,
+                    compute_seconds=round(stats['compute_seconds'], 3),
+                    seconds_saved=round(stats['seconds_saved'], 3),
+                    hit_rate=round(hits / lookups, 3) if lookups else 0.0
+                )
+            hits = sum(stats['hits'] + stats['shared'] for stats in self._stats.values())
+            lookups = hits + sum(stats['misses'] for stats in self._stats.values())
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'watermark': self._watermark,
+                'watermark_age_seconds': round(time.monotonic() - self._watermark_since, 1)
+                if self._watermark_since is not None else None,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+                'invalidations': self._invalidations,
+                'evictions': self._evictions,
+                'kinds': kinds
+            }
+
+    def _observe_watermark(self, watermark: Hashable):
+        with self._lock:
+            if watermark == self._watermark:
+                return
+            if self._entries:
+                self._entries.clear()
+                self._invalidations += 1
+            self._watermark = watermark
+            self._watermark_since = time.monotonic()
+
+    def _lookup(self, key, kind: str, watermark: Hashable, counter: str = 'hits') -> Tuple[Any, bool]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != watermark:
+                return None, False
+            self._entries.move_to_end(key)
+            stats = self._kind_stats(kind)
+            stats[counter] += 1
+            stats['seconds_saved'] += entry[2]
+            return entry[0], True
+
+    def _store(self, key, kind: str, watermark: Hashable, value: Any, seconds: float):
+        with self._lock:
+            self._kind_stats(kind)['compute_seconds'] += seconds
+            # A compute that straddled a watermark change is already out of date
+            if watermark != self._watermark:
+                return
+            self._entries[key] = (value, watermark, seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _count(self, kind: str, counter: str):
+        with self._lock:
+            self._kind_stats(kind)[counter] += 1
+
+    def _kind_stats(self, kind: str) -> Dict:
+        # Caller holds self._lock
+        return self._stats.setdefault(kind, {
+            'hits': 0, 'shared': 0, 'misses': 0, 'compute_seconds': 0.0, 'seconds_saved': 0.0
+        })
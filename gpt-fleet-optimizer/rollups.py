@@ -0,0 +1,752 @@
+#!/usr/bin/env python3
+"""
+Analytics Rollups - Fleet Optimizer Module
+Incrementally maintained aggregate tables that feed the analyzers.
+
+The analyzers answer 7-90 day questions. Rescanning millions of raw orders and shipments
+for every dashboard request takes seconds; the same answers come from a few thousand
+pre-aggregated rows in milliseconds. Three rollups are maintained:
+
+- analytics_order_hourly: orders per hub x hour (created_at) x order_status
+  (route efficiency, bottlenecks, ABC analysis, hourly demand)
+- analytics_sla_hourly: completed shipments per hub x hour (delivery_finish), with on-time
+  and performance-zone counts and a duration histogram (SLA compliance)
+- analytics_courier_daily: shipments per courier x day (created_at) (courier performance)
+
+Each rollup stores additive measures only (counts, sums, sums of squares, min/max, distinct
+courier arrays), so any date range is answered by summing buckets. A refresh recomputes only
+the buckets touched by rows whose updated_at moved past the rollup's high-water mark, in one
+transaction per rollup. Read queries below return the same columns as the raw analyzer
+queries they replace, at hour (SLA, orders) or day (couriers) granularity.
+
+Usage:
+    python rollups.py --create      # create tables and backfill ROLLUP_RETENTION_DAYS
+    python rollups.py --refresh     # incremental refresh (schedule every minute)
+    python rollups.py --rebuild     # recompute everything (after backfills or corrections)
+    python rollups.py --status
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from database_connection import DatabaseConnection, get_database_connection, register_statement
+
+
+# hub_id -1 holds orders and shipments without a hub (primary keys cannot hold NULL).
+# duration_histogram counts deliveries in 5-minute bins; the 49th bin is open-ended (>= 240 min).
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analytics_rollup_state (
+    rollup TEXT PRIMARY KEY,
+    high_water TIMESTAMPTZ,
+    refreshed_at TIMESTAMPTZ,
+    dirty_buckets INTEGER,
+    rows_written INTEGER,
+    duration_ms DOUBLE PRECISION
+);
+
+CREATE TABLE IF NOT EXISTS analytics_order_hourly (
+    bucket TIMESTAMPTZ NOT NULL,
+    hub_id INTEGER NOT NULL,
+    order_status TEXT NOT NULL,
+    orders BIGINT NOT NULL,
+    timed_orders BIGINT NOT NULL,
+    delivery_hours_sum DOUBLE PRECISION,
+    delivery_hours_sq_sum DOUBLE PRECISION,
+    delivery_hours_min DOUBLE PRECISION,
+    delivery_hours_max DOUBLE PRECISION,
+    distance_count BIGINT NOT NULL,
+    distance_sum DOUBLE PRECISION,
+    courier_ids INTEGER[] NOT NULL,
+    PRIMARY KEY (bucket, hub_id, order_status)
+);
+CREATE INDEX IF NOT EXISTS idx_analytics_order_hourly_hub ON analytics_order_hourly (hub_id, bucket);
+
+CREATE TABLE IF NOT EXISTS analytics_sla_hourly (
+    bucket TIMESTAMPTZ NOT NULL,
+    hub_id INTEGER NOT NULL,
+    deliveries BIGINT NOT NULL,
+    on_time BIGINT NOT NULL,
+    at_risk BIGINT NOT NULL,
+    violated BIGINT NOT NULL,
+    duration_sum DOUBLE PRECISION,
+    duration_sq_sum DOUBLE PRECISION,
+    sla_target_sum DOUBLE PRECISION,
+    breach_sum DOUBLE PRECISION,
+    breach_max DOUBLE PRECISION,
+    duration_histogram BIGINT[] NOT NULL,
+    PRIMARY KEY (bucket, hub_id)
+);
+CREATE INDEX IF NOT EXISTS idx_analytics_sla_hourly_hub ON analytics_sla_hourly (hub_id, bucket);
+
+CREATE TABLE IF NOT EXISTS analytics_courier_daily (
+    day DATE NOT NULL,
+    courier_id INTEGER NOT NULL,
+    shipments BIGINT NOT NULL,
+    completed BIGINT NOT NULL,
+    cancelled BIGINT NOT NULL,
+    on_time BIGINT NOT NULL,
+    timed BIGINT NOT NULL,
+    delivery_hours_sum DOUBLE PRECISION,
+    delivery_hours_sq_sum DOUBLE PRECISION,
+    delivery_hours_min DOUBLE PRECISION,
+    delivery_hours_max DOUBLE PRECISION,
+    distance_sum DOUBLE PRECISION,
+    reward_sum DOUBLE PRECISION,
+    PRIMARY KEY (day, courier_id)
+);
+CREATE INDEX IF NOT EXISTS idx_analytics_courier_daily_courier ON analytics_courier_daily (courier_id, day);
+
+INSERT INTO analytics_rollup_state (rollup)
+VALUES ('order_hourly'), ('sla_hourly'), ('courier_daily')
+ON CONFLICT DO NOTHING;
+"""
+
+# Buckets to recompute: hours (or days) holding a row changed since the high-water mark.
+# A shipment change also dirties the buckets of its orders, and vice versa.
+ORDER_HOURLY_DIRTY = """
+SELECT date_trunc('hour', o.created_at) AS bucket
+FROM orders o
+WHERE o.updated_at > %(since)s AND o.updated_at <= %(until)s
+AND o.created_at >= %(retain_from)s
+UNION
+SELECT date_trunc('hour', o.created_at)
+FROM shipments s
+JOIN orders o ON o.shipment_id = s.id
+WHERE s.updated_at > %(since)s AND s.updated_at <= %(until)s
+AND o.created_at >= %(retain_from)s
+"""
+
+ORDER_HOURLY_INSERT = """
+INSERT INTO analytics_order_hourly (
+    bucket, hub_id, order_status, orders, timed_orders, delivery_hours_sum, delivery_hours_sq_sum,
+    delivery_hours_min, delivery_hours_max, distance_count, distance_sum, courier_ids
+)
+SELECT
+    d.bucket,
+    COALESCE(o.hub_id, -1),
+    COALESCE(o.order_status, ''),
+    COUNT(*),
+    COUNT(t.delivery_hours),
+    SUM(t.delivery_hours),
+    SUM(t.delivery_hours * t.delivery_hours),
+    MIN(t.delivery_hours),
+    MAX(t.delivery_hours),
+    COUNT(s.driving_distance),
+    SUM(s.driving_distance),
+    COALESCE(ARRAY_AGG(DISTINCT s.courier_id) FILTER (WHERE s.courier_id IS NOT NULL), '{}')
+FROM rollup_dirty d
+JOIN orders o ON o.created_at >= d.bucket AND o.created_at < d.bucket + INTERVAL '1 hour'
+LEFT JOIN shipments s ON s.id = o.shipment_id
+CROSS JOIN LATERAL (
+    SELECT EXTRACT(EPOCH FROM (o.delivery_finish - o.delivery_start))::float8 / 3600.0 AS delivery_hours
+) t
+GROUP BY d.bucket, COALESCE(o.hub_id, -1), COALESCE(o.order_status, '')
+"""
+
+SLA_HOURLY_DIRTY = """
+SELECT date_trunc('hour', s.delivery_finish) AS bucket
+FROM shipments s
+WHERE s.updated_at > %(since)s AND s.updated_at <= %(until)s
+AND s.delivery_finish >= %(retain_from)s
+UNION
+SELECT date_trunc('hour', s.delivery_finish)
+FROM orders o
+JOIN shipments s ON s.id = o.shipment_id
+WHERE o.updated_at > %(since)s AND o.updated_at <= %(until)s
+AND s.delivery_finish >= %(retain_from)s
+"""
+
+# Same population and LEFT JOIN to orders as the raw compliance query
+SLA_HOURLY_INSERT = """
+WITH measured AS (
+    SELECT
+        d.bucket,
+        COALESCE(o.hub_id, -1) AS hub_id,
+        EXTRACT(EPOCH FROM (s.delivery_finish - s.created_at))::float8 / 60 AS duration_minutes,
+        EXTRACT(EPOCH FROM (to_timestamp(s.promise_time) - s.created_at))::float8 / 60 AS sla_target_minutes,
+        EXTRACT(EPOCH FROM (s.delivery_finish - to_timestamp(s.promise_time)))::float8 / 60 AS breach_minutes
+    FROM rollup_dirty d
+    JOIN shipments s ON s.delivery_finish >= d.bucket AND s.delivery_finish < d.bucket + INTERVAL '1 hour'
+    LEFT JOIN orders o ON o.shipment_id = s.id
+    WHERE s.is_completed = true
+    AND s.promise_time IS NOT NULL
+),
+binned AS (
+    SELECT bucket, hub_id, LEAST(GREATEST(floor(duration_minutes / 5)::int, 0), 48) AS bin, COUNT(*) AS n
+    FROM measured
+    GROUP BY 1, 2, 3
+),
+histograms AS (
+    SELECT g.bucket, g.hub_id, ARRAY_AGG(COALESCE(b.n, 0) ORDER BY bins.bin) AS duration_histogram
+    FROM (SELECT DISTINCT bucket, hub_id FROM binned) g
+    CROSS JOIN generate_series(0, 48) AS bins(bin)
+    LEFT JOIN binned b ON b.bucket = g.bucket AND b.hub_id = g.hub_id AND b.bin = bins.bin
+    GROUP BY g.bucket, g.hub_id
+)
+INSERT INTO analytics_sla_hourly (
+    bucket, hub_id, deliveries, on_time, at_risk, violated, duration_sum, duration_sq_sum,
+    sla_target_sum, breach_sum, breach_max, duration_histogram
+)
+SELECT
+    m.bucket,
+    m.hub_id,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE m.breach_minutes <= 0),
+    COUNT(*) FILTER (WHERE m.breach_minutes > 0 AND m.breach_minutes <= 15),
+    COUNT(*) FILTER (WHERE m.breach_minutes > 15),
+    SUM(m.duration_minutes),
+    SUM(m.duration_minutes * m.duration_minutes),
+    SUM(m.sla_target_minutes),
+    SUM(GREATEST(m.breach_minutes, 0)),
+    MAX(m.breach_minutes),
+    h.duration_histogram
+FROM measured m
+JOIN histograms h ON h.bucket = m.bucket AND h.hub_id = m.hub_id
+GROUP BY m.bucket, m.hub_id, h.duration_histogram
+"""
+
+COURIER_DAILY_DIRTY = """
+SELECT DISTINCT s.created_at::date AS bucket
+FROM shipments s
+WHERE s.updated_at > %(since)s AND s.updated_at <= %(until)s
+AND s.created_at >= %(retain_from)s
+"""
+
+COURIER_DAILY_INSERT = """
+INSERT INTO analytics_courier_daily (
+    day, courier_id, shipments, completed, cancelled, on_time, timed, delivery_hours_sum,
+    delivery_hours_sq_sum, delivery_hours_min, delivery_hours_max, distance_sum, reward_sum
+)
+SELECT
+    d.bucket,
+    s.courier_id,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE s.is_completed),
+    COUNT(*) FILTER (WHERE s.is_cancelled),
+    COUNT(*) FILTER (WHERE s.delivery_finish <= to_timestamp(s.promise_time)),
+    COUNT(t.delivery_hours),
+    SUM(t.delivery_hours),
+    SUM(t.delivery_hours * t.delivery_hours),
+    MIN(t.delivery_hours),
+    MAX(t.delivery_hours),
+    SUM(COALESCE(s.driving_distance, 0)),
+    SUM(COALESCE(s.reward, 0))
+FROM rollup_dirty d
+JOIN shipments s ON s.created_at >= d.bucket AND s.created_at < d.bucket + INTERVAL '1 day'
+CROSS JOIN LATERAL (
+    SELECT EXTRACT(EPOCH FROM (s.complete_time - s.pickup_time))::float8 / 3600.0 AS delivery_hours
+) t
+WHERE s.courier_id IS NOT NULL
+GROUP BY d.bucket, s.courier_id
+"""
+
+HOURLY_FULL = """
+SELECT generate_series(date_trunc('hour', %(retain_from)s::timestamptz), %(until)s::timestamptz,
+                       INTERVAL '1 hour') AS bucket
+"""
+
+DAILY_FULL = """
+SELECT generate_series(%(retain_from)s::date, %(until)s::date, INTERVAL '1 day')::date AS bucket
+"""
+
+ROLLUPS = {
+    'order_hourly': {
+        'table': 'analytics_order_hourly',
+        'key': 'bucket',
+        'dirty': ORDER_HOURLY_DIRTY,
+        'full': HOURLY_FULL,
+        'insert': ORDER_HOURLY_INSERT
+    },
+    'sla_hourly': {
+        'table': 'analytics_sla_hourly',
+        'key': 'bucket',
+        'dirty': SLA_HOURLY_DIRTY,
+        'full': HOURLY_FULL,
+        'insert': SLA_HOURLY_INSERT
+    },
+    'courier_daily': {
+        'table': 'analytics_courier_daily',
+        'key': 'day',
+        'dirty': COURIER_DAILY_DIRTY,
+        'full': DAILY_FULL,
+        'insert': COURIER_DAILY_INSERT
+    }
+}
+
+
+class RollupManager:
+    """Creates and refreshes the rollup tables, and tells analyzers when they can read them."""
+
+    def __init__(self, db: DatabaseConnection, retention_days: int = None, lag_seconds: float = None,
+                 max_staleness: float = None, readiness_ttl: float = 60.0):
+        """
+        Initialize the rollup manager.
+
+        Args:
+            db: Database connection shared with the analyzer
+            retention_days: Days of history kept (default ROLLUP_RETENTION_DAYS or 120)
+            lag_seconds: Changes newer than this are left for the next refresh, so rows from
+                transactions still in flight are not skipped (default ROLLUP_LAG_SECONDS or 120)
+            max_staleness: Analyzers fall back to raw queries when the oldest high-water mark
+                is older than this many seconds (default ROLLUP_MAX_STALENESS or 900)
+            readiness_ttl: Seconds a readiness check is reused
+        """
+        self.db = db
+        self.retention_days = retention_days or int(os.getenv('ROLLUP_RETENTION_DAYS', 120))
+        self.lag_seconds = lag_seconds if lag_seconds is not None else float(os.getenv('ROLLUP_LAG_SECONDS', 120))
+        self.max_staleness = max_staleness or float(os.getenv('ROLLUP_MAX_STALENESS', 900))
+        self.readiness_ttl = readiness_ttl
+        self.enabled = os.getenv('ANALYTICS_ROLLUPS', 'auto').lower() not in ('0', 'off', 'false', 'no')
+
+        self._lock = threading.Lock()
+        self._ready = None
+        self._ready_checked = 0.0
+
+    def create_tables(self, backfill: bool = True) -> Dict[str, Dict]:
+        """Create the rollup tables (idempotent) and optionally backfill them."""
+        self.db.execute_query(ROLLUP_SCHEMA, timeout=None)
+        return self.refresh(full=True) if backfill else {}
+
+    def refresh(self, full: bool = False) -> Dict[str, Dict]:
+        """
+        Bring every rollup up to date.
+
+        Args:
+            full: Recompute all retained buckets instead of the dirty ones
+
+        Returns:
+            Per rollup: dirty buckets recomputed, rows written, new high-water mark, duration
+        """
+        results = {name: self._refresh_rollup(name, spec, full) for name, spec in ROLLUPS.items()}
+        with self._lock:
+            self._ready = None
+        return results
+
+    def _refresh_rollup(self, name: str, spec: Dict, full: bool) -> Dict:
+        start = time.monotonic()
+        execute = self.db.execute_in_transaction
+        with self.db.get_cursor() as cursor:
+            execute(cursor, "SET LOCAL statement_timeout = 0")
+            # Row lock serializes concurrent refreshers (cron overlap, several API workers)
+            execute(cursor,
+                "SELECT high_water, NOW() - make_interval(secs => %s) AS until "
+                "FROM analytics_rollup_state WHERE rollup = %s FOR UPDATE",
+                [self.lag_seconds, name]
+            )
+            state = cursor.fetchone()
+            if state is None:
+                raise RuntimeError(f"Rollup {name} is not set up; run python rollups.py --create")
+
+            until = state['until']
+            params = {
+                'since': state['high_water'],
+                'until': until,
+                'retain_from': until - timedelta(days=self.retention_days)
+            }
+            rebuild = full or state['high_water'] is None
+
+            execute(cursor,
+                f"CREATE TEMP TABLE rollup_dirty ON COMMIT DROP AS {spec['full' if rebuild else 'dirty']}",
+                params
+            )
+            execute(cursor, "SELECT COUNT(*) AS buckets FROM rollup_dirty")
+            dirty_buckets = int(cursor.fetchone()['buckets'])
+
+            if rebuild:
+                execute(cursor, f"DELETE FROM {spec['table']}")
+            else:
+                execute(cursor, f"DELETE FROM {spec['table']} t USING rollup_dirty d WHERE t.{spec['key']} = d.bucket")
+            rows_written = 0
+            if dirty_buckets:
+                rows_written = execute(cursor, spec['insert'])
+            execute(cursor, f"DELETE FROM {spec['table']} WHERE {spec['key']} < %s", [params['retain_from']])
+
+            duration_ms = round((time.monotonic() - start) * 1000, 1)
+            execute(cursor,
+                "UPDATE analytics_rollup_state SET high_water = %s, refreshed_at = NOW(), dirty_buckets = %s, "
+                "rows_written = %s, duration_ms = %s WHERE rollup = %s",
+                [until, dirty_buckets, rows_written, duration_ms, name]
+            )
+
+        return {
+            'mode': 'full' if rebuild else 'incremental',
+            'dirty_buckets': dirty_buckets,
+            'rows_written': rows_written,
+            'high_water': until.isoformat(),
+            'duration_ms': duration_ms
+        }
+
+    def status(self) -> List[Dict]:
+        """High-water mark, staleness and size of each rollup."""
+        rows = self.db.execute_query("""
+        SELECT
+            r.rollup,
+            r.high_water,
+            r.refreshed_at,
+            EXTRACT(EPOCH FROM (NOW() - r.high_water)) AS staleness_seconds,
+            r.dirty_buckets,
+            r.rows_written,
+            r.duration_ms
+        FROM analytics_rollup_state r
+        ORDER BY r.rollup
+        """)
+        for row in rows:
+            for column in ('high_water', 'refreshed_at'):
+                if row[column] is not None:
+                    row[column] = row[column].isoformat()
+        return rows
+
+    def is_ready(self) -> bool:
+        """
+        Whether analyzers should read the rollups.
+
+        True when rollups are enabled (ANALYTICS_ROLLUPS), the tables exist and every
+        rollup was refreshed within max_staleness. The answer is cached for readiness_ttl
+        seconds; any failure counts as not ready, so analyzers keep their raw queries.
+        """
+        if not self.enabled or self.db.is_fallback_mode:
+            return False
+        with self._lock:
+            if self._ready is not None and time.monotonic() - self._ready_checked < self.readiness_ttl:
+                return self._ready
+
+        try:
+            rows = self.db.execute_query("SELECT to_regclass('analytics_rollup_state') IS NOT NULL AS present")
+            ready = bool(rows and rows[0]['present'])
+            if ready:
+                rows = self.db.execute_query(
+                    "SELECT COUNT(*) AS fresh FROM analytics_rollup_state "
+                    "WHERE high_water >= NOW() - make_interval(secs => %s)",
+                    [self.max_staleness]
+                )
+                ready = int(rows[0]['fresh']) == len(ROLLUPS)
+        except Exception:
+            ready = False
+
+        with self._lock:
+            self._ready = ready
+            self._ready_checked = time.monotonic()
+        return ready
+
+
+# ============================================================================
+# READ QUERIES (same columns as the raw analyzer queries they replace)
+# ============================================================================
+
+def sla_compliance_query(start_date: datetime, end_date: datetime, hub_id: int = None) -> Tuple[str, List]:
+    """Overall SLA compliance; median and p95 are interpolated from the duration histogram."""
+    query = register_statement('rollup_sla_compliance_by_hub' if hub_id else 'rollup_sla_compliance', """
+    WITH hourly AS (
+        SELECT *
+        FROM analytics_sla_hourly
+        WHERE bucket >= date_trunc('hour', %s::timestamptz)
+        AND bucket <= %s
+        {}
+    ),
+    histogram AS (
+        SELECT b.bin, SUM(b.n) AS n
+        FROM hourly, unnest(hourly.duration_histogram) WITH ORDINALITY AS b(n, bin)
+        GROUP BY b.bin
+    ),
+    cumulative AS (
+        SELECT bin, n, SUM(n) OVER (ORDER BY bin) AS running, SUM(n) OVER () AS total
+        FROM histogram
+    )
+    SELECT
+        COALESCE(SUM(deliveries), 0) as total_deliveries,
+        SUM(on_time) as deliveries_on_time,
+        SUM(deliveries) - SUM(on_time) as deliveries_breached,
+        (SUM(on_time)::float / NULLIF(SUM(deliveries), 0) * 100) as compliance_rate,
+        SUM(duration_sum) / NULLIF(SUM(deliveries), 0) as avg_duration_minutes,
+        SUM(sla_target_sum) / NULLIF(SUM(deliveries), 0) as avg_sla_target,
+        SUM(breach_sum) / NULLIF(SUM(deliveries), 0) as avg_breach_minutes,
+        MAX(breach_max) as max_breach_minutes,
+        (SELECT (bin - 1) * 5 + 5.0 * (0.5 * total - (running - n)) / NULLIF(n, 0)
+         FROM cumulative WHERE running >= 0.5 * total ORDER BY bin LIMIT 1) as median_duration,
+        (SELECT (bin - 1) * 5 + 5.0 * (0.95 * total - (running - n)) / NULLIF(n, 0)
+         FROM cumulative WHERE running >= 0.95 * total ORDER BY bin LIMIT 1) as p95_duration
+    FROM hourly
+    """.format("AND hub_id = %s" if hub_id else ""))
+
+    params = [start_date, end_date]
+    if hub_id:
+        params.append(hub_id)
+    return query, params
+
+
+def sla_hub_compliance_query(start_date: datetime, end_date: datetime) -> Tuple[str, List]:
+    """Compliance per hub, worst 20 hubs first."""
+    query = register_statement('rollup_sla_hub_compliance', """
+    SELECT
+        r.hub_id,
+        h.code as hub_name,
+        SUM(r.deliveries) as total_deliveries,
+        SUM(r.on_time) as on_time_deliveries,
+        (SUM(r.on_time)::float / SUM(r.deliveries) * 100) as compliance_rate,
+        SUM(r.duration_sum) / SUM(r.deliveries) as avg_duration_minutes
+    FROM analytics_sla_hourly r
+    LEFT JOIN hubs h ON h.id = r.hub_id
+    WHERE r.bucket >= date_trunc('hour', %s::timestamptz)
+    AND r.bucket <= %s
+    AND r.hub_id <> -1
+    GROUP BY r.hub_id, h.code
+    HAVING SUM(r.deliveries) >= 10
+    ORDER BY compliance_rate ASC
+    LIMIT 20
+    """)
+    return query, [start_date, end_date]
+
+
+def sla_performance_zones_query(start_date: datetime, end_date: datetime, hub_id: int = None) -> Tuple[str, List]:
+    """Completed deliveries counted per performance zone."""
+    query = register_statement('rollup_sla_zones_by_hub' if hub_id else 'rollup_sla_zones', """
+    SELECT zone, count
+    FROM (
+        SELECT SUM(on_time) as on_time, SUM(at_risk) as at_risk, SUM(violated) as violated
+        FROM analytics_sla_hourly
+        WHERE bucket >= date_trunc('hour', %s::timestamptz)
+        AND bucket <= %s
+        {}
+    ) totals
+    CROSS JOIN LATERAL (
+        VALUES ('on_time', totals.on_time), ('at_risk', totals.at_risk), ('violated', totals.violated)
+    ) AS zones(zone, count)
+    WHERE count > 0
+    """.format("AND hub_id = %s" if hub_id else ""))
+
+    params = [start_date, end_date]
+    if hub_id:
+        params.append(hub_id)
+    return query, params
+
+
+def route_efficiency_query(start_date: datetime, end_date: datetime) -> Tuple[str, List]:
+    """Per-hub delivery metrics for route efficiency scoring (top 50 hubs by volume)."""
+    query = register_statement('rollup_route_efficiency', """
+    WITH hourly AS (
+        SELECT *
+        FROM analytics_order_hourly
+        WHERE bucket >= date_trunc('hour', %s::timestamptz)
+        AND bucket <= %s
+        AND order_status IN ('delivered', 'completed', 'cancelled', 'failed')
+        AND hub_id <> -1
+    ),
+    couriers AS (
+        SELECT hourly.hub_id, COUNT(DISTINCT c.courier_id) as couriers_used
+        FROM hourly, unnest(hourly.courier_ids) AS c(courier_id)
+        GROUP BY hourly.hub_id
+    )
+    SELECT
+        r.hub_id,
+        h.code as hub_name,
+        SUM(r.orders) as total_deliveries,
+        SUM(r.distance_sum) / NULLIF(SUM(r.distance_count), 0) as avg_distance_km,
+        SUM(r.delivery_hours_sum) / NULLIF(SUM(r.timed_orders), 0) as avg_delivery_hours,
+        MIN(r.delivery_hours_min) as min_delivery_hours,
+        MAX(r.delivery_hours_max) as max_delivery_hours,
+        SQRT(GREATEST(
+            (SUM(r.delivery_hours_sq_sum) - SUM(r.delivery_hours_sum) ^ 2 / NULLIF(SUM(r.timed_orders), 0))
+            / NULLIF(SUM(r.timed_orders) - 1, 0), 0
+        )) as stddev_delivery_hours,
+        COALESCE(SUM(r.orders) FILTER (WHERE r.order_status = 'delivered'), 0)::float / SUM(r.orders) * 100
+            as on_time_rate,
+        COALESCE(MAX(c.couriers_used), 0) as couriers_used
+    FROM hourly r
+    INNER JOIN hubs h ON h.id = r.hub_id
+    LEFT JOIN couriers c ON c.hub_id = r.hub_id
+    GROUP BY r.hub_id, h.code
+    HAVING SUM(r.orders) >= 5
+    ORDER BY total_deliveries DESC
+    LIMIT 50
+    """)
+    return query, [start_date, end_date]
+
+
+def route_bottlenecks_query(start_date: datetime, end_date: datetime, hub_id: int = None) -> Tuple[str, List]:
+    """Delivered orders per hour of day and day of week."""
+    query = register_statement('rollup_route_bottlenecks_by_hub' if hub_id else 'rollup_route_bottlenecks', """
+    WITH hourly AS (
+        SELECT *
+        FROM analytics_order_hourly
+        WHERE bucket >= date_trunc('hour', %s::timestamptz)
+        AND bucket <= %s
+        AND order_status IN ('delivered', 'completed')
+        {}
+    ),
+    couriers AS (
+        SELECT
+            EXTRACT(HOUR FROM hourly.bucket) as hour_of_day,
+            EXTRACT(DOW FROM hourly.bucket) as day_of_week,
+            COUNT(DISTINCT c.courier_id) as couriers_active
+        FROM hourly, unnest(hourly.courier_ids) AS c(courier_id)
+        GROUP BY 1, 2
+    ),
+    volume AS (
+        SELECT
+            EXTRACT(HOUR FROM bucket) as hour_of_day,
+            EXTRACT(DOW FROM bucket) as day_of_week,
+            SUM(orders) as order_count,
+            SUM(delivery_hours_sum) / NULLIF(SUM(timed_orders), 0) as avg_delivery_hours
+        FROM hourly
+        GROUP BY 1, 2
+    )
+    SELECT v.hour_of_day, v.day_of_week, v.order_count, v.avg_delivery_hours,
+           COALESCE(c.couriers_active, 0) as couriers_active
+    FROM volume v
+    LEFT JOIN couriers c ON c.hour_of_day = v.hour_of_day AND c.day_of_week = v.day_of_week
+    ORDER BY v.order_count DESC
+    """.format("AND hub_id = %s" if hub_id else ""))
+
+    params = [start_date, end_date]
+    if hub_id:
+        params.append(hub_id)
+    return query, params
+
+
+def route_abc_query(min_deliveries: int) -> Tuple[str, List]:
+    """Per-hub delivery volume over the last 90 days for ABC classification."""
+    query = register_statement('rollup_route_abc', """
+    SELECT
+        r.hub_id,
+        h.code as hub_name,
+        h.city_id,
+        SUM(r.orders) as delivery_count,
+        SUM(r.delivery_hours_sum) / NULLIF(SUM(r.timed_orders), 0) as avg_delivery_hours,
+        COALESCE(SUM(r.orders) FILTER (WHERE r.order_status = 'delivered'), 0)::float / SUM(r.orders) * 100
+            as success_rate
+    FROM analytics_order_hourly r
+    LEFT JOIN hubs h ON r.hub_id = h.id
+    WHERE r.order_status IN ('delivered', 'completed', 'cancelled', 'failed')
+    AND r.bucket >= CURRENT_DATE - INTERVAL '90 days'
+    AND r.hub_id <> -1
+    GROUP BY r.hub_id, h.code, h.city_id
+    HAVING SUM(r.orders) >= %s
+    ORDER BY delivery_count DESC
+    """)
+    return query, [min_deliveries]
+
+
+def hourly_demand_query(hub_id: int = None) -> Tuple[str, List]:
+    """Orders per date and hour over the last 90 complete days."""
+    query = register_statement('rollup_hourly_demand_by_hub' if hub_id else 'rollup_hourly_demand', """
+    SELECT
+        EXTRACT(DOW FROM bucket) as day_of_week,
+        EXTRACT(HOUR FROM bucket) as hour_of_day,
+        SUM(orders) as order_count,
+        DATE(bucket) as order_date
+    FROM analytics_order_hourly
+    WHERE bucket >= CURRENT_DATE - INTERVAL '90 days'
+    AND bucket < CURRENT_DATE
+    {}
+    GROUP BY DATE(bucket), EXTRACT(DOW FROM bucket), EXTRACT(HOUR FROM bucket)
+    ORDER BY order_date, day_of_week, hour_of_day
+    """.format("AND hub_id = %s" if hub_id else ""))
+    return query, [hub_id] if hub_id else []
+
+
+def hub_hourly_demand_query() -> Tuple[str, List]:
+    """Orders per hub, date and hour over the last 90 complete days (orders with a hub)."""
+    query = register_statement('rollup_hub_hourly_demand', """
+    SELECT
+        hub_id,
+        EXTRACT(DOW FROM bucket) as day_of_week,
+        EXTRACT(HOUR FROM bucket) as hour_of_day,
+        SUM(orders) as order_count,
+        DATE(bucket) as order_date
+    FROM analytics_order_hourly
+    WHERE bucket >= CURRENT_DATE - INTERVAL '90 days'
+    AND bucket < CURRENT_DATE
+    AND hub_id <> -1
+    GROUP BY hub_id, DATE(bucket), EXTRACT(DOW FROM bucket), EXTRACT(HOUR FROM bucket)
+    ORDER BY hub_id, order_date, hour_of_day
+    """)
+    return query, []
+
+
+def courier_performance_query(start_date: datetime, end_date: datetime, courier_id: int = None) -> Tuple[str, List]:
+    """Per-courier performance metrics (days from start_date's date through end_date's date)."""
+    query = register_statement('rollup_courier_metrics_single' if courier_id else 'rollup_courier_metrics', """
+    WITH courier_metrics AS (
+        SELECT
+            r.courier_id,
+            c.first_name,
+            c.last_name,
+            c.vehicle_type,
+            SUM(r.shipments) as total_shipments,
+            SUM(r.completed) as completed_shipments,
+            SUM(r.cancelled) as cancelled_shipments,
+            SUM(r.on_time) as on_time_shipments,
+            SUM(r.delivery_hours_sum) / NULLIF(SUM(r.timed), 0) as avg_delivery_hours,
+            SQRT(GREATEST(
+                (SUM(r.delivery_hours_sq_sum) - SUM(r.delivery_hours_sum) ^ 2 / NULLIF(SUM(r.timed), 0))
+                / NULLIF(SUM(r.timed) - 1, 0), 0
+            )) as stddev_delivery_hours,
+            MIN(r.delivery_hours_min) as min_delivery_hours,
+            MAX(r.delivery_hours_max) as max_delivery_hours,
+            COUNT(*) as active_days,
+            SUM(r.distance_sum) as total_distance_km,
+            SUM(r.reward_sum) / SUM(r.shipments) as avg_reward
+        FROM analytics_courier_daily r
+        LEFT JOIN couriers c ON c.id = r.courier_id
+        WHERE r.day >= %s::date
+        AND r.day <= %s::date
+        {}
+        GROUP BY r.courier_id, c.first_name, c.last_name, c.vehicle_type
+        HAVING SUM(r.shipments) >= 5
+    )
+    SELECT
+        cm.*,
+        (cm.completed_shipments::float / cm.total_shipments * 100) as completion_rate,
+        (cm.on_time_shipments::float / NULLIF(cm.completed_shipments, 0) * 100) as on_time_rate,
+        (cm.total_shipments::float / cm.active_days) as shipments_per_day,
+        (cm.total_distance_km / NULLIF(cm.completed_shipments, 0)) as avg_distance_per_shipment_km,
+        (cm.cancelled_shipments::float / cm.total_shipments * 100) as cancellation_rate
+    FROM courier_metrics cm
+    ORDER BY completion_rate DESC, on_time_rate DESC
+    """.format("AND r.courier_id = %s" if courier_id else ""))
+
+    params = [start_date, end_date]
+    if courier_id:
+        params.append(courier_id)
+    return query, params
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Maintain analytics rollup tables')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--create', action='store_true', help='Create rollup tables and backfill them')
+    group.add_argument('--refresh', action='store_true', help='Incremental refresh from the high-water marks')
+    group.add_argument('--rebuild', action='store_true', help='Recompute all retained buckets')
+    group.add_argument('--status', action='store_true', help='Show high-water marks and staleness')
+    args = parser.parse_args()
+
+    db = get_database_connection()
+    db.connect(retry_attempts=1)
+    manager = RollupManager(db)
+
+    try:
+        if args.create:
+            results = manager.create_tables()
+        elif args.refresh:
+            results = manager.refresh()
+        elif args.rebuild:
+            results = manager.refresh(full=True)
+        else:
+            results = manager.status()
+        print(json.dumps(results, indent=2, default=str))
+    except Exception as e:
+        print(f"❌ Rollup {'status' if args.status else 'refresh'} failed: {e}")
+        sys.exit(1)
+    finally:
+        db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -25,6 +25,7 @@ Usage:
 
 import os
 import sys
+import logging
 import json
 import argparse
 from datetime import datetime, timedelta
@@ -33,7 +34,11 @@ import pandas as pd
 import numpy as np
 
 # Import our robust database connection handler
-from database_connection import DatabaseConnection, get_database_connection
+from database_connection import DatabaseConnection, QueryTimeoutError, get_database_connection, register_statement
+from rollups import RollupManager, route_abc_query, route_bottlenecks_query, route_efficiency_query
+
+
+logger = logging.getLogger(__name__)
 
 
 class RouteAnalyzer:
@@ -53,7 +58,8 @@ class RouteAnalyzer:
         elif enable_fallback is None:
             enable_fallback = False
             
-        self.db = get_database_connection(enable_fallback=enable_fallback)
+        self.db = get_database_connection(enable_fallback=enable_fallback, config=db_config)
+        self.rollups = RollupManager(self.db)
         self.data_source = 'unknown'
 
     def connect(self):
@@ -112,7 +118,7 @@ class RouteAnalyzer:
         start_date = end_date - timedelta(days=date_range)
 
         # Optimized query for production database performance
-        query = """
+        query = register_statement('route_efficiency', """
         WITH delivery_metrics AS (
             SELECT
                 o.hub_id,
@@ -173,12 +179,16 @@ class RouteAnalyzer:
         FROM delivery_metrics
         ORDER BY total_deliveries DESC
         LIMIT 50
-        """
+        """)
+
+        params = [start_date, end_date]
+        if self.rollups.is_ready():
+            query, params = route_efficiency_query(start_date, end_date)
 
         try:
-            results = self.db.execute_query(query, [start_date, end_date], timeout=30.0)
+            df = self.db.query_dataframe(query, params, timeout=30.0, cache='recent')
 
-            if not results:
+            if df.empty:
                 print("⚠ No route data found for the specified period")
                 return {
                     "error": "No data available",
@@ -186,20 +196,7 @@ class RouteAnalyzer:
                     "fallback_available": self.db.enable_fallback
                 }
 
-            # Calculate efficiency scores
-            df = pd.DataFrame(results)
-
-            # Handle null values
-            df['avg_delivery_hours'] = df['avg_delivery_hours'].fillna(df['avg_delivery_hours'].median())
-
-            # Efficiency score calculation
-            # Higher is better: considers success rate and delivery speed
-            min_hours = df['avg_delivery_hours'].min() if df['avg_delivery_hours'].min() > 0 else 1
-
-            df['efficiency_score'] = (
-                (df['on_time_rate'] * 0.7) +  # 70% weight on success rate
-                ((min_hours / df['avg_delivery_hours']) * 100 * 0.3)  # 30% weight on speed
-            ).clip(0, 100)
+            df = self._score_routes(df)
 
             # Rank routes
             df = df.sort_values('efficiency_score', ascending=False)
@@ -234,10 +231,10 @@ class RouteAnalyzer:
                 'connection_info': self.get_connection_info()
             }
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            print(f"✗ Analysis failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Analysis failed")
             
             return {
                 "error": str(e),
@@ -273,7 +270,7 @@ class RouteAnalyzer:
         start_date = end_date - timedelta(days=date_range)
 
         # Peak hour analysis using actual schema
-        query = """
+        query = register_statement('route_bottlenecks_by_hub' if hub_id else 'route_bottlenecks', """
         SELECT
             EXTRACT(HOUR FROM o.created_at) as hour_of_day,
             EXTRACT(DOW FROM o.created_at) as day_of_week,
@@ -294,24 +291,21 @@ class RouteAnalyzer:
         {}
         GROUP BY EXTRACT(HOUR FROM o.created_at), EXTRACT(DOW FROM o.created_at)
         ORDER BY order_count DESC
-        """.format("AND o.hub_id = %s" if hub_id else "")
+        """.format("AND o.hub_id = %s" if hub_id else ""))
 
         try:
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
             params = [start_date, end_date]
             if hub_id:
                 params.append(hub_id)
+            if self.rollups.is_ready():
+                query, params = route_bottlenecks_query(start_date, end_date, hub_id)
 
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            cursor.close()
+            df = self.db.query_dataframe(query, params, cache='recent')
 
-            if not results:
+            if df.empty:
                 print("⚠ No bottleneck data found")
                 return {"error": "No data available"}
 
-            df = pd.DataFrame(results)
-
             # Identify peak hours (top 25% by volume)
             peak_threshold = df['order_count'].quantile(0.75)
             peak_hours = df[df['order_count'] >= peak_threshold]
@@ -327,7 +321,7 @@ class RouteAnalyzer:
                     'day': day_names[int(row['day_of_week'])],
                     'hour': f"{int(row['hour_of_day']):02d}:00",
                     'order_count': int(row['order_count']),
-                    'avg_delivery_hours': float(row['avg_delivery_hours']) if row['avg_delivery_hours'] else 0,
+                    'avg_delivery_hours': 0 if pd.isna(row['avg_delivery_hours']) else row['avg_delivery_hours'],
                     'couriers_active': int(row['couriers_active'])
                 }
                 for _, row in peak_hours.iterrows()
@@ -337,7 +331,7 @@ class RouteAnalyzer:
                 {
                     'day': day_names[int(row['day_of_week'])],
                     'hour': f"{int(row['hour_of_day']):02d}:00",
-                    'orders_per_courier': float(row['orders_per_courier']),
+                    'orders_per_courier': row['orders_per_courier'],
                     'order_count': int(row['order_count']),
                     'couriers_active': int(row['couriers_active'])
                 }
@@ -359,12 +353,10 @@ class RouteAnalyzer:
                 )
             }
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
-            print(f"✗ Bottleneck analysis failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Bottleneck analysis failed")
             return {"error": str(e)}
 
     def analyze_abc_routes(self, min_deliveries: int = 10) -> Dict:
@@ -385,7 +377,7 @@ class RouteAnalyzer:
         print(f"\n📈 Performing ABC/Pareto analysis on routes...")
 
         # Use actual schema - group by hub
-        query = """
+        query = register_statement('route_abc_summary', """
         WITH route_summary AS (
             SELECT
                 o.hub_id,
@@ -410,19 +402,19 @@ class RouteAnalyzer:
         )
         SELECT * FROM route_summary
         ORDER BY delivery_count DESC
-        """
+        """)
+
+        params = [min_deliveries]
+        if self.rollups.is_ready():
+            query, params = route_abc_query(min_deliveries)
 
         try:
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute(query, (min_deliveries,))
-            results = cursor.fetchall()
-            cursor.close()
+            df = self.db.query_dataframe(query, params, cache='historical')
 
-            if not results:
+            if df.empty:
                 print("⚠ No route data found meeting minimum delivery threshold")
                 return {"error": "Insufficient data"}
 
-            df = pd.DataFrame(results)
             total_deliveries = df['delivery_count'].sum()
 
             # Calculate cumulative percentage
@@ -463,14 +455,30 @@ class RouteAnalyzer:
                 'recommendations': self._generate_abc_recommendations(abc_summary, a_routes)
             }
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
-            print(f"✗ ABC analysis failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("ABC analysis failed")
             return {"error": str(e)}
 
+    @staticmethod
+    def _score_routes(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the efficiency_score column.
+
+        Higher is better: considers success rate (70%) and delivery speed (30%).
+        """
+        # Handle null values
+        df['avg_delivery_hours'] = df['avg_delivery_hours'].fillna(df['avg_delivery_hours'].median())
+
+        min_hours = df['avg_delivery_hours'].min() if df['avg_delivery_hours'].min() > 0 else 1
+
+        df['efficiency_score'] = (
+            (df['on_time_rate'] * 0.7) +
+            ((min_hours / df['avg_delivery_hours']) * 100 * 0.3)
+        ).clip(0, 100)
+        return df
+
     def _generate_bottleneck_recommendations(self, peak_hours: List, overload_periods: List) -> List[str]:
         """Generate actionable recommendations based on bottleneck analysis."""
         recommendations = []
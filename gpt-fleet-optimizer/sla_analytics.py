@@ -25,15 +25,22 @@ Usage:
 
 import os
 import sys
+import logging
 import json
+import asyncio
 import argparse
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
-import psycopg2
-from psycopg2.extras import RealDictCursor
 import pandas as pd
 import numpy as np
 
+from database_connection import QueryTimeoutError, get_database_connection, register_statement
+from rollups import RollupManager, sla_compliance_query, sla_hub_compliance_query, sla_performance_zones_query
+from sla_tracker import RealtimeSLATracker
+
+
+logger = logging.getLogger(__name__)
+
 
 class SLAAnalytics:
     """Analyzes SLA compliance and delivery performance."""
@@ -60,12 +67,17 @@ class SLAAnalytics:
             }
 
         self.db_config = db_config
-        self.conn = None
+        # Queries borrow connections from the shared pool, so one instance is safe across threads
+        self.db = get_database_connection(config=db_config)
+        # Compliance reports read the hourly SLA rollup once it is built and fresh
+        self.rollups = RollupManager(self.db)
+        # Realtime status is answered from active shipments kept in memory
+        self.tracker = RealtimeSLATracker(self.db)
 
     def connect(self):
         """Establish database connection."""
         try:
-            self.conn = psycopg2.connect(**self.db_config)
+            self.db.connect(retry_attempts=1)
             print("✓ Connected to BarqFleet production database successfully")
         except Exception as e:
             print(f"✗ Database connection failed: {e}")
@@ -73,21 +85,23 @@ class SLAAnalytics:
 
     def disconnect(self):
         """Close database connection."""
-        if self.conn:
-            self.conn.close()
-            print("✓ Database connection closed")
+        self.db.disconnect()
+        print("✓ Database connection closed")
 
     def get_realtime_sla_status(self) -> Dict:
         """
         Get real-time SLA status for active deliveries.
 
+        Served from the in-memory RealtimeSLATracker (sla_tracker.py); the two queries below
+        run only when SLA_TRACKER=0 or the database is in fallback mode.
+
         Returns:
             Dictionary with current SLA status and at-risk deliveries
         """
         print(f"\n⚡ Getting real-time SLA status...")
 
         # Query active shipments with SLA information
-        query = """
+        query = register_statement('sla_realtime_status', """
         WITH active_shipments AS (
             SELECT
                 s.id,
@@ -118,12 +132,16 @@ class SLAAnalytics:
             MAX(elapsed_minutes) as max_elapsed_minutes,
             AVG(sla_target_minutes) as avg_sla_target
         FROM active_shipments
-        """
+        """)
 
         try:
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute(query)
-            results = cursor.fetchone()
+            if self.tracker.enabled and not self.db.is_fallback_mode:
+                # Aggregates and at-risk shipments from memory; at most one delta poll
+                results, at_risk_deliveries = self.tracker.status()
+            else:
+                rows = self.db.execute_query(query, cache='realtime')
+                results = rows[0] if rows else None
+                at_risk_deliveries = None
 
             if not results or results['active_count'] == 0:
                 print("✓ No active shipments at this time")
@@ -136,7 +154,7 @@ class SLAAnalytics:
                 }
 
             # Get at-risk delivery details
-            at_risk_query = """
+            at_risk_query = register_statement('sla_at_risk_deliveries', """
             SELECT
                 s.id,
                 s.tracking_no,
@@ -152,11 +170,10 @@ class SLAAnalytics:
             AND to_timestamp(s.promise_time) - NOW() < INTERVAL '15 minutes'
             ORDER BY remaining_minutes ASC
             LIMIT 20
-            """
+            """)
 
-            cursor.execute(at_risk_query)
-            at_risk_deliveries = cursor.fetchall()
-            cursor.close()
+            if at_risk_deliveries is None:
+                at_risk_deliveries = self.db.execute_query(at_risk_query, cache='realtime')
 
             # Process results
             summary = {
@@ -199,18 +216,19 @@ class SLAAnalytics:
 
             return summary
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
-            print(f"✗ Real-time status check failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Real-time status check failed")
             return {"error": str(e)}
 
     def analyze_sla_compliance(self, date_range: int = 7, hub_id: int = None) -> Dict:
         """
         Analyze historical SLA compliance using promise_time vs delivery_finish.
 
+        On raw tables the overall, per-hub and per-zone aggregates come from a single scan
+        (see _compliance_report_query); on the rollups they are three cheap bucket reads.
+
         Args:
             date_range: Number of days to analyze
             hub_id: Filter by hub ID (optional)
@@ -223,26 +241,110 @@ class SLAAnalytics:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=date_range)
 
-        # Query completed shipments with SLA compliance data
-        query = """
+        try:
+            use_rollups = self.rollups.is_ready()
+            if use_rollups:
+                rows = self.db.execute_query(*sla_compliance_query(start_date, end_date, hub_id), cache='recent')
+                result = rows[0] if rows else None
+            else:
+                rows = self.db.execute_query(
+                    *self._compliance_report_query(start_date, end_date, hub_id), cache='recent'
+                )
+                result, hub_breakdown, performance_zones = self._split_compliance_report(rows, hub_id)
+
+            if not result or result['total_deliveries'] == 0:
+                print("⚠ No delivery data found for the specified period")
+                return {"error": "No data available"}
+
+            if use_rollups:
+                # Get hub-level breakdown if no specific hub requested
+                hub_breakdown = None if hub_id else self._get_hub_level_compliance(start_date, end_date)
+                performance_zones = self._get_performance_zones(start_date, end_date, hub_id)
+
+            return self._build_compliance_report(
+                result, start_date, end_date, date_range, hub_breakdown, performance_zones
+            )
+
+        except QueryTimeoutError:
+            raise
+        except Exception as e:
+            logger.exception("SLA compliance analysis failed")
+            return {"error": str(e)}
+
+    async def analyze_sla_compliance_async(self, date_range: int = 7, hub_id: int = None) -> Dict:
+        """
+        Asyncio variant of analyze_sla_compliance.
+
+        On the rollups the overall, hub-level and performance-zone queries are independent,
+        so they run concurrently on separate pooled connections; on raw tables the report is
+        one query. Run it on the database event loop:
+        run_async(analytics.analyze_sla_compliance_async(7)).
+        """
+        print(f"\n📊 Analyzing SLA compliance (last {date_range} days, concurrent)...")
+
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=date_range)
+
+        async def no_hub_breakdown():
+            return None
+
+        try:
+            if self.rollups.is_ready():
+                rows, hub_breakdown, performance_zones = await asyncio.gather(
+                    self.db.execute_query_async(*sla_compliance_query(start_date, end_date, hub_id), cache='recent'),
+                    no_hub_breakdown() if hub_id else self._get_hub_level_compliance_async(start_date, end_date),
+                    self._get_performance_zones_async(start_date, end_date, hub_id)
+                )
+                result = rows[0] if rows else None
+            else:
+                rows = await self.db.execute_query_async(
+                    *self._compliance_report_query(start_date, end_date, hub_id), cache='recent'
+                )
+                result, hub_breakdown, performance_zones = self._split_compliance_report(rows, hub_id)
+
+            if not result or result['total_deliveries'] == 0:
+                print("⚠ No delivery data found for the specified period")
+                return {"error": "No data available"}
+
+            return self._build_compliance_report(
+                result, start_date, end_date, date_range, hub_breakdown, performance_zones
+            )
+
+        except QueryTimeoutError:
+            raise
+        except Exception as e:
+            logger.exception("SLA compliance analysis failed")
+            return {"error": str(e)}
+
+    def _compliance_report_query(self, start_date: datetime, end_date: datetime,
+                                 hub_id: int = None) -> Tuple[str, List]:
+        """
+        Overall, per-hub and per-zone compliance over raw shipments in one scan.
+
+        The filtered shipments × orders join is read once and aggregated with GROUPING SETS;
+        grouping_set labels each output row ('overall', 'hub' or 'zone') for
+        _split_compliance_report.
+        """
+        query = register_statement('sla_compliance_report_by_hub' if hub_id else 'sla_compliance_report', """
         WITH delivery_performance AS (
             SELECT
-                s.id,
-                s.tracking_no,
-                s.created_at,
-                s.promise_time,
-                s.delivery_finish,
-                s.partner_id,
                 o.hub_id,
+                h.code as hub_name,
                 EXTRACT(EPOCH FROM (s.delivery_finish - s.created_at)) / 60 as actual_duration_minutes,
                 EXTRACT(EPOCH FROM (to_timestamp(s.promise_time) - s.created_at)) / 60 as sla_target_minutes,
                 CASE
                     WHEN s.delivery_finish <= to_timestamp(s.promise_time) THEN 1
                     ELSE 0
                 END as sla_met,
-                EXTRACT(EPOCH FROM (s.delivery_finish - to_timestamp(s.promise_time))) / 60 as breach_minutes
+                EXTRACT(EPOCH FROM (s.delivery_finish - to_timestamp(s.promise_time))) / 60 as breach_minutes,
+                CASE
+                    WHEN s.delivery_finish <= to_timestamp(s.promise_time) THEN 'on_time'
+                    WHEN EXTRACT(EPOCH FROM (s.delivery_finish - to_timestamp(s.promise_time))) / 60 <= 15 THEN 'at_risk'
+                    ELSE 'violated'
+                END as zone
             FROM shipments s
             LEFT JOIN orders o ON o.shipment_id = s.id
+            LEFT JOIN hubs h ON h.id = o.hub_id
             WHERE s.is_completed = true
             AND s.delivery_finish IS NOT NULL
             AND s.promise_time IS NOT NULL
@@ -251,6 +353,14 @@ class SLAAnalytics:
             {}
         )
         SELECT
+            CASE
+                WHEN GROUPING(zone) = 0 THEN 'zone'
+                WHEN GROUPING(hub_id) = 0 THEN 'hub'
+                ELSE 'overall'
+            END as grouping_set,
+            hub_id,
+            hub_name,
+            zone,
             COUNT(*) as total_deliveries,
             SUM(sla_met) as deliveries_on_time,
             COUNT(*) - SUM(sla_met) as deliveries_breached,
@@ -262,172 +372,156 @@ class SLAAnalytics:
             PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY actual_duration_minutes) as median_duration,
             PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY actual_duration_minutes) as p95_duration
         FROM delivery_performance
-        """.format("AND o.hub_id = %s" if hub_id else "")
+        GROUP BY GROUPING SETS ((), (hub_id, hub_name), (zone))
+        """.format("AND o.hub_id = %s" if hub_id else ""))
 
-        try:
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-            params = [start_date, end_date]
-            if hub_id:
-                params.append(hub_id)
+        params = [start_date, end_date]
+        if hub_id:
+            params.append(hub_id)
+        return query, params
 
-            cursor.execute(query, params)
-            result = cursor.fetchone()
-            cursor.close()
-
-            if not result or result['total_deliveries'] == 0:
-                print("⚠ No delivery data found for the specified period")
-                return {"error": "No data available"}
+    def _split_compliance_report(self, rows: List[Dict], hub_id: int = None) -> Tuple[Dict, List[Dict], Dict]:
+        """
+        Demultiplex _compliance_report_query rows into (overall, hub breakdown, zones).
 
-            # Process results
-            compliance_rate = float(result['compliance_rate'])
-            compliance_data = {
-                'analysis_period': {
-                    'start_date': start_date.isoformat(),
-                    'end_date': end_date.isoformat(),
-                    'days': date_range
-                },
-                'overall': {
-                    'total_deliveries': int(result['total_deliveries']),
-                    'deliveries_on_time': int(result['deliveries_on_time']),
-                    'deliveries_breached': int(result['deliveries_breached']),
-                    'compliance_rate': compliance_rate,
-                    'avg_duration_minutes': float(result['avg_duration_minutes']),
-                    'avg_sla_target_minutes': float(result['avg_sla_target']),
-                    'avg_breach_minutes': float(result['avg_breach_minutes']) if result['avg_breach_minutes'] else 0,
-                    'max_breach_minutes': float(result['max_breach_minutes']) if result['max_breach_minutes'] else 0,
-                    'median_duration': float(result['median_duration']),
-                    'p95_duration': float(result['p95_duration']),
-                    'status': self._get_compliance_status(compliance_rate)
-                }
+        Hub rows get the same treatment the standalone hub query used to apply in SQL:
+        hubs with at least 10 deliveries, worst 20 by compliance first.
+        """
+        overall, hubs, zones = None, [], []
+        for row in rows:
+            if row['grouping_set'] == 'overall':
+                overall = row
+            elif row['grouping_set'] == 'hub':
+                if row['hub_id'] is not None and row['total_deliveries'] >= 10:
+                    hubs.append(dict(row, on_time_deliveries=row['deliveries_on_time']))
+            else:
+                zones.append({'zone': row['zone'], 'count': row['total_deliveries']})
+
+        hubs.sort(key=lambda hub: hub['compliance_rate'])
+        hub_breakdown = None if hub_id else self._summarize_hub_compliance(hubs[:20])
+        return overall, hub_breakdown, self._summarize_performance_zones(zones)
+
+    def _build_compliance_report(self, result: Dict, start_date: datetime, end_date: datetime,
+                                 date_range: int, hub_breakdown: List[Dict] = None,
+                                 performance_zones: Dict = None) -> Dict:
+        """Assemble the compliance report from the overall, hub and zone query results."""
+        compliance_rate = float(result['compliance_rate'])
+        compliance_data = {
+            'analysis_period': {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'days': date_range
+            },
+            'overall': {
+                'total_deliveries': int(result['total_deliveries']),
+                'deliveries_on_time': int(result['deliveries_on_time']),
+                'deliveries_breached': int(result['deliveries_breached']),
+                'compliance_rate': compliance_rate,
+                'avg_duration_minutes': float(result['avg_duration_minutes']),
+                'avg_sla_target_minutes': float(result['avg_sla_target']),
+                'avg_breach_minutes': float(result['avg_breach_minutes']) if result['avg_breach_minutes'] else 0,
+                'max_breach_minutes': float(result['max_breach_minutes']) if result['max_breach_minutes'] else 0,
+                'median_duration': float(result['median_duration']),
+                'p95_duration': float(result['p95_duration']),
+                'status': self._get_compliance_status(compliance_rate)
             }
+        }
 
-            # Get hub-level breakdown if no specific hub requested
-            if not hub_id:
-                hub_breakdown = self._get_hub_level_compliance(start_date, end_date)
-                compliance_data['by_hub'] = hub_breakdown
-
-            # Get performance zones
-            performance_zones = self._get_performance_zones(start_date, end_date, hub_id)
-            compliance_data['performance_zones'] = performance_zones
+        if hub_breakdown is not None:
+            compliance_data['by_hub'] = hub_breakdown
+        compliance_data['performance_zones'] = performance_zones
 
-            # Add recommendations
-            compliance_data['recommendations'] = self._generate_compliance_recommendations(compliance_data)
+        # Add recommendations
+        compliance_data['recommendations'] = self._generate_compliance_recommendations(compliance_data)
 
-            print(f"✓ Analyzed {compliance_data['overall']['total_deliveries']} deliveries")
-            print(f"  Overall compliance: {compliance_data['overall']['compliance_rate']:.1f}%")
+        print(f"✓ Analyzed {compliance_data['overall']['total_deliveries']} deliveries")
+        print(f"  Overall compliance: {compliance_data['overall']['compliance_rate']:.1f}%")
 
-            return compliance_data
-
-        except Exception as e:
-            if self.conn:
-                self.conn.rollback()
-            print(f"✗ SLA compliance analysis failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return {"error": str(e)}
+        return compliance_data
 
     def _get_hub_level_compliance(self, start_date: datetime, end_date: datetime) -> List[Dict]:
-        """Get SLA compliance breakdown by hub."""
-        query = """
-        WITH hub_performance AS (
-            SELECT
-                o.hub_id,
-                h.code as hub_name,
-                COUNT(*) as total_deliveries,
-                SUM(CASE WHEN s.delivery_finish <= to_timestamp(s.promise_time) THEN 1 ELSE 0 END) as on_time_deliveries,
-                (SUM(CASE WHEN s.delivery_finish <= to_timestamp(s.promise_time) THEN 1 ELSE 0 END)::float / COUNT(*) * 100) as compliance_rate,
-                AVG(EXTRACT(EPOCH FROM (s.delivery_finish - s.created_at)) / 60) as avg_duration_minutes
-            FROM shipments s
-            JOIN orders o ON o.shipment_id = s.id
-            LEFT JOIN hubs h ON h.id = o.hub_id
-            WHERE s.is_completed = true
-            AND s.delivery_finish IS NOT NULL
-            AND s.promise_time IS NOT NULL
-            AND s.delivery_finish >= %s
-            AND s.delivery_finish <= %s
-            GROUP BY o.hub_id, h.code
-            HAVING COUNT(*) >= 10
-        )
-        SELECT *
-        FROM hub_performance
-        ORDER BY compliance_rate ASC
-        LIMIT 20
-        """
-
+        """Get SLA compliance breakdown by hub from the rollups."""
         try:
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute(query, [start_date, end_date])
-            results = cursor.fetchall()
-            cursor.close()
+            results = self.db.execute_query(*sla_hub_compliance_query(start_date, end_date), cache='recent')
+            return self._summarize_hub_compliance(results)
 
-            hub_data = []
-            for row in results:
-                hub_data.append({
-                    'hub_id': row['hub_id'],
-                    'hub_name': row['hub_name'] or f"Hub {row['hub_id']}",
-                    'total_deliveries': int(row['total_deliveries']),
-                    'on_time_deliveries': int(row['on_time_deliveries']),
-                    'compliance_rate': float(row['compliance_rate']),
-                    'avg_duration_minutes': float(row['avg_duration_minutes']),
-                    'status': self._get_compliance_status(float(row['compliance_rate']))
-                })
+        except QueryTimeoutError:
+            raise
+        except Exception as e:
+            logger.warning(f"Hub-level analysis failed: {e}")
+            return []
 
-            return hub_data
+    async def _get_hub_level_compliance_async(self, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """Asyncio variant of _get_hub_level_compliance."""
+        try:
+            results = await self.db.execute_query_async(
+                *sla_hub_compliance_query(start_date, end_date), cache='recent'
+            )
+            return self._summarize_hub_compliance(results)
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            print(f"⚠ Hub-level analysis failed: {e}")
+            logger.warning(f"Hub-level analysis failed: {e}")
             return []
 
-    def _get_performance_zones(self, start_date: datetime, end_date: datetime, hub_id: int = None) -> Dict:
-        """Classify deliveries into performance zones (on-time, at-risk, violated)."""
-        query = """
-        WITH delivery_zones AS (
-            SELECT
-                CASE
-                    WHEN s.delivery_finish <= to_timestamp(s.promise_time) THEN 'on_time'
-                    WHEN EXTRACT(EPOCH FROM (s.delivery_finish - to_timestamp(s.promise_time))) / 60 <= 15 THEN 'at_risk'
-                    ELSE 'violated'
-                END as zone,
-                COUNT(*) as count
-            FROM shipments s
-            LEFT JOIN orders o ON o.shipment_id = s.id
-            WHERE s.is_completed = true
-            AND s.delivery_finish IS NOT NULL
-            AND s.promise_time IS NOT NULL
-            AND s.delivery_finish >= %s
-            AND s.delivery_finish <= %s
-            {}
-            GROUP BY zone
-        )
-        SELECT * FROM delivery_zones
-        """.format("AND o.hub_id = %s" if hub_id else "")
+    def _summarize_hub_compliance(self, results: List[Dict]) -> List[Dict]:
+        hub_data = []
+        for row in results:
+            hub_data.append({
+                'hub_id': row['hub_id'],
+                'hub_name': row['hub_name'] or f"Hub {row['hub_id']}",
+                'total_deliveries': int(row['total_deliveries']),
+                'on_time_deliveries': int(row['on_time_deliveries']),
+                'compliance_rate': float(row['compliance_rate']),
+                'avg_duration_minutes': float(row['avg_duration_minutes']),
+                'status': self._get_compliance_status(float(row['compliance_rate']))
+            })
+        return hub_data
 
+    def _get_performance_zones(self, start_date: datetime, end_date: datetime, hub_id: int = None) -> Dict:
+        """Classify rolled-up deliveries into performance zones (on-time, at-risk, violated)."""
         try:
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-            params = [start_date, end_date]
-            if hub_id:
-                params.append(hub_id)
-
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            cursor.close()
-
-            zones = {'on_time': 0, 'at_risk': 0, 'violated': 0}
-            for row in results:
-                zones[row['zone']] = int(row['count'])
+            results = self.db.execute_query(
+                *sla_performance_zones_query(start_date, end_date, hub_id), cache='recent'
+            )
+            return self._summarize_performance_zones(results)
 
-            total = sum(zones.values())
-            if total > 0:
-                zones['on_time_pct'] = round(zones['on_time'] / total * 100, 2)
-                zones['at_risk_pct'] = round(zones['at_risk'] / total * 100, 2)
-                zones['violated_pct'] = round(zones['violated'] / total * 100, 2)
+        except QueryTimeoutError:
+            raise
+        except Exception as e:
+            logger.warning(f"Performance zones analysis failed: {e}")
+            return {}
 
-            return zones
+    async def _get_performance_zones_async(self, start_date: datetime, end_date: datetime,
+                                           hub_id: int = None) -> Dict:
+        """Asyncio variant of _get_performance_zones."""
+        try:
+            results = await self.db.execute_query_async(
+                *sla_performance_zones_query(start_date, end_date, hub_id), cache='recent'
+            )
+            return self._summarize_performance_zones(results)
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            print(f"⚠ Performance zones analysis failed: {e}")
+            logger.warning(f"Performance zones analysis failed: {e}")
             return {}
 
+    @staticmethod
+    def _summarize_performance_zones(results: List[Dict]) -> Dict:
+        zones = {'on_time': 0, 'at_risk': 0, 'violated': 0}
+        for row in results:
+            zones[row['zone']] = int(row['count'])
+
+        total = sum(zones.values())
+        if total > 0:
+            zones['on_time_pct'] = round(zones['on_time'] / total * 100, 2)
+            zones['at_risk_pct'] = round(zones['at_risk'] / total * 100, 2)
+            zones['violated_pct'] = round(zones['violated'] / total * 100, 2)
+
+        return zones
+
     def identify_breach_risks(self, hub_id: int = None) -> Dict:
         """
         Identify patterns and factors leading to SLA breaches.
@@ -440,7 +534,7 @@ class SLAAnalytics:
         """
         print(f"\n⚠️  Identifying SLA breach risks...")
 
-        query = """
+        query = register_statement('sla_breach_risks_by_hub' if hub_id else 'sla_breach_risks', """
         WITH recent_breaches AS (
             SELECT
                 s.id,
@@ -474,14 +568,11 @@ class SLAAnalytics:
         HAVING COUNT(*) >= 3
         ORDER BY breach_count DESC, avg_breach_minutes DESC
         LIMIT 50
-        """.format("AND o.hub_id = %s" if hub_id else "")
+        """.format("AND o.hub_id = %s" if hub_id else ""))
 
         try:
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
             params = [hub_id] if hub_id else []
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            cursor.close()
+            results = self.db.execute_query(query, params, cache='historical')
 
             if not results:
                 print("✓ No significant breach patterns detected")
@@ -520,12 +611,10 @@ class SLAAnalytics:
                 'analysis_date': datetime.now().isoformat()
             }
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
-            print(f"✗ Breach risk analysis failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Breach risk analysis failed")
             return {"error": str(e)}
 
     def get_sla_trend(self, days: int = 30) -> Dict:
@@ -540,7 +629,7 @@ class SLAAnalytics:
         """
         print(f"\n📈 Analyzing SLA trend (last {days} days)...")
 
-        query = """
+        query = register_statement('sla_daily_trend', """
         WITH daily_compliance AS (
             SELECT
                 DATE(s.delivery_finish) as delivery_date,
@@ -552,7 +641,7 @@ class SLAAnalytics:
             WHERE s.is_completed = true
             AND s.delivery_finish IS NOT NULL
             AND s.promise_time IS NOT NULL
-            AND s.delivery_finish >= CURRENT_DATE - INTERVAL '%s days'
+            AND s.delivery_finish >= CURRENT_DATE - make_interval(days => %s)
             GROUP BY DATE(s.delivery_finish)
             HAVING COUNT(*) >= 5
         )
@@ -564,13 +653,10 @@ class SLAAnalytics:
             avg_duration_minutes
         FROM daily_compliance
         ORDER BY delivery_date DESC
-        """
+        """)
 
         try:
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute(query, (days,))
-            results = cursor.fetchall()
-            cursor.close()
+            results = self.db.execute_query(query, (days,), cache='historical')
 
             if not results:
                 return {"error": "No data available"}
@@ -618,12 +704,10 @@ class SLAAnalytics:
                     }
                 }
 
+        except QueryTimeoutError:
+            raise
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
-            print(f"✗ Trend analysis failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Trend analysis failed")
             return {"error": str(e)}
 
     def _get_compliance_status(self, compliance_rate: float) -> str:
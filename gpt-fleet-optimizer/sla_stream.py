@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+SLA Stream - Fleet Optimizer Module
+Fan-out of realtime SLA status to Server-Sent Events subscribers.
+
+Dashboards that poll /api/sla/realtime cost one status computation per open tab per poll.
+SLAStatusBroadcaster computes the status once per interval on a single background thread,
+while anyone is subscribed, and publishes it with the at-risk and breach transitions
+recorded by RealtimeSLATracker. Events go into one bounded ring buffer that every
+subscriber reads at its own pace. The publisher never waits for a subscriber; a subscriber
+that falls more than buffer_size events behind skips to the latest status. Database load
+depends on the interval, not on the number of viewers.
+
+Event types:
+    status      get_realtime_sla_status() result
+    transition  a shipment became at risk or breached (tracker enabled only)
+    error       the status computation failed; the stream keeps going
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StreamCapacityError(Exception):
+    """Raised when a broadcaster already has max_subscribers open streams."""
+
+
+class Subscription:
+    """One open stream of a broadcaster: iterate for events, close() to unsubscribe."""
+
+    def __init__(self, broadcaster: 'SLAStatusBroadcaster', events: Iterator):
+        self._broadcaster = broadcaster
+        self._events = events
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Optional[Tuple[int, str, Dict]]:
+        return next(self._events)
+
+    def close(self):
+        """Stop the stream and release its subscriber slot (only the first call counts)."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._events.close()
+        self._broadcaster._unsubscribe()
+
+
+class SLAStatusBroadcaster:
+    """Computes realtime SLA status once per interval and fans it out to all subscribers."""
+
+    def __init__(self, analytics, interval: float = None, buffer_size: int = None,
+                 max_subscribers: int = None, idle_timeout: float = 30.0):
+        """
+        Initialize the broadcaster. The publisher thread starts with the first subscriber.
+
+        Args:
+            analytics: SLAAnalytics instance shared with the API
+            interval: Seconds between status computations (default SLA_STREAM_INTERVAL or 2)
+            buffer_size: Events kept for subscribers to catch up on (default SLA_STREAM_BUFFER or 256)
+            max_subscribers: Open streams allowed per process; each one holds a server thread
+                (default SLA_STREAM_MAX_SUBSCRIBERS or 24)
+            idle_timeout: Seconds without subscribers before the publisher thread exits
+        """
+        self.analytics = analytics
+        self.interval = interval or float(os.getenv('SLA_STREAM_INTERVAL', 2))
+        self.buffer_size = buffer_size or int(os.getenv('SLA_STREAM_BUFFER', 256))
+        self.max_subscribers = max_subscribers or int(os.getenv('SLA_STREAM_MAX_SUBSCRIBERS', 24))
+        self.idle_timeout = idle_timeout
+
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=self.buffer_size)
+        self._seq = 0
+        self._latest_status = None
+        self._subscribers = 0
+        self._idle_since = time.monotonic()
+        self._publisher = None
+        self._stop = threading.Event()
+        self._transition_seq = None
+
+        # Metrics
+        self._computations = 0
+        self._errors = 0
+        self._skipped = 0
+        self._total_subscriptions = 0
+
+    def subscribe(self, last_event_id: int = None, heartbeat: float = 15.0) -> 'Subscription':
+        """
+        Open a stream, reserving a subscriber slot at once.
+
+        The subscription yields (event id, event type, data), starting with the events
+        after last_event_id when they are still buffered (an SSE reconnect), otherwise with
+        the latest status. It yields None every `heartbeat` seconds without events so the
+        caller can write a keep-alive and notice closed connections. Closing it releases
+        the slot, also when it was never iterated.
+
+        Raises:
+            StreamCapacityError: max_subscribers streams are already open
+        """
+        with self._condition:
+            if self._subscribers >= self.max_subscribers:
+                raise StreamCapacityError(f"{self._subscribers} SLA streams are already open")
+            self._subscribers += 1
+            self._total_subscriptions += 1
+            self._ensure_publisher()
+            if last_event_id is not None and self._events and \
+                    self._events[0][0] - 1 <= last_event_id <= self._seq:
+                cursor = last_event_id
+                pending = []
+            else:
+                cursor = self._seq
+                pending = [self._latest_status] if self._latest_status else []
+        return Subscription(self, self._stream(cursor, pending, heartbeat))
+
+    def _stream(self, cursor: int, pending: list, heartbeat: float) -> Iterator[Optional[Tuple[int, str, Dict]]]:
+        for event in pending:
+            yield event
+        while True:
+            with self._condition:
+                if not self._condition.wait_for(lambda: self._seq > cursor, timeout=heartbeat):
+                    pending = None
+                elif self._events[0][0] > cursor + 1:
+                    # Fell behind the buffer: skip to the latest status instead of replaying
+                    self._skipped += self._events[0][0] - cursor - 1
+                    pending = [self._latest_status] if self._latest_status else []
+                    cursor = self._seq
+                else:
+                    pending = [event for event in self._events if event[0] > cursor]
+                    cursor = pending[-1][0]
+
+            if pending is None:
+                yield None
+                continue
+            for event in pending:
+                yield event
+
+    def _unsubscribe(self):
+        with self._condition:
+            self._subscribers -= 1
+            if self._subscribers == 0:
+                self._idle_since = time.monotonic()
+
+    def has_capacity(self) -> bool:
+        """Whether another subscriber fits under max_subscribers (subscribe() checks atomically)."""
+        return self._subscribers < self.max_subscribers
+
+    def get_stats(self) -> Dict:
+        """Subscribers, buffer occupancy and publisher counters."""
+        with self._condition:
+            return {
+                'subscribers': self._subscribers,
+                'max_subscribers': self.max_subscribers,
+                'total_subscriptions': self._total_subscriptions,
+                'publisher_running': self._publisher is not None,
+                'interval_seconds': self.interval,
+                'buffer_size': self.buffer_size,
+                'buffered_events': len(self._events),
+                'last_event_id': self._seq,
+                'computations': self._computations,
+                'errors': self._errors,
+                'skipped_events': self._skipped
+            }
+
+    def stop(self):
+        """Stop the publisher thread (subscribers keep waiting for a restart)."""
+        self._stop.set()
+        publisher = self._publisher
+        if publisher is not None:
+            publisher.join(timeout=self.interval + 5)
+
+    def _ensure_publisher(self):
+        # Caller holds self._condition
+        if self._publisher is None:
+            self._stop.clear()
+            self._publisher = threading.Thread(target=self._run, name='sla-stream-publisher', daemon=True)
+            self._publisher.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._condition:
+                if self._subscribers == 0 and time.monotonic() - self._idle_since >= self.idle_timeout:
+                    self._release_publisher()
+                    return
+            self._publish_status()
+            self._stop.wait(self.interval)
+        with self._condition:
+            self._release_publisher()
+
+    def _release_publisher(self):
+        # Caller holds self._condition; a publisher started after stop() stays registered
+        if self._publisher is threading.current_thread():
+            self._publisher = None
+
+    def _publish_status(self):
+        try:
+            status = self.analytics.get_realtime_sla_status()
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"SLA stream status failed: {e}")
+            self._publish('error', {'error': str(e), 'error_type': type(e).__name__})
+            return
+
+        self._computations += 1
+        tracker = self.analytics.tracker
+        transitions = []
+        if tracker.enabled and 'error' not in status:
+            seq, transitions = tracker.transitions_since(self._transition_seq or 0)
+            if self._transition_seq is None:
+                # Transitions from before the first computation are history, not news
+                transitions = []
+            self._transition_seq = seq
+
+        for transition in transitions:
+            self._publish('transition', transition)
+        self._publish('error' if 'error' in status else 'status', status)
+
+    def _publish(self, event_type: str, data: Dict):
+        with self._condition:
+            self._seq += 1
+            event = (self._seq, event_type, data)
+            self._events.append(event)
+            if event_type == 'status':
+                self._latest_status = event
+            self._condition.notify_all()
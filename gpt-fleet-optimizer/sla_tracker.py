@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Realtime SLA Tracker - Fleet Optimizer Module
+In-process view of active shipments for the realtime SLA dashboard.
+
+get_realtime_sla_status used to aggregate 24 hours of active shipments and scan every
+uncompleted shipment for to_timestamp(promise_time) - NOW() on each request. The tracker
+loads the active shipments once, then applies deltas polled by an updated_at high-water
+mark. Shipments are kept in min-heaps keyed by promise time: the most urgent shipments are
+read off the front, and at-risk and breached counters advance as the clock passes each
+shipment's deadline. The 24-hour aggregates are running sums. A request costs one small
+indexed delta query at most every poll_interval seconds, plus microseconds of Python.
+
+Requires updated_at to be maintained on every write to shipments (and indexed). Rows whose
+updated_at is not bumped, and deletes, are picked up by the periodic full reload
+(SLA_TRACKER_RESYNC_SECONDS).
+
+Usage:
+    python sla_tracker.py            # load once and print the current status
+    python sla_tracker.py --watch 5  # print the status every 5 seconds
+"""
+
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+from database_connection import DatabaseConnection, get_database_connection, register_statement
+
+
+CLOCK = """
+SELECT NOW() AS db_time, EXTRACT(EPOCH FROM NOW()) AS db_epoch
+"""
+
+# created_at is cast so a timestamp column is read in the session time zone, as NOW() - created_at does
+ACTIVE_SHIPMENTS = register_statement('sla_tracker_active', """
+SELECT
+    s.id,
+    s.tracking_no,
+    s.shipment_status,
+    s.courier_id,
+    s.partner_id,
+    EXTRACT(EPOCH FROM s.created_at::timestamptz) AS created_epoch,
+    s.promise_time,
+    true AS active
+FROM shipments s
+WHERE s.is_completed = false
+AND s.is_cancelled = false
+AND s.promise_time IS NOT NULL
+""")
+
+# Re-reads an overlap window before the high-water mark: rows committed late by long
+# transactions are not skipped, and applying a row twice is harmless. updated_at is cast
+# like created_at: the high-water mark comes from NOW() and is compared with it in Python,
+# which fails for the naive values a timestamp column returns.
+SHIPMENT_CHANGES = register_statement('sla_tracker_changes', """
+SELECT
+    s.id,
+    s.tracking_no,
+    s.shipment_status,
+    s.courier_id,
+    s.partner_id,
+    EXTRACT(EPOCH FROM s.created_at::timestamptz) AS created_epoch,
+    s.promise_time,
+    COALESCE(s.is_completed = false AND s.is_cancelled = false AND s.promise_time IS NOT NULL, false) AS active,
+    s.updated_at::timestamptz AS updated_at
+FROM shipments s
+WHERE s.updated_at > %s::timestamptz - make_interval(secs => %s)
+ORDER BY s.updated_at
+""")
+
+
+class RealtimeSLATracker:
+    """Keeps active shipments in memory and answers realtime SLA questions from them."""
+
+    AT_RISK_MINUTES = 15
+    WINDOW_HOURS = 24
+
+    def __init__(self, db: DatabaseConnection, poll_interval: float = None, resync_interval: float = None,
+                 overlap_seconds: float = None):
+        """
+        Initialize the tracker. Nothing is loaded until the first status() call.
+
+        Args:
+            db: Database connection shared with the analyzer
+            poll_interval: Minimum seconds between delta polls (default SLA_TRACKER_POLL_SECONDS or 2)
+            resync_interval: Seconds between full reloads (default SLA_TRACKER_RESYNC_SECONDS or 600)
+            overlap_seconds: How far before the high-water mark each delta poll re-reads
+                (default SLA_TRACKER_OVERLAP_SECONDS or 120)
+        """
+        self.db = db
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv('SLA_TRACKER_POLL_SECONDS', 2))
+        self.resync_interval = resync_interval or float(os.getenv('SLA_TRACKER_RESYNC_SECONDS', 600))
+        self.overlap_seconds = overlap_seconds if overlap_seconds is not None else float(os.getenv('SLA_TRACKER_OVERLAP_SECONDS', 120))
+        self.enabled = os.getenv('SLA_TRACKER', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._shipments = {}
+        self._reset()
+        self._seq = 0
+        self._high_water = None
+        self._clock_offset = 0.0
+        self._loaded_at = None
+        self._polled_at = None
+        # At-risk and breach transitions, numbered so consumers can ask for what they missed
+        self._transitions = deque(maxlen=1000)
+        self._transition_seq = 0
+
+        # Metrics
+        self._loads = 0
+        self._polls = 0
+        self._rows_applied = 0
+
+    def status(self, limit: int = 20) -> Tuple[Dict, List[Dict]]:
+        """
+        Current realtime SLA aggregates and the most urgent at-risk shipments.
+
+        Returns the same columns as the sla_realtime_status and sla_at_risk_deliveries
+        queries: aggregates over active shipments created in the last 24 hours, and up to
+        `limit` shipments due within AT_RISK_MINUTES, most overdue first.
+        """
+        self.sync()
+
+        with self._lock:
+            now = self._now()
+            self._advance(now)
+            threshold = now + self.AT_RISK_MINUTES * 60
+
+            at_risk = []
+            for entry in self._ordered_by_promise():
+                if entry['promise'] >= threshold or len(at_risk) == limit:
+                    break
+                at_risk.append({
+                    'id': entry['id'],
+                    'tracking_no': entry['tracking_no'],
+                    'shipment_status': entry['shipment_status'],
+                    'courier_id': entry['courier_id'],
+                    'partner_id': entry['partner_id'],
+                    'remaining_minutes': (entry['promise'] - now) / 60,
+                    'elapsed_minutes': (now - entry['created']) / 60
+                })
+
+            count = self._window_count
+            first_due = self._window_top(self._window_by_promise)
+            oldest = self._window_top(self._by_created)
+            aggregates = {
+                'active_count': count,
+                'avg_elapsed_minutes': (now - self._window_created_sum / count) / 60 if count else None,
+                'at_risk_count': self._at_risk_count,
+                'breached_count': self._breached_count,
+                'min_remaining_minutes': (first_due['promise'] - now) / 60 if first_due else None,
+                'max_elapsed_minutes': (now - oldest['created']) / 60 if oldest else None,
+                'avg_sla_target': self._window_target_sum / count / 60 if count else None
+            }
+        return aggregates, at_risk
+
+    def sync(self, force: bool = False):
+        """
+        Reload or apply deltas when due.
+
+        A full reload runs on first use and every resync_interval; otherwise changed rows are
+        polled at most every poll_interval. When another thread is already syncing, callers
+        read the current state instead of waiting, unless nothing has been loaded yet.
+        """
+        if not self._sync_lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            current = time.monotonic()
+            if force or self._loaded_at is None or current - self._loaded_at >= self.resync_interval:
+                self._load()
+            elif current - self._polled_at >= self.poll_interval:
+                self._poll()
+        finally:
+            self._sync_lock.release()
+
+    def transitions_since(self, seq: int) -> Tuple[int, List[Dict]]:
+        """
+        Shipments that became at risk or breached after transition number `seq`.
+
+        Transitions are recorded while status() advances the clock and when a polled change
+        puts a shipment straight into either state; full (re)loads record none. Only the
+        last 1000 are kept.
+
+        Returns:
+            (latest transition number, transitions newer than seq, oldest first)
+        """
+        with self._lock:
+            return self._transition_seq, [t for t in self._transitions if t['seq'] > seq]
+
+    def get_stats(self) -> Dict:
+        """Tracker size, high-water mark and load/poll counters."""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'active_shipments': len(self._shipments),
+                'in_window': self._window_count,
+                'heap_size': len(self._by_promise),
+                'high_water': self._high_water.isoformat() if self._high_water else None,
+                'seconds_since_load': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+                'loads': self._loads,
+                'polls': self._polls,
+                'rows_applied': self._rows_applied
+            }
+
+    def _load(self):
+        clock = self.db.execute_query(CLOCK)[0]
+        rows = self.db.execute_query(ACTIVE_SHIPMENTS, timeout=None)
+
+        with self._lock:
+            self._clock_offset = float(clock['db_epoch']) - time.time()
+            self._shipments = {}
+            self._reset()
+            now = self._now()
+            for row in rows:
+                self._apply(row, now)
+            self._high_water = clock['db_time']
+            self._loaded_at = self._polled_at = time.monotonic()
+            self._loads += 1
+            self._rows_applied += len(rows)
+
+    def _poll(self):
+        rows = self.db.execute_query(SHIPMENT_CHANGES, [self._high_water, self.overlap_seconds])
+
+        with self._lock:
+            now = self._now()
+            for row in rows:
+                self._apply(row, now, record=True)
+                if row['updated_at'] > self._high_water:
+                    self._high_water = row['updated_at']
+            if len(self._by_promise) > 2 * len(self._shipments) + 1024:
+                self._rebuild_heaps()
+            self._polled_at = time.monotonic()
+            self._polls += 1
+            self._rows_applied += len(rows)
+
+    def _reset(self):
+        """Empty heaps and window aggregates (the caller empties or refills _shipments)."""
+        # Heap items are (key, shipment id, seq); an item whose seq no longer matches the
+        # shipment's is stale and skipped, so updates never search the heaps.
+        self._by_promise = []          # every active shipment (at-risk list)
+        self._window_by_promise = []   # shipments in the 24-hour window (min remaining)
+        self._by_created = []          # shipments in the window, oldest first (eviction, max elapsed)
+        self._pending_risk = []        # in the window and not yet at risk
+        self._pending_breach = []      # in the window, at risk and not yet breached
+        self._window_count = 0
+        self._window_created_sum = 0.0
+        self._window_target_sum = 0.0
+        self._at_risk_count = 0
+        self._breached_count = 0
+
+    def _now(self) -> float:
+        """Database clock, as epoch seconds."""
+        return time.time() + self._clock_offset
+
+    def _apply(self, row: Dict, now: float, record: bool = False):
+        """Insert, update or drop one shipment. Heap items of replaced versions go stale."""
+        old = self._shipments.pop(row['id'], None)
+        if not row['active']:
+            if old:
+                self._leave_window(old)
+            return
+
+        entry = {
+            'id': row['id'],
+            'tracking_no': row['tracking_no'],
+            'shipment_status': row['shipment_status'],
+            'courier_id': row['courier_id'],
+            'partner_id': row['partner_id'],
+            'created': float(row['created_epoch']),
+            'promise': float(row['promise_time'])
+        }
+        if old and old['created'] == entry['created'] and old['promise'] == entry['promise']:
+            for key in ('seq', 'in_window', 'stage'):
+                entry[key] = old[key]
+            self._shipments[entry['id']] = entry
+            return
+
+        previous_stage = old['stage'] if old and old['in_window'] else 0
+        if old:
+            self._leave_window(old)
+        self._seq += 1
+        entry['seq'], entry['in_window'], entry['stage'] = self._seq, False, 0
+        self._shipments[entry['id']] = entry
+        heapq.heappush(self._by_promise, (entry['promise'], entry['id'], entry['seq']))
+        if entry['created'] >= now - self.WINDOW_HOURS * 3600:
+            self._enter_window(entry, now)
+            if record and entry['stage'] > previous_stage:
+                self._record_transition(entry, now)
+
+    def _enter_window(self, entry: Dict, now: float):
+        item = (entry['promise'], entry['id'], entry['seq'])
+        entry['in_window'] = True
+        self._window_count += 1
+        self._window_created_sum += entry['created']
+        self._window_target_sum += entry['promise'] - entry['created']
+        heapq.heappush(self._window_by_promise, item)
+        heapq.heappush(self._by_created, (entry['created'], entry['id'], entry['seq']))
+
+        if entry['promise'] < now:
+            entry['stage'] = 2
+            self._at_risk_count += 1
+            self._breached_count += 1
+        elif entry['promise'] < now + self.AT_RISK_MINUTES * 60:
+            entry['stage'] = 1
+            self._at_risk_count += 1
+            heapq.heappush(self._pending_breach, item)
+        else:
+            entry['stage'] = 0
+            heapq.heappush(self._pending_risk, item)
+
+    def _leave_window(self, entry: Dict):
+        if entry['in_window']:
+            entry['in_window'] = False
+            self._window_count -= 1
+            self._window_created_sum -= entry['created']
+            self._window_target_sum -= entry['promise'] - entry['created']
+            self._at_risk_count -= entry['stage'] >= 1
+            self._breached_count -= entry['stage'] == 2
+
+    def _current(self, item: Tuple, in_window: bool = False) -> Dict:
+        """The shipment a heap item points to, or None when the item is stale."""
+        entry = self._shipments.get(item[1])
+        if entry is None or entry['seq'] != item[2] or (in_window and not entry['in_window']):
+            return None
+        return entry
+
+    def _advance(self, now: float):
+        """
+        Move the window and the at-risk/breached counters to `now`.
+
+        Shipments only ever move forward (in window -> out, pending -> at risk -> breached),
+        so each one is popped at most once per stage.
+        """
+        cutoff = now - self.WINDOW_HOURS * 3600
+        while self._by_created and self._by_created[0][0] < cutoff:
+            entry = self._current(heapq.heappop(self._by_created), in_window=True)
+            if entry is not None:
+                self._leave_window(entry)
+
+        while self._pending_risk and self._pending_risk[0][0] < now + self.AT_RISK_MINUTES * 60:
+            item = heapq.heappop(self._pending_risk)
+            entry = self._current(item, in_window=True)
+            if entry is not None and entry['stage'] == 0:
+                entry['stage'] = 1
+                self._at_risk_count += 1
+                heapq.heappush(self._pending_breach, item)
+                self._record_transition(entry, now)
+
+        while self._pending_breach and self._pending_breach[0][0] < now:
+            entry = self._current(heapq.heappop(self._pending_breach), in_window=True)
+            if entry is not None and entry['stage'] == 1:
+                entry['stage'] = 2
+                self._breached_count += 1
+                self._record_transition(entry, now)
+
+    def _record_transition(self, entry: Dict, now: float):
+        self._transition_seq += 1
+        self._transitions.append({
+            'seq': self._transition_seq,
+            'transition': 'breached' if entry['stage'] == 2 else 'at_risk',
+            'id': entry['id'],
+            'tracking_no': entry['tracking_no'],
+            'courier_id': entry['courier_id'],
+            'remaining_minutes': (entry['promise'] - now) / 60,
+            'timestamp': datetime.fromtimestamp(now).isoformat()
+        })
+
+    def _window_top(self, heap: List) -> Dict:
+        """First live in-window shipment of a window heap, dropping stale items above it."""
+        while heap:
+            entry = self._current(heap[0], in_window=True)
+            if entry is not None:
+                return entry
+            heapq.heappop(heap)
+        return None
+
+    def _ordered_by_promise(self) -> Iterator[Dict]:
+        """
+        Live shipments in ascending promise time, without popping the heap.
+
+        Walks the heap array best-first (a node is visited only after its parent), so reading
+        the first k shipments costs O(k log k) however many shipments are tracked.
+        """
+        heap = self._by_promise
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            item, index = heapq.heappop(frontier)
+            entry = self._current(item)
+            if entry is not None:
+                yield entry
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def _rebuild_heaps(self):
+        """Drop stale items once they outnumber live ones."""
+        live = list(self._shipments.values())
+        window = [entry for entry in live if entry['in_window']]
+        self._by_promise = [(e['promise'], e['id'], e['seq']) for e in live]
+        self._window_by_promise = [(e['promise'], e['id'], e['seq']) for e in window]
+        self._by_created = [(e['created'], e['id'], e['seq']) for e in window]
+        self._pending_risk = [(e['promise'], e['id'], e['seq']) for e in window if e['stage'] == 0]
+        self._pending_breach = [(e['promise'], e['id'], e['seq']) for e in window if e['stage'] == 1]
+        for heap in (self._by_promise, self._window_by_promise, self._by_created,
+                     self._pending_risk, self._pending_breach):
+            heapq.heapify(heap)
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Track realtime SLA status in memory')
+    parser.add_argument('--watch', type=float, default=None, help='Print the status every N seconds')
+    args = parser.parse_args()
+
+    db = get_database_connection()
+    db.connect(retry_attempts=1)
+    tracker = RealtimeSLATracker(db)
+
+    try:
+        while True:
+            aggregates, at_risk = tracker.status()
+            print(json.dumps({'overall': aggregates, 'at_risk': at_risk, 'tracker': tracker.get_stats()},
+                             indent=2, default=str))
+            if args.watch is None:
+                break
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"❌ SLA tracker failed: {e}")
+        sys.exit(1)
+    finally:
+        db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
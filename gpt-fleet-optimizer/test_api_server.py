@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+API server tests: the demand endpoints answer 503 while the database is unreachable
+(instead of exiting the worker) and connect again on the next request once it is back;
+the SLA stream refuses connections beyond its subscriber cap.
+
+Runs without a database: DatabaseConnection.connect is replaced for each scenario, and
+the SLA stream reads a stub analytics object.
+
+Usage:
+    python -m pytest test_api_server.py
+"""
+
+import os
+import sys
+import types
+
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import api_server  # noqa: E402
+from database_connection import CircuitOpenError, DatabaseConnection  # noqa: E402
+from sla_stream import SLAStatusBroadcaster  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api_server, '_demand_forecaster', None)
+    monkeypatch.delenv('PRODUCTION_ONLY', raising=False)
+    return api_server.app.test_client()
+
+
+def test_unreachable_database_answers_503_and_reconnects(client, monkeypatch):
+    attempts = []
+
+    def refuse(self, **kwargs):
+        attempts.append(self)
+        raise psycopg2.OperationalError('could not connect to server: Connection refused')
+
+    monkeypatch.setattr(DatabaseConnection, 'connect', refuse)
+    for path in ('/api/demand/daily', '/api/demand/hourly', '/api/demand/resources', '/api/demand/cache'):
+        response = client.get(path)
+        assert response.status_code == 503, path
+        assert response.get_json()['error_type'] == 'database_unavailable'
+        assert response.headers['Retry-After'] == '5'
+    # No half-initialized forecaster is kept: every request tried to connect
+    assert len(attempts) == 4
+    assert api_server._demand_forecaster is None
+
+    monkeypatch.setattr(DatabaseConnection, 'connect', lambda self, **kwargs: attempts.append(self) or True)
+    response = client.get('/api/demand/cache')
+    assert response.status_code == 200
+    assert response.get_json()['entries'] == 0
+    assert api_server._demand_forecaster.data_source == 'production'
+
+    client.get('/api/demand/cache')
+    assert len(attempts) == 5
+
+
+def test_open_circuit_answers_503(client, monkeypatch):
+    def circuit_open(self, **kwargs):
+        raise CircuitOpenError('Circuit breaker is OPEN. Database unavailable.')
+
+    monkeypatch.setattr(DatabaseConnection, 'connect', circuit_open)
+    response = client.get('/api/demand/daily')
+    assert response.status_code == 503
+    assert api_server._demand_forecaster is None
+
+
+def test_sla_stream_cap_counts_responses_not_yet_streaming(client, monkeypatch):
+    analytics = types.SimpleNamespace(get_realtime_sla_status=lambda: {'active_shipments': 0},
+                                      tracker=types.SimpleNamespace(enabled=False))
+    broadcaster = SLAStatusBroadcaster(analytics, interval=3600, max_subscribers=2)
+    monkeypatch.setattr(api_server, '_sla_broadcaster', broadcaster)
+    try:
+        # Neither response body has been read yet
+        first, second = client.get('/api/sla/stream'), client.get('/api/sla/stream')
+        assert (first.status_code, second.status_code) == (200, 200)
+        refused = client.get('/api/sla/stream')
+        assert refused.status_code == 503
+        assert refused.get_json()['error_type'] == 'stream_capacity'
+
+        # Request contexts of streamed responses are closed in reverse order
+        second.close()
+        assert broadcaster.get_stats()['subscribers'] == 1
+        third = client.get('/api/sla/stream')
+        assert third.status_code == 200
+        assert next(third.response).startswith(b'id: 1\nevent: status\n')
+        third.close()
+        first.close()
+        assert broadcaster.get_stats()['subscribers'] == 0
+    finally:
+        broadcaster.stop()
@@ -0,0 +1,825 @@
+#!/usr/bin/env python3
+"""
+Database connection layer tests that need no PostgreSQL server: the shared connection
+pool and the circuit breaker are exercised with fake psycopg2 connections, and query
+telemetry and the prepared-statement registry are fed recorded executions and fake
+cursors directly, the COPY readers parse canned CSV output, and query timeouts are
+raised by fake cursors (sync and asyncio) that are cancelled or hang until cancelled.
+
+Usage:
+    python -m pytest test_database_connection.py
+"""
+
+import io
+import os
+import sys
+import time
+import types
+import asyncio
+import threading
+import contextlib
+from collections import deque
+
+import pandas as pd
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database_connection  # noqa: E402
+from conftest import wait_for  # noqa: E402
+from database_connection import (  # noqa: E402
+    LATENCY_BUCKETS_MS, CircuitBreaker, CircuitOpenError, ConnectionPool, DatabaseConnection, PoolTimeoutError,
+    QueryCache, QueryTelemetry, QueryTimeoutError, StatementRegistry, fingerprint_sql, get_connection_pool,
+    get_timed_out_queries, normalize_sql, run_async
+)
+
+CONFIG = {'host': 'test', 'port': 5432, 'database': 'pool_test'}
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.connection = conn
+        self.statements = []
+
+    def execute(self, query, params=None):
+        if self.connection.broken:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        self.statements.append((query, params))
+        self.connection.statements.append(query)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """What ConnectionPool uses of a psycopg2 connection."""
+
+    created = 0
+
+    def __init__(self, **config):
+        FakeConnection.created += 1
+        self.id = FakeConnection.created
+        self.closed = 0
+        self.broken = False
+        self.in_transaction = False
+        self.rollbacks = 0
+        self.statements = []
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        if self.broken:
+            raise psycopg2.OperationalError('connection lost')
+        return (psycopg2.extensions.TRANSACTION_STATUS_INTRANS if self.in_transaction
+                else psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    FakeConnection.created = 0
+    monkeypatch.setattr(database_connection.psycopg2, 'connect', FakeConnection)
+    monkeypatch.setattr(database_connection.psycopg2.extensions, 'register_type', lambda *args: None)
+    return FakeConnection
+
+
+def test_pool_opens_lazily_and_reuses_last_returned(fake_connect):
+    pool = ConnectionPool(CONFIG, min_size=1, max_size=3)
+    assert pool.get_metrics()['open_connections'] == 1
+
+    first, second = pool.getconn(), pool.getconn()
+    assert (first.id, second.id) == (1, 2)
+    pool.putconn(first)
+    pool.putconn(second)
+    assert pool.getconn() is second
+
+    metrics = pool.get_metrics()
+    assert (metrics['open_connections'], metrics['in_use_connections'], metrics['peak_in_use_connections']) == (2, 1, 2)
+    assert metrics['checkouts'] == 3
+
+
+def test_checkout_times_out_when_exhausted(fake_connect):
+    pool = ConnectionPool(CONFIG, min_size=0, max_size=2, checkout_timeout=0.05)
+    held = [pool.getconn(), pool.getconn()]
+
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+    assert pool.get_metrics()['checkout_timeouts'] == 1
+    assert pool.get_metrics()['utilization_pct'] == 100.0
+    assert fake_connect.created == 2
+    for conn in held:
+        pool.putconn(conn)
+
+
+def test_waiting_checkout_gets_returned_connection(fake_connect):
+    pool = ConnectionPool(CONFIG, min_size=0, max_size=1, checkout_timeout=5)
+    conn = pool.getconn()
+    borrowed = []
+    waiter = threading.Thread(target=lambda: borrowed.append(pool.getconn()))
+    waiter.start()
+    time.sleep(0.05)
+    assert borrowed == []
+
+    pool.putconn(conn)
+    waiter.join(5)
+    assert borrowed == [conn]
+    assert pool.get_metrics()['max_wait_ms'] >= 40
+
+
+def test_dead_idle_connection_is_replaced(fake_connect):
+    pool = ConnectionPool(CONFIG, min_size=1, max_size=2, health_check_interval=0)
+    idle = pool.getconn()
+    pool.putconn(idle)
+    idle.broken = True  # the server went away while it sat in the pool
+
+    conn = pool.getconn()
+    assert conn is not idle and idle.closed
+    metrics = pool.get_metrics()
+    assert (metrics['health_check_failures'], metrics['open_connections']) == (1, 1)
+
+
+def test_recently_used_connection_is_not_pinged(fake_connect):
+    pool = ConnectionPool(CONFIG, min_size=1, max_size=1, health_check_interval=30)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert conn.statements == []
+
+
+def test_putconn_rolls_back_and_discards_broken_connections(fake_connect):
+    pool = ConnectionPool(CONFIG, min_size=0, max_size=2)
+    open_transaction, broken = pool.getconn(), pool.getconn()
+    open_transaction.in_transaction = True
+    broken.broken = True
+
+    pool.putconn(open_transaction)
+    pool.putconn(broken)
+    assert open_transaction.rollbacks == 1 and not open_transaction.closed
+    assert broken.closed
+    assert pool.get_metrics()['open_connections'] == 1
+
+
+def test_connection_block_returns_connection_on_error(fake_connect):
+    pool = ConnectionPool(CONFIG, min_size=0, max_size=1, checkout_timeout=0.05)
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            raise RuntimeError('query failed')
+
+    with pool.connection() as again:
+        assert again is conn
+
+
+def test_abandoned_stream_returns_connection(fake_connect):
+    pool = ConnectionPool(CONFIG, min_size=0, max_size=1, checkout_timeout=0.05)
+
+    def stream():
+        with pool.connection():
+            yield from range(10)
+
+    rows = stream()
+    assert next(rows) == 0
+    rows.close()
+    assert pool.get_metrics()['in_use_connections'] == 0
+
+
+def test_failed_connect_frees_the_slot(fake_connect, monkeypatch):
+    pool = ConnectionPool(CONFIG, min_size=0, max_size=1, checkout_timeout=0.05)
+
+    def refuse(**config):
+        raise psycopg2.OperationalError('could not connect to server')
+
+    monkeypatch.setattr(database_connection.psycopg2, 'connect', refuse)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    assert pool.get_metrics()['open_connections'] == 0
+
+    monkeypatch.setattr(database_connection.psycopg2, 'connect', FakeConnection)
+    assert pool.getconn() is not None
+
+
+def test_closeall_closes_idle_and_returned_connections(fake_connect):
+    pool = ConnectionPool(CONFIG, min_size=2, max_size=2)
+    borrowed = pool.getconn()
+    pool.closeall()
+    pool.putconn(borrowed)
+
+    assert borrowed.closed
+    assert pool.get_metrics()['open_connections'] == 0
+    with pytest.raises(Exception, match='closed'):
+        pool.getconn()
+
+
+def test_pools_are_shared_per_config(fake_connect, monkeypatch):
+    monkeypatch.setattr(database_connection, '_pools', {})
+    pool = get_connection_pool(dict(CONFIG))
+    assert get_connection_pool({'database': 'pool_test', 'port': '5432', 'host': 'test'}) is pool
+    assert get_connection_pool(dict(CONFIG, database='other')) is not pool
+
+    pool.closeall()
+    assert get_connection_pool(dict(CONFIG)) is not pool
+
+
+def refuse_connection(**config):
+    raise psycopg2.OperationalError('could not connect to server')
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # a success resets the count
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == 'CLOSED' and breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == 'OPEN'
+    assert not breaker.allow_request() and not breaker.allow_request()
+    metrics = breaker.get_metrics()
+    assert metrics['rejected_requests'] == 2
+    assert metrics['transitions'] == {'CLOSED->OPEN': 1}
+
+
+def test_decorated_call_fails_fast_while_open():
+    breaker = CircuitBreaker(failure_threshold=1, expected_exception=ConnectionError)
+    calls = []
+
+    @breaker
+    def query():
+        calls.append(1)
+        raise ConnectionError('reset by peer')
+
+    with pytest.raises(ConnectionError):
+        query()
+    with pytest.raises(CircuitOpenError):
+        query()
+    assert len(calls) == 1
+
+
+def test_prober_backs_off_and_closes_circuit():
+    outcomes = [False, False, False, True]
+    probed_at = []
+
+    def probe():
+        probed_at.append(time.monotonic())
+        if not outcomes.pop(0):
+            raise ConnectionError('still down')
+
+    breaker = CircuitBreaker(probe=probe, probe_interval=0.02, reset_timeout=0.08)
+    try:
+        breaker.trip()
+        assert breaker.state == 'OPEN'
+        wait_for(lambda: breaker.state == 'CLOSED')
+    finally:
+        breaker.stop()
+
+    gaps = [later - earlier for earlier, later in zip(probed_at, probed_at[1:])]
+    assert gaps[0] >= 0.035 and gaps[1] >= 0.075 and gaps[2] >= 0.075  # 0.04, then capped at 0.08
+    metrics = breaker.get_metrics()
+    assert (metrics['probes'], metrics['probe_failures']) == (4, 3)
+    assert metrics['transitions'] == {'CLOSED->OPEN': 1, 'OPEN->HALF_OPEN': 4, 'HALF_OPEN->OPEN': 3,
+                                      'HALF_OPEN->CLOSED': 1}
+    assert breaker.allow_request()
+
+
+@pytest.fixture
+def breakers(monkeypatch):
+    monkeypatch.setattr(database_connection, '_breakers', {})
+    monkeypatch.setattr(database_connection, '_pools', {})
+    monkeypatch.setattr(database_connection, '_query_cache', QueryCache())
+    monkeypatch.setenv('DB_BREAKER_FAILURE_THRESHOLD', '2')
+    monkeypatch.setenv('DB_BREAKER_PROBE_INTERVAL', '0.01')
+    monkeypatch.setenv('DB_BREAKER_MAX_PROBE_INTERVAL', '0.02')
+    yield database_connection._breakers
+    for breaker in database_connection._breakers.values():
+        breaker.stop()
+
+
+def test_connect_does_not_wait_between_attempts(fake_connect, breakers, monkeypatch):
+    monkeypatch.setattr(database_connection.psycopg2, 'connect', refuse_connection)
+    db = DatabaseConnection(config=dict(CONFIG), enable_fallback=True)
+
+    started = time.monotonic()
+    assert db.connect(retry_attempts=3, base_delay=2.0) is False
+    assert time.monotonic() - started < 1.0
+    assert db.is_fallback_mode and db.circuit_breaker.state == 'OPEN'
+    assert db.execute_query("SELECT COUNT(*) FROM orders GROUP BY hub_id")
+
+    strict = DatabaseConnection(config=dict(CONFIG))
+    assert strict.circuit_breaker is db.circuit_breaker
+    with pytest.raises(CircuitOpenError):
+        strict.connect()
+
+    # The prober sees the database come back; fallback connections return on their next query
+    monkeypatch.setattr(database_connection.psycopg2, 'connect', FakeConnection)
+    wait_for(lambda: db.circuit_breaker.state == 'CLOSED')
+    db._execute_query = lambda query, params, timeout, numeric_as_float: [{'n': 1}]
+    assert db.execute_query('SELECT 1 AS n') == [{'n': 1}]
+    assert not db.is_fallback_mode
+
+
+def test_open_circuit_serves_cached_results_without_querying(fake_connect, breakers, monkeypatch):
+    db = DatabaseConnection(config=dict(CONFIG))
+    db.connect()
+    calls = []
+
+    def execute(query, params, timeout, numeric_as_float):
+        calls.append(query)
+        if query == 'SELECT broken':
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        return [{'active': 3}]
+
+    db._execute_query = execute
+    assert db.execute_query('SELECT COUNT(*) AS active FROM shipments', cache='realtime') == [{'active': 3}]
+    for _ in range(2):
+        with pytest.raises(psycopg2.OperationalError):
+            db.execute_query('SELECT broken')
+    assert db.circuit_breaker.state == 'OPEN'
+
+    # Keep the circuit open while the cached and uncached paths are checked
+    db.circuit_breaker.stop()
+    calls.clear()
+    assert db.execute_query('SELECT COUNT(*) AS active FROM shipments', cache='realtime') == [{'active': 3}]
+    with pytest.raises(CircuitOpenError):
+        db.execute_query('SELECT COUNT(*) AS active FROM shipments')
+    assert calls == []
+
+
+def test_fingerprint_ignores_literals_comments_and_parameters():
+    query = """
+        SELECT hub_id, COUNT(*)  -- busiest hubs
+        FROM orders WHERE status = 'delivered' AND created_at > %s LIMIT 10
+    """
+    assert normalize_sql(query) == \
+        "select hub_id, count(*) from orders where status = ? and created_at > ? limit ?"
+    assert fingerprint_sql(query) == fingerprint_sql(
+        "/* report */ select hub_id, count(*) from orders where status = 'it''s' and created_at > %(since)s limit 5"
+    )
+    assert fingerprint_sql(query) != fingerprint_sql(query.replace('hub_id', 'zone_id'))
+
+
+def test_record_aggregates_per_fingerprint():
+    telemetry = QueryTelemetry(slow_query_ms=1000)
+    telemetry.record('SELECT * FROM orders WHERE hub_id = 1', 'forecast.daily', 0.004, rows=10, bytes_received=400)
+    telemetry.record('SELECT * FROM orders WHERE hub_id = 2', 'forecast.hourly', 0.030, rows=20, bytes_received=800)
+    telemetry.record('SELECT * FROM orders WHERE hub_id = 3', 'forecast.daily', 0.002, error='QueryCanceled')
+    telemetry.record('SELECT 1', 'health', 0.001)
+
+    busiest, health = telemetry.get_query_stats()
+    assert busiest['fingerprint'] == fingerprint_sql('SELECT * FROM orders WHERE hub_id = %s')
+    assert (busiest['calls'], busiest['errors'], busiest['rows'], busiest['bytes']) == (3, 1, 30, 1200)
+    assert busiest['callers'] == {'forecast.daily': 2, 'forecast.hourly': 1}
+    assert (busiest['total_ms'], busiest['max_ms'], busiest['mean_ms']) == (36.0, 30.0, 12.0)
+    assert health['calls'] == 1
+    assert [item['calls'] for item in telemetry.get_query_stats(limit=1, order_by='calls')] == [3]
+
+    # 1, 2 and 4ms fall in the first bucket, 30ms in le_50ms
+    assert sum(busiest['histogram']) == 3 and busiest['histogram'][LATENCY_BUCKETS_MS.index(50)] == 1
+    histogram = telemetry.get_histogram()
+    assert (histogram['le_5ms'], histogram['le_50ms'], sum(histogram.values())) == (3, 1, 4)
+
+
+def test_histogram_bucket_bounds_are_inclusive():
+    telemetry = QueryTelemetry(slow_query_ms=float('inf'))
+    for duration in (0.005, 0.0051, 30.0, 31.0):
+        telemetry.record('SELECT 1', 'test', duration)
+    histogram = telemetry.get_histogram()
+    assert (histogram['le_5ms'], histogram['le_10ms'], histogram['le_30000ms'], histogram['gt_30000ms']) == \
+        (1, 1, 1, 1)
+
+
+def test_slow_queries_are_logged_and_explained_once_per_interval():
+    telemetry = QueryTelemetry(slow_query_ms=100, explain_slow_queries=True, explain_interval=3600, slow_log_size=3)
+    explained = []
+
+    def explain():
+        explained.append(1)
+        return 'Seq Scan on orders'
+
+    telemetry.record('SELECT * FROM orders WHERE hub_id = 1', 'report', 0.099, explain=explain)
+    assert telemetry.get_slow_queries() == []
+
+    for hub_id in range(3):
+        telemetry.record(f'SELECT * FROM orders WHERE hub_id = {hub_id}', 'report', 0.25, rows=5, explain=explain)
+    wait_for(lambda: telemetry.get_slow_queries()[0]['plan'] is not None)
+    time.sleep(0.02)
+    first, second, third = telemetry.get_slow_queries()
+    assert (first['caller'], first['duration_ms'], first['rows']) == ('report', 250.0, 5)
+    assert first['plan'] == 'Seq Scan on orders'
+    assert second['plan'] is None and third['plan'] is None
+    assert len(explained) == 1
+
+    # A failed query is logged but never re-run; the log keeps the newest entries
+    telemetry.record('SELECT pg_sleep(1)', 'report', 1.0, error='QueryCanceled', explain=explain)
+    slow = telemetry.get_slow_queries()
+    assert len(slow) == 3 and slow[-1]['error'] == 'QueryCanceled'
+    assert all(entry['plan'] is None for entry in slow)  # the explained entry was the oldest
+    time.sleep(0.02)
+    assert len(explained) == 1
+
+
+def test_failed_explain_is_reported_in_the_plan():
+    telemetry = QueryTelemetry(slow_query_ms=0, explain_slow_queries=True)
+
+    def explain():
+        raise psycopg2.OperationalError('canceling statement due to statement timeout')
+
+    telemetry.record('SELECT 1', 'test', 0.001, explain=explain)
+    wait_for(lambda: telemetry.get_slow_queries()[0]['plan'] is not None)
+    assert telemetry.get_slow_queries()[0]['plan'].startswith('EXPLAIN failed: canceling statement')
+
+
+class PlanningCursor(FakeCursor):
+    """Answers EXPLAIN (SUMMARY) with a fixed planning time for text queries and for EXECUTE."""
+
+    def __init__(self, conn, text_ms: float = 2.0, prepared_ms: float = 0.05):
+        super().__init__(conn)
+        self.planning = {False: text_ms, True: prepared_ms}
+        self.last = None
+
+    def execute(self, query, params=None):
+        super().execute(query, params)
+        self.last = query
+
+    def fetchone(self):
+        return ('[{"Plan": {}, "Planning Time": %s}]' % self.planning[' EXECUTE ' in self.last],)
+
+
+DAILY_SQL = "SELECT order_date, COUNT(*) FROM orders WHERE hub_id = %s AND status LIKE 'deliver%%' " \
+            "AND order_date >= %s GROUP BY order_date"
+
+
+def test_register_validates_names_and_rejects_rebinding():
+    registry = StatementRegistry()
+    statement = registry.register('daily_orders', DAILY_SQL)
+    assert statement == DAILY_SQL and statement.name == 'daily_orders'
+    assert registry.register('daily_orders', DAILY_SQL) is statement
+
+    with pytest.raises(ValueError):
+        registry.register('daily_orders', 'SELECT 1')
+    for name in ('Daily', 'daily-orders', '1daily', 'daily; DROP TABLE orders'):
+        with pytest.raises(ValueError):
+            registry.register(name, 'SELECT 1')
+
+
+def test_placeholders_are_rewritten_for_prepare():
+    statement = StatementRegistry().register('daily_orders', DAILY_SQL)
+    assert StatementRegistry._server_sql(statement) == \
+        "SELECT order_date, COUNT(*) FROM orders WHERE hub_id = $1 AND status LIKE 'deliver%' " \
+        "AND order_date >= $2 GROUP BY order_date"
+    assert StatementRegistry._execute_sql(statement, [3, '2025-01-01']) == 'EXECUTE daily_orders (%s, %s)'
+    assert StatementRegistry._execute_sql(statement, None) == 'EXECUTE daily_orders'
+
+
+def test_statement_is_prepared_once_per_connection():
+    registry = StatementRegistry(sample_every=0)
+    statement = registry.register('daily_orders', DAILY_SQL)
+    first, second = FakeConnection(), FakeConnection()
+
+    for conn in (first, first, second, first):
+        registry.execute(FakeCursor(conn), statement, [3, '2025-01-01'])
+
+    assert first.statements == ['PREPARE daily_orders AS ' + StatementRegistry._server_sql(statement)] + \
+        ['EXECUTE daily_orders (%s, %s)'] * 3
+    assert [query.split()[0] for query in second.statements] == ['PREPARE', 'EXECUTE']
+    (stats,) = registry.get_stats()
+    assert (stats['executions'], stats['preparations'], stats['planning_samples']) == (4, 2, 0)
+    assert stats['est_planning_saved_ms'] is None
+
+
+def test_deallocated_statement_is_prepared_again():
+    registry = StatementRegistry()
+    statement = registry.register('daily_orders', DAILY_SQL)
+    conn = FakeConnection()
+    registry.execute(FakeCursor(conn), statement, [3, '2025-01-01'])
+
+    class DiscardedCursor(FakeCursor):
+        def execute(self, query, params=None):
+            raise psycopg2.errors.InvalidSqlStatementName('prepared statement "daily_orders" does not exist')
+
+    with pytest.raises(psycopg2.errors.InvalidSqlStatementName):
+        registry.execute(DiscardedCursor(conn), statement, [3, '2025-01-01'])
+    registry.execute(FakeCursor(conn), statement, [3, '2025-01-01'])
+    assert [query.split()[0] for query in conn.statements] == ['PREPARE', 'EXECUTE', 'PREPARE', 'EXECUTE']
+
+
+def test_planning_is_sampled_every_n_executions():
+    registry = StatementRegistry(sample_every=3)
+    statement = registry.register('daily_orders', DAILY_SQL)
+    idle = registry.register('health_check', 'SELECT 1')
+    conn = FakeConnection()
+
+    due = [registry.execute(FakeCursor(conn), statement, [3, '2025-01-01']) for _ in range(7)]
+    assert due == [False, False, True, False, False, True, False]
+    registry.execute(FakeCursor(conn), idle)
+
+    for text_ms in (2.0, 3.0):
+        cursor = PlanningCursor(conn, text_ms=text_ms, prepared_ms=0.5)
+        registry.sample_planning(cursor, statement, [3, '2025-01-01'])
+        assert cursor.statements[0][0] == 'EXPLAIN (SUMMARY ON, FORMAT JSON) ' + DAILY_SQL
+        assert cursor.statements[1][0] == 'EXPLAIN (SUMMARY ON, FORMAT JSON) EXECUTE daily_orders (%s, %s)'
+
+    daily, health = registry.get_stats()
+    assert daily['name'] == 'daily_orders' and daily['fingerprint'] == fingerprint_sql(DAILY_SQL)
+    assert (daily['planning_samples'], daily['avg_text_planning_ms'], daily['avg_prepared_planning_ms']) == \
+        (2, 2.5, 0.5)
+    assert daily['est_planning_saved_ms'] == 2.0 * 7
+    assert (health['executions'], health['planning_samples']) == (1, 0)
+
+
+COPY_CSV = (
+    b"id,courier_id,is_completed,is_late,reward,status,zone,created_at\n"
+    b"1,7,t,f,12.5,delivered,NA,2025-03-09 21:15:00+00\n"
+    b"2,,f,,0,returned,N,2025-03-10 00:00:01.25+00\n"
+    b"3,9,t,t,7.25,delivered,,2025-03-10 08:00:00+00\n"
+)
+COPY_DTYPES = {'id': 'int64', 'courier_id': 'Int64', 'is_completed': 'bool', 'is_late': 'bool',
+               'reward': 'float64', 'status': 'category'}
+
+
+def test_parse_copy_pandas_types_columns():
+    df = DatabaseConnection._parse_copy_pandas(io.BytesIO(COPY_CSV), COPY_DTYPES, ['created_at'])
+
+    assert df['id'].dtype == 'int64' and df['reward'].dtype == 'float64'
+    assert df['courier_id'].dtype == 'Int64'
+    assert df['courier_id'].isna().tolist() == [False, True, False]
+    # t/f without NULLs stay numpy bool; a 'bool' column with a NULL becomes nullable
+    assert df['is_completed'].dtype == bool and df['is_completed'].tolist() == [True, False, True]
+    assert df['is_late'].dtype == 'boolean'
+    assert df['is_late'].tolist()[::2] == [False, True] and df['is_late'].isna().tolist()[1]
+    assert isinstance(df['status'].dtype, pd.CategoricalDtype)
+    # Only empty fields are NULL: the string 'NA' is kept
+    assert df['zone'].tolist()[:2] == ['NA', 'N'] and pd.isna(df['zone'][2])
+    assert isinstance(df['created_at'].dtype, pd.DatetimeTZDtype) and str(df['created_at'].dt.tz) == 'UTC'
+    assert df['created_at'].tolist() == [pd.Timestamp('2025-03-09 21:15:00', tz='UTC'),
+                                         pd.Timestamp('2025-03-10 00:00:01.25', tz='UTC'),
+                                         pd.Timestamp('2025-03-10 08:00:00', tz='UTC')]
+
+
+def test_parse_copy_pandas_empty_results():
+    assert DatabaseConnection._parse_copy_pandas(io.BytesIO(b'')).empty
+
+    header = COPY_CSV.split(b"\n")[0] + b"\n"
+    df = DatabaseConnection._parse_copy_pandas(io.BytesIO(header), COPY_DTYPES, ['created_at'])
+    assert df.empty and list(df.columns) == COPY_CSV.decode().split("\n")[0].split(',')
+    assert df['courier_id'].dtype == 'Int64' and df['is_completed'].dtype == bool
+
+
+def test_parse_copy_arrow_maps_dtypes():
+    pa = pytest.importorskip('pyarrow')
+    table = DatabaseConnection._parse_copy_arrow(io.BytesIO(COPY_CSV), COPY_DTYPES, ['created_at'])
+
+    assert table.schema.field('id').type == pa.int64()
+    assert table.schema.field('courier_id').type == pa.int64()
+    assert table.column('courier_id').null_count == 1
+    assert table.schema.field('is_late').type == pa.bool_()
+    assert table.column('is_late').to_pylist() == [False, None, True]
+    assert table.schema.field('status').type == pa.dictionary(pa.int32(), pa.string())
+    assert table.column('zone').to_pylist() == ['NA', 'N', None]
+    assert table.schema.field('created_at').type == pa.timestamp('us', tz='UTC')
+    assert DatabaseConnection._parse_copy_arrow(io.BytesIO(b'')).num_rows == 0
+
+
+class CopyConnection(FakeConnection):
+    """A connection whose COPY TO STDOUT writes COPY_CSV."""
+
+    def cursor(self, **kwargs):
+        cursor = FakeCursor(self)
+        cursor.mogrify = lambda query, params: (query % tuple(repr(value) for value in params)).encode()
+        cursor.copy_expert = lambda sql, buffer: (cursor.execute(sql), buffer.write(COPY_CSV))
+        return cursor
+
+    def commit(self):
+        self.statements.append('COMMIT')
+
+
+def test_read_copy_wraps_the_query_in_copy(fake_connect, breakers, monkeypatch):
+    monkeypatch.setattr(database_connection.psycopg2, 'connect', CopyConnection)
+    monkeypatch.setattr(database_connection, '_telemetry', QueryTelemetry())
+    db = DatabaseConnection(config=dict(CONFIG))
+    db.connect()
+
+    df = db.read_copy("SELECT * FROM shipments WHERE hub_id = %s;", [3], dtypes=COPY_DTYPES,
+                      parse_dates=['created_at'], timeout=2.5)
+    assert len(df) == 3 and df['is_completed'].dtype == bool
+    ((conn, _),) = db.pool._idle
+    assert conn.statements[-4:] == [
+        'SET LOCAL statement_timeout = %s',
+        "SET LOCAL timezone = 'UTC'",
+        'COPY (SELECT * FROM shipments WHERE hub_id = 3) TO STDOUT WITH (FORMAT csv, HEADER true)',
+        'COMMIT'
+    ]
+    (stats,) = database_connection._telemetry.get_query_stats()
+    assert (stats['rows'], stats['bytes']) == (3, len(COPY_CSV))
+
+    with pytest.raises(ValueError):
+        db.read_copy("SELECT 1", engine='polars')
+
+
+class TimeoutCursor(FakeCursor):
+    """Runs queries the way the connection's mode says: 'ok', 'server' (cancelled) or 'hang'."""
+
+    def __init__(self, conn):
+        super().__init__(conn)
+        self.rowcount = -1
+        self.rows = []
+
+    def execute(self, query, params=None):
+        super().execute(query, params)
+        if query.startswith('SET '):
+            self.connection.settings.append(params)
+            return
+        if self.connection.mode == 'server':
+            raise psycopg2.errors.QueryCanceled('canceling statement due to statement timeout')
+        if self.connection.mode == 'hang':
+            # An unresponsive backend: only a cancel request from the client ends the query
+            assert self.connection.cancelled.wait(5)
+            raise psycopg2.errors.QueryCanceled('canceling statement due to user request')
+        self.rows = [{'n': 1}]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class TimeoutConnection(FakeConnection):
+    mode = 'ok'
+
+    def __init__(self, **config):
+        super().__init__(**config)
+        self.cancelled = threading.Event()
+        self.cancels = 0
+        self.settings = []
+
+    def cursor(self, **kwargs):
+        return TimeoutCursor(self)
+
+    def cancel(self):
+        self.cancels += 1
+        self.cancelled.set()
+
+    def commit(self):
+        self.statements.append('COMMIT')
+
+
+@pytest.fixture
+def timeout_db(fake_connect, breakers, monkeypatch):
+    monkeypatch.setattr(database_connection.psycopg2, 'connect', TimeoutConnection)
+    monkeypatch.setattr(database_connection, 'CLIENT_CANCEL_GRACE_SECONDS', 0.05)
+    monkeypatch.setattr(database_connection, '_timed_out_queries', deque(maxlen=100))
+    monkeypatch.setattr(database_connection, '_telemetry', QueryTelemetry())
+    db = DatabaseConnection(config=dict(CONFIG))
+    db.connect()
+    ((conn, _),) = db.pool._idle
+    return db, conn
+
+
+def test_server_side_timeout(timeout_db):
+    db, conn = timeout_db
+    conn.mode = 'server'
+    query = 'SELECT pg_sleep(5) FROM shipments WHERE hub_id = %s'
+
+    for _ in range(2):
+        with pytest.raises(QueryTimeoutError) as raised:
+            db.execute_query(query, [3], timeout=1.5)
+    error = raised.value
+    assert (error.fingerprint, error.timeout) == (fingerprint_sql(query), 1.5)
+    assert 0 <= error.duration < 1.0
+    assert str(error) == f"Query timeout (1.5s) [query {error.fingerprint}]"
+    assert conn.statements[:2] == ['SET LOCAL statement_timeout = %s', query]
+    assert conn.settings == [[1500], [1500]]
+    assert conn.rollbacks == 2
+
+    timed_out = get_timed_out_queries()
+    assert [entry['cancelled_by'] for entry in timed_out] == ['server', 'server']
+    assert timed_out[-1]['fingerprint'] == error.fingerprint and timed_out[-1]['timeout_seconds'] == 1.5
+    # Timeouts are not connection failures; the server cancelled, so the client timer never fires
+    assert db.circuit_breaker.state == 'CLOSED'
+    time.sleep(1.5 + 0.05 + 0.1)
+    assert conn.cancels == 0
+
+
+def test_client_cancels_after_grace_period(timeout_db):
+    db, conn = timeout_db
+    conn.mode = 'hang'
+
+    with pytest.raises(QueryTimeoutError) as raised:
+        db.execute_query('SELECT * FROM shipments', timeout=0.05)
+    assert raised.value.duration >= 0.1 - 0.01
+    assert conn.cancels == 1
+    assert get_timed_out_queries()[-1]['cancelled_by'] == 'client'
+    (stats,) = database_connection._telemetry.get_query_stats()
+    assert stats['errors'] == 1
+
+
+def test_timer_is_cancelled_after_success(timeout_db):
+    db, conn = timeout_db
+    assert db.execute_query('SELECT 1 AS n', timeout=0.05) == [{'n': 1}]
+    assert conn.statements == ['SET LOCAL statement_timeout = %s', 'SELECT 1 AS n', 'COMMIT']
+    time.sleep(0.05 + 0.05 + 0.1)
+    assert conn.cancels == 0
+
+    # No timeout: no statement_timeout and no timer
+    conn.statements.clear()
+    assert db.execute_query('SELECT 1 AS n', timeout=None) == [{'n': 1}]
+    assert conn.statements == ['SELECT 1 AS n', 'COMMIT']
+    assert get_timed_out_queries() == []
+
+
+class FakeQueryCanceled(Exception):
+    pass
+
+
+class FakeAsyncCursor:
+    """psycopg 3 AsyncCursor stand-in: the pool's mode decides how a query ends."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.rowcount = -1
+
+    async def execute(self, query, params=None, prepare=False):
+        self.pool.statements.append(query)
+        if query.startswith('SET '):
+            return
+        if self.pool.mode == 'server':
+            raise FakeQueryCanceled('canceling statement due to statement timeout')
+        if self.pool.mode == 'hang':
+            await asyncio.sleep(10)
+
+    async def fetchall(self):
+        return [{'n': 1}]
+
+
+class FakeAsyncPool:
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.statements = []
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        @contextlib.asynccontextmanager
+        async def cursor(row_factory=None):
+            yield FakeAsyncCursor(self)
+
+        yield types.SimpleNamespace(cursor=cursor)
+
+
+@pytest.fixture
+def async_db(breakers, monkeypatch):
+    pool = FakeAsyncPool('ok')
+
+    async def get_pool(config):
+        return pool
+
+    errors = types.SimpleNamespace(QueryCanceled=FakeQueryCanceled)
+    monkeypatch.setattr(database_connection, 'psycopg', types.SimpleNamespace(
+        errors=errors, OperationalError=ConnectionError, InterfaceError=ConnectionAbortedError))
+    monkeypatch.setattr(database_connection, 'dict_row', None, raising=False)
+    monkeypatch.setattr(database_connection, 'get_async_connection_pool', get_pool)
+    monkeypatch.setattr(database_connection, 'CLIENT_CANCEL_GRACE_SECONDS', 0.05)
+    monkeypatch.setattr(database_connection, '_timed_out_queries', deque(maxlen=100))
+    db = DatabaseConnection(config=dict(CONFIG))
+    db.pool = object()  # the sync pool is not used on the asyncio path
+    return db, pool
+
+
+def test_async_query_runs_with_statement_timeout(async_db):
+    db, pool = async_db
+    assert run_async(db.execute_query_async('SELECT 1 AS n', timeout=2.0), timeout=5) == [{'n': 1}]
+    assert pool.statements == ['SET LOCAL statement_timeout = 2000', 'SELECT 1 AS n']
+
+
+def test_async_client_timeout_maps_to_query_timeout(async_db):
+    db, pool = async_db
+    pool.mode = 'hang'
+
+    started = time.monotonic()
+    with pytest.raises(QueryTimeoutError) as raised:
+        run_async(db.execute_query_async('SELECT * FROM shipments', timeout=0.05), timeout=5)
+    assert time.monotonic() - started < 1.0
+    assert raised.value.timeout == 0.05 and raised.value.duration >= 0.1 - 0.01
+    assert raised.value.fingerprint == fingerprint_sql('SELECT * FROM shipments')
+    assert get_timed_out_queries()[-1]['cancelled_by'] == 'client'
+    assert db.circuit_breaker.state == 'CLOSED'
+
+
+def test_async_server_timeout_maps_to_query_timeout(async_db):
+    db, pool = async_db
+    pool.mode = 'server'
+
+    with pytest.raises(QueryTimeoutError):
+        run_async(db.execute_query_async('SELECT * FROM shipments', timeout=0.05), timeout=5)
+    assert get_timed_out_queries()[-1]['cancelled_by'] == 'server'
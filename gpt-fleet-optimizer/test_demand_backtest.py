@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Backtest tests: fitting all origins as one stacked batch gives the same forecasts as
+backtesting each origin on its own, for both methods, daily and hourly; plus origin
+selection, snapshot loading and the WAPE / MAPE summary.
+
+Runs without a database on a synthetic snapshot; the forecaster is never connected.
+
+Usage:
+    python -m pytest test_demand_backtest.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from demand_backtest import DemandBacktest, load_snapshot, summarize  # noqa: E402
+from demand_forecaster import DemandForecaster  # noqa: E402
+
+FIRST_DATE = pd.Timestamp('2024-10-01')
+DAYS = 130
+
+
+def make_snapshot(seed: int = 8) -> pd.DataFrame:
+    """Order counts per hub, date and hour, as load_snapshot returns them."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for hub_id, scale in ((3, 6.0), (7, 1.5), (11, 12.0), (12, 0.4)):
+        # Hub 12 opens partway through the earliest origin's history
+        first_day = 20 if hub_id == 12 else 0
+        day, hour = np.meshgrid(np.arange(first_day, DAYS), np.arange(24), indexing='ij')
+        day, hour = day.ravel(), hour.ravel()
+        dates = FIRST_DATE + pd.to_timedelta(day, unit='D')
+        busy = np.where((hour >= 9) & (hour <= 22), 1.0, 0.1) * (1 + 0.3 * (dates.dayofweek >= 4)) * (1 + day / 200)
+        counts = rng.poisson(scale * busy)
+        frames.append(pd.DataFrame({'hub_id': hub_id, 'order_date': dates, 'hour_of_day': hour,
+                                    'order_count': counts})[counts > 0])
+    snapshot = pd.concat(frames, ignore_index=True)
+    snapshot['day_of_week'] = (snapshot['order_date'].dt.dayofweek + 1) % 7
+    return snapshot
+
+
+@pytest.fixture(scope='module')
+def snapshot():
+    return make_snapshot()
+
+
+def backtest(history):
+    return DemandBacktest(history, forecaster=DemandForecaster.__new__(DemandForecaster))
+
+
+@pytest.mark.parametrize('forecast_type, horizon', [('daily', 7), ('hourly', 3)])
+def test_stacked_origins_match_origin_by_origin(snapshot, forecast_type, horizon):
+    stacked, timings = backtest(snapshot).run(forecast_type, horizon=horizon, origins=4, step_days=7)
+    assert set(timings) == {'seasonal_mean', 'holt_winters'}
+    assert stacked['origin'].nunique() == 4
+
+    keys = ['method', 'hub_id', 'order_date'] + (['hour_of_day'] if forecast_type == 'hourly' else [])
+    for origin, expected in stacked.groupby('origin'):
+        # With the snapshot cut off after this origin's horizon, it is the only (latest) origin
+        history = snapshot[snapshot['order_date'] < origin + pd.Timedelta(days=horizon)]
+        alone, _ = backtest(history).run(forecast_type, horizon=horizon, origins=1, step_days=7)
+        assert (alone['origin'] == origin).all()
+
+        expected = expected.sort_values(keys).reset_index(drop=True)
+        alone = alone.sort_values(keys).reset_index(drop=True)
+        assert len(alone) == len(expected)
+        for column in keys + ['horizon']:
+            assert alone[column].tolist() == expected[column].tolist(), column
+        np.testing.assert_allclose(alone['forecast'], expected['forecast'], rtol=0, atol=1e-9)
+        np.testing.assert_allclose(alone['actual'], expected['actual'])
+
+
+def test_scores_attach_actuals_per_real_date(snapshot):
+    errors, _ = backtest(snapshot).run('daily', horizon=7, origins=2, methods=('seasonal_mean',))
+    actual = snapshot.groupby(['hub_id', 'order_date'])['order_count'].sum()
+
+    assert sorted(errors['horizon'].unique()) == list(range(1, 8))
+    for row in errors.sample(20, random_state=0).itertuples():
+        assert row.order_date == row.origin + pd.Timedelta(days=row.horizon - 1)
+        assert row.actual == actual.get((row.hub_id, row.order_date), 0)
+
+
+def test_origins_need_full_history_and_whole_weeks(snapshot):
+    bt = backtest(snapshot)
+    last_date = snapshot['order_date'].max()
+    origins = bt.origins(count=10, step_days=7, horizon=7)
+
+    assert origins[0] == last_date - pd.Timedelta(days=6)
+    assert all(origin - pd.Timedelta(days=90) >= FIRST_DATE for origin in origins)
+    assert len(origins) == (DAYS - 90 - 7) // 7 + 1
+    with pytest.raises(ValueError):
+        bt.origins(count=2, step_days=5, horizon=7)
+    with pytest.raises(ValueError):
+        backtest(snapshot[snapshot['order_date'] < FIRST_DATE + pd.Timedelta(days=60)]).run()
+
+
+def test_load_snapshot_adds_postgres_day_of_week(tmp_path):
+    path = tmp_path / 'snapshot.csv'
+    pd.DataFrame({'hub_id': [1, 1], 'order_date': ['2025-03-09', '2025-03-10'], 'hour_of_day': [8, 9],
+                  'order_count': [4, 5]}).to_csv(path, index=False)
+    snapshot = load_snapshot(str(path))
+    # 2025-03-09 was a Sunday
+    assert snapshot['day_of_week'].tolist() == [0, 1]
+
+    pd.DataFrame({'hub_id': [1], 'order_date': ['2025-03-09']}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match='order_count'):
+        load_snapshot(str(path))
+
+
+def test_summarize_wape_and_mape():
+    errors = pd.DataFrame({'method': ['a', 'a', 'a', 'b'], 'forecast': [12.0, 5.0, 2.0, 10.0],
+                           'actual': [10.0, 10.0, 0.0, 10.0]})
+    summary = summarize(errors, ['method']).set_index('method')
+
+    # WAPE = (2 + 5 + 2) / 20; MAPE skips the empty slot: (0.2 + 0.5) / 2
+    assert summary.loc['a', 'wape'] == 45.0
+    assert summary.loc['a', 'mape'] == 35.0
+    assert summary.loc['a', 'slots'] == 3
+    assert (summary.loc['b', 'wape'], summary.loc['b', 'mape']) == (0.0, 0.0)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Demand forecaster tests: the vectorized hourly grid reproduces the per-slot loop it
+replaced, the all-hubs batch forecasts match the single-hub forecasts hub by hub, and
+cached forecasts follow new orders through both the forecast and the query cache.
+
+Runs without a database: FakeOrdersDB answers the forecast queries from synthetic
+hourly order counts per hub.
+
+Usage:
+    python -m pytest test_demand_forecaster.py
+"""
+
+import os
+import sys
+import types
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database_connection  # noqa: E402
+from conftest import CLOCK_START  # noqa: E402
+from database_connection import QueryCache  # noqa: E402
+from demand_forecaster import DATA_WATERMARK, DemandForecaster  # noqa: E402
+from forecast_cache import ForecastCache  # noqa: E402
+
+HISTORY_END = date(2025, 3, 10)
+
+
+def make_orders(hubs: int = 6, days: int = 90, seed: int = 21) -> pd.DataFrame:
+    """Order counts per hub, date and hour (hours without orders have no row)."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for hub_id in range(1, hubs + 1):
+        scale = rng.uniform(0.5, 20)
+        # The last hub opened a month into the window
+        first_day = 30 if hub_id == hubs else 0
+        for day in range(first_day, days):
+            order_date = HISTORY_END - timedelta(days=days - day)
+            dow = (order_date.weekday() + 1) % 7
+            for hour in range(24):
+                busy = 1.0 if 10 <= hour <= 21 else 0.15
+                count = rng.poisson(scale * busy * (1.3 if dow in (4, 5) else 1.0))
+                if count:
+                    rows.append((hub_id, dow, hour, count, order_date))
+    return pd.DataFrame(rows, columns=['hub_id', 'day_of_week', 'hour_of_day', 'order_count', 'order_date'])
+
+
+class FakeOrdersDB:
+    """The forecaster's order-count queries, evaluated over a DataFrame."""
+
+    enable_fallback = False
+    is_fallback_mode = False
+
+    def __init__(self, orders: pd.DataFrame):
+        self.orders = orders
+
+    def get_connection_status(self):
+        return {}
+
+    def query_dataframe(self, query, params=None, timeout=None, cache=None):
+        orders = self.orders
+        if 'hub_id IS NOT NULL' in query:
+            return orders.copy()
+        if params:
+            orders = orders[orders['hub_id'] == params[0]]
+        if 'daily_orders' in query:
+            daily = orders.groupby('order_date').agg(day_of_week=('day_of_week', 'first'),
+                                                     order_count=('order_count', 'sum'))
+            return daily.reset_index().rename(columns={'order_date': 'date'})
+        return orders.drop(columns='hub_id').reset_index(drop=True)
+
+
+class CachedOrdersDB(FakeOrdersDB):
+    """FakeOrdersDB behind a real QueryCache, with the data watermark query."""
+
+    def __init__(self, orders: pd.DataFrame):
+        super().__init__(orders)
+        self.query_cache = QueryCache()
+        self.history_reads = 0
+
+    def execute_query(self, query, params=None, timeout=None, cache=None):
+        assert query == DATA_WATERMARK
+        return self._cached(cache, query, params, lambda: [{
+            'window_end': HISTORY_END, 'last_order': (len(self.orders), self.orders['order_count'].sum())
+        }])
+
+    def query_dataframe(self, query, params=None, timeout=None, cache=None):
+        def load():
+            self.history_reads += 1
+            return super(CachedOrdersDB, self).query_dataframe(query, params)
+        return self._cached(cache, query, params, load)
+
+    def _cached(self, cache, query, params, load):
+        if not cache:
+            return load()
+        return self.query_cache.get_or_load(self.query_cache.make_key(cache, query, params), cache, load)
+
+
+def make_forecaster(db) -> DemandForecaster:
+    forecaster = DemandForecaster.__new__(DemandForecaster)
+    forecaster.db = db
+    forecaster.rollups = types.SimpleNamespace(is_ready=lambda: False)
+    forecaster.profiles = types.SimpleNamespace(is_ready=lambda: False)
+    forecaster.forecast_cache = ForecastCache()
+    forecaster.data_source = 'production'
+    return forecaster
+
+
+@pytest.fixture
+def forecaster(monkeypatch):
+    monkeypatch.setenv('FORECAST_CACHE', 'off')
+    return make_forecaster(FakeOrdersDB(make_orders()))
+
+
+def loop_hourly_forecast(df: pd.DataFrame, horizon_days: int, today: datetime) -> pd.DataFrame:
+    """The per-slot loop forecast_hourly_demand used before the grid was vectorized."""
+    hourly_stats = df.groupby(['day_of_week', 'hour_of_day']).agg({
+        'order_count': ['mean', 'std', 'min', 'max', 'count']
+    }).round(2)
+    hourly_stats.columns = ['avg_orders', 'std_orders', 'min_orders', 'max_orders', 'sample_count']
+    hourly_stats = hourly_stats.reset_index()
+
+    forecasts = []
+    for day_offset in range(horizon_days):
+        forecast_date = today + timedelta(days=day_offset)
+        dow = (forecast_date.weekday() + 1) % 7
+        for hour in range(24):
+            mask = (hourly_stats['day_of_week'] == dow) & (hourly_stats['hour_of_day'] == hour)
+            historical_data = hourly_stats[mask]
+            row = {'date': forecast_date.strftime('%Y-%m-%d'), 'day_of_week': forecast_date.strftime('%A'),
+                   'hour': f"{hour:02d}:00"}
+            if len(historical_data) > 0:
+                avg_demand = historical_data['avg_orders'].iloc[0]
+                std_demand = historical_data['std_orders'].iloc[0]
+                if pd.isna(std_demand):
+                    std_demand = avg_demand * 0.2
+                sample_count = historical_data['sample_count'].iloc[0]
+                cv = std_demand / avg_demand if avg_demand > 0 else 1
+                if sample_count >= 10 and cv < 0.3:
+                    confidence = 'high'
+                elif sample_count >= 5 and cv < 0.5:
+                    confidence = 'medium'
+                else:
+                    confidence = 'low'
+                row.update({
+                    'forecasted_demand': round(avg_demand, 1),
+                    'lower_bound': max(0, round(avg_demand - std_demand, 1)),
+                    'upper_bound': round(avg_demand + std_demand, 1),
+                    'confidence': confidence,
+                    'sample_count': int(sample_count)
+                })
+            else:
+                overall_avg = df['order_count'].mean()
+                row.update({
+                    'forecasted_demand': round(overall_avg, 1),
+                    'lower_bound': 0,
+                    'upper_bound': round(overall_avg * 2, 1),
+                    'confidence': 'low',
+                    'sample_count': 0
+                })
+            forecasts.append(row)
+    return pd.DataFrame(forecasts)
+
+
+def assert_same_frame(actual: pd.DataFrame, expected: pd.DataFrame):
+    actual = actual.reset_index(drop=True)
+    expected = expected.reset_index(drop=True)
+    assert list(actual.columns) == list(expected.columns)
+    for column in expected.columns:
+        if pd.api.types.is_numeric_dtype(expected[column]):
+            np.testing.assert_allclose(actual[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float),
+                                       rtol=0, atol=1e-9, err_msg=column)
+        else:
+            assert actual[column].tolist() == expected[column].tolist(), column
+
+
+@pytest.mark.parametrize('hub_id', [1, 6])
+def test_hourly_grid_matches_loop(forecaster, hub_id):
+    orders = forecaster.db.orders
+    # Sparse hours: hub 6 has too few days in some slots, and 03:00 on Mondays never has orders
+    df = orders[(orders['hub_id'] == hub_id) & ~((orders['day_of_week'] == 1) & (orders['hour_of_day'] == 3))]
+    df = df.drop(columns='hub_id')
+    today = datetime(2025, 3, 10, 14, 30)
+
+    grid = forecaster._hourly_forecast_grid(forecaster._hourly_stats(df), 30, today)
+    assert_same_frame(grid, loop_hourly_forecast(df, 30, today))
+    assert (grid['sample_count'] == 0).any()
+
+
+def test_hourly_forecast_columnar_matches_records(forecaster):
+    records = forecaster.forecast_hourly_demand(horizon_days=3, hub_id=2)
+    columnar = forecaster.forecast_hourly_demand(horizon_days=3, hub_id=2, columnar=True)
+
+    assert pd.DataFrame(columnar['forecasts']).to_dict('records') == records['forecasts']
+    assert columnar['statistics'] == records['statistics']
+    assert records['statistics']['total_forecasts'] == 72
+
+
+def test_all_hubs_hourly_matches_single_hub_forecasts(forecaster):
+    table = forecaster.forecast_all_hubs(horizon_days=7, forecast_type='hourly')
+    assert sorted(table['hub_id'].unique()) == list(range(1, 7))
+
+    for hub_id in range(1, 7):
+        single = pd.DataFrame(forecaster.forecast_hourly_demand(horizon_days=7, hub_id=hub_id)['forecasts'])
+        assert_same_frame(table[table['hub_id'] == hub_id].drop(columns='hub_id'), single)
+
+
+def test_all_hubs_daily_matches_single_hub_forecasts(forecaster):
+    table = forecaster.forecast_all_hubs(horizon_days=14, forecast_type='daily')
+
+    for hub_id in range(1, 7):
+        single = pd.DataFrame(forecaster.forecast_daily_demand(horizon_days=14, hub_id=hub_id)['forecasts'])
+        assert_same_frame(table[table['hub_id'] == hub_id].drop(columns='hub_id'), single)
+
+
+def test_all_hubs_holt_winters_covers_every_hub(forecaster):
+    table = forecaster.forecast_all_hubs(horizon_days=7, forecast_type='daily', method='holt_winters')
+
+    assert len(table) == 6 * 7
+    assert (table['forecasted_demand'] >= 0).all()
+    assert (table['lower_bound'] <= table['forecasted_demand']).all()
+    assert (table['forecasted_demand'] <= table['upper_bound']).all()
+
+
+def test_all_hubs_rejects_unknown_options(forecaster):
+    with pytest.raises(ValueError):
+        forecaster.forecast_all_hubs(forecast_type='weekly')
+    with pytest.raises(ValueError):
+        forecaster.forecast_all_hubs(method='prophet')
+
+
+def test_late_orders_reach_the_cached_forecast(clock, monkeypatch):
+    monkeypatch.delenv('FORECAST_CACHE', raising=False)
+    db = CachedOrdersDB(make_orders())
+    forecaster = make_forecaster(db)
+
+    before = forecaster.forecast_daily_demand(horizon_days=14, hub_id=1)
+    assert forecaster.forecast_daily_demand(horizon_days=14, hub_id=1) == before
+    assert db.history_reads == 1
+
+    # Late orders for the last complete day move MAX(created_at); the watermark read expires
+    last_day = db.orders['order_date'].max()
+    late = pd.DataFrame([(1, (last_day.weekday() + 1) % 7, hour, 40, last_day) for hour in range(10, 22)],
+                        columns=db.orders.columns)
+    db.orders = pd.concat([db.orders, late], ignore_index=True)
+    clock.now += 2 * database_connection.QUERY_CACHE_TTLS['recent'] + 1
+    assert clock.now - CLOCK_START < database_connection.QUERY_CACHE_TTLS['historical']
+
+    after = forecaster.forecast_daily_demand(horizon_days=14, hub_id=1)
+    assert db.history_reads == 2
+    monkeypatch.setenv('FORECAST_CACHE', 'off')
+    assert after == make_forecaster(FakeOrdersDB(db.orders)).forecast_daily_demand(horizon_days=14, hub_id=1)
+    assert after['forecasts'] != before['forecasts']
+
+
+def test_uncached_forecasts_use_the_query_cache(monkeypatch):
+    monkeypatch.setenv('FORECAST_CACHE', 'off')
+    db = CachedOrdersDB(make_orders())
+    forecaster = make_forecaster(db)
+
+    first = forecaster.forecast_hourly_demand(horizon_days=2, hub_id=3)
+    assert forecaster.forecast_hourly_demand(horizon_days=2, hub_id=3) == first
+    assert db.history_reads == 1
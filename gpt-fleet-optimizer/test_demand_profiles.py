@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Demand profile tests: sliding the 90-day window with the Welford add and remove updates
+gives the same (n, mean, M2) as recomputing it from all days, and a refresh runs the
+right statements through the query telemetry.
+
+Runs without a database. The update formulas are taken from the PROFILE_ADD and
+PROFILE_REMOVE statements themselves and evaluated in Python (NULL as NaN, as far as
+these expressions need it); batch statistics follow BATCH_STATS (COUNT, AVG,
+VAR_POP * COUNT).
+
+Usage:
+    python -m pytest test_demand_profiles.py
+"""
+
+import os
+import re
+import sys
+import math
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import RecordingCursor, db_with_cursor  # noqa: E402
+from database_connection import fingerprint_sql  # noqa: E402
+from demand_profiles import PROFILE_ADD, PROFILE_REBUILD, PROFILE_REMOVE, DemandProfileStore  # noqa: E402
+
+KEY = ['hub_id', 'day_of_week', 'hour_of_day']
+TODAY = date(2025, 3, 10)
+
+
+def nullif(value, other):
+    return math.nan if value == other else value
+
+
+def greatest(*values):
+    values = [value for value in values if not math.isnan(value)]
+    return max(values) if values else math.nan
+
+
+def coalesce(*values):
+    return next((value for value in values if not math.isnan(value)), math.nan)
+
+
+def compile_expression(sql: str):
+    """A Python function of the row aliases (p, b, r, EXCLUDED) for one SQL expression."""
+    expression = sql.replace('EXCLUDED.', 'b.').replace('^', '**')
+    expression = re.sub(r'\bNULLIF\b', 'nullif', expression)
+    expression = re.sub(r'\bGREATEST\b', 'greatest', expression)
+    expression = re.sub(r'\bCOALESCE\b', 'coalesce', expression)
+    code = compile(expression, sql, 'eval')
+    names = {'nullif': nullif, 'greatest': greatest, 'coalesce': coalesce}
+    return lambda **rows: eval(code, dict(names), rows)
+
+
+class Row:
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+def assignments(sql: str, pattern: str):
+    """(column, compiled expression) pairs matched by pattern (groups: column, expression)."""
+    return [(column, compile_expression(expression.strip().rstrip(',')))
+            for column, expression in re.findall(pattern, sql, re.MULTILINE)]
+
+
+ADD_SET = assignments(PROFILE_ADD.split('DO UPDATE SET')[1], r'^\s*(n|mean|m2) = (.+)$')
+REMAINDER = [(column, compile_expression(expression)) for expression, column in
+             re.findall(r'^\s*(.+?) AS (\w+),?$', PROFILE_REMOVE.split('remainder AS (')[1].split('FROM')[0],
+                        re.MULTILINE)
+             if column not in KEY]
+REMOVE_SET = assignments(PROFILE_REMOVE.split('UPDATE analytics_demand_profile p SET')[1].split('FROM')[0],
+                         r'^\s*(n|mean|m2) = (.+)$')
+
+
+def batch_stats(days: pd.DataFrame) -> dict:
+    """BATCH_STATS over a profile_days table: key -> Row(n, mean, m2)."""
+    grouped = days.groupby(KEY)['order_count']
+    stats = pd.DataFrame({'n': grouped.count(), 'mean': grouped.mean(), 'm2': grouped.var(ddof=0) * grouped.count()})
+    return {key: Row(n=int(row['n']), mean=float(row['mean']), m2=float(row['m2'])) for key, row in stats.iterrows()}
+
+
+def profile_add(profile: dict, days: pd.DataFrame):
+    for key, batch in batch_stats(days).items():
+        current = profile.get(key)
+        if current is None:
+            profile[key] = batch
+        else:
+            profile[key] = Row(**{column: expression(p=current, b=batch) for column, expression in ADD_SET})
+
+
+def profile_remove(profile: dict, days: pd.DataFrame):
+    for key, batch in batch_stats(days).items():
+        current = profile[key]
+        remainder = Row(**{column: expression(p=current, b=batch) for column, expression in REMAINDER})
+        profile[key] = Row(**{column: expression(r=remainder) for column, expression in REMOVE_SET})
+    for key in [key for key, row in profile.items() if row.n <= 0]:
+        del profile[key]
+
+
+def make_day_counts(days: int, seed: int = 11) -> pd.DataFrame:
+    """profile_days rows (hub, day of week, hour, order count) for `days` consecutive days."""
+    rng = random.Random(seed)
+    rows = []
+    for day in range(days):
+        for hub_id in (0, 1, 2):
+            for hour in (8, 12, 18, 23):
+                # Quiet hours without orders are not samples
+                if rng.random() < 0.25:
+                    continue
+                rows.append({'day': day, 'hub_id': hub_id, 'day_of_week': day % 7, 'hour_of_day': hour,
+                             'order_count': rng.randint(1, 400 if hour != 23 else 5)})
+    # A cell that only occurs early on, so it empties as the window moves past it
+    rows.append({'day': 0, 'hub_id': 3, 'day_of_week': 0, 'hour_of_day': 4, 'order_count': 2})
+    return pd.DataFrame(rows)
+
+
+def window(counts: pd.DataFrame, start: int, end: int) -> pd.DataFrame:
+    return counts[(counts['day'] >= start) & (counts['day'] < end)]
+
+
+def assert_matches_recompute(profile: dict, days: pd.DataFrame):
+    expected = batch_stats(days)
+    assert sorted(profile) == sorted(expected)
+    for key, row in expected.items():
+        assert profile[key].n == row.n, key
+        assert profile[key].mean == pytest.approx(row.mean, rel=1e-9, abs=1e-9), key
+        assert profile[key].m2 == pytest.approx(row.m2, rel=1e-7, abs=1e-6), key
+
+
+def test_formulas_were_found():
+    assert [column for column, _ in ADD_SET] == ['n', 'mean', 'm2']
+    assert [column for column, _ in REMAINDER] == ['n', 'mean', 'm2_less_batch', 'batch_n', 'batch_mean', 'total_n']
+    assert [column for column, _ in REMOVE_SET] == ['n', 'mean', 'm2']
+
+
+@pytest.mark.parametrize('step', [1, 3])
+def test_sliding_window_matches_full_recompute(step):
+    counts = make_day_counts(150)
+    window_days = 90
+    profile = batch_stats(window(counts, 0, window_days))
+
+    start = 0
+    while start + step + window_days <= 150:
+        profile_add(profile, window(counts, start + window_days, start + window_days + step))
+        profile_remove(profile, window(counts, start, start + step))
+        start += step
+        assert_matches_recompute(profile, window(counts, start, start + window_days))
+
+    assert (3, 0, 4) not in profile
+
+
+def test_removing_every_sample_deletes_the_cell():
+    days = pd.DataFrame([{'hub_id': 1, 'day_of_week': 2, 'hour_of_day': 9, 'order_count': count}
+                         for count in (4, 9, 2)])
+    profile = batch_stats(days)
+    profile_remove(profile, days.iloc[:1])
+    assert_matches_recompute(profile, days.iloc[1:])
+    profile_remove(profile, days.iloc[1:])
+    assert profile == {}
+
+
+class FakeCursor(RecordingCursor):
+    """Answers the state row lock; every other statement is only recorded."""
+
+    def __init__(self, window_start, window_end):
+        super().__init__()
+        self.state = {'window_start': window_start, 'window_end': window_end, 'today': TODAY}
+
+    def answer(self, query):
+        return dict(self.state) if 'FOR UPDATE' in query and self.state else None
+
+
+def make_store(cursor):
+    return DemandProfileStore(db_with_cursor(cursor, 'profiles_test'))
+
+
+def loaded_ranges(cursor):
+    return [(params['start'], params['end']) for query, params in cursor.statements
+            if query.startswith('CREATE TEMP TABLE profile_days')]
+
+
+def test_incremental_refresh_adds_new_days_and_removes_expired_ones(telemetry):
+    window_end = TODAY - timedelta(days=2)
+    cursor = FakeCursor(window_end - timedelta(days=90), window_end)
+    result = make_store(cursor).refresh()
+
+    assert (result['mode'], result['days_added'], result['days_removed']) == ('incremental', 2, 2)
+    assert loaded_ranges(cursor) == [(window_end, TODAY),
+                                     (window_end - timedelta(days=90), TODAY - timedelta(days=90))]
+    queries = [query for query, _ in cursor.statements]
+    assert queries.index(PROFILE_ADD) < queries.index(PROFILE_REMOVE)
+    assert PROFILE_REBUILD not in queries
+
+    stats = {item['fingerprint']: item for item in telemetry.get_query_stats(limit=1000)}
+    callers = {'demand_profiles.DemandProfileStore.refresh', 'demand_profiles.DemandProfileStore._load_days'}
+    for query in queries:
+        assert set(stats[fingerprint_sql(query)]['callers']) <= callers
+    assert all(entry['plan'] is None for entry in telemetry.get_slow_queries())
+
+
+def test_refresh_rebuilds_after_a_long_gap(telemetry):
+    window_end = TODAY - timedelta(days=45)
+    cursor = FakeCursor(window_end - timedelta(days=90), window_end)
+    result = make_store(cursor).refresh()
+
+    assert result['mode'] == 'full'
+    assert loaded_ranges(cursor) == [(TODAY - timedelta(days=90), TODAY)]
+    assert PROFILE_REBUILD in [query for query, _ in cursor.statements]
+
+
+def test_refresh_without_state_row_asks_for_setup(telemetry):
+    cursor = FakeCursor(None, None)
+    cursor.state = None
+    with pytest.raises(RuntimeError, match='--create'):
+        make_store(cursor).refresh()
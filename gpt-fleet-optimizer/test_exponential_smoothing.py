@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Batched Holt-Winters tests: fitting many series in one array gives each series the same
+parameters, states and forecasts as fitting it alone (including NaN-padded series that
+start late, and with the series split into chunks), and the forecast standard deviation
+matches simulated ETS(A,Ad,A) sample paths.
+
+Usage:
+    python -m pytest test_exponential_smoothing.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from exponential_smoothing import HoltWinters, parameter_grid  # noqa: E402
+
+SEASON = 7
+ATTRIBUTES = ('alpha', 'beta', 'gamma', 'phi', 'level', 'trend', 'sigma', 'season')
+
+
+def make_series(n_series: int, n_obs: int, seed: int = 5) -> np.ndarray:
+    """Weekly-seasonal demand with per-series level, trend and noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_obs)
+    level = rng.uniform(20, 500, (n_series, 1))
+    trend = rng.uniform(-0.5, 1.5, (n_series, 1))
+    season = rng.uniform(-0.3, 0.3, (n_series, SEASON)) * level
+    noise = rng.normal(0, 1, (n_series, n_obs)) * rng.uniform(1, 15, (n_series, 1))
+    return level + trend * t + season[:, t % SEASON] + noise
+
+
+def assert_same_fit(batch: HoltWinters, row: int, single: HoltWinters):
+    for attribute in ATTRIBUTES:
+        np.testing.assert_allclose(getattr(batch, attribute)[row], getattr(single, attribute)[0],
+                                   rtol=1e-9, atol=1e-9, err_msg=attribute)
+
+
+def test_parameter_grid_is_admissible():
+    params = parameter_grid()
+    alpha, beta, gamma, phi = params.T
+    assert np.all((0 < alpha) & (alpha < 1))
+    assert np.all((0 <= beta) & (beta <= alpha))
+    assert np.all((0 < gamma) & (gamma < 1 - alpha))
+    # Without a trend only the largest damping is kept
+    assert set(phi[beta == 0]) == {0.98}
+    assert len(np.unique(params, axis=0)) == len(params)
+
+
+def test_batch_fit_matches_single_series_fits():
+    y = make_series(12, 10 * SEASON + 3)
+    batch = HoltWinters(SEASON).fit(y)
+    batch_mean, batch_std = batch.forecast(2 * SEASON)
+
+    for row in range(len(y)):
+        single = HoltWinters(SEASON).fit(y[row])
+        assert_same_fit(batch, row, single)
+        mean, std = single.forecast(2 * SEASON)
+        np.testing.assert_allclose(batch_mean[row], mean[0], rtol=1e-9)
+        np.testing.assert_allclose(batch_std[row], std[0], rtol=1e-9)
+
+
+def test_late_starting_series_matches_fit_of_its_observations():
+    y = make_series(4, 12 * SEASON)
+    starts = [0, 3, SEASON, 3 * SEASON + 5]
+    for row, start in enumerate(starts):
+        y[row, :start] = np.nan
+    y[2, 40:43] = np.nan  # a gap inside the history
+
+    batch = HoltWinters(SEASON).fit(y)
+    for row, start in enumerate(starts):
+        assert_same_fit(batch, row, HoltWinters(SEASON).fit(y[row, start:]))
+
+
+def test_chunked_fit_matches_one_chunk():
+    y = make_series(9, 6 * SEASON)
+    whole = HoltWinters(SEASON).fit(y)
+    # Room for the seasonal state of about two series per chunk
+    chunked = HoltWinters(SEASON, max_chunk_bytes=2 * len(whole.params) * SEASON * 8).fit(y)
+    for attribute in ATTRIBUTES:
+        np.testing.assert_array_equal(getattr(chunked, attribute), getattr(whole, attribute), err_msg=attribute)
+
+
+def test_fit_needs_one_season():
+    with pytest.raises(ValueError):
+        HoltWinters(SEASON).fit(np.ones(SEASON - 1))
+
+
+def test_forecast_std_matches_simulated_paths():
+    model = HoltWinters(SEASON).fit(make_series(3, 8 * SEASON))
+    # Exercise trend, damping and seasonal terms of the variance regardless of the fitted values
+    model.alpha[:], model.beta[:], model.gamma[:], model.phi[:] = 0.3, 0.1, 0.2, 0.9
+    horizon, paths = 2 * SEASON + 1, 40000
+    mean, std = model.forecast(horizon)
+
+    rng = np.random.default_rng(0)
+    for row in range(3):
+        level = np.full(paths, model.level[row])
+        trend = np.full(paths, model.trend[row])
+        season = np.tile(model.season[row], (paths, 1))
+        simulated = np.empty((paths, horizon))
+        for h in range(horizon):
+            s = h % SEASON
+            damped = model.phi[row] * trend
+            e = rng.normal(0, model.sigma[row], paths)
+            simulated[:, h] = level + damped + season[:, s] + e
+            level = level + damped + model.alpha[row] * e
+            trend = damped + model.beta[row] * e
+            season[:, s] += model.gamma[row] * e
+
+        np.testing.assert_allclose(simulated.mean(axis=0), mean[row], atol=4 * std[row].max() / np.sqrt(paths))
+        np.testing.assert_allclose(simulated.std(axis=0), std[row], rtol=0.02)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Forecast cache tests: hits within a data watermark, invalidation when the watermark
+moves, LRU eviction, single-flight computation of concurrent misses, uncacheable
+results and metrics.
+
+Usage:
+    python -m pytest test_forecast_cache.py
+"""
+
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from forecast_cache import ForecastCache  # noqa: E402
+
+DAY_1 = ('2025-03-09', '2025-03-09T23:58:00')
+DAY_2 = ('2025-03-10', '2025-03-10T23:59:00')
+
+
+class Compute:
+    """Counts calls and returns (label, call number)."""
+
+    def __init__(self, label='forecast'):
+        self.label = label
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return (self.label, self.calls)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.delenv('FORECAST_CACHE', raising=False)
+    return ForecastCache(max_entries=3)
+
+
+def test_hit_within_watermark(cache):
+    compute = Compute()
+    assert cache.get_or_compute('daily', (1, 7), DAY_1, compute) == ('forecast', 1)
+    assert cache.get_or_compute('daily', (1, 7), DAY_1, compute) == ('forecast', 1)
+    # Other arguments or kinds are separate artifacts
+    assert cache.get_or_compute('daily', (1, 14), DAY_1, compute) == ('forecast', 2)
+    assert cache.get_or_compute('hourly', (1, 7), DAY_1, compute) == ('forecast', 3)
+
+    daily = cache.get_metrics()['kinds']['daily']
+    assert (daily['hits'], daily['shared'], daily['misses']) == (1, 0, 2)
+
+
+def test_new_watermark_drops_every_entry(cache):
+    daily, hourly = Compute('daily'), Compute('hourly')
+    cache.get_or_compute('daily', (1, 7), DAY_1, daily)
+    cache.get_or_compute('hourly', (1, 7), DAY_1, hourly)
+
+    # The first lookup at the new watermark clears both kinds
+    assert cache.get_or_compute('daily', (1, 7), DAY_2, daily) == ('daily', 2)
+    assert cache.get_or_compute('hourly', (1, 7), DAY_2, hourly) == ('hourly', 2)
+    metrics = cache.get_metrics()
+    assert metrics['watermark'] == DAY_2
+    assert metrics['invalidations'] == 1
+    assert metrics['entries'] == 2
+
+    # A caller still on the old watermark never reads entries of the new one
+    assert cache.get_or_compute('daily', (1, 7), DAY_1, daily) == ('daily', 3)
+    assert cache.get_or_compute('daily', (1, 7), DAY_1, daily) == ('daily', 3)
+    assert cache.get_metrics()['invalidations'] == 2
+
+
+def test_compute_straddling_a_watermark_change_is_not_stored(cache):
+    def compute():
+        # Another request observes the next day's data while this forecast is being fitted
+        cache.get_or_compute('hourly', (2, 7), DAY_2, Compute())
+        return 'stale forecast'
+
+    assert cache.get_or_compute('daily', (1, 7), DAY_1, compute) == 'stale forecast'
+    assert cache.get_or_compute('daily', (1, 7), DAY_2, Compute()) == ('forecast', 1)
+
+
+def test_least_recently_used_artifact_is_evicted(cache):
+    compute = Compute()
+    for hub in (1, 2, 3):
+        cache.get_or_compute('daily', (hub,), DAY_1, compute)
+    cache.get_or_compute('daily', (1,), DAY_1, compute)  # hub 1 becomes most recent
+    cache.get_or_compute('daily', (4,), DAY_1, compute)
+    assert compute.calls == 4
+
+    cache.get_or_compute('daily', (1,), DAY_1, compute)
+    assert compute.calls == 4
+    cache.get_or_compute('daily', (2,), DAY_1, compute)
+    assert compute.calls == 5
+    assert cache.get_metrics()['evictions'] == 2
+
+
+def test_concurrent_misses_compute_once(cache):
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return 'forecast'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('daily', (1,), DAY_1, compute)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.005)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ['forecast'] * 8
+    assert len(calls) == 1
+    daily = cache.get_metrics()['kinds']['daily']
+    assert daily['misses'] == 1
+    assert daily['hits'] + daily['shared'] == 7
+
+
+def test_uncacheable_results_are_recomputed(cache):
+    compute = Compute()
+    cacheable = lambda value: value[1] > 1  # noqa: E731
+    assert cache.get_or_compute('daily', (1,), DAY_1, compute, cacheable) == ('forecast', 1)
+    assert cache.get_or_compute('daily', (1,), DAY_1, compute, cacheable) == ('forecast', 2)
+    assert cache.get_or_compute('daily', (1,), DAY_1, compute, cacheable) == ('forecast', 2)
+
+
+def test_failed_compute_is_not_cached(cache):
+    def failing():
+        raise RuntimeError('database down')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('daily', (1,), DAY_1, failing)
+    assert cache.get_or_compute('daily', (1,), DAY_1, Compute()) == ('forecast', 1)
+    assert cache._inflight == {}
+
+
+def test_invalidate_one_kind(cache):
+    daily, hourly = Compute('daily'), Compute('hourly')
+    cache.get_or_compute('daily', (1,), DAY_1, daily)
+    cache.get_or_compute('hourly', (1,), DAY_1, hourly)
+    cache.invalidate('hourly')
+
+    cache.get_or_compute('daily', (1,), DAY_1, daily)
+    cache.get_or_compute('hourly', (1,), DAY_1, hourly)
+    assert (daily.calls, hourly.calls) == (1, 2)
+
+
+def test_metrics_report_hit_rate_and_time_saved(cache):
+    def slow():
+        time.sleep(0.02)
+        return 'forecast'
+
+    cache.get_or_compute('daily', (1,), DAY_1, slow)
+    for _ in range(3):
+        cache.get_or_compute('daily', (1,), DAY_1, slow)
+
+    metrics = cache.get_metrics()
+    daily = metrics['kinds']['daily']
+    assert metrics['hit_rate'] == daily['hit_rate'] == 0.75
+    assert daily['compute_seconds'] >= 0.02
+    assert daily['seconds_saved'] == pytest.approx(3 * daily['compute_seconds'], abs=0.002)
+    assert metrics['enabled'] is True
+    assert metrics['entries'] == 1 and metrics['max_entries'] == 3
+
+
+def test_disabled_by_environment(monkeypatch):
+    monkeypatch.setenv('FORECAST_CACHE', 'off')
+    assert ForecastCache().enabled is False
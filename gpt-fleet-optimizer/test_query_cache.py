@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Query result cache tests: fresh and stale-while-revalidate lookups, single background
+refresh per key, refresh failures, key bucketing, dated keys and LRU eviction.
+
+Runs without a database or Redis; the cache clock is replaced by a fake one.
+
+Usage:
+    python -m pytest test_query_cache.py
+"""
+
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import CLOCK_START, wait_for  # noqa: E402
+from database_connection import QueryCache  # noqa: E402
+
+
+class Loader:
+    """Counts calls and returns the call number; optionally blocks until released."""
+
+    def __init__(self, block: bool = False):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return self.calls
+
+
+def test_fresh_entry_is_served_without_loading(clock):
+    cache = QueryCache(ttls={'recent': 60})
+    loader = Loader()
+    assert cache.get_or_load('k', 'recent', loader) == 1
+    clock.now += 59
+    assert cache.get_or_load('k', 'recent', loader) == 1
+    assert loader.calls == 1
+
+    stats = cache.get_metrics()['classes']['recent']
+    assert (stats['hits'], stats['stale_hits'], stats['misses']) == (1, 0, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(clock):
+    cache = QueryCache(ttls={'recent': 60})
+    cache.get_or_load('k', 'recent', lambda: 'old')
+
+    clock.now += 90
+    loader = Loader(block=True)
+    assert cache.get_or_load('k', 'recent', loader) == 'old'
+    assert loader.started.wait(5)
+    # Further stale lookups keep serving the old value and start no second refresh
+    assert cache.get_or_load('k', 'recent', loader) == 'old'
+    assert cache.get_or_load('k', 'recent', loader) == 'old'
+
+    loader.release.set()
+    wait_for(lambda: cache.get_metrics()['refreshes'] == 1)
+    assert loader.calls == 1
+    assert cache.get_or_load('k', 'recent', loader) == 1
+
+    stats = cache.get_metrics()['classes']['recent']
+    assert (stats['hits'], stats['stale_hits'], stats['misses']) == (1, 3, 1)
+
+
+def test_failed_refresh_keeps_stale_value(clock):
+    cache = QueryCache(ttls={'recent': 60})
+    cache.get_or_load('k', 'recent', lambda: 'old')
+    clock.now += 90
+
+    def failing():
+        raise RuntimeError('database down')
+
+    assert cache.get_or_load('k', 'recent', failing) == 'old'
+    wait_for(lambda: cache.get_metrics()['refresh_failures'] == 1)
+    assert cache.peek('k') == 'old'
+    # The key can be refreshed again after a failure
+    assert cache.get_or_load('k', 'recent', lambda: 'new') == 'old'
+    wait_for(lambda: cache.get_metrics()['refreshes'] == 1)
+    assert cache.peek('k') == 'new'
+
+
+def test_entry_past_stale_window_is_reloaded(clock):
+    cache = QueryCache(ttls={'realtime': 5})
+    loader = Loader()
+    cache.get_or_load('k', 'realtime', loader)
+    clock.now += 10
+    assert cache.get_or_load('k', 'realtime', loader) == 2
+    assert cache.get_metrics()['classes']['realtime']['misses'] == 2
+    # peek ignores age (served while the database is unreachable)
+    clock.now += 3600
+    assert cache.peek('k') == 2
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = QueryCache(max_entries=2)
+    cache.get_or_load('a', 'historical', lambda: 'a')
+    cache.get_or_load('b', 'historical', lambda: 'b')
+    cache.get_or_load('a', 'historical', lambda: 'reloaded')  # a is now most recent
+    cache.get_or_load('c', 'historical', lambda: 'c')
+
+    assert cache.peek('b') is None
+    assert (cache.peek('a'), cache.peek('c')) == ('a', 'c')
+    metrics = cache.get_metrics()
+    assert (metrics['entries'], metrics['evictions']) == (2, 1)
+
+    cache.clear()
+    assert cache.get_metrics()['entries'] == 0
+
+
+def test_key_normalizes_sql_and_buckets_datetimes():
+    cache = QueryCache(ttls={'recent': 60})
+    query = 'SELECT *\n  FROM shipments WHERE created_at >= %s'
+    t0 = datetime.fromtimestamp(CLOCK_START - CLOCK_START % 60, timezone.utc)
+    t1 = datetime.fromtimestamp(CLOCK_START - CLOCK_START % 60 + 59, timezone.utc)
+    t2 = datetime.fromtimestamp(CLOCK_START - CLOCK_START % 60 + 60, timezone.utc)
+
+    key = cache.make_key('recent', query, [t0])
+    assert cache.make_key('recent', 'SELECT * FROM shipments WHERE created_at >= %s', [t1]) == key
+    assert cache.make_key('recent', query, [t2]) != key
+    assert cache.make_key('historical', query, [t0]) != key
+    assert cache.make_key('recent', query, [t0], 'other-db') != key
+
+
+def test_historical_entries_do_not_outlive_the_day(clock):
+    cache = QueryCache()
+    query = "SELECT COUNT(*) FROM orders WHERE created_at >= CURRENT_DATE - INTERVAL '90 days'"
+    # One minute before local midnight
+    clock.now = (datetime.fromtimestamp(CLOCK_START) + timedelta(days=1)).replace(
+        hour=23, minute=59, second=0, microsecond=0).timestamp()
+    loader = Loader()
+
+    assert cache.get_or_load(cache.make_key('historical', query), 'historical', loader) == 1
+    clock.now += 30
+    assert cache.get_or_load(cache.make_key('historical', query), 'historical', loader) == 1
+
+    # Still within the TTL, but CURRENT_DATE moved: the previous window is not served, even stale
+    clock.now += 60
+    assert cache.get_or_load(cache.make_key('historical', query), 'historical', loader) == 2
+    assert loader.calls == 2
+
+    # Other classes are keyed by their parameters only
+    key = cache.make_key('recent', query)
+    clock.now += 86400
+    assert cache.make_key('recent', query) == key
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Rollup refresh tests: every statement of a refresh transaction goes through the query
+telemetry (fingerprint stats and slow-query log) and the state row is advanced.
+
+Runs without a database: the refresh transaction is replayed against a fake cursor.
+
+Usage:
+    python -m pytest test_rollups.py
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import RecordingCursor, db_with_cursor  # noqa: E402
+from database_connection import fingerprint_sql  # noqa: E402
+from rollups import ROLLUPS, RollupManager  # noqa: E402
+
+UNTIL = datetime(2025, 1, 7, 12, 0)
+
+
+class FakeCursor(RecordingCursor):
+    """Answers the refresh transaction's reads; writes report a fixed row count."""
+
+    rows_affected = 4
+
+    def __init__(self, high_water):
+        super().__init__()
+        self.high_water = high_water
+
+    def answer(self, query):
+        if 'FOR UPDATE' in query:
+            return {'high_water': self.high_water, 'until': UNTIL}
+        if 'COUNT(*) AS buckets' in query:
+            return {'buckets': 3}
+        return self._row
+
+
+def make_manager(cursor):
+    return RollupManager(db_with_cursor(cursor, 'rollups_test'), retention_days=30, lag_seconds=120)
+
+
+def test_refresh_statements_are_recorded_in_telemetry(telemetry):
+    cursor = FakeCursor(high_water=UNTIL - timedelta(minutes=15))
+    results = make_manager(cursor).refresh()
+
+    stats = {item['fingerprint']: item for item in telemetry.get_query_stats(limit=1000)}
+    for query, _ in cursor.statements:
+        entry = stats[fingerprint_sql(query)]
+        assert entry['callers'] == {'rollups.RollupManager._refresh_rollup': entry['calls']}
+
+    slow = telemetry.get_slow_queries()
+    assert len(slow) == len(cursor.statements)
+    assert all(entry['plan'] is None for entry in slow)
+
+    for name, spec in ROLLUPS.items():
+        assert results[name] == {
+            'mode': 'incremental',
+            'dirty_buckets': 3,
+            'rows_written': 4,
+            'high_water': UNTIL.isoformat(),
+            'duration_ms': results[name]['duration_ms']
+        }
+        assert stats[fingerprint_sql(spec['insert'])]['rows'] == 4
+
+
+def test_first_refresh_rebuilds(telemetry):
+    cursor = FakeCursor(high_water=None)
+    results = make_manager(cursor).refresh()
+
+    assert {result['mode'] for result in results.values()} == {'full'}
+    deletes = [query for query, _ in cursor.statements if query.startswith('DELETE FROM') and 'USING' not in query
+               and '<' not in query]
+    assert len(deletes) == len(ROLLUPS)
+
+
+def test_failed_statement_is_recorded_as_error(telemetry):
+    class FailingCursor(FakeCursor):
+        def execute(self, query, params=None):
+            super().execute(query, params)
+            if query.startswith('CREATE TEMP TABLE'):
+                raise RuntimeError('relation "orders" does not exist')
+
+    with pytest.raises(RuntimeError):
+        make_manager(FailingCursor(high_water=UNTIL)).refresh()
+
+    errors = [item for item in telemetry.get_query_stats(limit=1000) if item['errors']]
+    assert len(errors) == 1 and errors[0]['query'].startswith('create temp table rollup_dirty')
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+SLA compliance report tests: the rows of the single GROUPING SETS query are split into
+the overall aggregates, hub breakdown and performance zones that the separate overall,
+hub and zone queries used to return; the asyncio report runs its rollup sub-queries
+concurrently and matches the synchronous one.
+
+Runs without a database: the grouping-set rows are computed in Python from synthetic
+deliveries, and the reference hub and zone results follow the replaced SQL (hubs with at
+least 10 deliveries, worst 20 by compliance first). The async tests answer the queries
+from the same rows through a DatabaseConnection with stubbed executors.
+
+Usage:
+    python -m pytest test_sla_analytics.py
+"""
+
+import os
+import sys
+import time
+import random
+import types
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database_connection  # noqa: E402
+from database_connection import DatabaseConnection, QueryCache, QueryTimeoutError, run_async  # noqa: E402
+from sla_analytics import SLAAnalytics  # noqa: E402
+
+
+def make_deliveries(seed: int = 3, hubs: int = 30):
+    """Completed deliveries as (hub_id, actual_minutes, target_minutes, breach_minutes)."""
+    rng = random.Random(seed)
+    deliveries = []
+    for hub_id in list(range(1, hubs + 1)) + [None]:
+        on_time_share = rng.uniform(0.6, 1.0)
+        for _ in range(rng.randint(3, 40)):
+            target = rng.uniform(60, 240)
+            actual = target * (rng.uniform(0.3, 1.0) if rng.random() < on_time_share else rng.uniform(1.0, 1.5))
+            deliveries.append((hub_id, actual, target, actual - target))
+    return deliveries
+
+
+def zone_of(breach_minutes: float) -> str:
+    if breach_minutes <= 0:
+        return 'on_time'
+    return 'at_risk' if breach_minutes <= 15 else 'violated'
+
+
+def aggregate(deliveries):
+    count = len(deliveries)
+    met = sum(breach <= 0 for _, _, _, breach in deliveries)
+    return {
+        'total_deliveries': count,
+        'deliveries_on_time': met,
+        'deliveries_breached': count - met,
+        'compliance_rate': met / count * 100,
+        'avg_duration_minutes': sum(actual for _, actual, _, _ in deliveries) / count,
+        'avg_sla_target': sum(target for _, _, target, _ in deliveries) / count,
+        'avg_breach_minutes': sum(breach if breach > 0 else 0 for *_, breach in deliveries) / count,
+        'max_breach_minutes': max(breach for *_, breach in deliveries),
+        'median_duration': 0.0,
+        'p95_duration': 0.0
+    }
+
+
+def grouping_set_rows(deliveries):
+    """What GROUP BY GROUPING SETS ((), (hub_id, hub_name), (zone)) returns, in no particular order."""
+    rows = [dict(aggregate(deliveries), grouping_set='overall', hub_id=None, hub_name=None, zone=None)]
+    for hub_id in {hub for hub, *_ in deliveries}:
+        group = [delivery for delivery in deliveries if delivery[0] == hub_id]
+        rows.append(dict(aggregate(group), grouping_set='hub', hub_id=hub_id,
+                         hub_name=f'HUB{hub_id}' if hub_id is not None else None, zone=None))
+    for zone in {zone_of(delivery[3]) for delivery in deliveries}:
+        group = [delivery for delivery in deliveries if zone_of(delivery[3]) == zone]
+        rows.append(dict(aggregate(group), grouping_set='zone', hub_id=None, hub_name=None, zone=zone))
+    random.Random(0).shuffle(rows)
+    return rows
+
+
+@pytest.fixture
+def analytics():
+    # The split only needs the summarizing helpers, not a database connection
+    return SLAAnalytics.__new__(SLAAnalytics)
+
+
+def test_split_matches_separate_queries(analytics):
+    deliveries = make_deliveries()
+    overall, hub_breakdown, zones = analytics._split_compliance_report(grouping_set_rows(deliveries))
+
+    assert overall['total_deliveries'] == len(deliveries)
+    assert overall['compliance_rate'] == pytest.approx(aggregate(deliveries)['compliance_rate'])
+
+    eligible = {}
+    for hub_id in {hub for hub, *_ in deliveries if hub is not None}:
+        group = [delivery for delivery in deliveries if delivery[0] == hub_id]
+        if len(group) >= 10:
+            eligible[hub_id] = aggregate(group)
+    expected_rates = sorted(hub['compliance_rate'] for hub in eligible.values())[:20]
+
+    # Hubs tied on compliance may come in either order, as with ORDER BY compliance_rate
+    assert len(hub_breakdown) == 20
+    assert [hub['compliance_rate'] for hub in hub_breakdown] == pytest.approx(expected_rates)
+    for hub in hub_breakdown:
+        expected = eligible[hub['hub_id']]
+        assert hub['hub_name'] == f"HUB{hub['hub_id']}"
+        assert hub['total_deliveries'] == expected['total_deliveries']
+        assert hub['on_time_deliveries'] == expected['deliveries_on_time']
+        assert hub['compliance_rate'] == pytest.approx(expected['compliance_rate'])
+        assert hub['status'] == analytics._get_compliance_status(expected['compliance_rate'])
+
+    for zone in ('on_time', 'at_risk', 'violated'):
+        assert zones[zone] == sum(zone_of(delivery[3]) == zone for delivery in deliveries)
+    assert zones['on_time_pct'] + zones['at_risk_pct'] + zones['violated_pct'] == pytest.approx(100, abs=0.02)
+
+
+def test_split_for_one_hub_has_no_breakdown(analytics):
+    deliveries = [delivery for delivery in make_deliveries() if delivery[0] == 4]
+    overall, hub_breakdown, zones = analytics._split_compliance_report(grouping_set_rows(deliveries), hub_id=4)
+
+    assert overall['total_deliveries'] == len(deliveries)
+    assert hub_breakdown is None
+    assert sum(zones[zone] for zone in ('on_time', 'at_risk', 'violated')) == len(deliveries)
+
+
+def test_split_reports_zones_without_rows_as_zero(analytics):
+    deliveries = [(1, 50.0, 60.0, -10.0)] * 12
+    _, hub_breakdown, zones = analytics._split_compliance_report(grouping_set_rows(deliveries))
+
+    assert [hub['hub_id'] for hub in hub_breakdown] == [1]
+    assert zones == {'on_time': 12, 'at_risk': 0, 'violated': 0,
+                     'on_time_pct': 100.0, 'at_risk_pct': 0.0, 'violated_pct': 0.0}
+
+    _, _, zones = analytics._split_compliance_report([])
+    assert zones == {'on_time': 0, 'at_risk': 0, 'violated': 0}
+
+
+def test_compliance_report_on_raw_tables_uses_one_query(analytics):
+    deliveries = make_deliveries()
+    queries = []
+
+    def execute_query(query, params=None, cache=None):
+        queries.append(query)
+        return grouping_set_rows(deliveries)
+
+    analytics.db = types.SimpleNamespace(execute_query=execute_query)
+    analytics.rollups = types.SimpleNamespace(is_ready=lambda: False)
+    report = analytics.analyze_sla_compliance(date_range=7)
+
+    assert len(queries) == 1 and 'GROUPING SETS' in queries[0]
+    assert report['overall']['total_deliveries'] == len(deliveries)
+    assert len(report['by_hub']) == 20
+    assert sum(report['performance_zones'][zone] for zone in ('on_time', 'at_risk', 'violated')) == len(deliveries)
+
+
+def rollup_rows(deliveries, statement_name: str):
+    """What each rollup (or raw-table report) statement returns for the deliveries."""
+    if statement_name == 'rollup_sla_compliance':
+        return [aggregate(deliveries)]
+    if statement_name == 'rollup_sla_hub_compliance':
+        hubs = {hub for hub, *_ in deliveries if hub is not None}
+        rows = []
+        for hub_id in hubs:
+            stats = aggregate([delivery for delivery in deliveries if delivery[0] == hub_id])
+            if stats['total_deliveries'] >= 10:
+                rows.append({'hub_id': hub_id, 'hub_name': f'HUB{hub_id}',
+                             'total_deliveries': stats['total_deliveries'],
+                             'on_time_deliveries': stats['deliveries_on_time'],
+                             'compliance_rate': stats['compliance_rate'],
+                             'avg_duration_minutes': stats['avg_duration_minutes']})
+        return sorted(rows, key=lambda row: (row['compliance_rate'], row['hub_id']))[:20]
+    if statement_name == 'rollup_sla_zones':
+        return [{'zone': zone, 'count': sum(zone_of(delivery[3]) == zone for delivery in deliveries)}
+                for zone in ('on_time', 'at_risk', 'violated')]
+    assert statement_name == 'sla_compliance_report'
+    return grouping_set_rows(deliveries)
+
+
+@pytest.fixture
+def async_analytics(monkeypatch):
+    """Analytics on a DatabaseConnection whose sync and async executors answer from the same rows."""
+    monkeypatch.setattr(database_connection, '_breakers', {})
+    monkeypatch.setattr(database_connection, '_query_cache', QueryCache())
+    deliveries = make_deliveries()
+    db = DatabaseConnection(config={'host': 'test', 'port': 5432, 'database': 'sla_async_test'})
+    db.pool = object()  # never used: both executors are replaced
+    db.running = db.peak = 0
+
+    async def execute_async(query, params, timeout, numeric_as_float):
+        db.running += 1
+        db.peak = max(db.peak, db.running)
+        try:
+            await asyncio.sleep(0.2)
+        finally:
+            db.running -= 1
+        return rollup_rows(deliveries, query.name)
+
+    db._execute_query_async = execute_async
+    db._execute_query = lambda query, params, timeout, numeric_as_float: rollup_rows(deliveries, query.name)
+
+    analytics = SLAAnalytics.__new__(SLAAnalytics)
+    analytics.db = db
+    analytics.rollups = types.SimpleNamespace(is_ready=lambda: True)
+    return analytics
+
+
+def without_period(report):
+    return {key: value for key, value in report.items() if key != 'analysis_period'}
+
+
+def test_async_report_runs_rollup_queries_concurrently(async_analytics):
+    started = time.monotonic()
+    report = run_async(async_analytics.analyze_sla_compliance_async(date_range=7), timeout=5)
+    elapsed = time.monotonic() - started
+
+    # Overall, hub and zone queries overlap: about one query's time, not three
+    assert async_analytics.db.peak == 3
+    assert elapsed < 0.45
+    async_analytics.db.query_cache.clear()
+    assert without_period(report) == without_period(async_analytics.analyze_sla_compliance(date_range=7))
+    assert len(report['by_hub']) == 20
+
+
+def test_async_report_on_raw_tables_matches_sync(async_analytics):
+    async_analytics.rollups = types.SimpleNamespace(is_ready=lambda: False)
+    report = run_async(async_analytics.analyze_sla_compliance_async(date_range=7), timeout=5)
+
+    assert async_analytics.db.peak == 1
+    async_analytics.db.query_cache.clear()
+    assert without_period(report) == without_period(async_analytics.analyze_sla_compliance(date_range=7))
+
+
+def test_async_report_raises_sub_query_timeouts(async_analytics):
+    async def timed_out(query, params, timeout, numeric_as_float):
+        if query.name == 'rollup_sla_zones':
+            raise QueryTimeoutError('Query timeout (30.0s) [query abc]', 'abc', 30.0, 32.0)
+        return []
+
+    async_analytics.db._execute_query_async = timed_out
+    with pytest.raises(QueryTimeoutError):
+        run_async(async_analytics.analyze_sla_compliance_async(date_range=7), timeout=5)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+SLA stream tests: several in-process subscribers read one broadcaster. Subscribers that
+keep up receive every event in order, a slow one skips ahead to the latest status,
+reconnects resume from Last-Event-ID, concurrent subscribers never exceed the cap, and
+the publisher thread exits once nobody is subscribed.
+
+Runs without a database: FakeAnalytics counts status computations and FakeTracker hands
+out queued transitions.
+
+Usage:
+    python -m pytest test_sla_stream.py
+"""
+
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import wait_for  # noqa: E402
+from sla_stream import SLAStatusBroadcaster, StreamCapacityError  # noqa: E402
+
+
+class FakeTracker:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.transitions = []
+
+    def transitions_since(self, seq: int):
+        return len(self.transitions), self.transitions[seq:]
+
+
+class FakeAnalytics:
+    def __init__(self, tracker: FakeTracker = None):
+        self.tracker = tracker or FakeTracker()
+        self.computations = 0
+        self.fail = False
+
+    def get_realtime_sla_status(self):
+        if self.fail:
+            raise RuntimeError('database down')
+        self.computations += 1
+        return {'computation': self.computations}
+
+
+def take(subscription, count: int = 1, timeout: float = 5.0):
+    """The next `count` events of a subscription, skipping keep-alives."""
+    events = []
+    deadline = time.monotonic() + timeout
+    while len(events) < count:
+        assert time.monotonic() < deadline, 'timed out waiting for events'
+        event = next(subscription)
+        if event is not None:
+            events.append(event)
+    return events
+
+
+@pytest.fixture
+def broadcaster():
+    # The publisher computes once when the first subscriber arrives; the tests publish the rest
+    broadcaster = SLAStatusBroadcaster(FakeAnalytics(), interval=3600, buffer_size=4, max_subscribers=3)
+    yield broadcaster
+    broadcaster.stop()
+
+
+def test_fan_out_to_fast_and_slow_subscribers(broadcaster):
+    fast = [broadcaster.subscribe(heartbeat=0.05) for _ in range(2)]
+    slow = broadcaster.subscribe(heartbeat=0.05)
+    for subscription in fast + [slow]:
+        assert take(subscription) == [(1, 'status', {'computation': 1})]
+    assert not broadcaster.has_capacity()
+
+    received = {0: [], 1: []}
+    for _ in range(10):
+        broadcaster._publish_status()
+        for i, subscription in enumerate(fast):
+            received[i].extend(event_id for event_id, _, _ in take(subscription))
+    assert received[0] == received[1] == list(range(2, 12))
+
+    # The slow subscriber missed more than the buffer holds and jumps to the latest status
+    assert take(slow) == [(11, 'status', {'computation': 11})]
+    stats = broadcaster.get_stats()
+    assert stats['skipped_events'] == 11 - 4 - 1
+    assert (stats['computations'], stats['last_event_id'], stats['buffered_events']) == (11, 11, 4)
+    assert stats['subscribers'] == 3
+
+    for subscription in fast + [slow]:
+        subscription.close()
+    assert broadcaster.get_stats()['subscribers'] == 0
+
+
+def test_reconnect_resumes_from_last_event_id(broadcaster):
+    first = broadcaster.subscribe(heartbeat=0.05)
+    take(first)
+    for _ in range(4):
+        broadcaster._publish_status()
+    first.close()
+
+    # Events 2..5 are buffered: resume after 3
+    resumed = broadcaster.subscribe(last_event_id=3, heartbeat=0.05)
+    assert [event_id for event_id, _, _ in take(resumed, 2)] == [4, 5]
+    resumed.close()
+
+    # Event 1 has left the buffer: start from the latest status
+    restarted = broadcaster.subscribe(last_event_id=0, heartbeat=0.05)
+    assert take(restarted) == [(5, 'status', {'computation': 5})]
+    restarted.close()
+
+
+def test_transitions_are_published_before_status():
+    tracker = FakeTracker(enabled=True)
+    tracker.transitions = [{'id': 1, 'transition': 'at_risk'}]
+    broadcaster = SLAStatusBroadcaster(FakeAnalytics(tracker), interval=3600, buffer_size=16)
+    try:
+        subscription = broadcaster.subscribe(heartbeat=0.05)
+        # Transitions from before the first computation are not news
+        assert [event_type for _, event_type, _ in take(subscription)] == ['status']
+
+        tracker.transitions += [{'id': 2, 'transition': 'at_risk'}, {'id': 1, 'transition': 'breached'}]
+        broadcaster._publish_status()
+        events = take(subscription, 3)
+        assert [(event_type, data.get('id')) for _, event_type, data in events] == \
+            [('transition', 2), ('transition', 1), ('status', None)]
+        subscription.close()
+    finally:
+        broadcaster.stop()
+
+
+def test_failed_status_publishes_error_and_stream_continues(broadcaster):
+    subscription = broadcaster.subscribe(heartbeat=0.05)
+    take(subscription)
+
+    broadcaster.analytics.fail = True
+    broadcaster._publish_status()
+    broadcaster.analytics.fail = False
+    broadcaster._publish_status()
+
+    events = take(subscription, 2)
+    assert [event_type for _, event_type, _ in events] == ['error', 'status']
+    assert events[0][2]['error_type'] == 'RuntimeError'
+    assert broadcaster.get_stats()['errors'] == 1
+    subscription.close()
+
+
+def test_heartbeat_without_events(broadcaster):
+    subscription = broadcaster.subscribe(heartbeat=0.02)
+    take(subscription)
+    assert next(subscription) is None
+    subscription.close()
+
+
+def test_publisher_exits_without_subscribers():
+    analytics = FakeAnalytics()
+    broadcaster = SLAStatusBroadcaster(analytics, interval=0.01, idle_timeout=0.05)
+    try:
+        subscription = broadcaster.subscribe(heartbeat=0.05)
+        take(subscription, 3)
+        assert broadcaster.get_stats()['publisher_running']
+        subscription.close()
+
+        wait_for(lambda: not broadcaster.get_stats()['publisher_running'])
+        computations = analytics.computations
+        time.sleep(0.05)
+        assert analytics.computations == computations
+
+        # The next subscriber starts it again
+        subscription = broadcaster.subscribe(heartbeat=0.05)
+        take(subscription, 2)
+        assert broadcaster.get_stats()['publisher_running']
+        subscription.close()
+    finally:
+        broadcaster.stop()
+
+
+def test_concurrent_subscribers_never_exceed_the_cap(broadcaster):
+    start = threading.Barrier(12)
+    subscriptions, refused = [], []
+
+    def connect():
+        start.wait(5)
+        try:
+            subscriptions.append(broadcaster.subscribe(heartbeat=0.05))
+        except StreamCapacityError:
+            refused.append(1)
+
+    threads = [threading.Thread(target=connect) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    # Slots are taken at subscribe(), before any subscription is iterated
+    assert (len(subscriptions), len(refused)) == (3, 9)
+    assert broadcaster.get_stats()['subscribers'] == 3
+
+    # Closing a subscription that never streamed releases its slot, once
+    subscriptions[0].close()
+    subscriptions[0].close()
+    assert broadcaster.get_stats()['subscribers'] == 2
+    replacement = broadcaster.subscribe(heartbeat=0.05)
+    with pytest.raises(StreamCapacityError):
+        broadcaster.subscribe(heartbeat=0.05)
+
+    for subscription in subscriptions[1:] + [replacement]:
+        subscription.close()
+    assert broadcaster.get_stats()['subscribers'] == 0
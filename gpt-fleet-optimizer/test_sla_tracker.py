@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Realtime SLA tracker tests: the heap-maintained aggregates and at-risk list are compared
+with a brute-force scan of the same shipments as the clock moves and deltas are polled.
+
+Runs without a database: FakeShipmentsDB answers the tracker's three queries from an
+in-memory shipments table whose updated_at is a naive timestamp column, as in the
+production schema.
+
+Usage:
+    python -m pytest test_sla_tracker.py
+"""
+
+import os
+import sys
+import time
+import random
+import types
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sla_tracker  # noqa: E402
+from sla_tracker import RealtimeSLATracker  # noqa: E402
+
+START = 1_700_000_000.0
+
+
+class FakeClock:
+    def __init__(self, now: float = START):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+class FakeShipmentsDB:
+    """The shipments table and the tracker's queries, evaluated in Python."""
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.rows = {}
+
+    def upsert(self, shipment_id: int, created: float, promise: float, active: bool = True):
+        self.rows[shipment_id] = {
+            'id': shipment_id,
+            'tracking_no': f'TRK{shipment_id:06d}',
+            'shipment_status': 'in_transit',
+            'courier_id': shipment_id % 7,
+            'partner_id': shipment_id % 3,
+            'created_epoch': created,
+            'promise_time': promise,
+            'active': active,
+            # timestamp without time zone: psycopg2 returns naive datetimes (UTC session)
+            'updated_at': datetime.fromtimestamp(self.clock.now, timezone.utc).replace(tzinfo=None)
+        }
+
+    def execute_query(self, query, params=None, timeout=None):
+        if query == sla_tracker.CLOCK:
+            return [{'db_time': datetime.fromtimestamp(self.clock.now, timezone.utc), 'db_epoch': self.clock.now}]
+        if query is sla_tracker.ACTIVE_SHIPMENTS:
+            return [self._select(row, query) for row in self.rows.values() if row['active']]
+        if query is sla_tracker.SHIPMENT_CHANGES:
+            high_water, overlap = params
+            since = high_water - timedelta(seconds=overlap)
+            changed = [row for row in self.rows.values() if row['updated_at'].replace(tzinfo=timezone.utc) > since]
+            return [self._select(row, query) for row in sorted(changed, key=lambda row: row['updated_at'])]
+        raise AssertionError(f'unexpected query: {query}')
+
+    @staticmethod
+    def _select(row, query):
+        row = dict(row)
+        # Like PostgreSQL, a ::timestamptz cast turns the naive column into an aware value
+        if 'updated_at::timestamptz' in query:
+            row['updated_at'] = row['updated_at'].replace(tzinfo=timezone.utc)
+        return row
+
+
+def brute_force(rows, now: float, limit: int):
+    """The sla_realtime_status and sla_at_risk_deliveries queries, as full scans."""
+    active = [row for row in rows.values() if row['active']]
+    window = [row for row in active if row['created_epoch'] >= now - RealtimeSLATracker.WINDOW_HOURS * 3600]
+    threshold = now + RealtimeSLATracker.AT_RISK_MINUTES * 60
+    count = len(window)
+    aggregates = {
+        'active_count': count,
+        'avg_elapsed_minutes': sum(now - row['created_epoch'] for row in window) / count / 60 if count else None,
+        'at_risk_count': sum(row['promise_time'] < threshold for row in window),
+        'breached_count': sum(row['promise_time'] < now for row in window),
+        'min_remaining_minutes': min(row['promise_time'] - now for row in window) / 60 if count else None,
+        'max_elapsed_minutes': max(now - row['created_epoch'] for row in window) / 60 if count else None,
+        'avg_sla_target': sum(row['promise_time'] - row['created_epoch'] for row in window) / count / 60
+        if count else None
+    }
+    due = sorted((row for row in active if row['promise_time'] < threshold),
+                 key=lambda row: (row['promise_time'], row['id']))
+    return aggregates, [row['id'] for row in due[:limit]]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(sla_tracker, 'time', types.SimpleNamespace(time=clock.time, monotonic=time.monotonic))
+    return clock
+
+
+def make_tracker(db):
+    return RealtimeSLATracker(db, poll_interval=0, resync_interval=1e9, overlap_seconds=120)
+
+
+def assert_matches_brute_force(tracker, db, now, limit=20):
+    aggregates, at_risk = tracker.status(limit=limit)
+    expected, expected_ids = brute_force(db.rows, now, limit)
+    for key, value in expected.items():
+        if value is None:
+            assert aggregates[key] is None, key
+        else:
+            assert aggregates[key] == pytest.approx(value, abs=1e-4), key
+    assert [shipment['id'] for shipment in at_risk] == expected_ids
+
+
+def test_matches_brute_force_as_clock_moves_and_deltas_arrive(clock):
+    rng = random.Random(7)
+    db = FakeShipmentsDB(clock)
+    next_id = 1
+    for _ in range(400):
+        created = clock.now - rng.uniform(0, 30 * 3600)
+        db.upsert(next_id, created, clock.now + rng.uniform(-2 * 3600, 6 * 3600))
+        next_id += 1
+
+    tracker = make_tracker(db)
+    assert_matches_brute_force(tracker, db, clock.now)
+
+    for _ in range(60):
+        clock.now += rng.uniform(0, 20 * 60)
+        for shipment_id in rng.sample(sorted(db.rows), 8):
+            row = db.rows[shipment_id]
+            action = rng.random()
+            if action < 0.4:
+                db.upsert(shipment_id, row['created_epoch'], clock.now + rng.uniform(-3600, 4 * 3600), row['active'])
+            elif action < 0.7:
+                db.upsert(shipment_id, row['created_epoch'], row['promise_time'], active=False)
+            else:
+                # Touched without a change to created or promise time
+                db.upsert(shipment_id, row['created_epoch'], row['promise_time'], row['active'])
+        for _ in range(rng.randint(0, 10)):
+            db.upsert(next_id, clock.now - rng.uniform(0, 3600), clock.now + rng.uniform(0, 4 * 3600))
+            next_id += 1
+
+        assert_matches_brute_force(tracker, db, clock.now, limit=rng.choice([5, 20, 50]))
+
+    stats = tracker.get_stats()
+    assert stats['active_shipments'] == sum(row['active'] for row in db.rows.values())
+    assert stats['polls'] == 60
+
+
+def test_poll_with_naive_updated_at(clock):
+    db = FakeShipmentsDB(clock)
+    db.upsert(1, clock.now - 3600, clock.now + 3600)
+    tracker = make_tracker(db)
+    aggregates, _ = tracker.status()
+    assert aggregates['active_count'] == 1
+
+    clock.now += 60
+    db.upsert(1, clock.now - 3660, clock.now + 300)
+    db.upsert(2, clock.now - 60, clock.now - 30)
+    aggregates, at_risk = tracker.status()
+
+    assert aggregates['active_count'] == 2
+    assert aggregates['breached_count'] == 1
+    assert [shipment['id'] for shipment in at_risk] == [2, 1]
+    assert tracker.get_stats()['high_water'] == datetime.fromtimestamp(clock.now, timezone.utc).isoformat()
+
+
+def test_transitions_recorded_as_deadlines_pass(clock):
+    db = FakeShipmentsDB(clock)
+    db.upsert(1, clock.now - 600, clock.now + 20 * 60)
+    tracker = make_tracker(db)
+    tracker.status()
+    seq, transitions = tracker.transitions_since(0)
+    assert transitions == []
+
+    clock.now += 10 * 60
+    tracker.status()
+    clock.now += 11 * 60
+    tracker.status()
+    seq, transitions = tracker.transitions_since(0)
+    assert seq == 2
+    assert [(t['id'], t['transition']) for t in transitions] == [(1, 'at_risk'), (1, 'breached')]
+    assert tracker.transitions_since(seq) == (2, [])
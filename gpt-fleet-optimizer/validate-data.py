@@ -9,13 +9,13 @@ Database: barqfleet_db (Production Read Replica)
 Host: barqfleet-db-prod-stack-read-replica.cgr02s6xqwhy.me-south-1.rds.amazonaws.com
 """
 
-import psycopg2
-from psycopg2.extras import RealDictCursor
 from datetime import datetime, timedelta
 import json
 from typing import Dict, List, Any
 import sys
 
+from database_connection import DatabaseConnection
+
 # Database configuration
 DB_CONFIG = {
     'host': 'barqfleet-db-prod-stack-read-replica.cgr02s6xqwhy.me-south-1.rds.amazonaws.com',
@@ -29,8 +29,7 @@ class DatabaseValidator:
     """Validates BarqFleet production database data quality and completeness."""
 
     def __init__(self):
-        self.conn = None
-        self.cursor = None
+        self.db = DatabaseConnection(DB_CONFIG)
         self.validation_results = {
             'timestamp': datetime.now().isoformat(),
             'database': DB_CONFIG['database'],
@@ -44,8 +43,7 @@ class DatabaseValidator:
         """Establish database connection."""
         try:
             print(f"Connecting to {DB_CONFIG['host']}...")
-            self.conn = psycopg2.connect(**DB_CONFIG)
-            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+            self.db.connect(retry_attempts=1)
             print("✓ Database connection established\n")
             return True
         except Exception as e:
@@ -56,24 +54,18 @@ class DatabaseValidator:
 
     def disconnect(self):
         """Close database connection."""
-        if self.cursor:
-            self.cursor.close()
-        if self.conn:
-            self.conn.close()
+        if self.db.pool:
+            self.db.disconnect()
             print("\n✓ Database connection closed")
 
     def execute_query(self, query: str, description: str = "") -> List[Dict]:
         """Execute a query and return results."""
         try:
-            self.cursor.execute(query)
-            results = self.cursor.fetchall()
-            return results
+            return self.db.execute_query(query)
         except Exception as e:
             error_msg = f"Query failed ({description}): {str(e)}"
             print(f"  ✗ {error_msg}")
             self.validation_results['errors'].append(error_msg)
-            # Rollback the transaction to continue
-            self.conn.rollback()
             return []
 
     def validate_orders_table(self):